@@ -1,10 +1,13 @@
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from contextlib import asynccontextmanager
+from typing import AsyncContextManager, AsyncGenerator, AsyncIterator, Callable, Generator, Optional
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from app.db.session import SessionLocal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import SessionLocal, get_async_sessionmaker
+from app.core.admission import AdmissionRejected, admission_controller
 from app.core.config import settings
 from app.models.user import User
 
@@ -21,8 +24,16 @@ def get_db() -> Generator:
     finally:
         db.close()
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Session for `async def` handlers: queries are awaited instead of blocking the event loop."""
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+async def _user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    return (await db.execute(select(User).where(User.email == email))).scalar_one_or_none()
+
 async def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)
 ) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -38,13 +49,20 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == token_data.email).first()
+    user = await _user_by_email(db, token_data.email)
     if user is None:
         raise credentials_exception
     return user
 
+async def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+    """get_current_user restricted to the accounts listed in ADMIN_EMAILS."""
+    admins = {email.strip().lower() for email in settings.ADMIN_EMAILS.split(",") if email.strip()}
+    if (current_user.email or "").lower() not in admins:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
+
 async def get_current_user_optional(
-    db: Session = Depends(get_db), token: Optional[str] = Depends(oauth2_scheme_optional)
+    db: AsyncSession = Depends(get_async_db), token: Optional[str] = Depends(oauth2_scheme_optional)
 ) -> Optional[User]:
     if not token:
         return None
@@ -56,5 +74,47 @@ async def get_current_user_optional(
     except JWTError:
         return None
     
-    user = db.query(User).filter(User.email == email).first()
-    return user
+    return await _user_by_email(db, email)
+
+async def get_current_user_stream(
+    db: AsyncSession = Depends(get_async_db),
+    token: Optional[str] = Depends(oauth2_scheme_optional),
+    access_token: Optional[str] = None,
+) -> User:
+    """get_current_user that also takes ?access_token=, since the browser EventSource cannot send headers."""
+    return await get_current_user(db=db, token=token or access_token or "")
+
+def admission(route: str) -> Callable[..., Callable[[], AsyncContextManager[None]]]:
+    """
+    Dependency giving the handler an async context manager that holds one of the route's admission slots
+    (ADMISSION_ROUTES). The handler takes it only around the work the slot protects, so a request that ends
+    up replaying an idempotent response, or waiting for the original to finish, never occupies capacity.
+    Users are told apart by account, anonymous clients by IP address.
+    """
+    def slot_for(
+        request: Request, current_user: Optional[User] = Depends(get_current_user_optional)
+    ) -> Callable[[], AsyncContextManager[None]]:
+        if current_user:
+            user_key = f"user:{current_user.id}"
+        else:
+            user_key = f"ip:{request.client.host}" if request.client else None
+
+        @asynccontextmanager
+        async def hold_slot() -> AsyncIterator[None]:
+            controller = admission_controller(route)
+            if controller is None:
+                yield
+                return
+            try:
+                async with controller.slot(user_key):
+                    yield
+            except AdmissionRejected as e:
+                raise HTTPException(
+                    status_code=e.status_code,
+                    detail=f"Server busy ({e.reason}), retry later",
+                    headers={"Retry-After": str(e.retry_after)},
+                )
+
+        return hold_slot
+
+    return slot_for
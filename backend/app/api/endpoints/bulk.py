@@ -0,0 +1,190 @@
+import asyncio
+import json
+import logging
+from typing import Any, List, Optional
+from datetime import datetime
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+
+from app.api import deps
+from app.core.config import settings
+from app.models.user import User
+from app.models.bulk_job import BulkJob, BulkJobItem
+from app.services.bulk_generation import bulk_service, parse_csv_items, FINISHED_STATUSES
+from app.services.batch_generation import batch_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+DEFAULT_PLATFORMS = ["facebook", "instagram", "tiktok", "linkedin", "whatsapp"]
+
+class BulkItem(BaseModel):
+    title: str
+    body: str
+
+class BulkJobCreate(BaseModel):
+    items: List[BulkItem]
+    platforms: List[str] = DEFAULT_PLATFORMS
+    concurrency: int = 2
+    mode: str = "realtime"  # realtime, or batch for the OpenAI Batch API (text-only drafts, within 24h)
+
+class BulkJobItemResponse(BaseModel):
+    id: int
+    position: int
+    title: str
+    status: str
+    chat_session_id: Optional[int]
+    error_message: Optional[str]
+
+    class Config:
+        from_attributes = True
+
+class BulkJobResponse(BaseModel):
+    id: int
+    status: str
+    mode: str = "realtime"
+    platforms: List[str]
+    concurrency: int
+    total: int
+    completed: int
+    failed: int
+    created_at: datetime
+    finished_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+class BulkJobDetail(BulkJobResponse):
+    items: List[BulkJobItemResponse] = []
+
+def _get_own_job(db: Session, job_id: int, user: User) -> BulkJob:
+    job = db.query(BulkJob).filter(BulkJob.id == job_id, BulkJob.user_id == user.id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Bulk job not found")
+    return job
+
+async def _start(db: Session, job: BulkJob) -> None:
+    if job.mode == "batch":
+        try:
+            await asyncio.to_thread(batch_service.submit, job.id)
+        except Exception:
+            # The batch poller retries the submission
+            logger.exception("Batch submission failed", extra={"job_id": job.id})
+        db.refresh(job)
+    elif settings.WORKER_MODE == "external":
+        # Realtime jobs run in the worker process, which picks up jobs nobody runs on every pass
+        logger.info("Bulk job left to the worker", extra={"job_id": job.id})
+    else:
+        bulk_service.start(job.id)
+
+async def _create_and_start(db: Session, user: User, items, platforms: List[str], concurrency: int, mode: str) -> BulkJob:
+    try:
+        job = bulk_service.create_job(db, user.id, items, platforms, concurrency, mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await _start(db, job)
+    return job
+
+@router.post("/jobs", response_model=BulkJobResponse)
+async def create_bulk_job(
+    job_in: BulkJobCreate,
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user)
+) -> Any:
+    """Queues a generation job for a JSON list of title/body items."""
+    items = [item.model_dump() for item in job_in.items]
+    return await _create_and_start(db, current_user, items, job_in.platforms, job_in.concurrency, job_in.mode)
+
+@router.post("/jobs/csv", response_model=BulkJobResponse)
+async def create_bulk_job_from_csv(
+    file: UploadFile = File(...),
+    platforms: str = Form(",".join(DEFAULT_PLATFORMS)),
+    concurrency: int = Form(2),
+    mode: str = Form("realtime"),
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user)
+) -> Any:
+    """Queues a generation job for a CSV upload with `title` and `body` columns."""
+    try:
+        items = parse_csv_items(await file.read())
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    platform_list = [p.strip() for p in platforms.split(",") if p.strip()]
+    return await _create_and_start(db, current_user, items, platform_list, concurrency, mode)
+
+@router.get("/jobs", response_model=List[BulkJobResponse])
+def list_bulk_jobs(
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user)
+) -> Any:
+    return db.query(BulkJob).filter(BulkJob.user_id == current_user.id).order_by(BulkJob.created_at.desc()).all()
+
+@router.get("/jobs/{job_id}", response_model=BulkJobDetail)
+def get_bulk_job(
+    job_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user)
+) -> Any:
+    job = _get_own_job(db, job_id, current_user)
+    items = db.query(BulkJobItem).filter(BulkJobItem.job_id == job.id).order_by(BulkJobItem.position.asc()).all()
+    detail = BulkJobDetail.model_validate(job)
+    detail.items = [BulkJobItemResponse.model_validate(item) for item in items]
+    return detail
+
+@router.post("/jobs/{job_id}/resume", response_model=BulkJobResponse)
+async def resume_bulk_job(
+    job_id: int,
+    retry_failed: bool = False,
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user)
+) -> Any:
+    """
+    Restarts pending items (and failed ones with retry_failed=true). Completed items are never regenerated.
+    A job that is still running, here or in another process, is not started twice: its owner picks the
+    items up. A batch job can only be retried once its batch has been collected.
+    """
+    job = _get_own_job(db, job_id, current_user)
+    if job.mode == "batch" and job.status not in FINISHED_STATUSES:
+        return job
+    if retry_failed:
+        bulk_service.retry_failed(db, job.id)
+    elif job.status in FINISHED_STATUSES:
+        return job
+    db.refresh(job)
+    await _start(db, job)
+    return job
+
+@router.get("/jobs/{job_id}/events")
+async def stream_bulk_job_events(
+    job_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user)
+) -> Any:
+    """
+    Server-Sent Events stream of job progress: one `progress` event per finished item and a final `done`.
+    Jobs running in another process (and batch jobs between poller passes) are followed by polling the job row.
+    """
+    _get_own_job(db, job_id, current_user)
+
+    async def events():
+        queue = bulk_service.subscribe(job_id)
+        try:
+            snapshot = await asyncio.to_thread(bulk_service.snapshot, job_id)
+            yield f"event: progress\ndata: {json.dumps(snapshot)}\n\n"
+            while snapshot["status"] not in FINISHED_STATUSES:
+                try:
+                    snapshot = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    if bulk_service.is_running(job_id):
+                        yield ": keep-alive\n\n"
+                        continue
+                    snapshot = await asyncio.to_thread(bulk_service.snapshot, job_id)
+                yield f"event: progress\ndata: {json.dumps(snapshot)}\n\n"
+            yield f"event: done\ndata: {json.dumps(snapshot)}\n\n"
+        finally:
+            bulk_service.unsubscribe(job_id, queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
@@ -0,0 +1,88 @@
+from typing import Any, List
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel
+
+from app.api import deps
+from app.models.user import User
+from app.models.chat import ChatSession, ChatMessage
+
+router = APIRouter()
+
+class ChatCreate(BaseModel):
+    title: str = "New Chat"
+
+class ChatResponse(BaseModel):
+    id: int
+    title: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class MessageCreate(BaseModel):
+    content: str
+
+class MessageResponse(BaseModel):
+    id: int
+    session_id: int
+    role: str
+    content: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+async def _get_own_chat(db: AsyncSession, chat_id: int, user: User) -> ChatSession:
+    chat = (await db.execute(select(ChatSession).where(
+        ChatSession.id == chat_id, ChatSession.user_id == user.id
+    ))).scalar_one_or_none()
+    if not chat:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    return chat
+
+@router.get("/", response_model=List[ChatResponse])
+async def list_chats(
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_user)
+) -> Any:
+    return (await db.execute(select(ChatSession).where(
+        ChatSession.user_id == current_user.id
+    ).order_by(ChatSession.created_at.desc()))).scalars().all()
+
+@router.post("/", response_model=ChatResponse)
+async def create_chat(
+    chat_in: ChatCreate,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_user)
+) -> Any:
+    chat = ChatSession(user_id=current_user.id, title=chat_in.title)
+    db.add(chat)
+    await db.commit()
+    return chat
+
+@router.get("/{chat_id}/messages", response_model=List[MessageResponse])
+async def list_messages(
+    chat_id: int,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_user)
+) -> Any:
+    chat = await _get_own_chat(db, chat_id, current_user)
+    return (await db.execute(select(ChatMessage).where(
+        ChatMessage.session_id == chat.id
+    ).order_by(ChatMessage.created_at.asc()))).scalars().all()
+
+@router.post("/{chat_id}/messages", response_model=MessageResponse)
+async def create_message(
+    chat_id: int,
+    message_in: MessageCreate,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_user)
+) -> Any:
+    chat = await _get_own_chat(db, chat_id, current_user)
+    message = ChatMessage(session_id=chat.id, role="user", content=message_in.content)
+    db.add(message)
+    await db.commit()
+    return message
@@ -0,0 +1,28 @@
+import asyncio
+from typing import Any
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+
+from app.services.image_renditions import RENDITIONS, renditions
+
+router = APIRouter()
+
+# HEAD too: the Instagram publisher checks the content type before creating a container
+@router.api_route("/renditions/{image_name}/{rendition_file}", methods=["GET", "HEAD"])
+async def get_rendition(image_name: str, rendition_file: str) -> Any:
+    """
+    Serves a platform-sized crop or WebP thumbnail of a generated image, rendering it on first request.
+    e.g. /api/media/renditions/tmpab12cd.png/thumb.webp
+    """
+    name, _, extension = rendition_file.rpartition(".")
+    rendition = RENDITIONS.get(name)
+    if rendition is None or extension != rendition.extension:
+        raise HTTPException(status_code=404, detail="Unknown rendition")
+    source = renditions.source_path(image_name)
+    if source is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    path = await asyncio.to_thread(renditions.get, source, name)
+    media_type = rendition.media_type if path != source else "image/png"
+    # The cache key is the source content hash, and generated images never change
+    return FileResponse(path, media_type=media_type, headers={"Cache-Control": "public, max-age=31536000, immutable"})
@@ -0,0 +1,40 @@
+from typing import Any, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse
+
+from app.core.config import settings
+from app.core.profiling import process_profiler, profile_store, token_matches
+
+router = APIRouter()
+
+def require_profiling_token(x_profile: Optional[str] = Header(None)) -> None:
+    """Admin access: the X-Profile header must carry PROFILING_TOKEN. Without a token configured the API does not exist."""
+    if not settings.PROFILING_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not token_matches(x_profile):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+@router.post("/sample", dependencies=[Depends(require_profiling_token)])
+def sample_process(seconds: int = Query(30, ge=1)) -> Any:
+    """
+    Samples every thread of this API process for `seconds` (up to PROFILING_MAX_SECONDS) in the background;
+    the artifact can be downloaded once the run is over. With several processes, each one profiles itself.
+    """
+    seconds = min(seconds, settings.PROFILING_MAX_SECONDS)
+    name = process_profiler.start(seconds)
+    if name is None:
+        raise HTTPException(status_code=409, detail="A process profile is already running")
+    return {"artifact": name, "seconds": seconds}
+
+@router.get("/artifacts", dependencies=[Depends(require_profiling_token)])
+def list_artifacts() -> Any:
+    """Saved profiles, newest first."""
+    return {"running": process_profiler.running, "artifacts": profile_store.list()}
+
+@router.get("/artifacts/{name}", dependencies=[Depends(require_profiling_token)])
+def download_artifact(name: str) -> Any:
+    """A profile in folded-stack format: `flamegraph.pl name.folded > flame.svg`, or open it in speedscope."""
+    path = profile_store.path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=name)
@@ -0,0 +1,91 @@
+from datetime import datetime
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.models.publication import Publication
+from app.models.user import User
+from app.services.queue_service import queue_service
+
+router = APIRouter()
+
+class QueueStatusUpdate(BaseModel):
+    status: str  # ON or OFF
+
+class DeadLetterEntry(BaseModel):
+    id: int
+    user_id: Optional[int]
+    platform: str
+    text: str
+    status: str
+    attempts: int
+    error_code: Optional[str]
+    error_class: Optional[str]
+    error_message: Optional[str]
+    created_at: datetime
+    processed_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+class RequeueRequest(BaseModel):
+    # Explicit ids or at least one filter; a request with neither is rejected
+    ids: Optional[List[int]] = None
+    platform: Optional[str] = None
+    error_class: Optional[str] = None
+    error_code: Optional[str] = None
+
+DEAD_LETTER_COLUMNS = [getattr(Publication, name) for name in DeadLetterEntry.model_fields]
+
+@router.get("/status")
+def get_queue_status() -> Any:
+    stats = queue_service.get_queue_stats()
+    return {"status": queue_service.get_status(), **stats}
+
+@router.post("/status")
+def set_queue_status(update: QueueStatusUpdate) -> Any:
+    try:
+        status = queue_service.set_status(update.status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": status}
+
+@router.post("/process")
+def process_queue() -> Any:
+    """Drains the pending queue immediately instead of waiting for the worker tick."""
+    return queue_service.process_pending_publications()
+
+@router.get("/dead-letter", response_model=List[DeadLetterEntry])
+def get_dead_letter(
+    platform: Optional[str] = None,
+    error_class: Optional[str] = None,
+    error_code: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """The user's publications that failed permanently or ran out of retries, most recent first."""
+    query = queue_service.dead_letter(
+        db, user_id=current_user.id, platform=platform, error_class=error_class, error_code=error_code
+    )
+    return query.with_entities(*DEAD_LETTER_COLUMNS).order_by(
+        Publication.processed_at.desc(), Publication.id.desc()
+    ).offset(skip).limit(limit).all()
+
+@router.post("/dead-letter/requeue")
+def requeue_dead_letter(
+    request: RequeueRequest,
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """Puts the user's dead-lettered publications back in the queue with a fresh attempt budget."""
+    if not (request.ids or request.platform or request.error_class or request.error_code):
+        raise HTTPException(status_code=400, detail="Give the ids to requeue or at least one filter")
+    requeued = queue_service.requeue(
+        db, ids=request.ids, user_id=current_user.id, platform=request.platform,
+        error_class=request.error_class, error_code=request.error_code,
+    )
+    return {"requeued": requeued}
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+from typing import Any
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.models.user import User
+from app.services.llm_usage import seconds_until_tomorrow, usage_service
+
+router = APIRouter()
+
+def _since(days: int):
+    return datetime.utcnow().date() - timedelta(days=days - 1)
+
+@router.get("/me")
+def get_my_usage(
+    days: int = Query(30, ge=1, le=366),
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """Today's quota status plus the user's token usage per day and model over the last `days` days."""
+    quota = usage_service.quota_for(current_user.id)
+    used = usage_service.used_today(db, current_user.id)
+    return {
+        "quota": {
+            "daily_tokens": quota or None,
+            "used_today": used,
+            "remaining_today": max(quota - used, 0) if quota else None,
+            "resets_in_seconds": seconds_until_tomorrow(),
+        },
+        **usage_service.report(db, _since(days), user_id=current_user.id),
+    }
+
+@router.get("/report")
+def get_usage_report(
+    days: int = Query(7, ge=1, le=366),
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_admin),
+) -> Any:
+    """Token usage per user over the last `days` days, biggest consumers first (user_id null: anonymous). Admins only."""
+    return usage_service.report(db, _since(days), by_user=True)
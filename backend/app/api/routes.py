@@ -1,112 +1,128 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
+import asyncio
+import json
+import logging
+from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import AsyncContextManager, Callable, List, Literal, Optional
 from datetime import datetime
-from app.services.content_generator import ContentGenerator
-from app.services.media_generator import MediaGenerator
+from app.services.generation_pipeline import GenerationPipeline, get_pipeline
+from app.core import profiling
+from app.core.config import settings
+from app.core.metrics import NEAR_DUPLICATES
+from app.core.tracing import current_trace_id, current_traceparent
+from app.services.idempotency import IdempotencyClaim, idempotency_service
+from app.services.llm_usage import QuotaExceededError
+from app.services.publication_events import publication_events
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
-content_gen = ContentGenerator()
-media_gen = MediaGenerator()
+
+def replay_response(claim: IdempotencyClaim) -> JSONResponse:
+    return JSONResponse(claim.replay_body, status_code=claim.replay_status, headers={"Idempotent-Replayed": "true"})
 
 class GenerateRequest(BaseModel):
     title: str
     body: str
     platforms: Optional[List[str]] = ["facebook", "instagram", "tiktok", "linkedin", "whatsapp"]
+    # Return the user's previous result for a near-identical announcement instead of generating again
+    reuse: bool = False
+    # False: always a new image, even when an equivalent prompt is in the image cache
+    use_image_cache: bool = True
+
+class SimilarRequest(BaseModel):
+    title: str
+    body: str
 
+def near_duplicates():
+    # Imported on first use: the index needs numpy, which the API does not load at startup.
+    # Lookups block on the database and numpy, so handlers call them through asyncio.to_thread
+    from app.services.near_duplicates import get_near_duplicates
+    return get_near_duplicates()
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.api import deps
 from app.models.user import User
-from app.models.chat import ChatSession, ChatMessage
-import json
+
+# The handlers are async; the synchronous session work below runs through asyncio.to_thread
+
+def save_history(pipeline: GenerationPipeline, db: Session, user_id: int, title: str, body: str, results: dict) -> None:
+    try:
+        pipeline.save_history(db, user_id, title, body, results)
+    except Exception:
+        logger.exception("Error saving history")
+        db.rollback()
 
 @router.post("/generate")
 async def generate_content(
     request: GenerateRequest,
     db: Session = Depends(deps.get_db),
-    current_user: Optional[User] = Depends(deps.get_current_user_optional)
+    current_user: Optional[User] = Depends(deps.get_current_user_optional),
+    idempotency_key: Optional[str] = Header(None),
+    pipeline: GenerationPipeline = Depends(get_pipeline),
+    admission_slot: Callable[[], AsyncContextManager[None]] = Depends(deps.admission("generate")),
 ):
     """
     Generates social media content and media assets for the requested platforms.
+    A retry with the same Idempotency-Key returns the first result instead of generating again.
+    Answers 429 when the user's daily token quota is used up or they already have ADMISSION_PER_USER
+    generations running, and 503 + Retry-After when the server is at capacity (ADMISSION_ROUTES); only the
+    generation itself counts against those limits, not replays, retries waiting on the original or reuses.
+    With `reuse`, a previous generation of the user from a near-identical announcement that covers the
+    requested platforms is returned as is (header Reused-From-Session) and nothing is generated.
     """
-    # 1. Generate Textual Content
-    results = content_gen.generate_social_content(request.title, request.body, request.platforms)
-    
-    # 2. Generate Media Assets (Images/Videos)
-    # Find the first available image prompt to use as the "master" image
-    master_image_path = None
-    master_image_url = None
-    
-    # First pass: Generate the master image
-    for platform, content in results.items():
-        if "error" in content:
-            continue
-        
-        if "image_prompt" in content and not master_image_path:
-            print(f"Generating master image using prompt from {platform}...")
-            # Use 1024x1024 for TikTok to ensure video acceptance (256x256 is too small)
-            image_size = "1024x1024" if "tiktok" in request.platforms else "512x512"
-            print(f"Using image size: {image_size}")
-            # Now returns a tuple (path, url)
-            master_image_path, master_openai_url = media_gen.generate_image(content["image_prompt"], size=image_size)
-            if master_image_path:
-                # We prefer the OpenAI URL for publishing, but we have the local path for display
-                master_image_url = master_openai_url
-            break # Stop after generating one image
-            
-    # Second pass: Assign image to all platforms and generate video if needed
-    for platform, content in results.items():
-        if "error" in content:
-            continue
-            
-        # Assign the master image to all platforms
-        if master_image_url:
-            content["media_url"] = master_image_url
-            content["display_url"] = media_gen.get_localhost_url(master_image_path)
-            
-            # Generate Video for TikTok if applicable (using the master image)
-            if platform == "tiktok" and "script" in content and master_image_path:
-                print(f"Generating 6-second video for TikTok...")
-                video_path = media_gen.create_video_from_image(master_image_path, duration=6)
-                if video_path:
-                    content["video_path"] = video_path  # Local file path for upload
-                    content["display_video_url"] = media_gen.get_localhost_url(video_path)
-    
-    # Save History if User is Logged In
-    if current_user:
-        try:
-            # Create Chat Session
-            chat = ChatSession(user_id=current_user.id, title=request.title)
-            db.add(chat)
-            db.commit()
-            db.refresh(chat)
-            
-            # User Message
-            user_msg = ChatMessage(
-                session_id=chat.id, 
-                role="user", 
-                content=json.dumps({"title": request.title, "body": request.body}) # Store as JSON for easier parsing
-            )
-            db.add(user_msg)
-            
-<<<<<<< HEAD
-            
-=======
-            # AI Message
->>>>>>> edab826f1c006fb5c88c99504b503d04cf67df9a
-            ai_msg = ChatMessage(
-                session_id=chat.id, 
-                role="assistant", 
-                content=json.dumps(results)
+    claim = await idempotency_service.claim(
+        db, "generate", current_user.id if current_user else None, idempotency_key, request.model_dump()
+    )
+    if claim.is_replay:
+        return replay_response(claim)
+
+    async with idempotency_service.releasing(db, claim):
+        if request.reuse and current_user:
+            reused = await asyncio.to_thread(
+                near_duplicates().reusable_results, db, current_user.id, request.title, request.body, request.platforms
             )
-            db.add(ai_msg)
-            db.commit()
-        except Exception as e:
-            print(f"Error saving history: {e}")
+            if reused:
+                session_id, results = reused
+                NEAR_DUPLICATES.labels(kind="generate", outcome="reused").inc()
+                await asyncio.to_thread(idempotency_service.complete, db, claim, results)
+                return JSONResponse(results, headers={"Reused-From-Session": str(session_id)})
 
-    print(f"Returning results: {json.dumps(results, indent=2)}")
+        # The admission slot is taken only now: replays, retries waiting on the original and reuses never hold one
+        async with admission_slot():
+            try:
+                # In a worker thread: the event loop keeps serving while up to the admitted number of pipelines run
+                results = await asyncio.to_thread(
+                    profiling.propagate(pipeline.generate),
+                    request.title, request.body, request.platforms,
+                    user_id=current_user.id if current_user else None, use_image_cache=request.use_image_cache,
+                )
+            except QuotaExceededError as e:
+                raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+        # Save History if User is Logged In
+        if current_user:
+            await asyncio.to_thread(save_history, pipeline, db, current_user.id, request.title, request.body, results)
+
+        await asyncio.to_thread(idempotency_service.complete, db, claim, results)
+    logger.debug("Returning results", extra={"platforms": list(results)})
     return results
 
+@router.post("/generate/similar")
+async def similar_generations(
+    request: SimilarRequest,
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    The user's previous generations from a near-identical announcement (estimated similarity, most
+    similar first), so the client can offer to reuse one (/generate with reuse) before paying for a new one.
+    """
+    return await asyncio.to_thread(near_duplicates().similar_generations, db, current_user.id, request.title, request.body)
+
 # --- Publishing Endpoints ---
 
 from app.models.publication import Publication
@@ -116,81 +132,74 @@ class PublishRequest(BaseModel):
     text: str
     media_url: Optional[str] = None
     video_path: Optional[str] = None  # For TikTok local video file path
-<<<<<<< HEAD
+    # Queue it even if a near-identical post went out on the same platform recently
+    allow_duplicate: bool = False
+    # Urgent publications are sent before normal ones (still in turns among users)
+    priority: Literal["urgent", "normal"] = "normal"
 
-from app.services.social_publisher import SocialPublisher
-social_publisher = SocialPublisher()
-=======
->>>>>>> edab826f1c006fb5c88c99504b503d04cf67df9a
+def queue_publication(db: Session, user_id: Optional[int], request: PublishRequest) -> Publication:
+    publication = Publication(
+        user_id=user_id,
+        platform=request.platform,
+        text=request.text,
+        media_url=request.media_url,
+        video_path=request.video_path,  # Save video_path for TikTok
+        status="pending",
+        priority=request.priority,
+        trace_id=current_trace_id(),
+        traceparent=current_traceparent()
+    )
+    db.add(publication)
+    db.commit()
+    db.refresh(publication)
+    return publication
 
 @router.post("/publish")
 async def publish_content(
     request: PublishRequest,
     db: Session = Depends(deps.get_db),
-    current_user: Optional[User] = Depends(deps.get_current_user_optional)
+    current_user: Optional[User] = Depends(deps.get_current_user_optional),
+    idempotency_key: Optional[str] = Header(None)
 ):
     """
-<<<<<<< HEAD
-    Publishes content directly to the specified platform.
+    Saves publication to database with status 'pending'.
+    The queue processor will handle actual publishing.
+    A retry with the same Idempotency-Key returns the original publication instead of queueing a duplicate.
+    A near-identical post queued or sent on the same platform recently gets a 409 listing the matches;
+    send it again with `allow_duplicate` to queue it anyway.
     """
-    try:
-        # Publish directly to the platform
-        if request.platform == "tiktok":
-            result = social_publisher.publish_tiktok(request.text, request.video_path)
-        elif request.platform == "facebook":
-            result = social_publisher.publish_facebook(request.text, request.media_url)
-        elif request.platform == "instagram":
-            result = social_publisher.publish_instagram(request.text, request.media_url)
-        elif request.platform == "linkedin":
-            result = social_publisher.publish_linkedin(request.text, request.media_url)
-        elif request.platform == "whatsapp":
-            result = social_publisher.publish_whatsapp(request.text, request.media_url)
-        else:
-            return {
-                "success": False,
-                "message": f"Unsupported platform: {request.platform}"
-            }
-        
-        # Save publication record
-        publication = Publication(
-            user_id=current_user.id if current_user else None,
-            platform=request.platform,
-            text=request.text,
-            media_url=request.media_url,
-            video_path=request.video_path,
-            status="published" if result.get("success") else "failed",
-            error_message=result.get("message") if not result.get("success") else None
-        )
-        db.add(publication)
-        db.commit()
-        db.refresh(publication)
-        
-        return {
-            "success": result.get("success", False),
-            "message": result.get("message", "Unknown error"),
-            "publication_id": publication.id,
-            "status": publication.status
-        }
-    except Exception as e:
-        # Save failed publication record
-        publication = Publication(
-            user_id=current_user.id if current_user else None,
-            platform=request.platform,
-            text=request.text,
-            media_url=request.media_url,
-            video_path=request.video_path,
-            status="failed",
-            error_message=str(e)
+    claim = await idempotency_service.claim(
+        db, "publish", current_user.id if current_user else None, idempotency_key, request.model_dump()
+    )
+    if claim.is_replay:
+        return replay_response(claim)
+
+    async with idempotency_service.releasing(db, claim):
+        if settings.NEAR_DUPLICATE_CHECK:
+            duplicates = await asyncio.to_thread(
+                near_duplicates().similar_publications, db, current_user.id if current_user else None, request.platform, request.text
+            )
+            if duplicates and not request.allow_duplicate:
+                NEAR_DUPLICATES.labels(kind="publish", outcome="held").inc()
+                raise HTTPException(status_code=409, detail={
+                    "message": "Ya se publicó un texto casi idéntico en esta plataforma.",
+                    "duplicates": duplicates,
+                })
+            if duplicates:
+                NEAR_DUPLICATES.labels(kind="publish", outcome="allowed").inc()
+
+        publication = await asyncio.to_thread(
+            queue_publication, db, current_user.id if current_user else None, request
         )
-        db.add(publication)
-        db.commit()
-        
-        return {
-            "success": False,
-            "message": str(e),
+        response = {
+            "success": True,
+            "message": "Publication added to queue",
             "publication_id": publication.id,
-            "status": "failed"
+            "status": publication.status,
+            "trace_id": publication.trace_id
         }
+        await asyncio.to_thread(idempotency_service.complete, db, claim, response)
+    return response
 
 # --- Publications History Endpoints ---
 
@@ -204,13 +213,21 @@ class PublicationResponse(BaseModel):
     status: str
     error_message: Optional[str]
     created_at: datetime
+    trace_id: Optional[str] = None
+    attempts: int = 0
+    next_attempt_at: Optional[datetime] = None
+    error_class: Optional[str] = None
+    priority: str = "normal"
     
     class Config:
         from_attributes = True
 
+# Only the columns the response needs, returned as Rows instead of hydrated ORM objects
+PUBLICATION_COLUMNS = [getattr(Publication, name) for name in PublicationResponse.model_fields]
+
 @router.get("/publications", response_model=List[PublicationResponse])
 async def get_all_publications(
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     current_user: Optional[User] = Depends(deps.get_current_user_optional),
     skip: int = 0,
     limit: int = 100
@@ -218,18 +235,18 @@ async def get_all_publications(
     """
     Get all publications. If user is logged in, returns their publications first.
     """
-    query = db.query(Publication)
+    query = select(*PUBLICATION_COLUMNS)
     
     if current_user:
         # Show user's publications first, then others
-        query = query.filter(Publication.user_id == current_user.id)
+        query = query.where(Publication.user_id == current_user.id)
     
-    publications = query.order_by(Publication.created_at.desc()).offset(skip).limit(limit).all()
+    publications = (await db.execute(query.order_by(Publication.created_at.desc()).offset(skip).limit(limit))).all()
     return publications
 
 @router.get("/publications/me", response_model=List[PublicationResponse])
 async def get_my_publications(
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     current_user: User = Depends(deps.get_current_user),
     skip: int = 0,
     limit: int = 100
@@ -237,46 +254,76 @@ async def get_my_publications(
     """
     Get current user's publications only (requires authentication).
     """
-    publications = db.query(Publication).filter(
+    publications = (await db.execute(select(*PUBLICATION_COLUMNS).where(
         Publication.user_id == current_user.id
-    ).order_by(Publication.created_at.desc()).offset(skip).limit(limit).all()
+    ).order_by(Publication.created_at.desc()).offset(skip).limit(limit))).all()
     return publications
 
+@router.get("/publications/events")
+async def stream_publication_events(current_user: User = Depends(deps.get_current_user_stream)):
+    """
+    Server-Sent Events stream of the user's publication status changes, pushed by the queue worker.
+    On (re)connect one `publication` event per queued publication gives the current state; after that
+    every transition (processing, published, retrying, failed) arrives as it happens, with its timings.
+    """
+    user_id = current_user.id
+
+    async def events():
+        queue = publication_events.subscribe(user_id)
+        try:
+            for event in await asyncio.to_thread(publication_events.snapshot, user_id):
+                yield f"event: publication\ndata: {json.dumps(event)}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: publication\ndata: {json.dumps(event)}\n\n"
+        finally:
+            publication_events.unsubscribe(user_id, queue)
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/publications/{publication_id}/queue", response_model=PublicationResponse)
+async def queue_draft(
+    publication_id: int,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Moves a draft (e.g. generated by a batch-mode bulk job) to the publishing queue.
+    """
+    publication = (await db.execute(select(Publication).where(
+        Publication.id == publication_id, Publication.user_id == current_user.id
+    ))).scalar_one_or_none()
+
+    if not publication:
+        raise HTTPException(status_code=404, detail="Publication not found")
+    if publication.status != "draft":
+        raise HTTPException(status_code=409, detail=f"Publication is already {publication.status}")
+
+    publication.status = "pending"
+    publication.trace_id = current_trace_id()
+    publication.traceparent = current_traceparent()
+    await db.commit()
+    await db.refresh(publication)
+    return publication
+
 @router.get("/publications/{publication_id}", response_model=PublicationResponse)
 async def get_publication(
     publication_id: int,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     current_user: Optional[User] = Depends(deps.get_current_user_optional)
 ):
     """
     Get a specific publication by ID.
     """
-    publication = db.query(Publication).filter(Publication.id == publication_id).first()
+    publication = (await db.execute(select(*PUBLICATION_COLUMNS).where(Publication.id == publication_id))).first()
     
     if not publication:
         raise HTTPException(status_code=404, detail="Publication not found")
     
     return publication
-=======
-    Saves publication to database with status 'pending'.
-    The queue processor will handle actual publishing.
-    """
-    publication = Publication(
-        user_id=current_user.id if current_user else None,
-        platform=request.platform,
-        text=request.text,
-        media_url=request.media_url,
-        video_path=request.video_path,  # Save video_path for TikTok
-        status="pending"
-    )
-    db.add(publication)
-    db.commit()
-    db.refresh(publication)
-    
-    return {
-        "success": True,
-        "message": "Publication added to queue",
-        "publication_id": publication.id,
-        "status": publication.status
-    }
->>>>>>> edab826f1c006fb5c88c99504b503d04cf67df9a
@@ -0,0 +1,166 @@
+"""
+Admission control for expensive routes (/generate runs an LLM call, DALL-E and a MoviePy encode).
+
+Each controlled route admits `concurrency` requests at a time per API process; the next ones wait in a
+FIFO queue of at most `queue` entries for up to `max_wait` seconds. A request is turned away at once
+(503 + Retry-After) when the queue is full or when the expected wait (queue position / concurrency x
+recent service time) already exceeds `max_wait`, instead of holding the connection until it times out.
+A user can have at most ADMISSION_PER_USER requests admitted or waiting on a route (429 past that).
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+from app.core.config import settings
+from app.core.metrics import ADMISSION_IN_FLIGHT, ADMISSION_REQUESTS, ADMISSION_WAIT, ADMISSION_WAITING
+
+logger = logging.getLogger(__name__)
+
+# Weight of the latest request in the moving average of service time
+SERVICE_TIME_ALPHA = 0.2
+
+def parse_admission(spec: str) -> Dict[str, Dict[str, float]]:
+    """Parses "generate=4:16:30" into {"generate": {"concurrency": 4, "queue": 16, "max_wait": 30.0}}."""
+    routes = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        route, _, values = item.partition("=")
+        concurrency, queue, max_wait = (values.split(":") + ["", "", ""])[:3]
+        limits = {}
+        if concurrency.strip():
+            limits["concurrency"] = int(concurrency)
+        if queue.strip():
+            limits["queue"] = int(queue)
+        if max_wait.strip():
+            limits["max_wait"] = float(max_wait)
+        routes[route.strip().lower()] = limits
+    return routes
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """Concurrency limit with a bounded, deadline-aware wait queue for one route. Event loop only."""
+
+    def __init__(self, route: str, concurrency: int = 4, queue: int = 16, max_wait: float = 30, per_user: int = 0):
+        self.route = route
+        self.concurrency = concurrency
+        self.queue_size = queue
+        self.max_wait = max_wait
+        self.per_user = per_user
+        self.in_flight = 0
+        self.service_seconds: Optional[float] = None
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._users: Dict[str, int] = {}
+
+    def estimated_wait(self, position: int) -> float:
+        """Seconds until the `position`-th waiter gets a slot, from the recent service time (0 until known)."""
+        return math.ceil(position / self.concurrency) * (self.service_seconds or 0)
+
+    @asynccontextmanager
+    async def slot(self, user_key: Optional[str] = None) -> AsyncIterator[None]:
+        await self._acquire(user_key)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(user_key, time.monotonic() - started)
+
+    async def _acquire(self, user_key: Optional[str]) -> None:
+        if user_key and self.per_user and self._users.get(user_key, 0) >= self.per_user:
+            self._reject(429, "user_limit", self.estimated_wait(1))
+
+        if self.in_flight < self.concurrency and not self._waiters:
+            self._admit(user_key, "admitted")
+            return
+
+        position = len(self._waiters) + 1
+        if position > self.queue_size:
+            self._reject(503, "queue_full", self.estimated_wait(position))
+        if self.estimated_wait(position) > self.max_wait:
+            self._reject(503, "deadline", self.estimated_wait(position))
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self._add_user(user_key, 1)
+        ADMISSION_WAITING.labels(route=self.route).inc()
+        ADMISSION_REQUESTS.labels(route=self.route, outcome="queued").inc()
+        started = time.monotonic()
+        try:
+            # asyncio.wait does not cancel the future, so a slot handed over right at the deadline is not lost
+            await asyncio.wait({future}, timeout=self.max_wait)
+        except BaseException:
+            # Client gone while waiting: give back a slot it may already have been handed
+            self._leave_queue(future, user_key)
+            if future.done() and not future.cancelled():
+                self._release(user_key, 0, count=False)
+            raise
+        finally:
+            ADMISSION_WAITING.labels(route=self.route).dec()
+            ADMISSION_WAIT.labels(route=self.route).observe(time.monotonic() - started)
+
+        if not future.done():
+            self._leave_queue(future, user_key)
+            self._reject(503, "timeout", self.estimated_wait(len(self._waiters) + 1))
+        ADMISSION_REQUESTS.labels(route=self.route, outcome="admitted").inc()
+
+    def _admit(self, user_key: Optional[str], outcome: str) -> None:
+        self.in_flight += 1
+        self._add_user(user_key, 1)
+        ADMISSION_IN_FLIGHT.labels(route=self.route).set(self.in_flight)
+        ADMISSION_REQUESTS.labels(route=self.route, outcome=outcome).inc()
+
+    def _release(self, user_key: Optional[str], seconds: float, count: bool = True) -> None:
+        if count:
+            self.service_seconds = seconds if self.service_seconds is None else (
+                SERVICE_TIME_ALPHA * seconds + (1 - SERVICE_TIME_ALPHA) * self.service_seconds
+            )
+        self._add_user(user_key, -1)
+        # Hand the slot straight to the first live waiter; in_flight stays the same
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+        ADMISSION_IN_FLIGHT.labels(route=self.route).set(self.in_flight)
+
+    def _leave_queue(self, future: asyncio.Future, user_key: Optional[str]) -> None:
+        if future in self._waiters:
+            self._waiters.remove(future)
+            self._add_user(user_key, -1)
+        future.cancel()
+
+    def _add_user(self, user_key: Optional[str], delta: int) -> None:
+        if not user_key:
+            return
+        count = self._users.get(user_key, 0) + delta
+        if count > 0:
+            self._users[user_key] = count
+        else:
+            self._users.pop(user_key, None)
+
+    def _reject(self, status_code: int, reason: str, wait: float) -> None:
+        ADMISSION_REQUESTS.labels(route=self.route, outcome=f"rejected_{reason}").inc()
+        logger.warning(
+            "Request shed",
+            extra={"route": self.route, "reason": reason, "in_flight": self.in_flight, "waiting": len(self._waiters)},
+        )
+        raise AdmissionRejected(status_code, reason, max(1, math.ceil(wait)))
+
+_controllers: Dict[str, Optional[AdmissionController]] = {}
+
+def admission_controller(route: str) -> Optional[AdmissionController]:
+    """Controller of a route listed in ADMISSION_ROUTES, or None when the route is not limited."""
+    if route not in _controllers:
+        limits = parse_admission(settings.ADMISSION_ROUTES).get(route)
+        _controllers[route] = None if limits is None else AdmissionController(
+            route, per_user=settings.ADMISSION_PER_USER, **limits
+        )
+    return _controllers[route]
@@ -0,0 +1,141 @@
+from typing import Optional
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    # Database
+    DATABASE_URL: str = "sqlite:///./dev.db"
+
+    # Auth
+    SECRET_KEY: str = "change-me-in-production"
+    ALGORITHM: str = "HS256"
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24
+    # Comma-separated emails allowed on cross-user reports (GET /api/usage/report); empty: nobody
+    ADMIN_EMAILS: str = ""
+
+    # Redis (optional, used to share queue status between processes)
+    REDIS_HOST: Optional[str] = None
+    REDIS_PORT: int = 6379
+
+    # Background workers (publication queue, batch poller, bulk jobs).
+    # embedded: run inside the API process; external: only `python -m app.worker` runs them, bulk jobs included.
+    WORKER_MODE: str = "embedded"
+    # none, auto, postgres or redis: with several API processes/replicas only the elected leader runs them
+    WORKER_LEADER_ELECTION: str = "none"
+    WORKER_LEADER_TTL_SECONDS: int = 30
+    # The queue drains each platform in its own lane: "platform=concurrency:timeout_seconds".
+    # Unlisted platforms get WORKER_CONCURRENCY parallel publishes and WORKER_LANE_TIMEOUT_SECONDS.
+    # The timeout covers the whole publish (every call and upload), not each call separately.
+    WORKER_LANES: str = "tiktok=1:600,linkedin=2:180,instagram=2:120"
+    WORKER_CONCURRENCY: int = 1
+    WORKER_LANE_TIMEOUT_SECONDS: float = 60
+    WORKER_POLL_INTERVAL_SECONDS: int = 10
+    # Order within a lane: "fair" (weighted fair queuing across Publication.user_id, urgent first) or "fifo".
+    # QUEUE_USER_WEIGHTS gives some users a bigger share ("7=3,12=0.5", default 1);
+    # QUEUE_MAX_IN_FLIGHT_PER_USER caps a user's concurrent publishes per lane (0 = no cap)
+    QUEUE_SCHEDULING: str = "fair"
+    QUEUE_USER_WEIGHTS: str = ""
+    QUEUE_MAX_IN_FLIGHT_PER_USER: int = 0
+    # Failed publishes: transient errors (timeouts, connection errors, 5xx, 429) are retried with exponential
+    # backoff plus jitter, up to PUBLISH_MAX_ATTEMPTS attempts in total; permanent errors and the last failed
+    # attempt end as 'failed', the dead-letter view (GET /queue/dead-letter)
+    PUBLISH_MAX_ATTEMPTS: int = 5
+    PUBLISH_RETRY_BASE_SECONDS: float = 30
+    PUBLISH_RETRY_MAX_SECONDS: float = 3600
+    # Publication status push (GET /api/publications/events): memory, redis, postgres or auto.
+    # With the worker in its own process the events need redis (pub/sub) or postgres (LISTEN/NOTIFY).
+    PUBLICATION_EVENTS_BACKEND: str = "auto"
+    # Prometheus endpoint of the standalone worker (the API serves /metrics itself)
+    WORKER_METRICS_PORT: Optional[int] = None
+
+    # Bulk campaign generation
+    BULK_MAX_ITEMS: int = 500
+    BULK_MAX_CONCURRENCY: int = 4
+    # The process running a job renews its heartbeat every third of this; a job whose heartbeat is older
+    # belongs to a process that is gone and is resumed elsewhere
+    BULK_JOB_OWNER_TTL_SECONDS: int = 120
+    # Batch mode goes through the OpenAI Batch API: larger jobs, results within 24h
+    BULK_BATCH_MAX_ITEMS: int = 10000
+    BATCH_POLL_INTERVAL_SECONDS: int = 60
+
+    # LLM input budget: bodies over LLM_MAX_BODY_TOKENS are cut at paragraph/sentence boundaries, or with
+    # LLM_BODY_OVERFLOW=summarize condensed by the model first. Token usage is recorded per user and UTC day
+    # and checked before every call against the daily quota (0 = unlimited; anonymous users share one).
+    LLM_MAX_BODY_TOKENS: int = 1500
+    LLM_BODY_OVERFLOW: str = "truncate"  # truncate or summarize
+    LLM_COMPLETION_TOKENS_PER_PLATFORM: int = 300  # expected output, for the quota check before the call
+    LLM_DAILY_TOKEN_QUOTA: int = 200000
+    LLM_ANONYMOUS_DAILY_TOKEN_QUOTA: int = 50000
+
+    # OpenAI call deadlines, hedging and circuit breaker (OPENAI_FALLBACK_MODEL takes over while the
+    # primary model's circuit is open). A hedge is a second identical request sent when the first has not
+    # answered after the LLM_HEDGE_QUANTILE of recent latencies; images are not hedged by default (cost).
+    LLM_TIMEOUT_SECONDS: float = 60
+    IMAGE_TIMEOUT_SECONDS: float = 90
+    LLM_HEDGE: bool = True
+    IMAGE_HEDGE: bool = False
+    LLM_HEDGE_QUANTILE: float = 0.95
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 1
+    LLM_HEDGE_MAX_RATIO: float = 0.1
+    LLM_BREAKER_FAILURES: int = 5
+    LLM_BREAKER_COOLDOWN_SECONDS: float = 30
+    LLM_MAX_PARALLEL_CALLS: int = 16
+    # Share of the remaining deadline a model call leaves for the fallback models after it
+    LLM_FALLBACK_RESERVE: float = 0.3
+
+    # Admission control per API process, "route=concurrency:queue:max_wait_seconds" comma-separated.
+    # Past the queue, or when the expected wait exceeds max_wait, requests get 503 + Retry-After;
+    # a user (or anonymous client IP) can have ADMISSION_PER_USER requests running or queued (0 = no cap)
+    ADMISSION_ROUTES: str = "generate=4:16:30"
+    ADMISSION_PER_USER: int = 2
+
+    # DALL-E image cache: exact tier on the normalized prompt + size, optional fuzzy tier on token-set
+    # similarity; least recently used entries are dropped past IMAGE_CACHE_MAX_MB of images, with their
+    # files unless a publication or chat message still uses them
+    IMAGE_CACHE: bool = True
+    IMAGE_CACHE_MAX_MB: int = 500
+    IMAGE_CACHE_FUZZY: bool = False
+    IMAGE_CACHE_FUZZY_THRESHOLD: float = 0.85
+
+    # Near-duplicate detection (MinHash, estimated Jaccard similarity of word pairs): /publish answers
+    # 409 for a post near-identical to one queued or sent on the same platform in the last
+    # NEAR_DUPLICATE_WINDOW_DAYS, unless allow_duplicate is set; /generate can reuse a previous result
+    NEAR_DUPLICATE_CHECK: bool = True
+    NEAR_DUPLICATE_THRESHOLD: float = 0.7
+    NEAR_DUPLICATE_WINDOW_DAYS: int = 30
+
+    # Idempotency-Key on /generate and /publish: how long results are replayed, how long an in-flight
+    # request holds the key, and how long a retry waits for the original before answering 409
+    IDEMPOTENCY_TTL_HOURS: int = 24
+    IDEMPOTENCY_LOCK_SECONDS: int = 300
+    IDEMPOTENCY_WAIT_SECONDS: int = 120
+
+    # Opt-in fast response path: orjson serialization plus gzip/brotli for bodies over COMPRESSION_MIN_SIZE bytes
+    FAST_RESPONSES: bool = False
+    COMPRESSION_MIN_SIZE: int = 1024
+
+    # Static media: with a reverse proxy sharing the static volume (see frontend/nginx.conf),
+    # e.g. "/internal-static/", files are sent by the proxy via X-Accel-Redirect + sendfile
+    STATIC_ACCEL_REDIRECT: Optional[str] = None
+
+    # Logging: LOG_LEVELS overrides per module, e.g. "app.services.publishers=DEBUG,uvicorn.access=WARNING"
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # json or text
+    LOG_LEVELS: str = ""
+    LOG_DEBUG_SAMPLE_RATE: float = 0.1
+
+    # On-demand profiling, off unless PROFILING_TOKEN is set: a request sent with "X-Profile: <token>" is
+    # profiled, and POST /api/profiling/sample samples the whole process for up to PROFILING_MAX_SECONDS.
+    # Folded-stack artifacts (flamegraph.pl, speedscope) go to PROFILING_DIR, the newest PROFILING_MAX_ARTIFACTS kept
+    PROFILING_TOKEN: Optional[str] = None
+    PROFILING_DIR: str = "profiles"
+    PROFILING_INTERVAL_MS: float = 5
+    PROFILING_MAX_SECONDS: int = 300
+    PROFILING_MAX_ARTIFACTS: int = 50
+
+    # Tracing: none, memory, file or console
+    TRACING_EXPORTER: str = "none"
+    TRACING_FILE: str = "logs/traces.jsonl"
+
+settings = Settings()
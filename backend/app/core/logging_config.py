@@ -0,0 +1,166 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from app.core.config import settings
+
+# Attributes every LogRecord has; anything else was passed through `extra=` and is emitted as a field
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "trace_id"}
+
+# Credentials that must never reach the log sink
+_REDACTIONS = [
+    (re.compile(r"(Bearer\s+)[A-Za-z0-9\-._~+/]+=*", re.IGNORECASE), r"\1[REDACTED]"),
+    (re.compile(r"((?:access_token|api_key|token|password|secret)[\"']?\s*[:=]\s*[\"']?)[^\s\"'&,}]+", re.IGNORECASE), r"\1[REDACTED]"),
+    (re.compile(r"\bsk-[A-Za-z0-9\-_]{8,}"), "[REDACTED]"),
+    (re.compile(r"\bEAA[A-Za-z0-9]{20,}"), "[REDACTED]"),
+    (re.compile(r"\bact\.[A-Za-z0-9\-_.!*]{10,}"), "[REDACTED]"),
+]
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def redact(value: str) -> str:
+    for pattern, replacement in _REDACTIONS:
+        value = pattern.sub(replacement, value)
+    return value
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, trace_id and any `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": redact(record.getMessage()),
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            entry["trace_id"] = trace_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = redact(value) if isinstance(value, str) else value
+        if record.exc_info:
+            entry["exception"] = redact(self.formatException(record.exc_info))
+        elif record.exc_text:
+            entry["exception"] = redact(record.exc_text)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class RedactingFormatter(logging.Formatter):
+    """Plain-text formatter for local development, with the same redaction as the JSON one."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return redact(super().format(record))
+
+class RedactingFilter(logging.Filter):
+    """
+    Redacts a record's arguments in place. For loggers with their own handlers, such as uvicorn.access, whose
+    request line carries ?access_token= for event streams; the arguments keep their shape for its formatter.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.args, tuple):
+            record.args = tuple(redact(arg) if isinstance(arg, str) else arg for arg in record.args)
+        elif isinstance(record.msg, str) and not record.args:
+            record.msg = redact(record.msg)
+        return True
+
+class DebugSamplingFilter(logging.Filter):
+    """Keeps only a fraction of DEBUG records so chatty loops don't flood the queue."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1:
+            return True
+        return random.random() < self.rate
+
+class TraceContextFilter(logging.Filter):
+    """Stamps the active trace id on the record while still on the caller's thread."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        from app.core.tracing import current_trace_id
+        record.trace_id = current_trace_id()
+        return True
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only merge args; formatting, JSON encoding and redaction happen on the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """Parses "app.services.publishers=DEBUG,uvicorn.access=WARNING" into a dict."""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def setup_logging(
+    level: Optional[str] = None,
+    fmt: Optional[str] = None,
+    module_levels: Optional[str] = None,
+    debug_sample_rate: Optional[float] = None,
+    stream=None,
+) -> logging.handlers.QueueListener:
+    """
+    Routes every log record through an in-memory queue to a background listener thread,
+    so request handlers never block on stdout.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    fmt = (fmt or settings.LOG_FORMAT).lower()
+    sink = logging.StreamHandler(stream or sys.stdout)
+    if fmt == "json":
+        sink.setFormatter(JsonFormatter())
+    else:
+        sink.setFormatter(RedactingFormatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    sample_rate = settings.LOG_DEBUG_SAMPLE_RATE if debug_sample_rate is None else debug_sample_rate
+    queue_handler.addFilter(DebugSamplingFilter(sample_rate))
+    queue_handler.addFilter(TraceContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel((level or settings.LOG_LEVEL).upper())
+
+    # uvicorn writes access logs through its own handler, which the formatters above never see
+    access_logger = logging.getLogger("uvicorn.access")
+    if not any(isinstance(f, RedactingFilter) for f in access_logger.filters):
+        access_logger.addFilter(RedactingFilter())
+
+    for name, module_level in parse_levels(settings.LOG_LEVELS if module_levels is None else module_levels).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _listener = logging.handlers.QueueListener(log_queue, sink, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def shutdown_logging() -> None:
+    """Flushes queued records; registered with atexit."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(shutdown_logging)
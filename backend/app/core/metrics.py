@@ -0,0 +1,221 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+# Dedicated registry so tests and reloads don't collide with the global default one
+registry = CollectorRegistry()
+
+# Buckets tuned for this service: API calls are sub-second, generation/encoding takes tens of seconds
+LATENCY_BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+# Publications can wait in the queue from seconds to hours
+QUEUE_WAIT_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 7200)
+
+HTTP_REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+
+GENERATE_STAGE_LATENCY = Histogram(
+    "generate_stage_duration_seconds",
+    "Time spent in each stage of /generate (llm, image_generation, image_download, video_encode, db_save)",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+
+PUBLISH_LATENCY = Histogram(
+    "publish_duration_seconds",
+    "Time spent publishing a single publication to a platform",
+    ["platform"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+
+PUBLISH_TOTAL = Counter(
+    "publish_total",
+    "Publish attempts by platform and outcome (published, failed)",
+    ["platform", "outcome"],
+    registry=registry,
+)
+
+QUEUE_DEPTH = Gauge(
+    "queue_pending_publications",
+    "Number of publications waiting in the queue",
+    registry=registry,
+)
+
+QUEUE_OLDEST_PENDING_AGE = Gauge(
+    "queue_oldest_pending_age_seconds",
+    "Age of the oldest pending publication (0 when the queue is empty)",
+    registry=registry,
+)
+
+QUEUE_RETRYING = Gauge(
+    "queue_retrying_publications",
+    "Publications waiting out their retry backoff after a transient failure",
+    registry=registry,
+)
+
+QUEUE_DEAD_LETTER = Gauge(
+    "queue_dead_letter_publications",
+    "Publications that failed permanently or ran out of attempts (status failed)",
+    registry=registry,
+)
+
+# Per-platform lanes of the queue worker, so a TikTok backlog is visible apart from Facebook's
+QUEUE_LANE_DEPTH = Gauge(
+    "queue_lane_pending_publications",
+    "Pending publications per platform lane",
+    ["platform"],
+    registry=registry,
+)
+
+QUEUE_LANE_OLDEST_PENDING_AGE = Gauge(
+    "queue_lane_oldest_pending_age_seconds",
+    "Age of the oldest pending publication per platform lane (0 when the lane is empty)",
+    ["platform"],
+    registry=registry,
+)
+
+QUEUE_LANE_IN_FLIGHT = Gauge(
+    "queue_lane_in_flight",
+    "Publications being published right now per platform lane",
+    ["platform"],
+    registry=registry,
+)
+
+# Fair scheduler: with fair queuing, users with a short backlog wait little however long the others' are
+QUEUE_WAIT = Histogram(
+    "queue_wait_seconds",
+    "Time from due to dispatch per lane, priority and backlog of the user at that moment (1, 2-10, 11-100, 100+)",
+    ["platform", "priority", "backlog"],
+    buckets=QUEUE_WAIT_BUCKETS,
+    registry=registry,
+)
+
+QUEUE_BACKLOGGED_USERS = Gauge(
+    "queue_backlogged_users",
+    "Users with publications waiting in a lane of the fair scheduler",
+    ["platform"],
+    registry=registry,
+)
+
+IMAGE_CACHE = Counter(
+    "image_cache_total",
+    "Image cache lookups by result (exact, fuzzy, miss) and entries evicted",
+    ["result"],
+    registry=registry,
+)
+
+NEAR_DUPLICATES = Counter(
+    "near_duplicates_total",
+    "Near-duplicate hits: generations reused and publications held back (409) or sent anyway",
+    ["kind", "outcome"],
+    registry=registry,
+)
+
+# Admission control of expensive routes (ADMISSION_ROUTES), per API process
+ADMISSION_REQUESTS = Counter(
+    "admission_requests_total",
+    "Requests to admission-controlled routes by outcome (admitted, queued, rejected_queue_full, "
+    "rejected_deadline, rejected_timeout, rejected_user_limit)",
+    ["route", "outcome"],
+    registry=registry,
+)
+
+ADMISSION_WAITING = Gauge(
+    "admission_waiting",
+    "Requests waiting for a slot on an admission-controlled route",
+    ["route"],
+    registry=registry,
+)
+
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight",
+    "Requests holding a slot on an admission-controlled route",
+    ["route"],
+    registry=registry,
+)
+
+ADMISSION_WAIT = Histogram(
+    "admission_wait_seconds",
+    "Time queued requests waited for a slot (admitted or timed out)",
+    ["route"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+
+# OpenAI calls through ResilientCall (chat, image): outcome, hedges and failovers per model
+LLM_CALLS = Counter(
+    "llm_calls_total",
+    "OpenAI calls by operation, model and outcome (success, error, timeout)",
+    ["operation", "model", "outcome"],
+    registry=registry,
+)
+
+LLM_HEDGES = Counter(
+    "llm_hedges_total",
+    "Hedged OpenAI requests: fired (second request sent) and won (the hedge answered first)",
+    ["operation", "event"],
+    registry=registry,
+)
+
+LLM_FALLBACKS = Counter(
+    "llm_fallbacks_total",
+    "Calls sent to a fallback model because the previous one failed or had its circuit open",
+    ["operation", "model"],
+    registry=registry,
+)
+
+LLM_CIRCUIT_OPEN = Gauge(
+    "llm_circuit_open",
+    "1 while the circuit breaker of a model is open",
+    ["operation", "model"],
+    registry=registry,
+)
+
+OPENAI_TOKENS = Counter(
+    "openai_tokens_total",
+    "OpenAI token usage by model and kind (prompt, completion)",
+    ["model", "kind"],
+    registry=registry,
+)
+
+@contextmanager
+def time_stage(stage: str):
+    """Records the duration of a /generate pipeline stage."""
+    with GENERATE_STAGE_LATENCY.labels(stage=stage).time():
+        yield
+
+def record_token_usage(model: str, usage: Optional[Any]) -> None:
+    """Adds the `usage` block of a chat completion to the token counters."""
+    if usage is None:
+        return
+    for kind in ("prompt", "completion"):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        if isinstance(tokens, int) and tokens > 0:
+            OPENAI_TOKENS.labels(model=model, kind=kind).inc(tokens)
+
+def record_queue_stats(stats: Dict[str, Any]) -> None:
+    """Sets the queue gauges from QueueService.get_queue_stats()."""
+    QUEUE_DEPTH.set(stats["pending"])
+    QUEUE_OLDEST_PENDING_AGE.set(stats["oldest_pending_age_seconds"])
+    QUEUE_RETRYING.set(stats.get("retrying", 0))
+    QUEUE_DEAD_LETTER.set(stats.get("dead_letter", 0))
+    for platform, lane in stats.get("lanes", {}).items():
+        QUEUE_LANE_DEPTH.labels(platform=platform).set(lane["pending"])
+        QUEUE_LANE_OLDEST_PENDING_AGE.labels(platform=platform).set(lane["oldest_pending_age_seconds"])
+
+def render_latest() -> tuple[bytes, str]:
+    """Returns the current metrics in Prometheus text format with its content type."""
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,276 @@
+"""
+On-demand profiling for production, off unless PROFILING_TOKEN is set.
+
+- One request: send it with the header `X-Profile: <token>`; the response carries `X-Profile-Artifact`.
+- The whole process: POST /api/profiling/sample?seconds=N.
+
+Both use the same sampler: a daemon thread that every PROFILING_INTERVAL_MS reads the stacks of the threads
+of interest (sys._current_frames) and counts them. A request profile samples the event loop only while the
+request's task is running, plus the threads it hands work to through `propagate` (the /generate pipeline
+and the OpenAI calls), so concurrent requests stay out of it. Profiles are saved to PROFILING_DIR in the
+folded-stack format read by flamegraph.pl, speedscope and inferno ("frame;frame;frame count" per line).
+Nothing is sampled while no profile is running: without the header the middleware only looks it up.
+"""
+import asyncio
+import contextvars
+import functools
+import hmac
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+ARTIFACT_HEADER = "X-Profile-Artifact"
+ARTIFACT_NAME = re.compile(r"^[\w.-]+\.folded$")
+# Frames deeper than this are cut (runaway recursion)
+MAX_DEPTH = 256
+
+_active: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar("active_profile", default=None)
+
+def token_matches(token: Optional[str]) -> bool:
+    expected = settings.PROFILING_TOKEN
+    return bool(expected and token and hmac.compare_digest(token.encode(), expected.encode()))
+
+def _short_path(filename: str) -> str:
+    for marker in ("site-packages/", "/backend/"):
+        _, found, rest = filename.rpartition(marker)
+        if found:
+            return rest
+    return os.path.basename(filename)
+
+class StackSampler:
+    """Counts the stacks of the threads accepted by `include(thread_id)` until stopped or `duration` elapses."""
+
+    def __init__(self, include: Callable[[int], bool], interval: float, duration: Optional[float] = None,
+                 on_finish: Optional[Callable[["StackSampler"], None]] = None):
+        self.include = include
+        self.interval = interval
+        self.duration = duration
+        self.on_finish = on_finish
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._labels: Dict[Any, str] = {}
+        self._thread_names: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if threading.current_thread() is not self._thread:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        deadline = time.monotonic() + self.duration if self.duration else None
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident != own and self.include(ident):
+                    self.counts[self._stack(ident, frame)] += 1
+            self.samples += 1
+            if deadline and time.monotonic() >= deadline:
+                break
+        if self.on_finish:
+            try:
+                self.on_finish(self)
+            except Exception:
+                logger.exception("Could not save profile")
+
+    def _stack(self, ident: int, frame) -> Tuple[str, ...]:
+        labels = []
+        while frame is not None and len(labels) < MAX_DEPTH:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                name = f"{code.co_qualname} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+                label = self._labels[code] = name.replace(";", ":")
+            labels.append(label)
+            frame = frame.f_back
+        labels.append(self._thread_name(ident))
+        return tuple(reversed(labels))
+
+    def _thread_name(self, ident: int) -> str:
+        name = self._thread_names.get(ident)
+        if name is None:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            name = self._thread_names[ident] = f"[{names.get(ident, ident)}]"
+        return name
+
+    def folded(self) -> str:
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.counts.most_common())
+
+class RequestProfile:
+    """Threads that currently work for one profiled request."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, task: Optional[asyncio.Task]):
+        self.loop = loop
+        self.task = task
+        self.loop_thread = threading.get_ident()
+        self.threads: Set[int] = set()
+
+    def includes(self, ident: int) -> bool:
+        if ident in self.threads:
+            return True
+        return ident == self.loop_thread and asyncio.current_task(self.loop) is self.task
+
+def propagate(fn: Callable) -> Callable:
+    """
+    `fn` as is, or, when called from a profiled request, wrapped so the thread that runs it (to_thread,
+    an executor) is sampled with the request while it does.
+    """
+    profile = _active.get()
+    if profile is None:
+        return fn
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        ident = threading.get_ident()
+        profile.threads.add(ident)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.threads.discard(ident)
+
+    return run
+
+class ProfileStore:
+    """Folded-stack artifacts in PROFILING_DIR, the newest PROFILING_MAX_ARTIFACTS kept."""
+
+    @property
+    def directory(self) -> Path:
+        return Path(settings.PROFILING_DIR)
+
+    def new_name(self, kind: str, label: str = "") -> str:
+        slug = re.sub(r"[^\w-]+", "-", label).strip("-")[:60]
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        return "-".join(filter(None, (stamp, kind, slug, uuid.uuid4().hex[:8]))) + ".folded"
+
+    def save(self, name: str, sampler: StackSampler) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / name
+        path.write_text(sampler.folded())
+        logger.info("Profile saved", extra={"artifact": name, "samples": sampler.samples, "stacks": len(sampler.counts)})
+        self._prune()
+        return path
+
+    def list(self) -> List[Dict[str, Any]]:
+        if not self.directory.is_dir():
+            return []
+        artifacts = []
+        for path in self.directory.glob("*.folded"):
+            stat = path.stat()
+            artifacts.append({
+                "name": path.name,
+                "bytes": stat.st_size,
+                "created_at": datetime.utcfromtimestamp(stat.st_mtime).isoformat(),
+            })
+        return sorted(artifacts, key=lambda artifact: artifact["created_at"], reverse=True)
+
+    def path(self, name: str) -> Optional[Path]:
+        """Path of an existing artifact; None for unknown names or anything that is not a plain file name."""
+        if not ARTIFACT_NAME.match(name):
+            return None
+        path = self.directory / name
+        return path if path.is_file() else None
+
+    def _prune(self) -> None:
+        paths = sorted(self.directory.glob("*.folded"), key=lambda path: path.stat().st_mtime, reverse=True)
+        for path in paths[settings.PROFILING_MAX_ARTIFACTS:]:
+            path.unlink(missing_ok=True)
+
+class ProcessProfiler:
+    """Samples every thread of the process for a while; one run at a time."""
+
+    def __init__(self, store: ProfileStore):
+        self.store = store
+        self._lock = threading.Lock()
+        self._running: Optional[StackSampler] = None
+
+    @property
+    def running(self) -> bool:
+        return self._running is not None
+
+    def start(self, seconds: float) -> Optional[str]:
+        """Name the artifact will have once the run ends, or None when a run is already going on."""
+        with self._lock:
+            if self._running is not None:
+                return None
+            name = self.store.new_name("process", f"{int(seconds)}s")
+
+            def finish(sampler: StackSampler) -> None:
+                try:
+                    self.store.save(name, sampler)
+                finally:
+                    self._running = None
+
+            self._running = StackSampler(
+                lambda ident: True, settings.PROFILING_INTERVAL_MS / 1000, duration=seconds, on_finish=finish
+            ).start()
+            return name
+
+profile_store = ProfileStore()
+process_profiler = ProcessProfiler(profile_store)
+
+class ProfilingMiddleware:
+    """Profiles the requests that carry `X-Profile: <PROFILING_TOKEN>`; a wrong token gets 403."""
+
+    def __init__(self, app: ASGIApp, skip_prefix: str = "/api/profiling"):
+        self.app = app
+        self.skip_prefix = skip_prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.PROFILING_TOKEN or scope["path"].startswith(self.skip_prefix):
+            await self.app(scope, receive, send)
+            return
+        token = Headers(scope=scope).get(PROFILE_HEADER)
+        if token is None:
+            await self.app(scope, receive, send)
+            return
+        if not token_matches(token):
+            await JSONResponse({"detail": "Invalid profiling token"}, status_code=403)(scope, receive, send)
+            return
+
+        profile = RequestProfile(asyncio.get_running_loop(), asyncio.current_task())
+        name = profile_store.new_name("request", f"{scope['method']}{scope['path']}")
+        sampler = StackSampler(profile.includes, settings.PROFILING_INTERVAL_MS / 1000).start()
+        saved = False
+
+        def save() -> None:
+            nonlocal saved
+            if not saved:
+                saved = True
+                sampler.stop()
+                profile_store.save(name, sampler)
+
+        async def send_with_artifact(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", []).append((ARTIFACT_HEADER.lower().encode(), name.encode()))
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                # Saved before the last chunk goes out, so the artifact exists once the client has the response
+                await asyncio.to_thread(save)
+            await send(message)
+
+        reset = _active.set(profile)
+        try:
+            await self.app(scope, receive, send_with_artifact)
+        finally:
+            _active.reset(reset)
+            if not saved:
+                await asyncio.to_thread(save)
@@ -0,0 +1,21 @@
+import logging
+from typing import Type
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse
+except ImportError:
+    orjson = None
+    ORJSONResponse = None
+
+def default_response_class(fast: bool) -> Type[JSONResponse]:
+    """ORJSONResponse when the fast path is on and orjson is installed, FastAPI's JSONResponse otherwise."""
+    if not fast:
+        return JSONResponse
+    if ORJSONResponse is None:
+        logger.warning("FAST_RESPONSES is on but orjson is not installed - using the standard JSON encoder")
+        return JSONResponse
+    return ORJSONResponse
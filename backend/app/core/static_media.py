@@ -0,0 +1,86 @@
+import hashlib
+import logging
+import os
+import re
+from mimetypes import guess_type
+from pathlib import Path
+from typing import Optional
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+# Generated media is named (or, for renditions, foldered) by the first 32 hex chars of its SHA-256
+CONTENT_HASH = re.compile(r"(?:^|/)([0-9a-f]{32})(?:\.[A-Za-z0-9]+)?(?:/|$)")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Legacy tmpXXXX names: cacheable, but revalidated with the ETag
+REVALIDATE = "public, max-age=0, must-revalidate"
+
+# Next to the media files: one small file per OpenAI-hosted copy, named by the hash of its URL, holding
+# the name of the local file it was downloaded to
+REMOTE_COPIES_DIR = "remote"
+
+logger = logging.getLogger(__name__)
+
+def content_digest(relative_path: str) -> Optional[str]:
+    """Returns the content hash embedded in a static path, or None for legacy random names."""
+    match = CONTENT_HASH.search(relative_path.replace(os.sep, "/"))
+    return match.group(1) if match else None
+
+def _remote_key(url: str) -> str:
+    # OpenAI signs the URL in its query string (st, se, sig...); the path identifies the image
+    return hashlib.sha256(url.split("?")[0].encode()).hexdigest()[:32]
+
+def record_remote_copy(media_dir, url: str, filename: str) -> None:
+    """Remembers that the expiring `url` is a copy of `filename` in media_dir, so publishers can use the local file."""
+    copies = Path(media_dir) / REMOTE_COPIES_DIR
+    try:
+        copies.mkdir(exist_ok=True)
+        (copies / _remote_key(url)).write_text(filename)
+    except OSError as e:
+        logger.warning("Could not record the local copy of a remote image: %s", e)
+
+def local_copy(media_dir, url: str) -> Optional[Path]:
+    """The local file a remote image URL was downloaded to, if it is still in media_dir."""
+    try:
+        filename = (Path(media_dir) / REMOTE_COPIES_DIR / _remote_key(url)).read_text().strip()
+    except OSError:
+        return None
+    path = Path(media_dir) / Path(filename).name
+    return path if path.is_file() else None
+
+class MediaStaticFiles(StaticFiles):
+    """
+    StaticFiles for generated media. Content-hashed files get `immutable` caching and a strong ETag equal to
+    the hash, so repeat views are 304s or cache hits. Range requests come from FileResponse.
+
+    With `accel_redirect_prefix` set, requests proxied by nginx (which sends `X-Sendfile-Type: X-Accel-Redirect`)
+    get an empty response with X-Accel-Redirect, and nginx sends the file with sendfile instead of Python
+    reading it in 64 KiB chunks. Direct requests to the backend are still served here.
+    """
+
+    def __init__(self, *args, accel_redirect_prefix: Optional[str] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.accel_redirect_prefix = accel_redirect_prefix
+
+    def file_response(
+        self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200
+    ) -> Response:
+        relative_path = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+        digest = content_digest(relative_path)
+        headers = {"Cache-Control": IMMUTABLE if digest else REVALIDATE}
+
+        request_headers = Headers(scope=scope)
+        if self.accel_redirect_prefix and request_headers.get("x-sendfile-type") == "X-Accel-Redirect":
+            # nginx keeps Content-Type and Cache-Control from this response and sets its own ETag
+            headers["X-Accel-Redirect"] = self.accel_redirect_prefix.rstrip("/") + "/" + relative_path
+            media_type = guess_type(str(full_path))[0] or "application/octet-stream"
+            return Response(status_code=status_code, headers=headers, media_type=media_type)
+
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+        if digest:
+            response.headers["etag"] = f'"{digest}"'
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
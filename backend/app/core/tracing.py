@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+from typing import Dict, Optional, Sequence
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SimpleSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+from app.core.config import settings
+
+SERVICE_NAME = "social-topicos-backend"
+
+# Module-level proxy tracer: spans become real once setup_tracing() installs the provider
+tracer = trace.get_tracer(SERVICE_NAME)
+
+_propagator = TraceContextTextMapPropagator()
+_provider: Optional[TracerProvider] = None
+_lock = threading.Lock()
+
+class JsonLinesFileSpanExporter(SpanExporter):
+    """Writes finished spans as one JSON object per line (OTLP-like field names)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = [json.dumps(json.loads(span.to_json()), ensure_ascii=False) for span in spans]
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+def _get_provider() -> TracerProvider:
+    global _provider
+    with _lock:
+        if _provider is None:
+            _provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+            trace.set_tracer_provider(_provider)
+        return _provider
+
+def setup_tracing(exporter: Optional[str] = None) -> Optional[SpanExporter]:
+    """
+    Installs the tracer provider and attaches an exporter.
+    exporter: "none", "memory" (tests), "file" (JSON lines at TRACING_FILE) or "console".
+    Returns the exporter so tests can read the captured spans.
+    """
+    exporter = (exporter or settings.TRACING_EXPORTER).lower()
+    if exporter == "none":
+        return None
+
+    provider = _get_provider()
+    if exporter == "memory":
+        span_exporter = InMemorySpanExporter()
+        provider.add_span_processor(SimpleSpanProcessor(span_exporter))
+    elif exporter == "file":
+        span_exporter = JsonLinesFileSpanExporter(settings.TRACING_FILE)
+        provider.add_span_processor(BatchSpanProcessor(span_exporter))
+    elif exporter == "console":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+        span_exporter = ConsoleSpanExporter()
+        provider.add_span_processor(BatchSpanProcessor(span_exporter))
+    else:
+        raise ValueError(f"Unknown tracing exporter: {exporter}")
+    return span_exporter
+
+def current_trace_id() -> Optional[str]:
+    """Hex trace id of the active span, or None when nothing is being traced."""
+    ctx = trace.get_current_span().get_span_context()
+    if not ctx.is_valid:
+        return None
+    return trace.format_trace_id(ctx.trace_id)
+
+def current_traceparent() -> Optional[str]:
+    """W3C traceparent header for the active span, used to resume the trace in the queue worker."""
+    carrier: Dict[str, str] = {}
+    _propagator.inject(carrier)
+    return carrier.get("traceparent")
+
+def extract_context(traceparent: Optional[str]):
+    """Builds a parent context from a stored or incoming traceparent value."""
+    if not traceparent:
+        return None
+    return _propagator.extract({"traceparent": traceparent})
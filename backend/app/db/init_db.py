@@ -0,0 +1,69 @@
+"""
+Creates the database tables and brings existing ones up to the models. Run it once per deploy, before
+the API and the worker start:
+
+    python -m app.db.init_db
+
+The API no longer touches the schema when it is imported, so an unreachable database at boot
+fails requests (and recovers with the database) instead of crashing the process.
+
+create_all never alters a table that already exists, so for those the columns the models gained since
+(e.g. publications.priority, attempts, trace_id) are added with ALTER TABLE ... ADD COLUMN, and any
+missing index is created. Only additions are handled; running it again is a no-op.
+"""
+import logging
+from typing import List
+from sqlalchemy import Column, inspect, literal, text
+from sqlalchemy.engine import Connection
+from app.db.base import Base
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+def _column_ddl(conn: Connection, column: Column) -> str:
+    dialect = conn.dialect
+    ddl = f"{dialect.identifier_preparer.quote(column.name)} {column.type.compile(dialect=dialect)}"
+    default = column.default
+    if default is not None and default.is_scalar:
+        value = literal(default.arg, type_=column.type).compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+        ddl += f" DEFAULT {value}"
+        # Existing rows take the default, so the constraint holds
+        if not column.nullable:
+            ddl += " NOT NULL"
+    return ddl
+
+def upgrade_schema(conn: Connection) -> List[str]:
+    """Adds the model columns and indexes missing from existing tables; returns what was added."""
+    inspector = inspect(conn)
+    added = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                quoted = conn.dialect.identifier_preparer.format_table(table)
+                conn.execute(text(f"ALTER TABLE {quoted} ADD COLUMN {_column_ddl(conn, column)}"))
+                added.append(f"{table.name}.{column.name}")
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(conn)
+                added.append(index.name)
+    return added
+
+def init_db() -> None:
+    from app import models  # noqa: F401 - registers every table on Base.metadata
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        added = upgrade_schema(conn)
+    if added:
+        logger.info("Database schema upgraded", extra={"added": added})
+    logger.info("Database schema ready", extra={"tables": len(Base.metadata.tables)})
+
+if __name__ == "__main__":
+    from app.core.logging_config import setup_logging
+
+    setup_logging()
+    init_db()
@@ -1,4 +1,6 @@
+from functools import lru_cache
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
@@ -10,4 +12,33 @@ if settings.DATABASE_URL.startswith("sqlite"):
 else:
     engine = create_engine(settings.DATABASE_URL)
 
+# Scripts, the queue worker and the services shared with them use the sync session
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async drivers of the request handlers that await the database (deps.get_async_db)
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+def async_database_url(url: str) -> str:
+    """DATABASE_URL with its async driver: sqlite:// -> sqlite+aiosqlite://, postgresql(+psycopg2):// -> postgresql+asyncpg://."""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver for {parsed.get_backend_name()}")
+    return parsed.set(drivername=f"{parsed.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+@lru_cache(maxsize=None)
+def get_async_sessionmaker():
+    """
+    Async engine and session factory, built on first use so scripts and the worker never need aiosqlite or
+    asyncpg. Objects stay loaded after commit: handlers return them once the session is gone.
+    """
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(async_database_url(settings.DATABASE_URL))
+    return async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def dispose_async_engine() -> None:
+    """Closes the async engine's connections (app shutdown); aiosqlite's connection threads keep the process alive otherwise."""
+    if get_async_sessionmaker.cache_info().currsize:
+        await get_async_sessionmaker().kw["bind"].dispose()
+        get_async_sessionmaker.cache_clear()
@@ -3,70 +3,78 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+import logging
+from app.core.logging_config import setup_logging
+
+# Configure logging before anything else imports and logs
+setup_logging()
+logger = logging.getLogger(__name__)
+
+import time
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.api import api_router
-from app.db.base import Base
-from app.db.session import engine
-<<<<<<< HEAD
-
-# Create Tables
-Base.metadata.create_all(bind=engine)
-=======
+from app.core import metrics, responses, tracing
+from app.core.compression import CompressionMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.core.config import settings
+from app.core.static_media import MediaStaticFiles
+from app.db.session import dispose_async_engine
+from app.services.background_workers import WORKER_MODES, build_workers
+from app.services.bulk_generation import bulk_service
+from opentelemetry.trace import SpanKind
 import asyncio
 from contextlib import asynccontextmanager
->>>>>>> edab826f1c006fb5c88c99504b503d04cf67df9a
 
-# Create Tables
-Base.metadata.create_all(bind=engine)
+# Tables are created by the explicit `python -m app.db.init_db` step, not at import
 
-# Background task for queue processing
-async def process_queue_worker():
-    """Background worker that processes queue every 10 seconds"""
-    from app.services.queue_service import queue_service
-    
-    print("🚀 Queue worker started!")
-    
-    while True:
-        try:
-            # Check if queue is ON
-            status = queue_service.get_status()
-            pending_count = queue_service.get_queue_length()
-            
-            print(f"⏰ Worker check - Status: {status}, Pending: {pending_count}")
-            
-            if status == "ON":
-                # Check if there are pending publications
-                if pending_count > 0:
-                    print(f"📝 Processing {pending_count} pending publications...")
-                    result = queue_service.process_pending_publications()
-                    print(f"✅ Processed: {result}")
-                else:
-                    print("✓ Queue is ON but no pending items")
-            else:
-                print("⏸ Queue is OFF - skipping processing")
-        except Exception as e:
-            print(f"❌ Error in queue worker: {e}")
-        
-        # Wait 10 seconds before next check
-        await asyncio.sleep(10)
+# Tracing exporter is chosen by TRACING_EXPORTER (none by default)
+tracing.setup_tracing()
+
+def warm_near_duplicates() -> None:
+    from app.api.routes import near_duplicates
+    try:
+        near_duplicates().warm()
+    except Exception:
+        # Lookups load the index themselves on first use
+        logger.exception("Could not warm the near-duplicate index")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Initialize queue and create background task
-    from app.services.queue_service import queue_service
-    
-    # Force queue status to ON on startup
-    queue_service.set_status("ON")
-    print("✅ Queue status initialized to ON")
-    
-    task = asyncio.create_task(process_queue_worker())
+    # Startup: run the queue worker, batch poller and bulk job resume here unless a separate
+    # `python -m app.worker` process owns them
+    if settings.WORKER_MODE not in WORKER_MODES:
+        raise ValueError(f"Invalid WORKER_MODE: {settings.WORKER_MODE}")
+    workers_task = None
+    if settings.WORKER_MODE == "embedded":
+        workers_task = asyncio.create_task(build_workers().run())
+    else:
+        logger.info("Background workers run in a separate process", extra={"worker_mode": settings.WORKER_MODE})
+    if settings.NEAR_DUPLICATE_CHECK:
+        # Reading the history into the near-duplicate index takes a while on a large database: done in a
+        # worker thread now rather than by the first /publish
+        app.state.near_duplicates_warm = asyncio.create_task(asyncio.to_thread(warm_near_duplicates))
+
     yield
-    # Shutdown: Cancel background task
-    task.cancel()
+    # Shutdown: Cancel background tasks
+    if workers_task:
+        workers_task.cancel()
+        await asyncio.gather(workers_task, return_exceptions=True)
+    # Bulk jobs started by requests to this process, also when the workers run elsewhere or another replica leads
+    await bulk_service.shutdown()
+    await dispose_async_engine()
+
+app = FastAPI(
+    title="University Social Media Generator",
+    lifespan=lifespan,
+    default_response_class=responses.default_response_class(settings.FAST_RESPONSES),
+)
 
-app = FastAPI(title="University Social Media Generator", lifespan=lifespan)
+if settings.FAST_RESPONSES:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
+
+# Inside observe_request: a profiled request runs in the same task as its endpoint
+app.add_middleware(ProfilingMiddleware)
 
 # CORS
 app.add_middleware(
@@ -77,11 +85,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    start = time.perf_counter()
+    status_code = 500
+    parent = tracing.extract_context(request.headers.get("traceparent"))
+    with tracing.tracer.start_as_current_span(
+        f"{request.method} {request.url.path}", context=parent, kind=SpanKind.SERVER
+    ) as span:
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            trace_id = tracing.current_trace_id()
+            if trace_id:
+                response.headers["X-Trace-Id"] = trace_id
+            return response
+        finally:
+            # Label by route template (/api/publications/{publication_id}) to keep cardinality bounded
+            route = request.scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            span.update_name(f"{request.method} {route_path}")
+            span.set_attribute("http.route", route_path)
+            span.set_attribute("http.response.status_code", status_code)
+            metrics.HTTP_REQUEST_LATENCY.labels(
+                method=request.method, route=route_path, status=str(status_code)
+            ).observe(time.perf_counter() - start)
+
 # Mount Static Files
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 STATIC_DIR = os.path.join(os.path.dirname(BASE_DIR), "static")
 os.makedirs(STATIC_DIR, exist_ok=True)
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+app.mount(
+    "/static",
+    MediaStaticFiles(directory=STATIC_DIR, accel_redirect_prefix=settings.STATIC_ACCEL_REDIRECT),
+    name="static",
+)
 
 # Include Routes
 app.include_router(api_router, prefix="/api")
@@ -90,11 +128,20 @@ app.include_router(api_router, prefix="/api")
 def read_root():
     return {"message": "Welcome to the University Social Media Generator API"}
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    from app.services.queue_service import queue_service
+
+    try:
+        metrics.record_queue_stats(queue_service.get_queue_stats())
+    except Exception as e:
+        logger.warning("Could not refresh queue metrics: %s", e)
+
+    body, content_type = metrics.render_latest()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/health")
 def health_check():
     """Health check endpoint for Docker and load balancers"""
     return {"status": "healthy", "service": "backend"}
-<<<<<<< HEAD
-
-=======
->>>>>>> edab826f1c006fb5c88c99504b503d04cf67df9a
@@ -1,3 +1,8 @@
 from .user import User
 from .chat import ChatSession, ChatMessage
 from .publication import Publication
+from .bulk_job import BulkJob, BulkJobItem
+from .idempotency import IdempotencyKey
+from .llm_usage import LLMUsage
+from .image_cache import ImageCacheEntry
+from .app_setting import AppSetting
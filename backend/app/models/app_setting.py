@@ -0,0 +1,11 @@
+from sqlalchemy import Column, String, DateTime
+from datetime import datetime
+from app.db.base import Base
+
+class AppSetting(Base):
+    """Runtime switches shared by every process (API and worker), e.g. the queue ON/OFF status without Redis."""
+    __tablename__ = "app_settings"
+
+    key = Column(String, primary_key=True)
+    value = Column(String, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, JSON
+from datetime import datetime
+from app.db.base import Base
+
+class BulkJob(Base):
+    __tablename__ = "bulk_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    platforms = Column(JSON)
+    mode = Column(String, default="realtime") # realtime, batch (OpenAI Batch API, results stored as drafts)
+    openai_batch_id = Column(String, nullable=True, index=True)
+    concurrency = Column(Integer, default=2)
+    status = Column(String, default="pending", index=True) # pending, running, completed
+    total = Column(Integer, default=0)
+    completed = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    owner = Column(String, nullable=True) # Process running a realtime job; another one takes over once heartbeat_at goes stale
+    heartbeat_at = Column(DateTime, nullable=True)
+
+class BulkJobItem(Base):
+    __tablename__ = "bulk_job_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("bulk_jobs.id"), nullable=False, index=True)
+    position = Column(Integer)  # Order in the uploaded list
+    title = Column(String)
+    body = Column(Text)
+    status = Column(String, default="pending", index=True) # pending, running, submitted, done, failed
+    chat_session_id = Column(Integer, ForeignKey("chat_sessions.id"), nullable=True)
+    error_message = Column(Text, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, UniqueConstraint
+from datetime import datetime
+from app.db.base import Base
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (UniqueConstraint("endpoint", "owner", "key", name="uq_idempotency_endpoint_owner_key"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    endpoint = Column(String(50), nullable=False)  # generate, publish
+    owner = Column(String(50), nullable=False)     # user:<id> or anonymous
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status = Column(String, default="in_progress") # in_progress, completed
+    response_status = Column(Integer, nullable=True)
+    response_body = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    locked_until = Column(DateTime, nullable=False)  # in-flight lock; a crashed request frees the key after this
+    expires_at = Column(DateTime, nullable=False, index=True)
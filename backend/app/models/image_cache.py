@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from datetime import datetime
+from app.db.base import Base
+
+class ImageCacheEntry(Base):
+    """
+    A generated image reused for later prompts that normalize to the same text (and size). The file itself
+    belongs to the media store (static/media), shared with the history and the publications that use it.
+    """
+    __tablename__ = "image_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    prompt_key = Column(String(64), nullable=False, unique=True)  # sha256 of size + normalized prompt
+    prompt = Column(Text, nullable=False)  # normalized prompt, for the fuzzy tier
+    size = Column(String(16), nullable=False, index=True)
+    filename = Column(String, nullable=False)  # content-addressed file in the media directory
+    bytes = Column(Integer, default=0, nullable=False)
+    # OpenAI-hosted copy (url response format) and when it stops working
+    remote_url = Column(Text, nullable=True)
+    remote_expires_at = Column(DateTime, nullable=True)
+    hits = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)  # LRU eviction order
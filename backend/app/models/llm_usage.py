@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime, Index
+from datetime import datetime
+from app.db.base import Base
+
+class LLMUsage(Base):
+    """Tokens consumed per user, UTC day and model. Anonymous requests are accounted with user_id NULL."""
+    __tablename__ = "llm_usage"
+    __table_args__ = (Index("ix_llm_usage_user_day", "user_id", "day"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    day = Column(Date, nullable=False, index=True)
+    model = Column(String, nullable=False)
+    requests = Column(Integer, default=0, nullable=False)
+    prompt_tokens = Column(Integer, default=0, nullable=False)
+    completion_tokens = Column(Integer, default=0, nullable=False)
+    total_tokens = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,8 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, JSON
-<<<<<<< HEAD
-from sqlalchemy.orm import relationship
-=======
->>>>>>> edab826f1c006fb5c88c99504b503d04cf67df9a
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, JSON, Index
 from datetime import datetime
 from app.db.base import Base
 
@@ -15,17 +11,23 @@ class Publication(Base):
     text = Column(Text)
     media_url = Column(String, nullable=True)
     video_path = Column(String, nullable=True)  # Local file path for TikTok videos
-<<<<<<< HEAD
-    status = Column(String, default="published") # published, failed
-    error_message = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    
-    # Relationship
-    user = relationship("User", back_populates="publications")
-
-=======
-    status = Column(String, default="pending") # pending, processing, published, failed
+    status = Column(String, default="pending") # draft, pending, processing, retrying, published, failed
+    priority = Column(String, default="normal", nullable=False)  # urgent or normal (dispatched first)
     error_message = Column(Text, nullable=True)
+    # Retries: transient failures go back to 'retrying' until next_attempt_at; permanent ones (or the
+    # last attempt) end as 'failed', which is the dead-letter view
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, nullable=True)
+    error_code = Column(String, nullable=True)  # publisher error, e.g. API_ERROR, EXCEPTION
+    error_class = Column(String, nullable=True)  # retriable or permanent
     created_at = Column(DateTime, default=datetime.utcnow)
     processed_at = Column(DateTime, nullable=True)
->>>>>>> edab826f1c006fb5c88c99504b503d04cf67df9a
+
+    # Tracing: trace started by /publish, resumed by the queue worker
+    trace_id = Column(String(32), nullable=True, index=True)
+    traceparent = Column(String(55), nullable=True)
+
+    __table_args__ = (
+        # Due-time lookup of the queue: WHERE status = 'retrying' AND next_attempt_at <= now
+        Index("ix_publications_status_next_attempt_at", "status", "next_attempt_at"),
+    )
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from app.core import metrics
+from app.core.config import settings
+from app.services.leader_election import LeaderElection
+
+logger = logging.getLogger(__name__)
+
+WORKER_MODES = ("embedded", "external")
+
+class QueueLanes:
+    """
+    Drains each platform of the publication queue on its own: every lane has a thread pool sized to its
+    concurrency, so a lane busy with slow uploads neither delays other lanes nor takes their threads.
+    A lane that is still draining is skipped by the next tick instead of being started twice.
+    """
+
+    def __init__(self):
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+
+    def dispatch(self, lanes: Dict[str, Dict[str, Any]]) -> List[str]:
+        """Starts a drain for every lane with pending work that is not draining already."""
+        started = []
+        for platform, stats in lanes.items():
+            task = self._running.get(platform)
+            if stats["pending"] and (task is None or task.done()):
+                self._running[platform] = asyncio.create_task(self._drain(platform, stats["pending"]))
+                started.append(platform)
+        return started
+
+    async def _drain(self, platform: str, pending: int) -> None:
+        from app.services.queue_service import queue_service
+
+        lane = queue_service.lane(platform)
+        executor = self._executors.get(platform)
+        if executor is None:
+            executor = self._executors[platform] = ThreadPoolExecutor(
+                max_workers=lane.concurrency, thread_name_prefix=f"lane-{platform or 'none'}"
+            )
+        loop = asyncio.get_running_loop()
+        try:
+            # Concurrent drains of one lane share its rows: each row is claimed by exactly one of them
+            results = await asyncio.gather(*(
+                loop.run_in_executor(executor, queue_service.process_pending_publications, None, platform)
+                for _ in range(min(lane.concurrency, pending))
+            ))
+            result = {key: sum(r[key] for r in results) for key in results[0]}
+            logger.info("Lane drained", extra={"lane": platform, **result})
+        except Exception:
+            logger.exception("Error draining lane", extra={"lane": platform})
+
+    async def shutdown(self) -> None:
+        for task in self._running.values():
+            task.cancel()
+        await asyncio.gather(*self._running.values(), return_exceptions=True)
+        self._running.clear()
+        # Publications already being sent finish in their threads; nothing new is started
+        for executor in self._executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._executors.clear()
+
+async def process_queue_worker(interval: float = 10):
+    """Every `interval` seconds while the queue is ON, starts a drain for each lane with pending work"""
+    from app.services.queue_service import queue_service
+
+    logger.info("Queue worker started")
+    lanes = QueueLanes()
+
+    try:
+        while True:
+            try:
+                # Check if queue is ON
+                status = await asyncio.to_thread(queue_service.get_status)
+                stats = await asyncio.to_thread(queue_service.get_queue_stats)
+                metrics.record_queue_stats(stats)
+
+                logger.debug("Worker check", extra={"queue_status": status, "pending": stats["pending"]})
+
+                if status == "ON":
+                    started = lanes.dispatch(stats["lanes"])
+                    if started:
+                        logger.info("Processing pending publications", extra={"pending": stats["pending"], "lanes": started})
+                else:
+                    logger.debug("Queue is OFF - skipping processing")
+            except Exception:
+                logger.exception("Error in queue worker")
+
+            await asyncio.sleep(interval)
+    finally:
+        await lanes.shutdown()
+
+async def poll_generation_batches_worker():
+    """Collects finished OpenAI batches (bulk jobs in batch mode) and stores their drafts."""
+    from app.services.batch_generation import batch_service
+    from app.services.bulk_generation import bulk_service
+
+    while True:
+        try:
+            for event in await asyncio.to_thread(batch_service.poll):
+                bulk_service._publish(event["job_id"], event)
+        except Exception:
+            logger.exception("Error in batch poller")
+
+        await asyncio.sleep(settings.BATCH_POLL_INTERVAL_SECONDS)
+
+async def run_bulk_jobs_worker(interval: float = 10):
+    """
+    Starts the realtime bulk jobs nobody is running: new ones when the API leaves them to the worker
+    (WORKER_MODE=external) and those whose owner stopped renewing its heartbeat.
+    """
+    from app.services.bulk_generation import bulk_service
+
+    while True:
+        try:
+            await bulk_service.resume_incomplete_jobs()
+        except Exception:
+            logger.exception("Error starting bulk jobs")
+
+        await asyncio.sleep(interval)
+
+class BackgroundWorkers:
+    """
+    Starts the background loops, or with leader election keeps checking the lock every third of its TTL
+    and runs the loops only while this process is the leader.
+    """
+
+    def __init__(self, election: Optional[LeaderElection] = None):
+        self.election = election
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def run(self) -> None:
+        """Runs until cancelled."""
+        try:
+            if self.election is None or self.election.backend == "none":
+                await self._start()
+                await asyncio.Event().wait()
+            else:
+                await self._follow_leadership()
+        finally:
+            await self._stop()
+            if self.election is not None:
+                await asyncio.to_thread(self.election.release)
+
+    async def _follow_leadership(self) -> None:
+        interval = max(1, self.election.ttl_seconds // 3)
+        while True:
+            leader = await asyncio.to_thread(self.election.acquire)
+            if leader and not self.running:
+                await self._start()
+            elif not leader and self.running:
+                logger.warning("Stopping background workers: leadership lost")
+                await self._stop()
+            await asyncio.sleep(interval)
+
+    async def _start(self) -> None:
+        from app.services.queue_service import queue_service
+
+        # ON on the very first start; after a restart or a failover the stored status (e.g. an operator's OFF) stays
+        status = await asyncio.to_thread(queue_service.initialize_status, "ON")
+        logger.info("Queue status is %s", status)
+
+        self._tasks = [
+            asyncio.create_task(process_queue_worker(settings.WORKER_POLL_INTERVAL_SECONDS)),
+            asyncio.create_task(poll_generation_batches_worker()),
+            asyncio.create_task(run_bulk_jobs_worker(settings.WORKER_POLL_INTERVAL_SECONDS)),
+        ]
+
+    async def _stop(self) -> None:
+        from app.services.bulk_generation import bulk_service
+
+        if not self._tasks:
+            return
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await bulk_service.shutdown()
+
+def build_workers() -> BackgroundWorkers:
+    if settings.WORKER_LEADER_ELECTION.lower() == "none":
+        return BackgroundWorkers()
+    return BackgroundWorkers(LeaderElection())
@@ -0,0 +1,192 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, List
+from app.db.session import SessionLocal
+from app.models.bulk_job import BulkJob, BulkJobItem
+from app.models.publication import Publication
+from app.services.llm_usage import usage_service
+
+logger = logging.getLogger(__name__)
+
+# Batch states after which the output/error files are final
+BATCH_TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+def draft_text(content: Dict[str, Any]) -> str:
+    """Same field precedence the frontend uses when publishing generated content."""
+    return content.get("text") or content.get("caption") or content.get("message") or content.get("script") or ""
+
+class BatchGenerationService:
+    """
+    Offline mode for bulk jobs: every item becomes one line of an OpenAI Batch API file
+    (custom_id "item-<id>"). A background poller collects the results, maps them back to
+    their items and stores them as a ChatSession plus one draft Publication per platform.
+    Images and videos are not generated in this mode; drafts carry text only.
+    """
+
+    def __init__(self):
+        self._pipeline = None
+
+    @property
+    def pipeline(self):
+        if self._pipeline is None:
+            from app.services.generation_pipeline import get_pipeline
+            self._pipeline = get_pipeline()
+        return self._pipeline
+
+    @staticmethod
+    def custom_id(item_id: int) -> str:
+        return f"item-{item_id}"
+
+    def submit(self, job_id: int) -> None:
+        """
+        Uploads the job's pending items as one batch. Out-of-scope items, and items past what is left of
+        the user's daily token quota, fail without being sent.
+        """
+        content_gen = self.pipeline.content_gen
+        db = SessionLocal()
+        try:
+            job = db.get(BulkJob, job_id)
+            if job is None or job.openai_batch_id:
+                return
+            platforms = list(job.platforms or [])
+            items = db.query(BulkJobItem).filter(
+                BulkJobItem.job_id == job_id, BulkJobItem.status == "pending"
+            ).order_by(BulkJobItem.position.asc()).all()
+
+            quota = usage_service.quota_for(job.user_id)
+            remaining = quota - usage_service.used_today(db, job.user_id) if quota else None
+
+            requests = []
+            for item in items:
+                error = None
+                if not content_gen._is_academic_scope(f"{item.title}\n\n{item.body}"):
+                    error = "Este asistente solo genera contenido académico/universitario."
+                elif remaining is not None:
+                    estimate = content_gen.estimate_tokens(item.title, item.body, platforms)
+                    if estimate > remaining:
+                        error = "Cuota diaria de tokens agotada. Se renueva a las 00:00 UTC."
+                    else:
+                        remaining -= estimate
+
+                if error is None:
+                    requests.append(content_gen.batch_request(self.custom_id(item.id), item.title, item.body, platforms))
+                else:
+                    item.status = "failed"
+                    item.error_message = error
+                    item.finished_at = datetime.utcnow()
+                    job.failed = (job.failed or 0) + 1
+
+            if requests:
+                batch = content_gen.submit_batch(requests, metadata={"bulk_job_id": str(job_id)})
+                job.openai_batch_id = batch.id
+                job.status = "running"
+                now = datetime.utcnow()
+                for item in items:
+                    if item.status == "pending":
+                        item.status = "submitted"
+                        item.started_at = now
+                logger.info("Submitted generation batch", extra={"job_id": job_id, "batch_id": batch.id, "requests": len(requests)})
+            else:
+                job.status = "completed"
+                job.finished_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+    def poll(self) -> List[Dict[str, Any]]:
+        """
+        One poller pass: submits batch jobs that are not submitted yet (e.g. the API was down when the job
+        was created) and collects finished batches. Returns a progress event for every job that changed.
+        """
+        db = SessionLocal()
+        try:
+            jobs = db.query(BulkJob.id, BulkJob.openai_batch_id).filter(
+                BulkJob.mode == "batch", BulkJob.status.in_(["pending", "running"])
+            ).all()
+        finally:
+            db.close()
+
+        events = []
+        for job_id, batch_id in jobs:
+            try:
+                if batch_id is None:
+                    self.submit(job_id)
+                elif not self._collect(job_id, batch_id):
+                    continue
+                events.append(self._snapshot(job_id))
+            except Exception:
+                logger.exception("Error polling generation batch", extra={"job_id": job_id})
+        return events
+
+    def _collect(self, job_id: int, batch_id: str) -> bool:
+        """Stores the batch results once it reaches a terminal state. Returns False while it is still running."""
+        content_gen = self.pipeline.content_gen
+        batch = content_gen.retrieve_batch(batch_id)
+        if batch.status not in BATCH_TERMINAL_STATUSES:
+            return False
+
+        db = SessionLocal()
+        try:
+            user_id = db.query(BulkJob.user_id).filter(BulkJob.id == job_id).scalar()
+        finally:
+            db.close()
+
+        # Expired and cancelled batches still return the requests that did finish
+        results: Dict[str, Dict] = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                results.update(content_gen.batch_results(
+                    file_id, on_usage=lambda custom_id, model, usage: usage_service.record(user_id, model, usage)
+                ))
+
+        db = SessionLocal()
+        try:
+            job = db.get(BulkJob, job_id)
+            items = db.query(BulkJobItem).filter(
+                BulkJobItem.job_id == job_id, BulkJobItem.status == "submitted"
+            ).all()
+            for item in items:
+                content = results.get(self.custom_id(item.id))
+                if content is None:
+                    self._fail(job, item, f"No result (batch {batch.status})")
+                elif "error" in content:
+                    self._fail(job, item, content.get("message", content["error"]))
+                else:
+                    self._store_drafts(db, job, item, content)
+
+            job.status = "completed"
+            job.finished_at = datetime.utcnow()
+            db.commit()
+            logger.info("Collected generation batch", extra={"job_id": job_id, "batch_id": batch_id, "batch_status": batch.status})
+            return True
+        finally:
+            db.close()
+
+    def _fail(self, job: BulkJob, item: BulkJobItem, message: str) -> None:
+        item.status = "failed"
+        item.error_message = message
+        item.finished_at = datetime.utcnow()
+        job.failed = (job.failed or 0) + 1
+
+    def _store_drafts(self, db, job: BulkJob, item: BulkJobItem, content: Dict[str, Dict]) -> None:
+        for platform, platform_content in content.items():
+            if not isinstance(platform_content, dict) or "error" in platform_content:
+                continue
+            db.add(Publication(
+                user_id=job.user_id,
+                platform=platform,
+                text=draft_text(platform_content),
+                status="draft",
+            ))
+        item.status = "done"
+        item.finished_at = datetime.utcnow()
+        job.completed = (job.completed or 0) + 1
+        # save_history commits the drafts and the item together with the chat session
+        chat = self.pipeline.save_history(db, job.user_id, item.title, item.body, content)
+        item.chat_session_id = chat.id
+
+    def _snapshot(self, job_id: int) -> Dict[str, Any]:
+        from app.services.bulk_generation import bulk_service
+        return bulk_service.snapshot(job_id)
+
+batch_service = BatchGenerationService()
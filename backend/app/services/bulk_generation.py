@@ -0,0 +1,344 @@
+import asyncio
+import csv
+import io
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+from sqlalchemy import func, or_
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.bulk_job import BulkJob, BulkJobItem
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("completed",)
+MODES = ("realtime", "batch")
+
+def parse_csv_items(content: bytes) -> List[Dict[str, str]]:
+    """Reads a CSV with `title` and `body` columns (UTF-8, optional BOM). Blank rows are skipped."""
+    reader = csv.DictReader(io.StringIO(content.decode("utf-8-sig")))
+    fields = {name.strip().lower() for name in (reader.fieldnames or [])}
+    if not {"title", "body"} <= fields:
+        raise ValueError("CSV must have 'title' and 'body' columns")
+    items = []
+    for row in reader:
+        row = {(k or "").strip().lower(): (v or "").strip() for k, v in row.items()}
+        if row.get("title") or row.get("body"):
+            items.append({"title": row.get("title", ""), "body": row.get("body", "")})
+    return items
+
+class BulkGenerationService:
+    """
+    Runs the generation pipeline over a list of announcements with bounded concurrency.
+    Every finished item is committed on its own (ChatSession + item status), so a restart
+    only re-runs items that were still pending or running.
+
+    A realtime job runs in one process at a time: the process that claims it is recorded as its owner and
+    renews a heartbeat while it runs, and each item is claimed on its own before it is generated. Another
+    process only takes the job over (and re-runs its interrupted items) once that heartbeat has gone stale.
+    """
+
+    def __init__(self):
+        self.owner = uuid.uuid4().hex
+        self._pipeline = None
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+
+    @property
+    def pipeline(self):
+        if self._pipeline is None:
+            from app.services.generation_pipeline import get_pipeline
+            self._pipeline = get_pipeline()
+        return self._pipeline
+
+    # --- Job lifecycle ---
+
+    def create_job(
+        self, db, user_id: int, items: List[Dict[str, str]], platforms: List[str], concurrency: int, mode: str = "realtime"
+    ) -> BulkJob:
+        if mode not in MODES:
+            raise ValueError(f"Invalid mode: {mode}")
+        if not items:
+            raise ValueError("No items to generate")
+        max_items = settings.BULK_BATCH_MAX_ITEMS if mode == "batch" else settings.BULK_MAX_ITEMS
+        if len(items) > max_items:
+            raise ValueError(f"Too many items ({len(items)}), the limit is {max_items}")
+
+        job = BulkJob(
+            user_id=user_id,
+            platforms=platforms,
+            mode=mode,
+            concurrency=max(1, min(concurrency, settings.BULK_MAX_CONCURRENCY)),
+            status="pending",
+            total=len(items),
+        )
+        db.add(job)
+        db.flush()
+        db.add_all([
+            BulkJobItem(job_id=job.id, position=i, title=item["title"], body=item["body"])
+            for i, item in enumerate(items)
+        ])
+        db.commit()
+        db.refresh(job)
+        return job
+
+    def start(self, job_id: int) -> None:
+        """Schedules the job on the running event loop unless it is already running here."""
+        task = self._tasks.get(job_id)
+        if task and not task.done():
+            return
+        self._tasks[job_id] = asyncio.create_task(self.run_job(job_id))
+
+    async def resume_incomplete_jobs(self) -> List[int]:
+        """
+        Called by the background workers on every pass: starts the unfinished jobs nobody runs (not started
+        yet, or whose owner is gone; its items left 'running' then go back to pending). Jobs another live
+        process is running are left alone; batch-mode jobs are left to the batch poller.
+        """
+        job_ids = [job_id for job_id in await asyncio.to_thread(self._orphaned_jobs) if not self.is_running(job_id)]
+        for job_id in job_ids:
+            logger.info("Starting bulk job", extra={"job_id": job_id})
+            self.start(job_id)
+        return job_ids
+
+    async def shutdown(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+
+    def retry_failed(self, db, job_id: int) -> int:
+        count = db.query(BulkJobItem).filter(
+            BulkJobItem.job_id == job_id, BulkJobItem.status == "failed"
+        ).update({BulkJobItem.status: "pending", BulkJobItem.error_message: None}, synchronize_session=False)
+        # Batch jobs resubmit the retried items as a new batch
+        db.query(BulkJob).filter(BulkJob.id == job_id).update(
+            {BulkJob.failed: BulkJob.failed - count, BulkJob.status: "pending", BulkJob.finished_at: None,
+             BulkJob.openai_batch_id: None},
+            synchronize_session=False,
+        )
+        db.commit()
+        return count
+
+    async def run_job(self, job_id: int) -> None:
+        job_info = await asyncio.to_thread(self._claim_job, job_id)
+        if job_info is None:
+            return
+        platforms, user_id, concurrency = job_info
+        semaphore = asyncio.Semaphore(concurrency)
+        in_flight: Set[asyncio.Future] = set()
+
+        async def process(item_id: int):
+            async with semaphore:
+                future = asyncio.ensure_future(asyncio.to_thread(self._process_item, job_id, item_id, platforms, user_id))
+                in_flight.add(future)
+                future.add_done_callback(in_flight.discard)
+                event = await asyncio.shield(future)
+            if event is not None:
+                self._publish(job_id, event)
+
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            # Items put back to pending while the job runs (resume with retry_failed) are picked up by the next pass
+            while True:
+                item_ids = await asyncio.to_thread(self._pending_item_ids, job_id)
+                await asyncio.gather(*(process(item_id) for item_id in item_ids))
+                event = await asyncio.to_thread(self._finish_job, job_id)
+                if event is not None:
+                    break
+            self._publish(job_id, event)
+        finally:
+            # A cancelled job keeps its ownership until the items already generating are saved
+            if in_flight:
+                await asyncio.wait(in_flight)
+            heartbeat.cancel()
+            await asyncio.to_thread(self._release_job, job_id)
+            self._tasks.pop(job_id, None)
+
+    async def _heartbeat(self, job_id: int) -> None:
+        interval = max(1, settings.BULK_JOB_OWNER_TTL_SECONDS // 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await asyncio.to_thread(self._renew_job, job_id):
+                    logger.warning("Bulk job was taken over by another process", extra={"job_id": job_id})
+                    return
+            except Exception:
+                logger.exception("Error renewing bulk job heartbeat", extra={"job_id": job_id})
+
+    # --- Progress streaming ---
+
+    def subscribe(self, job_id: int) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, job_id: int, queue: asyncio.Queue) -> None:
+        subscribers = self._subscribers.get(job_id)
+        if subscribers:
+            subscribers.discard(queue)
+            if not subscribers:
+                self._subscribers.pop(job_id, None)
+
+    def is_running(self, job_id: int) -> bool:
+        task = self._tasks.get(job_id)
+        return bool(task and not task.done())
+
+    def _publish(self, job_id: int, event: Dict[str, Any]) -> None:
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait(event)
+
+    # --- DB work (runs in worker threads) ---
+
+    def snapshot(self, job_id: int) -> Optional[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            job = db.get(BulkJob, job_id)
+            return self._job_event(job) if job else None
+        finally:
+            db.close()
+
+    def _job_event(self, job: BulkJob, item: Optional[BulkJobItem] = None) -> Dict[str, Any]:
+        event = {
+            "job_id": job.id,
+            "status": job.status,
+            "total": job.total,
+            "completed": job.completed,
+            "failed": job.failed,
+        }
+        if item is not None:
+            event["item"] = {
+                "id": item.id,
+                "position": item.position,
+                "status": item.status,
+                "chat_session_id": item.chat_session_id,
+                "error_message": item.error_message,
+            }
+        return event
+
+    def _ownerless(self):
+        """Filter for jobs nobody runs: never claimed, released, or owned by a process whose heartbeat is stale."""
+        stale = datetime.utcnow() - timedelta(seconds=settings.BULK_JOB_OWNER_TTL_SECONDS)
+        return or_(BulkJob.owner.is_(None), BulkJob.heartbeat_at.is_(None), BulkJob.heartbeat_at < stale)
+
+    def _orphaned_jobs(self) -> List[int]:
+        db = SessionLocal()
+        try:
+            rows = db.query(BulkJob.id).filter(
+                BulkJob.status.in_(["pending", "running"]), BulkJob.mode != "batch", self._ownerless()
+            ).order_by(BulkJob.id.asc())
+            return [row.id for row in rows]
+        finally:
+            db.close()
+
+    def _claim_job(self, job_id: int):
+        """Makes this process the job's owner unless another live process is running it."""
+        db = SessionLocal()
+        try:
+            claimed = db.query(BulkJob).filter(
+                BulkJob.id == job_id,
+                BulkJob.status.notin_(FINISHED_STATUSES),
+                or_(BulkJob.owner == self.owner, self._ownerless()),
+            ).update(
+                {BulkJob.owner: self.owner, BulkJob.heartbeat_at: datetime.utcnow(), BulkJob.status: "running"},
+                synchronize_session=False,
+            )
+            if not claimed:
+                db.rollback()
+                return None
+            # Items left running were interrupted together with their previous owner
+            db.query(BulkJobItem).filter(
+                BulkJobItem.job_id == job_id, BulkJobItem.status == "running"
+            ).update({BulkJobItem.status: "pending", BulkJobItem.started_at: None}, synchronize_session=False)
+            db.commit()
+            job = db.get(BulkJob, job_id)
+            return list(job.platforms or []), job.user_id, job.concurrency or 1
+        finally:
+            db.close()
+
+    def _renew_job(self, job_id: int) -> bool:
+        db = SessionLocal()
+        try:
+            renewed = db.query(BulkJob).filter(BulkJob.id == job_id, BulkJob.owner == self.owner).update(
+                {BulkJob.heartbeat_at: datetime.utcnow()}, synchronize_session=False
+            )
+            db.commit()
+            return bool(renewed)
+        finally:
+            db.close()
+
+    def _release_job(self, job_id: int) -> None:
+        db = SessionLocal()
+        try:
+            db.query(BulkJob).filter(BulkJob.id == job_id, BulkJob.owner == self.owner).update(
+                {BulkJob.owner: None, BulkJob.heartbeat_at: None}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _pending_item_ids(self, job_id: int) -> List[int]:
+        db = SessionLocal()
+        try:
+            return [row.id for row in db.query(BulkJobItem.id).filter(
+                BulkJobItem.job_id == job_id, BulkJobItem.status == "pending"
+            ).order_by(BulkJobItem.position.asc())]
+        finally:
+            db.close()
+
+    def _process_item(self, job_id: int, item_id: int, platforms: List[str], user_id: int) -> Optional[Dict[str, Any]]:
+        """Generates one item; None when the item was no longer pending (another run claimed it first)."""
+        db = SessionLocal()
+        try:
+            claimed = db.query(BulkJobItem).filter(
+                BulkJobItem.id == item_id, BulkJobItem.status == "pending"
+            ).update({BulkJobItem.status: "running", BulkJobItem.started_at: datetime.utcnow()}, synchronize_session=False)
+            db.commit()
+            if not claimed:
+                return None
+            item = db.get(BulkJobItem, item_id)
+
+            try:
+                results = self.pipeline.generate(item.title, item.body, platforms, user_id=user_id)
+                errors = [c for c in results.values() if isinstance(c, dict) and "error" in c]
+                if results and len(errors) == len(results):
+                    raise RuntimeError(errors[0].get("message", errors[0]["error"]))
+                chat = self.pipeline.save_history(db, user_id, item.title, item.body, results)
+                item.status = "done"
+                item.chat_session_id = chat.id
+                counter = {BulkJob.completed: BulkJob.completed + 1}
+            except Exception as e:
+                db.rollback()
+                logger.warning("Bulk item failed: %s", e, extra={"job_id": job_id, "item_id": item_id})
+                item = db.get(BulkJobItem, item_id)
+                item.status = "failed"
+                item.error_message = str(e)
+                counter = {BulkJob.failed: BulkJob.failed + 1}
+
+            item.finished_at = datetime.utcnow()
+            db.query(BulkJob).filter(BulkJob.id == job_id).update(counter, synchronize_session=False)
+            db.commit()
+            return self._job_event(db.get(BulkJob, job_id), item)
+        finally:
+            db.close()
+
+    def _finish_job(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Completes the job once no item is left; None while items are still pending."""
+        db = SessionLocal()
+        try:
+            job = db.get(BulkJob, job_id)
+            remaining = dict(db.query(BulkJobItem.status, func.count(BulkJobItem.id)).filter(
+                BulkJobItem.job_id == job_id, BulkJobItem.status.in_(["pending", "running"])
+            ).group_by(BulkJobItem.status).all())
+            if remaining.get("pending"):
+                return None
+            if not remaining:
+                job.status = "completed"
+                job.finished_at = datetime.utcnow()
+                db.commit()
+            return self._job_event(job)
+        finally:
+            db.close()
+
+bulk_service = BulkGenerationService()
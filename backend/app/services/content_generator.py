@@ -1,15 +1,32 @@
 import os
+import logging
 import json
-from typing import List, Dict, Optional
+from types import SimpleNamespace
+from typing import Any, Callable, List, Dict, Optional
 from openai import OpenAI
+from app.core.config import settings
+from app.core.metrics import record_token_usage
+from app.services.token_budget import count_tokens, truncate_to_budget
+from opentelemetry import trace
+from app.core.tracing import tracer
+from app.services.resilient_llm import ResilientCall
+
+logger = logging.getLogger(__name__)
+
+# Called with (model, usage) after every completion, e.g. to account it to the requesting user
+UsageCallback = Callable[[str, Any], None]
 
 class ContentGenerator:
     def __init__(self):
         self.api_key = os.getenv("OPENAI_API_KEY")
         self.client = None
         if self.api_key:
-            self.client = OpenAI(api_key=self.api_key)
+            # OPENAI_BASE_URL lets tests and benchmarks point at the local fake API
+            self.client = OpenAI(api_key=self.api_key, base_url=os.getenv("OPENAI_BASE_URL") or None)
         self.model = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+        # Takes over while the primary model keeps failing (circuit open) or when it errors on a call
+        self.fallback_model = os.getenv("OPENAI_FALLBACK_MODEL") or None
+        self._chat = ResilientCall("chat", hedge=settings.LLM_HEDGE, timeout_seconds=settings.LLM_TIMEOUT_SECONDS)
 
     def _is_academic_scope(self, text: str) -> bool:
         """Simple heuristic to determine if text is about academic/university topics."""
@@ -28,20 +45,7 @@ class ContentGenerator:
                 return True
         return False
 
-    def generate_social_content(self, title: str, body: str, platforms: List[str]) -> Dict[str, Dict]:
-        """
-        Generates social media content for the specified platforms.
-        """
-        combined_text = f"{title}\n\n{body}"
-        
-        # Enforce academic scope
-        if not self._is_academic_scope(combined_text):
-             return {t: {"error": "OUT_OF_SCOPE", "message": "Este asistente solo genera contenido académico/universitario."} for t in platforms}
-
-        if not self.client:
-            # Fallback if no API key (though plan assumes it exists, good for safety)
-            return {t: {"error": "CONFIG_ERROR", "message": "OpenAI API Key not configured."} for t in platforms}
-
+    def _build_messages(self, title: str, body: str, platforms: List[str]) -> List[Dict[str, str]]:
         system_prompt = (
             "Eres un experto community manager para una universidad prestigiosa. "
             "Tu tarea es generar contenido atractivo y específico para cada plataforma basado en el texto de entrada. "
@@ -63,25 +67,170 @@ class ContentGenerator:
             "Generate the content now."
         )
 
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    def fit_body(self, body: str) -> str:
+        """Body cut to LLM_MAX_BODY_TOKENS at paragraph/sentence boundaries (unchanged when it fits)."""
+        return truncate_to_budget(body or "", settings.LLM_MAX_BODY_TOKENS, self.model)
+
+    def estimate_tokens(self, title: str, body: str, platforms: List[str]) -> int:
+        """Prompt tokens of the budgeted request plus the expected completion, for the quota check."""
+        messages = self._build_messages(title, self.fit_body(body), platforms)
+        prompt = sum(count_tokens(message["content"], self.model) + 4 for message in messages)
+        return prompt + settings.LLM_COMPLETION_TOKENS_PER_PLATFORM * len(platforms)
+
+    def _budget_body(self, body: str, on_usage: Optional[UsageCallback] = None) -> str:
+        """
+        Keeps oversized bodies within LLM_MAX_BODY_TOKENS. With LLM_BODY_OVERFLOW=summarize the model
+        condenses them first (one extra, short call); truncation is the fallback.
+        """
+        if count_tokens(body or "", self.model) <= settings.LLM_MAX_BODY_TOKENS:
+            return body
+        span = trace.get_current_span()
+        span.set_attribute("llm.body_overflow", settings.LLM_BODY_OVERFLOW)
+        if settings.LLM_BODY_OVERFLOW == "summarize" and self.client:
+            try:
+                return self._summarize(body, on_usage)
+            except Exception as e:
+                logger.warning("Body summary failed, truncating instead: %s", e)
+        return self.fit_body(body)
+
+    def _summarize(self, body: str, on_usage: Optional[UsageCallback] = None) -> str:
+        max_tokens = settings.LLM_MAX_BODY_TOKENS
+        response = self._complete(
+            [
+                {"role": "system", "content": (
+                    "Resume el siguiente anuncio universitario en español. Conserva fechas, horarios, lugares, "
+                    "nombres, requisitos y datos de contacto. Responde solo con el resumen."
+                )},
+                # The input itself is capped too, at a few times the target size
+                {"role": "user", "content": truncate_to_budget(body, max_tokens * 4, self.model)},
+            ],
+            on_usage,
+            temperature=0.2,
+            max_tokens=max_tokens,
+        )
+        return response.choices[0].message.content.strip()
+
+    def _complete(self, messages: List[Dict[str, str]], on_usage: Optional[UsageCallback] = None, **params: Any):
+        """
+        Chat completion with a deadline, hedging and failover to OPENAI_FALLBACK_MODEL (see resilient_llm).
+        Hedges that lose the race still cost tokens, so their usage is recorded as well.
+        """
+        def request(model: str, timeout: float):
+            return self.client.chat.completions.create(model=model, messages=messages, timeout=timeout, **params)
+
+        def abandoned(response: Any, model: str) -> None:
+            self._record_usage(getattr(response, "usage", None), on_usage, model)
+
+        response, model = self._chat.call(request, [self.model, self.fallback_model], on_abandoned=abandoned)
+        self._record_usage(getattr(response, "usage", None), on_usage, model)
+        return response
+
+    def _record_usage(self, usage: Any, on_usage: Optional[UsageCallback] = None, model: Optional[str] = None) -> None:
+        model = model or self.model
+        record_token_usage(model, usage)
+        if on_usage is not None:
+            on_usage(model, usage)
+
+    def _parse_content(self, content_str: str) -> Dict[str, Dict]:
+        # Attempt to clean markdown code blocks if present
+        if "```json" in content_str:
+            content_str = content_str.split("```json")[1].split("```")[0].strip()
+        elif "```" in content_str:
+            content_str = content_str.split("```")[1].split("```")[0].strip()
+
+        return json.loads(content_str)
+
+    @tracer.start_as_current_span("ContentGenerator.generate_social_content")
+    def generate_social_content(
+        self, title: str, body: str, platforms: List[str], on_usage: Optional[UsageCallback] = None
+    ) -> Dict[str, Dict]:
+        """
+        Generates social media content for the specified platforms.
+        Bodies over the token budget are shortened first; `on_usage` receives the usage of every completion.
+        """
+        combined_text = f"{title}\n\n{body}"
+        
+        # Enforce academic scope
+        if not self._is_academic_scope(combined_text):
+             return {t: {"error": "OUT_OF_SCOPE", "message": "Este asistente solo genera contenido académico/universitario."} for t in platforms}
+
+        if not self.client:
+            # Fallback if no API key (though plan assumes it exists, good for safety)
+            return {t: {"error": "CONFIG_ERROR", "message": "OpenAI API Key not configured."} for t in platforms}
+
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7,
+            response = self._complete(
+                self._build_messages(title, self._budget_body(body, on_usage), platforms), on_usage, temperature=0.7,
             )
-            
-            content_str = response.choices[0].message.content
-            # Attempt to clean markdown code blocks if present
-            if "```json" in content_str:
-                content_str = content_str.split("```json")[1].split("```")[0].strip()
-            elif "```" in content_str:
-                content_str = content_str.split("```")[1].split("```")[0].strip()
-                
-            return json.loads(content_str)
+            return self._parse_content(response.choices[0].message.content)
 
         except Exception as e:
-            print(f"Error generating content: {e}")
+            logger.error("Error generating content: %s", e)
+            trace.get_current_span().record_exception(e)
             return {t: {"error": "GENERATION_FAILED", "message": str(e)} for t in platforms}
+
+    # --- Batch API (offline generation, ~50% cheaper, results within 24h) ---
+
+    def batch_request(self, custom_id: str, title: str, body: str, platforms: List[str]) -> Dict:
+        """
+        One JSONL line of a Batch API input file; `custom_id` maps the result back to its request.
+        Oversized bodies are truncated (no summary call in offline mode).
+        """
+        return {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": self.model,
+                "messages": self._build_messages(title, self.fit_body(body), platforms),
+                "temperature": 0.7,
+            },
+        }
+
+    @tracer.start_as_current_span("ContentGenerator.submit_batch")
+    def submit_batch(self, requests: List[Dict], metadata: Optional[Dict[str, str]] = None):
+        """Uploads the requests as a JSONL file and creates a batch. Returns the OpenAI Batch object."""
+        if not self.client:
+            raise RuntimeError("OpenAI API Key not configured.")
+        jsonl = "\n".join(json.dumps(r, ensure_ascii=False) for r in requests).encode("utf-8")
+        input_file = self.client.files.create(file=("batch.jsonl", jsonl), purpose="batch")
+        return self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+            metadata=metadata,
+        )
+
+    def retrieve_batch(self, batch_id: str):
+        return self.client.batches.retrieve(batch_id)
+
+    def batch_results(self, file_id: str, on_usage: Optional[Callable[[str, str, Any], None]] = None) -> Dict[str, Dict]:
+        """
+        Reads a batch output (or error) file and returns {custom_id: content}, where content is the
+        parsed per-platform dict or a {"error", "message"} dict like generate_social_content returns.
+        `on_usage` receives (custom_id, model, usage) for every completion.
+        """
+        results = {}
+        for line in self.client.files.content(file_id).text.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            response = entry.get("response") or {}
+            try:
+                if entry.get("error") or response.get("status_code") != 200:
+                    error = entry.get("error") or (response.get("body") or {}).get("error") or {}
+                    raise RuntimeError(error.get("message") or f"status {response.get('status_code')}")
+                completion = response["body"]
+                usage = SimpleNamespace(**(completion.get("usage") or {}))
+                record_token_usage(self.model, usage)
+                if on_usage is not None:
+                    on_usage(entry["custom_id"], self.model, usage)
+                results[entry["custom_id"]] = self._parse_content(completion["choices"][0]["message"]["content"])
+            except Exception as e:
+                results[entry["custom_id"]] = {"error": "GENERATION_FAILED", "message": str(e)}
+        return results
@@ -0,0 +1,180 @@
+"""
+Fair dispatch of the publication queue across users.
+
+Each lane keeps the due publications in one FIFO per (priority, user) and hands them out by weighted
+fair queuing: every publication costs 1 / weight of virtual time, and the next one dispatched is the head
+of the user whose virtual finish time is lowest (a heap of backlogged users, O(log users) per dispatch).
+A user who enqueues 300 posts is served once per round like everyone else instead of ahead of them,
+and a user who shows up later starts at the current virtual time, not behind the backlog. Urgent
+publications are dispatched before normal ones, fairly among themselves.
+"""
+import heapq
+import itertools
+import threading
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Set, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import QUEUE_BACKLOGGED_USERS, QUEUE_WAIT
+from app.models.publication import Publication
+
+PRIORITIES = ("urgent", "normal")
+# Scope of a drain over every lane (POST /queue/process)
+ALL_LANES = "*"
+
+FlowKey = Tuple[str, Optional[int]]  # (priority, user_id)
+
+def parse_weights(spec: str) -> Dict[int, float]:
+    """Parses "7=3,12=0.5" into {7: 3.0, 12: 0.5}; users not listed weigh 1."""
+    weights = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        user_id, _, weight = item.partition("=")
+        weights[int(user_id)] = float(weight)
+    return weights
+
+def backlog_bucket(pending: int) -> str:
+    if pending <= 1:
+        return "1"
+    if pending <= 10:
+        return "2-10"
+    if pending <= 100:
+        return "11-100"
+    return "100+"
+
+@dataclass(frozen=True)
+class Ticket:
+    publication_id: int
+    scope: str
+    flow: FlowKey
+
+class _Flow:
+    __slots__ = ("items", "finish", "in_flight", "scheduled")
+
+    def __init__(self):
+        self.items: Deque[Tuple[int, datetime]] = deque()  # (publication id, waiting since)
+        self.finish = 0.0
+        self.in_flight = 0
+        self.scheduled = False  # has its entry in the heap: backlogged and under the in-flight cap
+
+class _Scope:
+    def __init__(self):
+        self.flows: Dict[FlowKey, _Flow] = {}
+        self.heaps: Dict[str, List[Tuple[float, int, FlowKey]]] = {priority: [] for priority in PRIORITIES}
+        self.virtual_time: Dict[str, float] = {priority: 0.0 for priority in PRIORITIES}
+        self.known: Set[int] = set()  # queued or in flight
+
+class FairScheduler:
+    """
+    In-memory dispatcher of one queue worker, shared by the drain threads of every lane. The table stays
+    the source of truth: refresh() loads the due rows it does not know yet and each dispatched row is still
+    claimed atomically, so a row taken by another process is just skipped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scopes: Dict[str, _Scope] = {}
+        self._seq = itertools.count()
+        self._fair = True
+        self._weights: Dict[int, float] = {}
+        self._max_in_flight = 0
+
+    def refresh(self, db: Session, platform: Optional[str] = None) -> int:
+        """Queues the due rows of a lane (every lane without `platform`) not queued yet; returns how many are waiting."""
+        from app.services.queue_service import due_filter
+
+        scope_key = ALL_LANES if platform is None else platform
+        query = db.query(
+            Publication.id, Publication.user_id, Publication.priority,
+            func.coalesce(Publication.next_attempt_at, Publication.created_at),
+        ).filter(due_filter(datetime.utcnow())).order_by(Publication.created_at.asc(), Publication.id.asc())
+        if platform is not None:
+            query = query.filter(Publication.platform == platform)
+        rows = query.all()
+
+        with self._lock:
+            self._fair = settings.QUEUE_SCHEDULING.lower() != "fifo"
+            self._weights = parse_weights(settings.QUEUE_USER_WEIGHTS)
+            self._max_in_flight = settings.QUEUE_MAX_IN_FLIGHT_PER_USER if self._fair else 0
+            scope = self._scopes.setdefault(scope_key, _Scope())
+            for publication_id, user_id, priority, waiting_since in rows:
+                if publication_id in scope.known:
+                    continue
+                scope.known.add(publication_id)
+                key = (priority if priority in PRIORITIES else "normal", user_id if self._fair else None)
+                flow = scope.flows.get(key)
+                if flow is None:
+                    flow = scope.flows[key] = _Flow()
+                flow.items.append((publication_id, waiting_since))
+                self._schedule(scope, key, flow)
+            waiting = sum(len(flow.items) for flow in scope.flows.values())
+            QUEUE_BACKLOGGED_USERS.labels(platform=self._label(scope_key)).set(
+                len({user for (_, user), flow in scope.flows.items() if flow.items})
+            )
+        return waiting
+
+    def next(self, platform: Optional[str] = None) -> Optional[Ticket]:
+        """Next publication to send in the lane, or None when every waiting user is at the in-flight cap."""
+        scope_key = ALL_LANES if platform is None else platform
+        with self._lock:
+            scope = self._scopes.get(scope_key)
+            if scope is None:
+                return None
+            for priority in PRIORITIES:
+                heap = scope.heaps[priority]
+                if not heap:
+                    continue
+                finish, _, key = heapq.heappop(heap)
+                flow = scope.flows[key]
+                flow.scheduled = False
+                publication_id, waiting_since = flow.items.popleft()
+                # Virtual time follows the start tag of the publication in service
+                scope.virtual_time[priority] = max(scope.virtual_time[priority], finish - self._cost(key))
+                flow.finish = finish
+                flow.in_flight += 1
+                QUEUE_WAIT.labels(
+                    platform=self._label(scope_key), priority=priority, backlog=backlog_bucket(len(flow.items) + 1)
+                ).observe(max((datetime.utcnow() - waiting_since).total_seconds(), 0.0) if waiting_since else 0.0)
+                self._schedule(scope, key, flow)
+                return Ticket(publication_id, scope_key, key)
+        return None
+
+    def done(self, ticket: Ticket) -> None:
+        """Frees the user's in-flight slot once the publication is sent, failed or lost to another worker."""
+        with self._lock:
+            scope = self._scopes[ticket.scope]
+            scope.known.discard(ticket.publication_id)
+            flow = scope.flows[ticket.flow]
+            flow.in_flight -= 1
+            self._schedule(scope, ticket.flow, flow)
+            if not flow.items and not flow.in_flight:
+                # An idle user keeps no credit: next time they start at the current virtual time
+                del scope.flows[ticket.flow]
+
+    def snapshot(self, platform: Optional[str] = None) -> List[Dict[str, object]]:
+        """Waiting and in-flight publications per (priority, user) of a lane."""
+        with self._lock:
+            scope = self._scopes.get(ALL_LANES if platform is None else platform)
+            if scope is None:
+                return []
+            return [
+                {"priority": priority, "user_id": user_id, "pending": len(flow.items), "in_flight": flow.in_flight}
+                for (priority, user_id), flow in scope.flows.items()
+            ]
+
+    def _cost(self, key: FlowKey) -> float:
+        return 1.0 / self._weights.get(key[1], 1.0) if self._fair else 1.0
+
+    def _schedule(self, scope: _Scope, key: FlowKey, flow: _Flow) -> None:
+        if flow.scheduled or not flow.items or (self._max_in_flight and flow.in_flight >= self._max_in_flight):
+            return
+        priority = key[0]
+        start = max(scope.virtual_time[priority], flow.finish)
+        heapq.heappush(scope.heaps[priority], (start + self._cost(key), next(self._seq), key))
+        flow.scheduled = True
+
+    @staticmethod
+    def _label(scope_key: str) -> str:
+        return "all" if scope_key == ALL_LANES else scope_key or "none"
@@ -0,0 +1,139 @@
+import json
+import logging
+import os
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from sqlalchemy.orm import Session
+from app.core.metrics import time_stage
+from app.models.chat import ChatSession, ChatMessage
+from app.services.image_renditions import PLATFORM_RENDITIONS, renditions
+
+if TYPE_CHECKING:
+    from app.services.content_generator import ContentGenerator
+    from app.services.media_generator import MediaGenerator
+    from app.services.llm_usage import UsageService
+
+logger = logging.getLogger(__name__)
+
+# Same host MediaGenerator.get_localhost_url uses for frontend display
+LOCAL_BASE_URL = "http://127.0.0.1:8080"
+
+class GenerationPipeline:
+    """
+    Text + master image + TikTok video for one announcement, shared by /generate and bulk jobs.
+    With a UsageService, the user's daily token quota is checked before the LLM call (raising
+    QuotaExceededError) and the tokens consumed are accounted to them.
+    """
+
+    def __init__(self, content_gen: "ContentGenerator", media_gen: "MediaGenerator", usage: Optional["UsageService"] = None):
+        self.content_gen = content_gen
+        self.media_gen = media_gen
+        self.usage = usage
+
+    def generate(
+        self, title: str, body: str, platforms: List[str], user_id: Optional[int] = None, use_image_cache: bool = True
+    ) -> Dict[str, Dict[str, Any]]:
+        on_usage = None
+        if self.usage is not None:
+            self.usage.check_quota(user_id, self.content_gen.estimate_tokens(title, body, platforms))
+            on_usage = lambda model, usage: self.usage.record(user_id, model, usage)
+
+        # 1. Generate Textual Content
+        with time_stage("llm"):
+            results = self.content_gen.generate_social_content(title, body, platforms, on_usage=on_usage)
+
+        # 2. Generate Media Assets (Images/Videos)
+        # Find the first available image prompt to use as the "master" image
+        master_image_path = None
+        master_image_url = None
+
+        # First pass: Generate the master image
+        for platform, content in results.items():
+            if "error" in content:
+                continue
+
+            if "image_prompt" in content and not master_image_path:
+                logger.info("Generating master image", extra={"prompt_platform": platform})
+                # Use 1024x1024 for TikTok to ensure video acceptance (256x256 is too small)
+                image_size = "1024x1024" if "tiktok" in platforms else "512x512"
+                logger.debug("Using image size %s", image_size)
+                # Now returns a tuple (path, url)
+                master_image_path, master_openai_url = self.media_gen.generate_image(
+                    content["image_prompt"], size=image_size, use_cache=use_image_cache
+                )
+                if master_image_path:
+                    # We prefer the OpenAI URL for publishing, but we have the local path for display
+                    master_image_url = master_openai_url
+                break # Stop after generating one image
+
+        # Second pass: Assign image to all platforms and generate video if needed
+        for platform, content in results.items():
+            if "error" in content:
+                continue
+
+            # Assign the master image to all platforms
+            if master_image_url:
+                content["media_url"] = self._publish_url(platform, master_image_path, master_image_url)
+                # The UI shows a small WebP thumbnail; the full PNG stays available
+                content["display_url"] = renditions.url(LOCAL_BASE_URL, master_image_path, "thumb")
+                content["original_url"] = self.media_gen.get_localhost_url(master_image_path)
+                if platform in PLATFORM_RENDITIONS:
+                    content["rendition_url"] = renditions.url(LOCAL_BASE_URL, master_image_path, PLATFORM_RENDITIONS[platform])
+
+                # Generate Video for TikTok if applicable (using the master image)
+                if platform == "tiktok" and "script" in content and master_image_path:
+                    logger.info("Generating 6-second video for TikTok")
+                    with time_stage("video_encode"):
+                        video_path = self.media_gen.create_video_from_image(master_image_path, duration=6)
+                    if video_path:
+                        content["video_path"] = video_path  # Local file path for upload
+                        content["display_video_url"] = self.media_gen.get_localhost_url(video_path)
+
+        return results
+
+    def _publish_url(self, platform: str, image_path: str, openai_url: str) -> str:
+        """
+        With PUBLIC_URL set, platforms fetch the platform-sized rendition from this server;
+        otherwise they get the OpenAI URL of the full-size original.
+        """
+        public_url = os.getenv("PUBLIC_URL")
+        if public_url and platform in PLATFORM_RENDITIONS:
+            return renditions.url(public_url, image_path, PLATFORM_RENDITIONS[platform])
+        return openai_url
+
+    def save_history(self, db: Session, user_id: int, title: str, body: str, results: Dict[str, Any]) -> ChatSession:
+        """Stores the request and the generated content as a ChatSession with two messages."""
+        with time_stage("db_save"):
+            chat = ChatSession(user_id=user_id, title=title)
+            db.add(chat)
+            db.flush()
+
+            # User Message
+            db.add(ChatMessage(
+                session_id=chat.id,
+                role="user",
+                content=json.dumps({"title": title, "body": body}) # Store as JSON for easier parsing
+            ))
+
+            # AI Message
+            db.add(ChatMessage(
+                session_id=chat.id,
+                role="assistant",
+                content=json.dumps(results)
+            ))
+            db.commit()
+            db.refresh(chat)
+        return chat
+
+@lru_cache(maxsize=None)
+def get_pipeline() -> GenerationPipeline:
+    """
+    Shared pipeline, built on first use. The generators import the OpenAI SDK and create the media
+    directories, so neither happens when the API is imported.
+    """
+    from app.services.content_generator import ContentGenerator
+    from app.services.media_generator import MediaGenerator
+    from app.services.image_cache import image_cache
+    from app.services.llm_usage import usage_service
+
+    return GenerationPipeline(ContentGenerator(), MediaGenerator(image_cache), usage_service)
@@ -0,0 +1,178 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Optional
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.idempotency import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL_SECONDS = 0.5
+# Expired keys are deleted in bulk at most this often per process; a key that expired since is
+# dropped individually when a new request collides with it
+PURGE_INTERVAL_SECONDS = 60
+
+@dataclass
+class IdempotencyClaim:
+    """Result of claiming a key: either this request owns it (record_id) or it replays a stored response."""
+    record_id: Optional[int] = None
+    replay_status: Optional[int] = None
+    replay_body: Any = None
+
+    @property
+    def is_replay(self) -> bool:
+        return self.replay_status is not None
+
+def request_hash(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+class IdempotencyService:
+    """
+    Idempotency-Key support backed by the idempotency_keys table. The first request with a key inserts an
+    in_progress row (the unique constraint is the lock), runs, and stores its response. Retries with the same
+    key wait for that row to complete and replay the stored response instead of running again.
+    """
+
+    def __init__(self):
+        self._next_purge = 0.0
+
+    async def claim(self, db: Session, endpoint: str, user_id: Optional[int], key: Optional[str], payload: Any) -> IdempotencyClaim:
+        if not key:
+            return IdempotencyClaim()
+        if len(key) > 255:
+            raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+
+        owner = f"user:{user_id}" if user_id else "anonymous"
+        fingerprint = request_hash(payload)
+        deadline = datetime.utcnow() + timedelta(seconds=settings.IDEMPOTENCY_WAIT_SECONDS)
+        # The session is only used by one thread at a time, so the queries can run off the event loop
+        await asyncio.to_thread(self._purge_expired, db)
+
+        while True:
+            claim = await asyncio.to_thread(self._try_claim, db, endpoint, owner, key, fingerprint)
+            if claim is not None:
+                return claim
+
+            if datetime.utcnow() >= deadline:
+                raise HTTPException(
+                    status_code=409,
+                    detail="A request with this Idempotency-Key is still in progress",
+                    headers={"Retry-After": str(int(POLL_INTERVAL_SECONDS * 10))},
+                )
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+    def _try_claim(self, db: Session, endpoint: str, owner: str, key: str, fingerprint: str) -> Optional[IdempotencyClaim]:
+        """One claim attempt; None while another request holds a live lock on the key."""
+        while True:
+            record_id = self._try_insert(db, endpoint, owner, key, fingerprint)
+            if record_id is not None:
+                return IdempotencyClaim(record_id=record_id)
+
+            record = self._load(db, endpoint, owner, key)
+            if record is None:
+                continue  # the row was released or purged between the insert and the read
+            if record.expires_at < datetime.utcnow():
+                # Expired keys are reusable
+                self._delete(db, record.id)
+                continue
+            if record.request_hash != fingerprint:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+            if record.status == "completed":
+                logger.info("Replaying idempotent response", extra={"endpoint": endpoint})
+                return IdempotencyClaim(replay_status=record.response_status, replay_body=record.response_body)
+            if self._take_over_stale(db, record.id):
+                logger.warning("Took over stale idempotency lock", extra={"endpoint": endpoint})
+                return IdempotencyClaim(record_id=record.id)
+            return None
+
+    def complete(self, db: Session, claim: IdempotencyClaim, body: Any, status_code: int = 200) -> None:
+        if claim.record_id is None:
+            return
+        db.query(IdempotencyKey).filter(IdempotencyKey.id == claim.record_id).update({
+            IdempotencyKey.status: "completed",
+            IdempotencyKey.response_status: status_code,
+            IdempotencyKey.response_body: body,
+        }, synchronize_session=False)
+        db.commit()
+
+    def release(self, db: Session, claim: IdempotencyClaim) -> None:
+        """Drops the key after an unexpected error so a retry runs the request again."""
+        if claim.record_id is None:
+            return
+        db.rollback()
+        self._delete(db, claim.record_id)
+
+    @asynccontextmanager
+    async def releasing(self, db: Session, claim: IdempotencyClaim):
+        """
+        Releases the claim when the block raises, cancellation included (the client went away mid-request),
+        so the key doesn't stay locked until IDEMPOTENCY_LOCK_SECONDS.
+        """
+        try:
+            yield
+        except BaseException:
+            # Shielded: a cancelled task is cancelled again at its next await, and the key must still be freed
+            await asyncio.shield(asyncio.to_thread(self.release, db, claim))
+            raise
+
+    def _delete(self, db: Session, record_id: int) -> None:
+        db.query(IdempotencyKey).filter(IdempotencyKey.id == record_id).delete(synchronize_session="fetch")
+        db.commit()
+
+    def _purge_expired(self, db: Session) -> None:
+        """Bulk delete of expired keys, at most every PURGE_INTERVAL_SECONDS (the expires_at index keeps it cheap)."""
+        now = time.monotonic()
+        if now < self._next_purge:
+            return
+        self._next_purge = now + PURGE_INTERVAL_SECONDS
+        db.query(IdempotencyKey).filter(IdempotencyKey.expires_at < datetime.utcnow()).delete(synchronize_session="evaluate")
+        db.commit()
+
+    def _try_insert(self, db: Session, endpoint: str, owner: str, key: str, fingerprint: str) -> Optional[int]:
+        now = datetime.utcnow()
+        record = IdempotencyKey(
+            endpoint=endpoint,
+            owner=owner,
+            key=key,
+            request_hash=fingerprint,
+            status="in_progress",
+            locked_until=now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS),
+            expires_at=now + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS),
+        )
+        db.add(record)
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return None
+        return record.id
+
+    def _load(self, db: Session, endpoint: str, owner: str, key: str) -> Optional[IdempotencyKey]:
+        db.expire_all()
+        return db.query(IdempotencyKey).filter(
+            IdempotencyKey.endpoint == endpoint, IdempotencyKey.owner == owner, IdempotencyKey.key == key
+        ).first()
+
+    def _take_over_stale(self, db: Session, record_id: int) -> bool:
+        """An in_progress row past locked_until belongs to a request that died; claim it conditionally."""
+        now = datetime.utcnow()
+        taken = db.query(IdempotencyKey).filter(
+            IdempotencyKey.id == record_id,
+            IdempotencyKey.status == "in_progress",
+            IdempotencyKey.locked_until < now,
+        ).update(
+            {IdempotencyKey.locked_until: now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)},
+            synchronize_session=False,
+        )
+        db.commit()
+        return taken == 1
+
+idempotency_service = IdempotencyService()
@@ -0,0 +1,192 @@
+import hashlib
+import logging
+import os
+import re
+import unicodedata
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import FrozenSet, Optional
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+from app.core.config import settings
+from app.core.metrics import IMAGE_CACHE
+from app.db.session import SessionLocal
+from app.models.chat import ChatMessage
+from app.models.image_cache import ImageCacheEntry
+from app.models.publication import Publication
+
+logger = logging.getLogger(__name__)
+
+# OpenAI image URLs expire after an hour; a cached one is handed out only while it has a margin left
+REMOTE_URL_TTL = timedelta(minutes=50)
+# Most recently used entries of the same size compared by the fuzzy tier
+FUZZY_CANDIDATES = 1000
+# Words that do not change the picture (prompts come in English or Spanish)
+STOPWORDS = frozenset(
+    "a an the of in on at to for with and or by from is are this that its "
+    "el la los las un una unos unas de del en con y o por para al que su sus".split()
+)
+
+def normalize_prompt(prompt: str) -> str:
+    """Lowercase, no accents or punctuation, single spaces: prompts that differ only in formatting match exactly."""
+    text = unicodedata.normalize("NFKD", (prompt or "").lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(re.findall(r"\w+", text))
+
+def prompt_tokens(normalized: str) -> FrozenSet[str]:
+    return frozenset(word for word in normalized.split() if word not in STOPWORDS)
+
+def token_set_similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def prompt_key(normalized: str, size: str) -> str:
+    return hashlib.sha256(f"{size}\n{normalized}".encode()).hexdigest()
+
+@dataclass
+class CachedImage:
+    entry_id: int
+    filename: str
+    remote_url: Optional[str]  # None once OpenAI's copy has expired
+    tier: str  # exact or fuzzy
+
+class ImageCache:
+    """
+    Images already generated for an equivalent prompt, shared by every API process through the image_cache
+    table. Exact tier: same normalized prompt and size. Fuzzy tier (IMAGE_CACHE_FUZZY): same size and a
+    token-set similarity of at least IMAGE_CACHE_FUZZY_THRESHOLD. Entries are evicted least recently used
+    first once the images they point to add up to more than IMAGE_CACHE_MAX_MB, and an evicted image's file
+    is deleted from the media store unless a publication or the chat history still points to it.
+    Cache errors never fail a generation: they are logged and the image is generated as usual.
+    """
+
+    # services -> app -> backend
+    media_dir: str = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "static", "media"
+    )
+
+    def lookup(self, prompt: str, size: str, need_remote: bool = False) -> Optional[CachedImage]:
+        """
+        Cached image for `prompt`, or None. With `need_remote` (publishers cannot reach this server), an
+        entry whose OpenAI URL has expired is a miss: the image is generated again and the entry refreshed.
+        """
+        normalized = normalize_prompt(prompt)
+        db = SessionLocal()
+        try:
+            tier = "exact"
+            entry = db.query(ImageCacheEntry).filter(ImageCacheEntry.prompt_key == prompt_key(normalized, size)).first()
+            if entry is None and settings.IMAGE_CACHE_FUZZY:
+                tier = "fuzzy"
+                entry = self._closest(db, normalized, size)
+            remote_url = None
+            if entry is not None and entry.remote_expires_at and entry.remote_expires_at > datetime.utcnow():
+                remote_url = entry.remote_url
+            if entry is None or (need_remote and remote_url is None):
+                IMAGE_CACHE.labels(result="miss").inc()
+                return None
+
+            entry.hits += 1
+            entry.last_used_at = datetime.utcnow()
+            db.commit()
+            IMAGE_CACHE.labels(result=tier).inc()
+            return CachedImage(entry.id, entry.filename, remote_url, tier)
+        except Exception as e:
+            db.rollback()
+            logger.warning("Image cache lookup failed: %s", e)
+            return None
+        finally:
+            db.close()
+
+    def _closest(self, db, normalized: str, size: str) -> Optional[ImageCacheEntry]:
+        tokens = prompt_tokens(normalized)
+        best, best_score = None, settings.IMAGE_CACHE_FUZZY_THRESHOLD
+        candidates = db.query(ImageCacheEntry).filter(ImageCacheEntry.size == size).order_by(
+            ImageCacheEntry.last_used_at.desc()
+        ).limit(FUZZY_CANDIDATES)
+        for entry in candidates:
+            score = token_set_similarity(tokens, prompt_tokens(entry.prompt))
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def store(self, prompt: str, size: str, filename: str, size_bytes: int, remote_url: Optional[str] = None) -> None:
+        """Records a freshly generated image for `prompt` (replacing a stale entry) and evicts past the size cap."""
+        normalized = normalize_prompt(prompt)
+        key = prompt_key(normalized, size)
+        now = datetime.utcnow()
+        values = {
+            "filename": filename,
+            "bytes": size_bytes,
+            "remote_url": remote_url,
+            "remote_expires_at": now + REMOTE_URL_TTL if remote_url else None,
+            "last_used_at": now,
+        }
+        db = SessionLocal()
+        try:
+            updated = db.query(ImageCacheEntry).filter(ImageCacheEntry.prompt_key == key).update(values, synchronize_session=False)
+            if not updated:
+                db.add(ImageCacheEntry(prompt_key=key, prompt=normalized, size=size, **values))
+            db.commit()
+            self._evict(db, keep_file=filename)
+        except IntegrityError:
+            # Another process stored the same prompt first
+            db.rollback()
+        except Exception as e:
+            db.rollback()
+            logger.warning("Could not store image in cache: %s", e, extra={"size": size})
+        finally:
+            db.close()
+
+    def forget(self, entry_id: int) -> None:
+        """Drops an entry whose file is gone from the media store."""
+        db = SessionLocal()
+        try:
+            db.query(ImageCacheEntry).filter(ImageCacheEntry.id == entry_id).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning("Could not drop image cache entry: %s", e, extra={"entry_id": entry_id})
+        finally:
+            db.close()
+
+    def _evict(self, db, keep_file: str) -> None:
+        # keep_file was just generated and is about to be returned, even if its own entry is evicted
+        limit = settings.IMAGE_CACHE_MAX_MB * 1024 * 1024
+        excess = (db.query(func.coalesce(func.sum(ImageCacheEntry.bytes), 0)).scalar() or 0) - limit
+        if excess <= 0:
+            return
+        evicted = []
+        for entry in db.query(ImageCacheEntry.id, ImageCacheEntry.bytes, ImageCacheEntry.filename, ImageCacheEntry.remote_url).order_by(
+            ImageCacheEntry.last_used_at.asc()
+        ).all():
+            if excess <= 0:
+                break
+            evicted.append(entry)
+            excess -= entry.bytes
+        db.query(ImageCacheEntry).filter(ImageCacheEntry.id.in_([entry.id for entry in evicted])).delete(synchronize_session=False)
+        db.commit()
+        IMAGE_CACHE.labels(result="evicted").inc(len(evicted))
+
+        for entry in evicted:
+            if entry.filename == keep_file or self._referenced(db, entry.filename, entry.remote_url):
+                continue
+            try:
+                os.unlink(os.path.join(self.media_dir, os.path.basename(entry.filename)))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning("Could not delete evicted image: %s", e, extra={"filename": entry.filename})
+
+    def _referenced(self, db, filename: str, remote_url: Optional[str]) -> bool:
+        """Whether another cache entry, a publication or a chat message still uses the file (by name or OpenAI URL)."""
+        if db.query(ImageCacheEntry.id).filter(ImageCacheEntry.filename == filename).first() is not None:
+            return True
+        # Publishers map an expired OpenAI URL back to its local copy, so that URL counts as a reference too
+        patterns = [f"%{filename}%"] + ([f"%{remote_url.split('?')[0]}%"] if remote_url else [])
+        for column in (Publication.media_url, ChatMessage.content):
+            if db.query(column).filter(or_(*[column.like(pattern) for pattern in patterns])).first() is not None:
+                return True
+        return False
+
+image_cache = ImageCache()
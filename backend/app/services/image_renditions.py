@@ -0,0 +1,144 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from app.core.metrics import time_stage
+from app.core.static_media import content_digest
+
+logger = logging.getLogger(__name__)
+
+_pillow = None
+
+def load_pillow():
+    """
+    Pillow (which also imports numpy when installed) is loaded on the first rendition instead of when
+    the API starts. Returns the (Image, ImageOps) modules, or None when Pillow is not installed.
+    """
+    global _pillow
+    if _pillow is None:
+        try:
+            from PIL import Image, ImageOps
+            _pillow = (Image, ImageOps)
+        except ImportError:
+            _pillow = False
+            logger.warning("Pillow not available - image renditions will fall back to the original image")
+    return _pillow or None
+
+@dataclass(frozen=True)
+class Rendition:
+    width: int
+    height: int
+    format: str  # Pillow format name
+    quality: int
+
+    @property
+    def extension(self) -> str:
+        return "jpg" if self.format == "JPEG" else self.format.lower()
+
+    @property
+    def media_type(self) -> str:
+        return "image/jpeg" if self.format == "JPEG" else f"image/{self.format.lower()}"
+
+RENDITIONS: Dict[str, Rendition] = {
+    "instagram": Rendition(1080, 1080, "JPEG", 85),        # square feed post
+    "facebook": Rendition(1200, 630, "JPEG", 85),          # link/photo landscape
+    "linkedin": Rendition(1200, 627, "JPEG", 85),
+    "whatsapp_story": Rendition(1080, 1920, "JPEG", 82),   # 9:16 story
+    "thumb": Rendition(320, 320, "WEBP", 75),              # UI previews
+}
+
+# Rendition used when publishing to each platform (TikTok gets the video instead)
+PLATFORM_RENDITIONS = {
+    "instagram": "instagram",
+    "facebook": "facebook",
+    "linkedin": "linkedin",
+    "whatsapp": "whatsapp_story",
+}
+
+class ImageRenditionService:
+    """
+    Platform-sized crops and UI thumbnails of generated images, made on first request and cached on disk
+    under static/renditions/<sha256 of the source>/<rendition>.<ext>. Renditions never upscale: a 512px
+    source yields a smaller crop with the platform's aspect ratio.
+    """
+
+    def __init__(self, media_dir: Path, cache_dir: Path):
+        self.media_dir = Path(media_dir)
+        self.cache_dir = Path(cache_dir)
+        self._hashes: Dict[Tuple[str, int, int], str] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def source_path(self, image_name: str) -> Optional[Path]:
+        """Resolves a generated image by file name, refusing anything outside the media directory."""
+        if Path(image_name).name != image_name:
+            return None
+        path = self.media_dir / image_name
+        return path if path.is_file() else None
+
+    def content_hash(self, source: Path) -> str:
+        # Images saved by MediaGenerator are already named by their hash
+        digest = content_digest(source.name)
+        if digest:
+            return digest
+        stat = source.stat()
+        key = (str(source), stat.st_mtime_ns, stat.st_size)
+        digest = self._hashes.get(key)
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(source, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    sha.update(chunk)
+            digest = self._hashes[key] = sha.hexdigest()[:32]
+        return digest
+
+    def get(self, source: Path, name: str) -> Path:
+        """Returns the cached rendition, creating it if needed. Without Pillow the source itself is returned."""
+        rendition = RENDITIONS[name]
+        if load_pillow() is None:
+            return source
+        target = self.cache_dir / self.content_hash(source) / f"{name}.{rendition.extension}"
+        if target.exists():
+            return target
+
+        with self._lock_for(str(target)):
+            if not target.exists():
+                self._render(source, target, rendition)
+        return target
+
+    def url(self, base_url: str, image_path: str, name: str) -> str:
+        """URL of the lazily-rendered endpoint for a generated image."""
+        rendition = RENDITIONS[name]
+        return f"{base_url.rstrip('/')}/api/media/renditions/{Path(image_path).name}/{name}.{rendition.extension}"
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _render(self, source: Path, target: Path, rendition: Rendition) -> None:
+        Image, ImageOps = load_pillow()
+        with time_stage("image_rendition"), Image.open(source) as image:
+            image = image.convert("RGB")
+            scale = min(1.0, image.width / rendition.width, image.height / rendition.height)
+            size = (max(1, round(rendition.width * scale)), max(1, round(rendition.height * scale)))
+            output = ImageOps.fit(image, size, method=Image.Resampling.LANCZOS)
+
+            # Write next to the target and rename, so concurrent readers never see a partial file
+            os.makedirs(target.parent, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(suffix=f".{rendition.extension}", dir=str(target.parent))
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    output.save(f, rendition.format, quality=rendition.quality, optimize=rendition.format == "JPEG")
+                os.replace(tmp_path, target)
+            except Exception:
+                os.unlink(tmp_path)
+                raise
+        logger.debug("Rendition created", extra={"rendition": target.name, "size": size})
+
+_BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+renditions = ImageRenditionService(_BACKEND_DIR / "static" / "media", _BACKEND_DIR / "static" / "renditions")
@@ -0,0 +1,152 @@
+import logging
+import uuid
+import zlib
+from typing import Optional
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+from app.core.config import settings
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("none", "auto", "postgres", "redis")
+
+# Renews the TTL only while the lock still holds our token, so an expired lock taken by another
+# process is never extended or deleted by the old holder
+_REDIS_RENEW = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_REDIS_RELEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+def resolve_backend(backend: str) -> str:
+    """auto picks the Postgres advisory lock when the database is Postgres, else Redis when configured."""
+    backend = backend.lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Invalid leader election backend: {backend}")
+    if backend != "auto":
+        return backend
+    if settings.DATABASE_URL.startswith("postgresql"):
+        return "postgres"
+    if settings.REDIS_HOST:
+        return "redis"
+    return "none"
+
+class LeaderElection:
+    """
+    Non-blocking leader election for the background workers. `acquire()` is called periodically: it takes
+    the lock when it is free and confirms (or renews) it while held, returning whether this process leads.
+
+    - postgres: session-level `pg_try_advisory_lock` on a dedicated, unpooled connection; the lock lives as
+      long as the connection, so a crashed leader (or a dropped connection) releases it immediately.
+    - redis: `SET NX PX` with a random token, renewed on every call; a crashed leader releases it after
+      WORKER_LEADER_TTL_SECONDS.
+    - none: every process is the leader (single process, or the worker runs on its own).
+    """
+
+    def __init__(self, name: str = "background-workers", backend: Optional[str] = None):
+        self.name = name
+        self.backend = resolve_backend(backend or settings.WORKER_LEADER_ELECTION)
+        self.ttl_seconds = settings.WORKER_LEADER_TTL_SECONDS
+        self.is_leader = False
+        self._engine = None
+        self._connection = None
+        self._redis = None
+        self._token = uuid.uuid4().hex
+        if self.backend == "redis":
+            if redis is None or not settings.REDIS_HOST:
+                raise RuntimeError("Redis leader election needs the redis package and REDIS_HOST")
+            self._redis = redis.Redis(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                decode_responses=True,
+                socket_timeout=2,
+            )
+
+    @property
+    def lock_key(self) -> int:
+        # Advisory locks take a bigint; crc32 gives a stable one per name
+        return zlib.crc32(self.name.encode("utf-8"))
+
+    def acquire(self) -> bool:
+        try:
+            if self.backend == "postgres":
+                leader = self._acquire_postgres()
+            elif self.backend == "redis":
+                leader = self._acquire_redis()
+            else:
+                leader = True
+        except Exception as e:
+            logger.warning("Leader election check failed: %s", e, extra={"backend": self.backend})
+            self._close_connection()
+            leader = False
+
+        if leader != self.is_leader:
+            logger.info("Leadership %s", "acquired" if leader else "lost", extra={"backend": self.backend, "lock": self.name})
+        self.is_leader = leader
+        return leader
+
+    def release(self) -> None:
+        try:
+            if self.backend == "postgres" and self._connection is not None:
+                self._connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.lock_key})
+                self._connection.commit()
+            elif self.backend == "redis" and self.is_leader:
+                self._redis.eval(_REDIS_RELEASE, 1, self._redis_key, self._token)
+        except Exception as e:
+            logger.warning("Could not release leadership: %s", e, extra={"backend": self.backend})
+        finally:
+            self._close_connection()
+            self.is_leader = False
+
+    @property
+    def _redis_key(self) -> str:
+        return f"leader:{self.name}"
+
+    def _lock_engine(self):
+        # Not the shared pool: a pooled connection goes back to the pool on close() with its session-level
+        # lock still held, and neither this process nor any other could take it again
+        if self._engine is None:
+            self._engine = create_engine(settings.DATABASE_URL, poolclass=NullPool)
+        return self._engine
+
+    def _acquire_postgres(self) -> bool:
+        if self._connection is None:
+            self._connection = self._lock_engine().connect()
+        if self.is_leader:
+            # Still connected means still holding the lock
+            self._connection.execute(text("SELECT 1"))
+            self._connection.commit()
+            return True
+        acquired = self._connection.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": self.lock_key}
+        ).scalar()
+        self._connection.commit()
+        return bool(acquired)
+
+    def _acquire_redis(self) -> bool:
+        ttl_ms = self.ttl_seconds * 1000
+        if self.is_leader and self._redis.eval(_REDIS_RENEW, 1, self._redis_key, self._token, ttl_ms):
+            return True
+        return bool(self._redis.set(self._redis_key, self._token, nx=True, px=ttl_ms))
+
+    def _close_connection(self) -> None:
+        """Drops the lock connection for good, which also drops the advisory lock if it is still held."""
+        if self._connection is not None:
+            try:
+                self._connection.invalidate()
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
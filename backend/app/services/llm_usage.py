@@ -0,0 +1,120 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.llm_usage import LLMUsage
+
+logger = logging.getLogger(__name__)
+
+class QuotaExceededError(RuntimeError):
+    """The user's daily token quota would be exceeded by the next LLM call."""
+
+    def __init__(self, used: int, quota: int, retry_after: int):
+        super().__init__(f"Cuota diaria de tokens agotada ({used}/{quota}). Se renueva a las 00:00 UTC.")
+        self.used = used
+        self.quota = quota
+        self.retry_after = retry_after
+
+def _owner(user_id: Optional[int]):
+    return LLMUsage.user_id.is_(None) if user_id is None else LLMUsage.user_id == user_id
+
+def seconds_until_tomorrow(now: Optional[datetime] = None) -> int:
+    now = now or datetime.utcnow()
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return max(int((tomorrow - now).total_seconds()), 1)
+
+class UsageService:
+    """
+    Per-user LLM token accounting in the llm_usage table (one row per user, UTC day and model) and the
+    daily quota checked before each call. The check is made against what is already recorded, so calls
+    running at the same time can overshoot the quota by their own size; it is a budget, not a hard cap.
+    """
+
+    def quota_for(self, user_id: Optional[int]) -> int:
+        """Daily token quota of a user (anonymous requests share one); 0 means unlimited."""
+        return settings.LLM_DAILY_TOKEN_QUOTA if user_id else settings.LLM_ANONYMOUS_DAILY_TOKEN_QUOTA
+
+    def used_today(self, db: Session, user_id: Optional[int]) -> int:
+        return db.query(func.coalesce(func.sum(LLMUsage.total_tokens), 0)).filter(
+            _owner(user_id), LLMUsage.day == datetime.utcnow().date(),
+        ).scalar()
+
+    def check_quota(self, user_id: Optional[int], estimated_tokens: int) -> None:
+        """Raises QuotaExceededError when today's usage plus `estimated_tokens` is over the user's quota."""
+        quota = self.quota_for(user_id)
+        if not quota:
+            return
+        db = SessionLocal()
+        try:
+            used = self.used_today(db, user_id)
+        finally:
+            db.close()
+        if used + estimated_tokens > quota:
+            logger.warning(
+                "Daily token quota exceeded",
+                extra={"user_id": user_id, "used": used, "estimated": estimated_tokens, "quota": quota},
+            )
+            raise QuotaExceededError(used, quota, seconds_until_tomorrow())
+
+    def record(self, user_id: Optional[int], model: str, usage: Any) -> None:
+        """
+        Adds the `usage` block of a completion to today's row. Accounting never fails the generation
+        that already happened: errors are logged and the call goes unrecorded.
+        """
+        if usage is None:
+            return
+        prompt = getattr(usage, "prompt_tokens", 0) or 0
+        completion = getattr(usage, "completion_tokens", 0) or 0
+        total = getattr(usage, "total_tokens", 0) or prompt + completion
+        today = datetime.utcnow().date()
+
+        db = SessionLocal()
+        try:
+            # Increment in place; a concurrent first insert of the day can leave two rows, which every read sums
+            updated = db.query(LLMUsage).filter(
+                _owner(user_id), LLMUsage.day == today, LLMUsage.model == model,
+            ).update({
+                LLMUsage.requests: LLMUsage.requests + 1,
+                LLMUsage.prompt_tokens: LLMUsage.prompt_tokens + prompt,
+                LLMUsage.completion_tokens: LLMUsage.completion_tokens + completion,
+                LLMUsage.total_tokens: LLMUsage.total_tokens + total,
+                LLMUsage.updated_at: datetime.utcnow(),
+            }, synchronize_session=False)
+            if not updated:
+                db.add(LLMUsage(
+                    user_id=user_id, day=today, model=model, requests=1,
+                    prompt_tokens=prompt, completion_tokens=completion, total_tokens=total,
+                ))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning("Could not record LLM usage: %s", e, extra={"user_id": user_id, "model": model})
+        finally:
+            db.close()
+
+    def report(self, db: Session, since: date, user_id: Optional[int] = None, by_user: bool = False) -> Dict[str, Any]:
+        """
+        Usage from `since` (inclusive) per day and model, for one user or for everyone.
+        With `by_user`, per user instead, biggest consumers first.
+        """
+        columns = [
+            func.sum(LLMUsage.requests).label("requests"),
+            func.sum(LLMUsage.prompt_tokens).label("prompt_tokens"),
+            func.sum(LLMUsage.completion_tokens).label("completion_tokens"),
+            func.sum(LLMUsage.total_tokens).label("total_tokens"),
+        ]
+        group = [LLMUsage.user_id] if by_user else [LLMUsage.day, LLMUsage.model]
+        query = db.query(*group, *columns).filter(LLMUsage.day >= since)
+        if user_id is not None:
+            query = query.filter(LLMUsage.user_id == user_id)
+        query = query.group_by(*group)
+        query = query.order_by(func.sum(LLMUsage.total_tokens).desc()) if by_user else query.order_by(LLMUsage.day.asc(), LLMUsage.model.asc())
+
+        rows = [dict(row._mapping) for row in query.all()]
+        totals = {name: sum(row[name] or 0 for row in rows) for name in ("requests", "prompt_tokens", "completion_tokens", "total_tokens")}
+        return {"since": since.isoformat(), "rows": rows, "totals": totals}
+
+usage_service = UsageService()
@@ -1,21 +1,70 @@
 import os
+import logging
 import tempfile
 import base64
+import hashlib
 import requests
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional
 from openai import OpenAI
-try:
-    from moviepy import ImageClip
-except ImportError:
-    ImageClip = None
-    print("WARNING: MoviePy not available - video generation will be disabled")
+from app.core.config import settings
+from app.core.metrics import time_stage
+from app.core.static_media import record_remote_copy
+from opentelemetry import trace
+from app.core.tracing import tracer
+from app.services.resilient_llm import ResilientCall
+
+if TYPE_CHECKING:
+    from app.services.image_cache import ImageCache
+
+logger = logging.getLogger(__name__)
+
+_image_clip = None
+
+def load_image_clip():
+    """
+    MoviePy (with numpy and imageio) takes about half a second to import, so it is loaded on the
+    first video render instead of when the API starts. Returns None when it is not installed.
+    """
+    global _image_clip
+    if _image_clip is None:
+        try:
+            from moviepy import ImageClip
+            _image_clip = ImageClip
+        except ImportError:
+            _image_clip = False
+            logger.warning("MoviePy not available - video generation will be disabled")
+    return _image_clip or None
+
+# base64 characters decoded per write; a multiple of 4 so every chunk decodes on its own
+B64_DECODE_CHUNK = 256 * 1024
+
+def content_addressed(tmp_path: str, sha) -> str:
+    """
+    Renames a finished temp file to <first 32 hex of its sha256><suffix> in the same directory, so /static
+    can serve it as immutable. Identical content ends up as one file.
+    """
+    suffix = Path(tmp_path).suffix
+    final_path = os.path.join(os.path.dirname(tmp_path), f"{sha.hexdigest()[:32]}{suffix}")
+    os.replace(tmp_path, final_path)
+    return final_path
 
 class MediaGenerator:
-    def __init__(self):
+    def __init__(self, image_cache: Optional["ImageCache"] = None):
         self.api_key = os.getenv("OPENAI_API_KEY")
         self.client = None
         if self.api_key:
-            self.client = OpenAI(api_key=self.api_key)
+            # OPENAI_BASE_URL lets tests and benchmarks point at the local fake API
+            self.client = OpenAI(api_key=self.api_key, base_url=os.getenv("OPENAI_BASE_URL") or None)
+        # b64_json returns the image bytes in the generation response (no second download),
+        # url returns an OpenAI-hosted URL. auto picks b64_json when PUBLIC_URL is set, since
+        # publishers then fetch images from this server instead of from OpenAI.
+        self.image_response_format = os.getenv("OPENAI_IMAGE_RESPONSE_FORMAT", "auto")
+        self.image_model = os.getenv("OPENAI_IMAGE_MODEL", "dall-e-2")
+        # Deadline and circuit breaker; hedging is off by default since a second image is paid in full
+        self._images = ResilientCall("image", hedge=settings.IMAGE_HEDGE, timeout_seconds=settings.IMAGE_TIMEOUT_SECONDS)
+        # Images of earlier equivalent prompts, reused instead of generating (IMAGE_CACHE)
+        self.image_cache = image_cache
         
         # Setup media directories
         self.base_dir = Path(__file__).resolve().parents[2] # backend/
@@ -24,58 +73,122 @@ class MediaGenerator:
         os.makedirs(self.media_dir, exist_ok=True)
         os.makedirs(self.video_dir, exist_ok=True)
 
-    def generate_image(self, prompt: str, size: str = "512x512") -> tuple[str, str]:
+    @tracer.start_as_current_span("MediaGenerator.generate_image")
+    def generate_image(self, prompt: str, size: str = "512x512", use_cache: bool = True) -> tuple[str, str]:
         """
-        Generates an image using DALL-E.
-        Returns a tuple: (absolute_local_path, openai_public_url)
+        Generates an image using DALL-E, or reuses the cached image of an equivalent prompt
+        (`use_cache=False` always generates a new one).
+        Returns a tuple: (absolute_local_path, public_url), where public_url is the OpenAI URL in
+        url mode and this server's /static URL in b64_json mode.
         """
         if not self.client:
             raise RuntimeError("OpenAI API Key not configured")
 
+        cache = self.image_cache if settings.IMAGE_CACHE else None
+        if cache is not None and use_cache:
+            cached = self._cached_image(cache, prompt, size)
+            if cached:
+                return cached
+
+        response_format = self._response_format()
         try:
-            response = self.client.images.generate(
-                model="dall-e-2",
-                prompt=prompt,
-                n=1,
-                size=size,
-                response_format="url"
-            )
-            
-            image_url = response.data[0].url
-            
-            # Download image to save locally (for frontend display and cache)
-            img_response = requests.get(image_url)
-            img_response.raise_for_status()
+            with time_stage("image_generation"):
+                response, _ = self._images.call(
+                    lambda model, timeout: self.client.images.generate(
+                        model=model,
+                        prompt=prompt,
+                        n=1,
+                        size=size,
+                        response_format=response_format,
+                        timeout=timeout,
+                    ),
+                    [self.image_model],
+                )
             
-            # Save to file
-            fd, path = tempfile.mkstemp(suffix=".png", dir=str(self.media_dir))
-            with os.fdopen(fd, "wb") as f:
-                f.write(img_response.content)
-            
-            return path, image_url
+            fd, tmp_path = tempfile.mkstemp(suffix=".png", dir=str(self.media_dir))
+            sha = hashlib.sha256()
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    def write(chunk: bytes) -> None:
+                        sha.update(chunk)
+                        f.write(chunk)
+
+                    if response_format == "b64_json":
+                        with time_stage("image_decode"):
+                            self._write_b64(response.data[0].b64_json, write)
+                        image_url = None
+                    else:
+                        image_url = response.data[0].url
+                        # Download image to save locally (for frontend display and cache)
+                        with time_stage("image_download"), tracer.start_as_current_span("image_download"):
+                            self._download(image_url, write)
+            except Exception:
+                os.unlink(tmp_path)
+                raise
+            path = content_addressed(tmp_path, sha)
+            if image_url:
+                # The OpenAI URL expires after an hour; publishers that run later fall back to this file
+                record_remote_copy(os.path.dirname(path), image_url, Path(path).name)
+            if cache is not None:
+                cache.store(prompt, size, Path(path).name, os.path.getsize(path), image_url)
+
+            # Without a remote copy, publishers get the image from this server
+            return path, image_url or self.get_public_url(path)
 
         except Exception as e:
-            print(f"Error generating image: {e}")
+            logger.error("Error generating image: %s", e)
+            trace.get_current_span().record_exception(e)
             return None, None
 
+    def _cached_image(self, cache: "ImageCache", prompt: str, size: str) -> Optional[tuple[str, str]]:
+        # Without PUBLIC_URL publishers need OpenAI's copy, which expires after an hour
+        public_url = os.getenv("PUBLIC_URL")
+        cached = cache.lookup(prompt, size, need_remote=not public_url)
+        if cached is None:
+            return None
+        path = str(self.media_dir / cached.filename)
+        if not os.path.exists(path):
+            cache.forget(cached.entry_id)
+            return None
+        logger.info("Reusing cached image", extra={"tier": cached.tier, "image_path": path})
+        return path, cached.remote_url if not public_url else self.get_public_url(path)
+
+    def _response_format(self) -> str:
+        if self.image_response_format == "auto":
+            return "b64_json" if os.getenv("PUBLIC_URL") else "url"
+        return self.image_response_format
+
+    def _write_b64(self, b64: str, write) -> None:
+        """Decodes in fixed-size slices so the full decoded image is never held next to the base64 text."""
+        for start in range(0, len(b64), B64_DECODE_CHUNK):
+            write(base64.b64decode(b64[start:start + B64_DECODE_CHUNK]))
+
+    def _download(self, url: str, write) -> None:
+        with requests.get(url, stream=True, timeout=60) as img_response:
+            img_response.raise_for_status()
+            for chunk in img_response.iter_content(chunk_size=64 * 1024):
+                write(chunk)
+
+    @tracer.start_as_current_span("MediaGenerator.create_video_from_image")
     def create_video_from_image(self, image_path: str, duration: int = 6) -> str:
         """
         Creates a simple video from a static image using MoviePy.
         Returns the absolute path to the saved video.
         """
+        ImageClip = load_image_clip()
         if not ImageClip:
-            print("ERROR: MoviePy not installed or failed to import.")
+            logger.error("MoviePy not installed or failed to import")
             return None
 
         try:
-            print(f"Creating video from image: {image_path} with duration: {duration}s")
+            logger.info("Creating video from image", extra={"image_path": image_path, "duration": duration})
             # Create a clip from the image
             clip = ImageClip(image_path, duration=duration)
             
             fd, out_path = tempfile.mkstemp(suffix=".mp4", dir=str(self.video_dir))
             os.close(fd) # Close the file descriptor so moviepy can write to it
             
-            print(f"Writing video to: {out_path}")
+            logger.debug("Writing video to %s", out_path)
             # Use 30fps and yuv420p pixel format for better compatibility
             # Note: MoviePy 2.x removed 'verbose' and 'logger' parameters
             clip.write_videofile(
@@ -87,13 +200,18 @@ class MediaGenerator:
                 ffmpeg_params=['-pix_fmt', 'yuv420p']
             )
             clip.close()  # Clean up
-            print(f"Video created successfully: {out_path}")
+
+            sha = hashlib.sha256()
+            with open(out_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    sha.update(chunk)
+            out_path = content_addressed(out_path, sha)
+            logger.info("Video created", extra={"video_path": out_path})
             return out_path
             
         except Exception as e:
-            print(f"ERROR creating video: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error creating video")
+            trace.get_current_span().record_exception(e)
             return None
 
     def get_public_url(self, file_path: str) -> str:
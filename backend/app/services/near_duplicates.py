@@ -0,0 +1,296 @@
+"""
+Near-duplicate detection for announcements (/generate inputs) and outgoing posts (Publication.text).
+
+Texts are reduced to MinHash signatures over word 2-shingles; LSH banding finds the candidates that share
+a band and the signatures estimate their Jaccard similarity. Everything lives in numpy arrays (about
+260 bytes per text), so hundreds of thousands of texts fit in a few tens of MB and a lookup is a handful
+of binary searches.
+"""
+import json
+import logging
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.chat import ChatMessage, ChatSession
+from app.models.publication import Publication
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 64
+# 4 rows per band: a pair at 0.7 Jaccard shares at least one band 99% of the time
+BANDS = 16
+# Pairs of words: 3 words changed in a 60-word announcement still leave ~0.8 similarity
+SHINGLE_WORDS = 2
+# Rows added since the last sort are scanned linearly; past this many, the band arrays are re-sorted
+UNSORTED_TAIL = 1024
+# Universal hashing modulo a prime below 2**32: (a * x + b) stays within uint64
+_PRIME = np.uint64(4294967291)
+_URL = re.compile(r"https?://\S+|www\.\S+")
+_WORD = re.compile(r"\w+")
+
+def normalize(text: str) -> List[str]:
+    """Lowercase words without accents, URLs or punctuation: rewordings differ in words, not in formatting."""
+    text = _URL.sub(" ", text or "").lower()
+    if not text.isascii():
+        text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return _WORD.findall(text)
+
+def shingles(text: str) -> List[str]:
+    words = normalize(text)
+    if len(words) < SHINGLE_WORDS:
+        return words
+    return [" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+
+class NearDuplicateIndex:
+    """
+    MinHash LSH index of texts identified by an integer `ref` (a row id). Not thread-safe by itself;
+    NearDuplicateService serializes access.
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, bands: int = BANDS, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.bands = bands
+        self._a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)[:, None]
+        self._b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)[:, None]
+        self._mix = rng.integers(1, 2**63, size=num_perm // bands, dtype=np.uint64) | np.uint64(1)
+        self.size = 0
+        self._refs = np.empty(0, dtype=np.int64)
+        # Low byte of each minhash (b-bit MinHash): enough to estimate similarity at 1/4 of the memory
+        self._signatures = np.empty((0, num_perm), dtype=np.uint8)
+        self._band_keys = np.empty((0, bands), dtype=np.uint32)
+        # Per band, keys of rows [0, _sorted) in ascending order and the row each one belongs to
+        self._sorted = 0
+        self._sorted_keys = np.empty((bands, 0), dtype=np.uint32)
+        self._sorted_rows = np.empty((bands, 0), dtype=np.int32)
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self._refs, self._signatures, self._band_keys, self._sorted_keys, self._sorted_rows)
+        return sum(array.nbytes for array in arrays)
+
+    def signature(self, text: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(b-bit signature, band keys) of a text, or None when it has no words."""
+        features = shingles(text)
+        if not features:
+            return None
+        hashes = np.fromiter((zlib.crc32(f.encode()) for f in set(features)), dtype=np.uint64)
+        minhash = ((self._a * hashes + self._b) % _PRIME).min(axis=1)
+        # Rows of a band mixed into one 32-bit key (uint64 arithmetic wraps around)
+        mixed = (minhash.reshape(self.bands, -1) * self._mix).sum(axis=1)
+        keys = ((mixed ^ (mixed >> np.uint64(32))) & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+        return (minhash & np.uint64(0xFF)).astype(np.uint8), keys
+
+    def add(self, ref: int, text: str) -> bool:
+        added = self._append(ref, text)
+        self._reindex_if_tail_full()
+        return added
+
+    def add_many(self, items: Iterable[Tuple[int, str]]) -> int:
+        """
+        Appends (ref, text) pairs, sorting the bands once at the end, and only if the unsorted tail grew past
+        UNSORTED_TAIL: a bulk load is sorted, a few new rows stay in the tail like add() leaves them.
+        """
+        added = sum(self._append(ref, text) for ref, text in items)
+        self._reindex_if_tail_full()
+        return added
+
+    def _reindex_if_tail_full(self) -> None:
+        if self.size - self._sorted > UNSORTED_TAIL:
+            self._reindex()
+
+    def _append(self, ref: int, text: str) -> bool:
+        signature = self.signature(text)
+        if signature is None:
+            return False
+        if self.size == len(self._refs):
+            self._grow()
+        self._refs[self.size] = ref
+        self._signatures[self.size], self._band_keys[self.size] = signature
+        self.size += 1
+        return True
+
+    def query(self, text: str, threshold: float) -> List[Tuple[int, float]]:
+        """(ref, estimated Jaccard similarity) of the indexed texts at or above `threshold`, most similar first."""
+        signature = self.signature(text)
+        if signature is None or not self.size:
+            return []
+        bits, keys = signature
+
+        candidates = [np.flatnonzero((self._band_keys[self._sorted:self.size] == keys).any(axis=1)) + self._sorted]
+        for band in range(self.bands):
+            column = self._sorted_keys[band]
+            start, end = np.searchsorted(column, keys[band], "left"), np.searchsorted(column, keys[band], "right")
+            candidates.append(self._sorted_rows[band, start:end])
+        rows = np.unique(np.concatenate(candidates))
+        if not len(rows):
+            return []
+
+        # Unrelated minhashes still agree on their low byte 1 time in 256; correct for it
+        agreement = (self._signatures[rows] == bits).mean(axis=1)
+        similarity = (agreement - 1 / 256) / (1 - 1 / 256)
+        keep = similarity >= threshold
+        order = np.argsort(-similarity[keep], kind="stable")
+        return [(int(ref), round(float(score), 3)) for ref, score in zip(self._refs[rows][keep][order], similarity[keep][order])]
+
+    def _grow(self) -> None:
+        capacity = max(1024, len(self._refs) * 2)
+        self._refs = np.resize(self._refs, capacity)
+        self._signatures = np.resize(self._signatures, (capacity, self.num_perm))
+        self._band_keys = np.resize(self._band_keys, (capacity, self.bands))
+
+    def _reindex(self) -> None:
+        keys = self._band_keys[:self.size].T
+        self._sorted_rows = np.argsort(keys, axis=1, kind="stable").astype(np.int32)
+        self._sorted_keys = np.take_along_axis(keys, self._sorted_rows, axis=1)
+        self._sorted = self.size
+
+def _generation_text(title: str, body: str) -> str:
+    return f"{title}\n{body}"
+
+class NearDuplicateService:
+    """
+    Indexes of previous /generate inputs (the user messages of the history, ref = chat session) and of
+    publications (one index per platform: the same post on two networks is intended). Each index is built
+    from the database on first use (or by warm() at startup) and catches up with rows added by any process
+    (id > last seen) on every lookup, so all API processes see the same items. Every method blocks on the
+    database and numpy: async callers run them in a worker thread.
+    """
+
+    def __init__(self):
+        self._generations = NearDuplicateIndex()
+        self._publications: Dict[str, NearDuplicateIndex] = {}
+        self._last_message_id = 0
+        self._last_publication_id = 0
+        self._lock = threading.Lock()
+
+    def warm(self) -> None:
+        """Loads both indexes ahead of the first lookup, so no request pays for reading the whole history."""
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            with self._lock:
+                self._catch_up_generations(db)
+                self._catch_up_publications(db)
+        finally:
+            db.close()
+        logger.info("Near-duplicate indexes warmed", extra={
+            "generations": self._generations.size,
+            "publications": sum(index.size for index in self._publications.values()),
+            "duration_seconds": round(time.perf_counter() - started, 2),
+        })
+
+    # --- Generations ---
+
+    def similar_generations(self, db: Session, user_id: int, title: str, body: str) -> List[Dict[str, Any]]:
+        """The user's previous generations from a near-identical announcement, most similar first."""
+        with self._lock:
+            self._catch_up_generations(db)
+            matches = self._generations.query(_generation_text(title, body), settings.NEAR_DUPLICATE_THRESHOLD)
+        if not matches:
+            return []
+        similarity = dict(reversed(matches))  # highest score per ref
+        sessions = db.query(ChatSession).filter(ChatSession.id.in_(similarity), ChatSession.user_id == user_id).all()
+        found = [
+            {"session_id": s.id, "title": s.title, "similarity": similarity[s.id], "created_at": s.created_at.isoformat()}
+            for s in sessions
+        ]
+        return sorted(found, key=lambda match: -match["similarity"])
+
+    def reusable_results(self, db: Session, user_id: int, title: str, body: str, platforms: List[str]) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """(session id, results) of the most similar previous generation that covers every requested platform."""
+        for match in self.similar_generations(db, user_id, title, body):
+            message = db.query(ChatMessage).filter(
+                ChatMessage.session_id == match["session_id"], ChatMessage.role == "assistant"
+            ).order_by(ChatMessage.id.desc()).first()
+            try:
+                results = json.loads(message.content) if message else None
+            except ValueError:
+                continue
+            if not isinstance(results, dict):
+                continue
+            if all(isinstance(results.get(p), dict) and "error" not in results[p] for p in platforms):
+                return match["session_id"], {p: results[p] for p in platforms}
+        return None
+
+    def _catch_up_generations(self, db: Session) -> None:
+        started = time.perf_counter()
+        rows = db.query(ChatMessage.id, ChatMessage.session_id, ChatMessage.content).filter(
+            ChatMessage.role == "user", ChatMessage.id > self._last_message_id
+        ).order_by(ChatMessage.id.asc()).yield_per(5000)
+
+        def inputs() -> Iterator[Tuple[int, str]]:
+            for message_id, session_id, content in rows:
+                self._last_message_id = message_id
+                try:
+                    request = json.loads(content)
+                    yield session_id, _generation_text(request.get("title", ""), request.get("body", ""))
+                except (ValueError, AttributeError):
+                    # Chat messages typed by hand are plain text, not /generate inputs
+                    continue
+
+        added = self._generations.add_many(inputs())
+        if added > UNSORTED_TAIL:
+            logger.info("Generation index loaded", extra={"items": added, "duration_seconds": round(time.perf_counter() - started, 2)})
+
+    # --- Publications ---
+
+    def similar_publications(self, db: Session, user_id: Optional[int], platform: str, text: str) -> List[Dict[str, Any]]:
+        """
+        The user's recent publications (NEAR_DUPLICATE_WINDOW_DAYS) on the same platform with near-identical
+        text, most similar first (user_id None: the anonymous ones). Dead-lettered ones are left out: they
+        never went out. The index spans every user; other users' posts are dropped here.
+        """
+        with self._lock:
+            self._catch_up_publications(db)
+            index = self._publications.get(platform)
+            matches = index.query(text, settings.NEAR_DUPLICATE_THRESHOLD) if index else []
+        if not matches:
+            return []
+        similarity = dict(reversed(matches))  # highest score per ref
+        since = datetime.utcnow() - timedelta(days=settings.NEAR_DUPLICATE_WINDOW_DAYS)
+        owner = Publication.user_id == user_id if user_id is not None else Publication.user_id.is_(None)
+        rows = db.query(Publication.id, Publication.status, Publication.created_at).filter(
+            Publication.id.in_(similarity), owner, Publication.status != "failed", Publication.created_at >= since,
+        ).all()
+        found = [
+            {"publication_id": row.id, "status": row.status, "similarity": similarity[row.id], "created_at": row.created_at.isoformat()}
+            for row in rows
+        ]
+        return sorted(found, key=lambda match: -match["similarity"])
+
+    def _catch_up_publications(self, db: Session) -> None:
+        started = time.perf_counter()
+        rows = db.query(Publication.id, Publication.platform, Publication.text).filter(
+            Publication.id > self._last_publication_id
+        ).order_by(Publication.id.asc()).yield_per(5000)
+        by_platform: Dict[str, List[Tuple[int, str]]] = {}
+        for publication_id, platform, text in rows:
+            self._last_publication_id = publication_id
+            by_platform.setdefault(platform, []).append((publication_id, text or ""))
+
+        added = 0
+        for platform, items in by_platform.items():
+            index = self._publications.get(platform)
+            if index is None:
+                index = self._publications[platform] = NearDuplicateIndex()
+            added += index.add_many(items)
+        if added > UNSORTED_TAIL:
+            logger.info("Publication index loaded", extra={"items": added, "duration_seconds": round(time.perf_counter() - started, 2)})
+
+@lru_cache(maxsize=None)
+def get_near_duplicates() -> NearDuplicateService:
+    """Shared service, built on first use (numpy is not imported with the API)."""
+    return NearDuplicateService()
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+from app.core.config import settings
+from app.db.session import SessionLocal, engine
+from app.models.publication import Publication
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("auto", "memory", "redis", "postgres")
+CHANNEL = "publication_events"
+ACTIVE_STATUSES = ("pending", "processing", "retrying")
+# NOTIFY payloads are limited to 8000 bytes; error messages are cut well below that
+MAX_ERROR_CHARS = 500
+# Events buffered per open stream; a client that falls further behind loses the oldest ones
+SUBSCRIBER_BUFFER = 100
+
+def resolve_backend(backend: str) -> str:
+    """auto uses Redis pub/sub when configured, else Postgres LISTEN/NOTIFY when the database is Postgres."""
+    backend = backend.lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Invalid publication events backend: {backend}")
+    if backend != "auto":
+        return backend
+    if settings.REDIS_HOST and redis is not None:
+        return "redis"
+    if settings.DATABASE_URL.startswith("postgresql"):
+        return "postgres"
+    return "memory"
+
+def publication_event(publication: Publication, previous_status: Optional[str] = None, **timings: float) -> Dict[str, Any]:
+    """Status transition of a publication as sent to the browser, plus the timings of the step that caused it."""
+    return {
+        "publication_id": publication.id,
+        "user_id": publication.user_id,
+        "platform": publication.platform,
+        "status": publication.status,
+        "previous_status": previous_status,
+        "attempts": publication.attempts or 0,
+        "next_attempt_at": publication.next_attempt_at.isoformat() if publication.next_attempt_at else None,
+        "error_code": publication.error_code,
+        "error_class": publication.error_class,
+        "error_message": (publication.error_message or "")[:MAX_ERROR_CHARS] or None,
+        "at": datetime.utcnow().isoformat(),
+        **{name: round(value, 3) for name, value in timings.items()},
+    }
+
+class PublicationEvents:
+    """
+    Push channel for publication status changes, fed by the queue worker and read by
+    GET /api/publications/events (one Server-Sent Events stream per open tab).
+
+    - memory: delivered to the streams of this process; enough when the worker is embedded in a single API process.
+    - redis: PUBLISH on a channel, with a listener thread per API process.
+    - postgres: NOTIFY, with a LISTEN connection per API process.
+    The listener starts with the first stream, so the worker process only ever publishes.
+    """
+
+    def __init__(self, backend: Optional[str] = None):
+        self.backend = resolve_backend(backend or settings.PUBLICATION_EVENTS_BACKEND)
+        self._subscribers: Dict[int, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._lock = threading.Lock()
+        self._listener: Optional[threading.Thread] = None
+        self._redis = None
+        self._listen_engine = None
+
+    # --- Streams (event loop side) ---
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_BUFFER)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add((asyncio.get_running_loop(), queue))
+        self._ensure_listener()
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers:
+                subscribers.difference_update({entry for entry in subscribers if entry[1] is queue})
+                if not subscribers:
+                    self._subscribers.pop(user_id, None)
+
+    def snapshot(self, user_id: int) -> List[Dict[str, Any]]:
+        """Current state of the user's publications still in the queue, sent when a stream (re)connects."""
+        db = SessionLocal()
+        try:
+            publications = db.query(Publication).filter(
+                Publication.user_id == user_id, Publication.status.in_(ACTIVE_STATUSES)
+            ).order_by(Publication.id.asc()).all()
+            return [publication_event(publication) for publication in publications]
+        finally:
+            db.close()
+
+    # --- Publishing (any thread, any process) ---
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        """Sends a transition to every stream of its user; call it once the change is committed."""
+        if event.get("user_id") is None:
+            return
+        if self.backend == "memory":
+            self._deliver(event)
+            return
+        payload = json.dumps(event)
+        try:
+            if self.backend == "redis":
+                self._redis_client().publish(CHANNEL, payload)
+            else:
+                with engine.connect() as connection:
+                    connection.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": payload})
+                    connection.commit()
+        except Exception as e:
+            # The streams of this process still get it; the others catch up from the snapshot on reconnect
+            logger.warning("Could not broadcast publication event: %s", e, extra={"backend": self.backend})
+            self._deliver(event)
+
+    def _deliver(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(event.get("user_id"), ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._enqueue, queue, event)
+            except RuntimeError:
+                # Loop already closed (stream torn down during shutdown)
+                pass
+
+    @staticmethod
+    def _enqueue(queue: asyncio.Queue, event: Dict[str, Any]) -> None:
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+    # --- Listener (redis / postgres) ---
+
+    def _ensure_listener(self) -> None:
+        if self.backend == "memory" or (self._listener and self._listener.is_alive()):
+            return
+        with self._lock:
+            if self._listener and self._listener.is_alive():
+                return
+            target = self._listen_redis if self.backend == "redis" else self._listen_postgres
+            self._listener = threading.Thread(target=self._listen_forever, args=(target,), name="publication-events", daemon=True)
+            self._listener.start()
+
+    def _listen_forever(self, listen) -> None:
+        while True:
+            try:
+                listen()
+            except Exception as e:
+                logger.warning("Publication events listener failed, reconnecting: %s", e, extra={"backend": self.backend})
+            time.sleep(1)
+
+    def _redis_client(self):
+        if self._redis is None:
+            self._redis = redis.Redis(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                decode_responses=True,
+                socket_timeout=2,
+            )
+        return self._redis
+
+    def _listen_redis(self) -> None:
+        # Own connection without socket_timeout: listen() blocks until the next message
+        client = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, decode_responses=True)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(CHANNEL)
+            for message in pubsub.listen():
+                self._deliver(json.loads(message["data"]))
+        finally:
+            pubsub.close()
+
+    def _listen_engine_for(self):
+        # Not the shared pool: the listening connection is switched to autocommit and keeps its LISTEN, so
+        # it must be closed for good instead of being handed to a request afterwards
+        if self._listen_engine is None:
+            self._listen_engine = create_engine(settings.DATABASE_URL, poolclass=NullPool)
+        return self._listen_engine
+
+    def _listen_postgres(self) -> None:
+        connection = self._listen_engine_for().raw_connection()
+        try:
+            dbapi_connection = connection.driver_connection
+            dbapi_connection.autocommit = True
+            dbapi_connection.cursor().execute(f"LISTEN {CHANNEL}")
+            while True:
+                if select.select([dbapi_connection], [], [], 30) == ([], [], []):
+                    continue
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    self._deliver(json.loads(dbapi_connection.notifies.pop(0).payload))
+        finally:
+            connection.close()
+
+publication_events = PublicationEvents()
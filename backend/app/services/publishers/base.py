@@ -1,8 +1,108 @@
 import os
+import logging
+import time
+import requests
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
 from typing import Dict, Any, Optional
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from app.core.static_media import local_copy
+from app.core.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# Monotonic deadline of the publication being sent, set by the queue lane
+_deadline: ContextVar[Optional[float]] = ContextVar("publish_deadline", default=None)
+
+@contextmanager
+def publish_deadline(seconds: Optional[float]):
+    """No outbound call made inside this block waits past `seconds` from now."""
+    token = _deadline.set(time.monotonic() + seconds if seconds else None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+@dataclass
+class PublishAttempt:
+    """What the last outbound call of one publish saw, so the queue can tell transient failures from permanent ones."""
+    status_code: Optional[int] = None
+    retry_after: Optional[float] = None
+    network_error: bool = False
+
+_attempt: ContextVar[Optional[PublishAttempt]] = ContextVar("publish_attempt", default=None)
+
+@contextmanager
+def publish_attempt(seconds: Optional[float] = None):
+    """Yields the PublishAttempt filled in by every _request() made inside the block, under publish_deadline(seconds)."""
+    attempt = PublishAttempt()
+    token = _attempt.set(attempt)
+    try:
+        with publish_deadline(seconds):
+            yield attempt
+    finally:
+        _attempt.reset(token)
+
+def check_deadline(platform: str) -> None:
+    """Raises requests.Timeout (a network error for the retry policy) once the publish deadline has passed."""
+    deadline = _deadline.get()
+    if deadline is not None and deadline - time.monotonic() <= 0:
+        attempt = _attempt.get()
+        if attempt:
+            attempt.network_error = True
+        raise requests.Timeout(f"{platform} publish exceeded its time limit")
+
+class _DeadlineExceeded(Exception):
+    # Not an OSError, so urllib3 does not turn it into a retried "connection aborted"
+    pass
+
+class _DeadlineBody:
+    """
+    A request body sent in chunks that stops at the publish deadline. The timeout requests passes to the socket
+    bounds each send and each wait for data, not the whole transfer, so a slow upload could otherwise keep going.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, data: bytes, deadline: float):
+        self._data = memoryview(data)
+        self._deadline = deadline
+        self._offset = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    def read(self, size: int = -1) -> bytes:
+        if time.monotonic() >= self._deadline:
+            raise _DeadlineExceeded()
+        end = len(self._data) if size is None or size < 0 else self._offset + size
+        chunk = self._data[self._offset:end].tobytes()
+        self._offset += len(chunk)
+        return chunk
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header; the HTTP-date form is ignored."""
+    try:
+        return max(float(value), 0.0) if value else None
+    except (TypeError, ValueError):
+        return None
 
 class BasePublisher(ABC):
+    platform: str = "unknown"
+    # publishers -> services -> app -> backend
+    media_dir: str = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))), "static", "media"
+    )
+
     def __init__(self):
         pass
 
@@ -10,26 +110,77 @@ class BasePublisher(ABC):
     def publish(self, text: str, media_url: Optional[str] = None) -> Dict[str, Any]:
         pass
 
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Sends an outbound HTTP request inside a client span.
+        Only the URL without its query string is recorded, since Graph API calls carry tokens there.
+        Inside publish_deadline() the request timeout is capped at the time left, and a bytes body is sent in
+        chunks that stop at the deadline.
+        Inside publish_attempt() the status (or network failure) of the call is recorded on the attempt.
+        """
+        attempt = _attempt.get()
+        deadline = _deadline.get()
+        if deadline is not None:
+            check_deadline(self.platform)
+            remaining = deadline - time.monotonic()
+            kwargs["timeout"] = min(kwargs.get("timeout") or remaining, remaining)
+            if isinstance(kwargs.get("data"), bytes):
+                kwargs["data"] = _DeadlineBody(kwargs["data"], deadline)
+        with tracer.start_as_current_span(f"{self.platform} {method}", kind=SpanKind.CLIENT) as span:
+            span.set_attribute("publisher.platform", self.platform)
+            span.set_attribute("http.request.method", method)
+            span.set_attribute("url.full", url.split("?")[0])
+            try:
+                response = requests.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt:
+                    attempt.network_error = True
+                raise
+            except _DeadlineExceeded:
+                if attempt:
+                    attempt.network_error = True
+                raise requests.Timeout(f"{self.platform} publish exceeded its time limit while sending") from None
+            if attempt:
+                # The last call decides: a swallowed network error earlier (e.g. a media check) no longer counts
+                attempt.network_error = False
+                attempt.status_code = response.status_code
+                attempt.retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            span.set_attribute("http.response.status_code", response.status_code)
+            if response.status_code >= 400:
+                span.set_status(Status(StatusCode.ERROR, f"HTTP {response.status_code}"))
+            return response
+
     def _get_local_path_from_url(self, url: str) -> Optional[str]:
         """
         Attempts to resolve ANY URL (localhost or public) to a local file path.
-        It extracts the filename and checks if it exists in the local media directory.
+        It extracts the filename and checks if it exists in the local media directory; an OpenAI URL
+        (expired or not) resolves to the file it was downloaded to.
         """
         if not url:
             return None
             
         try:
+            # Rendition URLs (http://.../api/media/renditions/<image>/<rendition>.<ext>) map to the cached file
+            if "/api/media/renditions/" in url:
+                from app.services.image_renditions import RENDITIONS, renditions
+                image_name, rendition_file = url.split("?")[0].split("/")[-2:]
+                name = rendition_file.rpartition(".")[0]
+                source = renditions.source_path(image_name)
+                if source and name in RENDITIONS:
+                    return str(renditions.get(source, name))
+                return None
+
             # Extract filename from URL (works for http://.../filename.png)
-            filename = url.split("/")[-1]
+            filename = url.split("?")[0].split("/")[-1]
+            local_path = os.path.join(self.media_dir, filename)
             
-            # Construct local path
-            # publishers -> services -> app -> backend
-            base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-            local_path = os.path.join(base_dir, "static", "media", filename)
-            
-            if os.path.exists(local_path):
+            if filename and os.path.exists(local_path):
                 return local_path
+
+            copy = local_copy(self.media_dir, url)
+            if copy:
+                return str(copy)
         except Exception as e:
-            print(f"Error resolving local path: {e}")
+            logger.warning("Error resolving local path: %s", e)
                 
         return None
@@ -1,15 +1,17 @@
 import os
-import requests
 from typing import Dict, Any, Optional
 from .base import BasePublisher
 
 class FacebookPublisher(BasePublisher):
+    platform = "facebook"
+
     def __init__(self):
         super().__init__()
         self.facebook_page_id = os.getenv("FB_PAGE_ID")
         self.facebook_access_token = os.getenv("FB_PAGE_ACCESS_TOKEN")
         self.api_version = "v18.0"
-        self.base_url = f"https://graph.facebook.com/{self.api_version}"
+        graph_url = os.getenv("GRAPH_API_BASE_URL", "https://graph.facebook.com").rstrip("/")
+        self.base_url = f"{graph_url}/{self.api_version}"
 
     def publish(self, text: str, media_url: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -34,7 +36,7 @@ class FacebookPublisher(BasePublisher):
                     files = {
                         'source': open(local_path, 'rb')
                     }
-                    response = requests.post(url, data=payload, files=files)
+                    response = self._request("POST", url, data=payload, files=files)
                 else:
                     # Use public URL
                     payload = {
@@ -42,14 +44,14 @@ class FacebookPublisher(BasePublisher):
                         "message": text,
                         "access_token": self.facebook_access_token
                     }
-                    response = requests.post(url, params=payload)
+                    response = self._request("POST", url, params=payload)
             else:
                 url = f"{self.base_url}/{self.facebook_page_id}/feed"
                 payload = {
                     "message": text,
                     "access_token": self.facebook_access_token
                 }
-                response = requests.post(url, params=payload)
+                response = self._request("POST", url, params=payload)
 
             data = response.json()
 
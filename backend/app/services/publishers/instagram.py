@@ -1,15 +1,20 @@
 import os
-import requests
+import logging
 from typing import Dict, Any, Optional
 from .base import BasePublisher
 
+logger = logging.getLogger(__name__)
+
 class InstagramPublisher(BasePublisher):
+    platform = "instagram"
+
     def __init__(self):
         super().__init__()
         self.instagram_account_id = os.getenv("IG_BUSINESS_ACCOUNT_ID")
         self.facebook_access_token = os.getenv("FB_PAGE_ACCESS_TOKEN")
         self.api_version = "v18.0"
-        self.base_url = f"https://graph.facebook.com/{self.api_version}"
+        graph_url = os.getenv("GRAPH_API_BASE_URL", "https://graph.facebook.com").rstrip("/")
+        self.base_url = f"{graph_url}/{self.api_version}"
 
     def publish(self, text: str, media_url: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -31,7 +36,7 @@ class InstagramPublisher(BasePublisher):
 
         # Validate that the URL actually returns an image (and not a warning page from ngrok/localtunnel)
         try:
-            head_response = requests.head(media_url, timeout=5)
+            head_response = self._request("HEAD", media_url, timeout=5, allow_redirects=False)
             content_type = head_response.headers.get("Content-Type", "")
             if "image" not in content_type:
                 return {
@@ -39,7 +44,7 @@ class InstagramPublisher(BasePublisher):
                     "message": f"La URL pública no devuelve una imagen, sino '{content_type}'. Esto suele pasar con ngrok/localtunnel gratuitos que muestran una página de advertencia. Prueba usar 'serveo.net' o un túnel sin página de espera."
                 }
         except Exception as e:
-            print(f"Warning: Could not validate image URL: {e}")
+            logger.warning("Could not validate image URL: %s", e)
 
         try:
             # Step 1: Create Media Container
@@ -50,7 +55,7 @@ class InstagramPublisher(BasePublisher):
                 "access_token": self.facebook_access_token
             }
             
-            response = requests.post(container_url, params=container_payload)
+            response = self._request("POST", container_url, params=container_payload)
             container_data = response.json()
 
             if "error" in container_data:
@@ -65,7 +70,7 @@ class InstagramPublisher(BasePublisher):
                 "access_token": self.facebook_access_token
             }
 
-            response = requests.post(publish_url, params=publish_payload)
+            response = self._request("POST", publish_url, params=publish_payload)
             publish_data = response.json()
 
             if "error" in publish_data:
@@ -1,13 +1,15 @@
 import os
-import requests
 from typing import Dict, Any, Optional
 from .base import BasePublisher
 
 class LinkedInPublisher(BasePublisher):
+    platform = "linkedin"
+
     def __init__(self):
         super().__init__()
         self.access_token = os.getenv("LINKEDIN_ACCESS_TOKEN")
         self.author_urn = os.getenv("LINKEDIN_AUTHOR_URN") # e.g., urn:li:person:12345 or urn:li:organization:67890
+        self.base_url = os.getenv("LINKEDIN_API_BASE_URL", "https://api.linkedin.com/v2").rstrip("/")
 
     def publish(self, text: str, media_url: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -29,7 +31,7 @@ class LinkedInPublisher(BasePublisher):
             # Step 1: Upload Image if exists
             if media_url:
                 # 1.1 Register Upload
-                register_url = "https://api.linkedin.com/v2/assets?action=registerUpload"
+                register_url = f"{self.base_url}/assets?action=registerUpload"
                 register_payload = {
                     "registerUploadRequest": {
                         "recipes": ["urn:li:digitalmediaRecipe:feedshare-image"],
@@ -43,7 +45,7 @@ class LinkedInPublisher(BasePublisher):
                     }
                 }
                 
-                reg_resp = requests.post(register_url, headers=headers, json=register_payload)
+                reg_resp = self._request("POST", register_url, headers=headers, json=register_payload)
                 if reg_resp.status_code != 200:
                      return {"error": "LINKEDIN_REGISTER_ERROR", "message": reg_resp.json()}
                 
@@ -51,21 +53,27 @@ class LinkedInPublisher(BasePublisher):
                 upload_url = reg_data['value']['uploadMechanism']['com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest']['uploadUrl']
                 asset_urn = reg_data['value']['asset']
 
-                # 1.2 Download Image
-                img_resp = requests.get(media_url)
-                if img_resp.status_code != 200:
-                    return {"error": "IMAGE_DOWNLOAD_ERROR", "message": "Could not download image from OpenAI URL"}
+                # 1.2 Read the local copy when there is one (OpenAI URLs expire), else download the image
+                local_path = self._get_local_path_from_url(media_url)
+                if local_path:
+                    with open(local_path, "rb") as image_file:
+                        image_data = image_file.read()
+                else:
+                    img_resp = self._request("GET", media_url)
+                    if img_resp.status_code != 200:
+                        return {"error": "IMAGE_DOWNLOAD_ERROR", "message": "Could not download image from OpenAI URL"}
+                    image_data = img_resp.content
                 
                 # 1.3 Upload Image Binary
                 # LinkedIn requires no Authorization header for the upload PUT
                 upload_headers = {"Content-Type": "application/octet-stream"}
-                up_resp = requests.put(upload_url, headers=upload_headers, data=img_resp.content)
+                up_resp = self._request("PUT", upload_url, headers=upload_headers, data=image_data)
                 
                 if up_resp.status_code not in [200, 201]:
                     return {"error": "LINKEDIN_UPLOAD_ERROR", "message": "Failed to upload image binary to LinkedIn"}
 
             # Step 2: Create UGC Post
-            post_url = "https://api.linkedin.com/v2/ugcPosts"
+            post_url = f"{self.base_url}/ugcPosts"
             
             share_content = {
                 "shareCommentary": {
@@ -96,7 +104,7 @@ class LinkedInPublisher(BasePublisher):
                 }
             }
 
-            post_resp = requests.post(post_url, headers=headers, json=post_payload)
+            post_resp = self._request("POST", post_url, headers=headers, json=post_payload)
             
             if post_resp.status_code in [200, 201]:
                 return {"success": True, "id": post_resp.json().get("id")}
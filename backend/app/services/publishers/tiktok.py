@@ -1,13 +1,18 @@
 import os
-import requests
+import logging
 from typing import Dict, Any, Optional
 from pathlib import Path
-from .base import BasePublisher
+from .base import BasePublisher, check_deadline
+
+logger = logging.getLogger(__name__)
 
 class TikTokPublisher(BasePublisher):
+    platform = "tiktok"
+
     def __init__(self):
         super().__init__()
         self.access_token = os.getenv("TIKTOK_ACCESS_TOKEN")
+        self.base_url = os.getenv("TIKTOK_API_BASE_URL", "https://open.tiktokapis.com/v2").rstrip("/")
         
     def publish(self, text: str, video_path: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -30,7 +35,7 @@ class TikTokPublisher(BasePublisher):
             video_size = os.path.getsize(video_path)
             
             # Step 1: Initialize upload
-            init_url = "https://open.tiktokapis.com/v2/post/publish/video/init/"
+            init_url = f"{self.base_url}/post/publish/video/init/"
             headers = {
                 "Authorization": f"Bearer {self.access_token}",
                 "Content-Type": "application/json"
@@ -53,9 +58,9 @@ class TikTokPublisher(BasePublisher):
                 }
             }
             
-            init_response = requests.post(init_url, headers=headers, json=init_payload)
+            init_response = self._request("POST", init_url, headers=headers, json=init_payload)
             
-            print(f"TikTok Init Response: {init_response.status_code} - {init_response.text}")
+            logger.debug("TikTok init response", extra={"status_code": init_response.status_code})
             
             if init_response.status_code not in [200, 201]:
                 return {
@@ -77,13 +82,13 @@ class TikTokPublisher(BasePublisher):
             upload_url = init_data.get("data", {}).get("upload_url")
             publish_id = init_data.get("data", {}).get("publish_id")
             
-            print(f"TikTok Upload URL: {upload_url}")
-            print(f"TikTok Publish ID: {publish_id}")
+            logger.debug("TikTok upload initialized", extra={"publish_id": publish_id})
             
             if not upload_url:
                 return {"error": "INIT_ERROR", "message": "No upload_url received from TikTok"}
             
-            # Step 2: Upload video file
+            # Step 2: Upload video file (not worth reading it if the lane's time is already up)
+            check_deadline(self.platform)
             with open(video_path, 'rb') as video_file:
                 video_data = video_file.read()
             
@@ -92,13 +97,12 @@ class TikTokPublisher(BasePublisher):
                 "Content-Range": f"bytes 0-{video_size-1}/{video_size}"
             }
             
-            print(f"Uploading video to TikTok... Size: {video_size} bytes. Range: {upload_headers['Content-Range']}")
-            print(f"Upload Headers: {upload_headers}")
+            logger.info("Uploading video to TikTok", extra={"video_size": video_size})
             
             # Send as raw binary data, exactly like Postman "binary" body
-            upload_response = requests.put(upload_url, headers=upload_headers, data=video_data)
+            upload_response = self._request("PUT", upload_url, headers=upload_headers, data=video_data)
             
-            print(f"TikTok Upload Response: {upload_response.status_code} - {upload_response.text}")
+            logger.debug("TikTok upload response", extra={"status_code": upload_response.status_code})
             
             if upload_response.status_code not in [200, 201]:
                 return {
@@ -1,12 +1,15 @@
 import os
-import requests
 from typing import Dict, Any, Optional
 from .base import BasePublisher
 
 class WhatsAppPublisher(BasePublisher):
+    platform = "whatsapp"
+
     def __init__(self):
         super().__init__()
         self.whapi_token = os.getenv("WHAPI_TOKEN")
+        self.wa_recipient = os.getenv("WHAPI_RECIPIENT")
+        self.base_url = os.getenv("WHAPI_BASE_URL", "https://gate.whapi.cloud").rstrip("/")
 
     def publish(self, text: str, media_url: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -20,10 +23,10 @@ class WhatsAppPublisher(BasePublisher):
             return {"error": "NO_MEDIA", "message": "WhatsApp stories require an image. No media provided."}
 
         # Whapi.cloud endpoint
-        url = "https://gate.whapi.cloud/stories/send/media"
+        url = f"{self.base_url}/stories/send/media"
         
         headers = {
-            "Authorization": f"Bearer {self.wa_token}",
+            "Authorization": f"Bearer {self.whapi_token}",
             "Content-Type": "application/json"
         }
         
@@ -40,7 +43,7 @@ class WhatsAppPublisher(BasePublisher):
                         "link": media_url
                     }
                 }
-                resp_img = requests.post(url, headers=headers, json=payload_image)
+                resp_img = self._request("POST", url, headers=headers, json=payload_image)
                 results.append({"type": "image", "status": resp_img.status_code, "response": resp_img.json()})
                 
                 if resp_img.status_code not in [200, 201]:
@@ -55,7 +58,7 @@ class WhatsAppPublisher(BasePublisher):
                     "body": text
                 }
             }
-            resp_text = requests.post(url, headers=headers, json=payload_text)
+            resp_text = self._request("POST", url, headers=headers, json=payload_text)
             results.append({"type": "text", "status": resp_text.status_code, "response": resp_text.json()})
 
             if resp_text.status_code not in [200, 201]:
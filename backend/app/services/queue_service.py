@@ -0,0 +1,428 @@
+import logging
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import IntegrityError
+from app.core.config import settings
+from opentelemetry.trace import Link
+from app.core.metrics import PUBLISH_LATENCY, PUBLISH_TOTAL, QUEUE_LANE_IN_FLIGHT
+from app.core.tracing import tracer, extract_context
+from app.db.session import SessionLocal
+from app.models.app_setting import AppSetting
+from app.models.publication import Publication
+from app.services.fair_queue import FairScheduler
+from app.services.publication_events import publication_event, publication_events
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class QueueLane:
+    platform: str
+    concurrency: int
+    timeout_seconds: float
+
+def parse_lanes(spec: str) -> Dict[str, Dict[str, float]]:
+    """Parses "tiktok=1:600,linkedin=2" into {"tiktok": {"concurrency": 1, "timeout_seconds": 600}, "linkedin": {"concurrency": 2}}."""
+    lanes = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        platform, _, values = item.partition("=")
+        concurrency, _, timeout = values.partition(":")
+        lane = {}
+        if concurrency.strip():
+            lane["concurrency"] = int(concurrency)
+        if timeout.strip():
+            lane["timeout_seconds"] = float(timeout)
+        lanes[platform.strip().lower()] = lane
+    return lanes
+
+# Publisher errors a retry cannot fix: missing credentials, invalid input, media the platform never accepts
+PERMANENT_ERRORS = frozenset({
+    "CONFIG_ERROR", "VALIDATION_ERROR", "FILE_ERROR", "UNSUPPORTED_PLATFORM",
+    "LOCALHOST_ERROR", "INVALID_MEDIA_TYPE", "NO_MEDIA",
+})
+# Besides 5xx: request timeout, too early, rate limited
+RETRIABLE_STATUS_CODES = frozenset({408, 425, 429})
+
+def classify_failure(result: Dict[str, Any], attempt) -> str:
+    """
+    'retriable' when the publish hit a timeout, a connection error, a 5xx or throttling; 'permanent' otherwise.
+    `attempt` is the PublishAttempt of the publish (last HTTP status seen, network failures).
+    """
+    if result.get("error") in PERMANENT_ERRORS:
+        return "permanent"
+    if attempt.network_error:
+        return "retriable"
+    status = result.get("status_code") or attempt.status_code
+    if status and (status >= 500 or status in RETRIABLE_STATUS_CODES):
+        return "retriable"
+    return "permanent"
+
+def retry_delay(attempts: int, retry_after: Optional[float] = None) -> float:
+    """
+    Seconds before attempt number `attempts + 1`: exponential backoff capped at PUBLISH_RETRY_MAX_SECONDS,
+    drawn from the upper half of the interval so a platform outage doesn't retry every row at the same instant.
+    A Retry-After from the platform is honoured up to the same cap.
+    """
+    delay = min(settings.PUBLISH_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), settings.PUBLISH_RETRY_MAX_SECONDS)
+    delay = random.uniform(delay / 2, delay)
+    if retry_after:
+        delay = max(delay, min(retry_after, settings.PUBLISH_RETRY_MAX_SECONDS))
+    return delay
+
+def due_filter(now: datetime):
+    """Rows ready to publish: new ones plus retries whose backoff has elapsed (ix_publications_status_next_attempt_at)."""
+    return or_(
+        Publication.status == "pending",
+        and_(Publication.status == "retrying", Publication.next_attempt_at <= now),
+    )
+
+class QueueService:
+    """
+    Publication queue backed by the `publications` table.
+    /publish stores rows as 'pending' and the background worker drains them here.
+    The ON/OFF switch lives in Redis when configured, otherwise in the app_settings table, so the API
+    and a separate worker process always see the same value.
+    Each platform is a lane with its own concurrency and time limit (WORKER_LANES), so the worker
+    drains platforms independently and a slow TikTok upload never holds up a Facebook post.
+    Within a lane, publications are handed out by the fair scheduler (QUEUE_SCHEDULING): urgent first,
+    then round by round across users, so one user's large backlog does not hold up everyone else.
+    Transient failures are rescheduled as 'retrying' with backoff; permanent ones end as 'failed'
+    (the dead-letter view), from where they can be requeued in bulk.
+    """
+    STATUS_KEY = "queue:status"
+    PLATFORMS = ("facebook", "instagram", "linkedin", "tiktok", "whatsapp")
+
+    def __init__(self):
+        self._status = "OFF"
+        self._status_set = False
+        self._redis = None
+        self._publisher = None
+        self.scheduler = FairScheduler()
+        if redis and settings.REDIS_HOST:
+            self._redis = redis.Redis(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                decode_responses=True,
+                socket_timeout=2,
+            )
+
+    @property
+    def publisher(self):
+        # Built on first use so importing the queue doesn't construct every publisher
+        if self._publisher is None:
+            from app.services.social_publisher import SocialPublisher
+            self._publisher = SocialPublisher()
+        return self._publisher
+
+    def get_status(self) -> str:
+        if self._redis:
+            try:
+                return self._redis.get(self.STATUS_KEY) or self._status
+            except Exception as e:
+                logger.warning("Redis unavailable, using local queue status: %s", e)
+            return self._status
+        return self._load_status() or self._status
+
+    def set_status(self, status: str) -> str:
+        status = status.upper()
+        if status not in ("ON", "OFF"):
+            raise ValueError(f"Invalid queue status: {status}")
+        self._status = status
+        self._status_set = True
+        if self._redis:
+            try:
+                self._redis.set(self.STATUS_KEY, status)
+            except Exception as e:
+                logger.warning("Redis unavailable, queue status stored locally: %s", e)
+        else:
+            self._store_status(status)
+        return status
+
+    def initialize_status(self, default: str = "ON") -> str:
+        """
+        Sets `default` only when no status was ever stored (first start), so an operator's OFF survives
+        restarts and leadership changes. Returns the status in effect.
+        """
+        if self._redis:
+            try:
+                self._redis.set(self.STATUS_KEY, default.upper(), nx=True)
+                self._status_set = True
+                return self.get_status()
+            except Exception as e:
+                logger.warning("Redis unavailable, queue status stored locally: %s", e)
+        else:
+            self._status = self._store_status(default.upper(), overwrite=False)
+            self._status_set = True
+            return self._status
+        if not self._status_set:
+            self.set_status(default)
+        return self._status
+
+    def _load_status(self) -> Optional[str]:
+        db = SessionLocal()
+        try:
+            row = db.get(AppSetting, self.STATUS_KEY)
+            return row.value if row else None
+        finally:
+            db.close()
+
+    def _store_status(self, status: str, overwrite: bool = True) -> str:
+        """Writes the status row (with overwrite=False only when there is none yet); returns the stored value."""
+        db = SessionLocal()
+        try:
+            row = db.get(AppSetting, self.STATUS_KEY)
+            if row is None:
+                db.add(AppSetting(key=self.STATUS_KEY, value=status))
+                try:
+                    db.commit()
+                    return status
+                except IntegrityError:
+                    # Another process stored it first
+                    db.rollback()
+                    row = db.get(AppSetting, self.STATUS_KEY)
+            if overwrite:
+                row.value = status
+                db.commit()
+            return row.value
+        finally:
+            db.close()
+
+    def lane(self, platform: Optional[str]) -> QueueLane:
+        config = parse_lanes(settings.WORKER_LANES).get((platform or "").lower(), {})
+        return QueueLane(
+            platform=platform or "",
+            concurrency=max(1, int(config.get("concurrency", settings.WORKER_CONCURRENCY))),
+            timeout_seconds=config.get("timeout_seconds", settings.WORKER_LANE_TIMEOUT_SECONDS),
+        )
+
+    def get_queue_length(self) -> int:
+        db = SessionLocal()
+        try:
+            return db.query(Publication).filter(Publication.status == "pending").count()
+        finally:
+            db.close()
+
+    def get_queue_stats(self) -> Dict[str, Any]:
+        """
+        Pending count and age in seconds of the oldest pending publication, overall and per lane.
+        Retries whose backoff has elapsed count as pending (waiting since next_attempt_at).
+        Every known platform has a lane entry, empty ones included.
+        Also the number of retries still backing off and of dead-lettered publications.
+        """
+        now = datetime.utcnow()
+        waiting_since = func.coalesce(Publication.next_attempt_at, Publication.created_at)
+        db = SessionLocal()
+        try:
+            rows = db.query(
+                Publication.platform, func.count(Publication.id), func.min(waiting_since)
+            ).filter(due_filter(now)).group_by(Publication.platform).all()
+            retrying = db.query(func.count(Publication.id)).filter(
+                Publication.status == "retrying", Publication.next_attempt_at > now
+            ).scalar()
+            dead_letter = db.query(func.count(Publication.id)).filter(Publication.status == "failed").scalar()
+        finally:
+            db.close()
+
+        lanes = {platform: {"pending": 0, "oldest_pending_age_seconds": 0.0} for platform in self.PLATFORMS}
+        for platform, pending, oldest in rows:
+            age = max((now - oldest).total_seconds(), 0.0) if oldest else 0.0
+            lanes[platform or ""] = {"pending": pending, "oldest_pending_age_seconds": age}
+        return {
+            "pending": sum(lane["pending"] for lane in lanes.values()),
+            "oldest_pending_age_seconds": max(lane["oldest_pending_age_seconds"] for lane in lanes.values()),
+            "retrying": retrying,
+            "dead_letter": dead_letter,
+            "lanes": lanes,
+        }
+
+    def process_pending_publications(self, limit: Optional[int] = None, platform: Optional[str] = None) -> Dict[str, int]:
+        """
+        Publishes due rows (pending, or retrying past next_attempt_at) in the order of the fair scheduler
+        and records the outcome of each one. With `platform`, only that lane is drained; concurrent drains
+        of a lane take turns on the same scheduler.
+        """
+        db = SessionLocal()
+        processed = published = retrying = failed = 0
+        try:
+            with tracer.start_as_current_span("queue.drain") as drain_span:
+                with tracer.start_as_current_span("queue.claim"):
+                    waiting = self.scheduler.refresh(db, platform)
+                drain_span.set_attribute("queue.claimed", waiting)
+                if platform is not None:
+                    drain_span.set_attribute("queue.lane", platform)
+
+                while not limit or processed < limit:
+                    ticket = self.scheduler.next(platform)
+                    if ticket is None:
+                        break
+                    try:
+                        publication = db.get(Publication, ticket.publication_id)
+                        if publication is None:
+                            continue
+                        outcome = self._process(db, publication, drain_span)
+                    finally:
+                        self.scheduler.done(ticket)
+                    if outcome is None:
+                        # Another worker got it first
+                        continue
+                    processed += 1
+                    if outcome == "published":
+                        published += 1
+                    elif outcome == "retrying":
+                        retrying += 1
+                    else:
+                        failed += 1
+        finally:
+            db.close()
+
+        return {"processed": processed, "published": published, "retrying": retrying, "failed": failed}
+
+    def _process(self, db, publication: Publication, drain_span) -> Optional[str]:
+        """Claims and publishes one row; returns its new status, or None when another drain claimed it."""
+        # Resume the trace started by /publish so enqueue -> platform response is one trace
+        with tracer.start_as_current_span(
+            "queue.process_publication",
+            context=extract_context(publication.traceparent),
+            links=[Link(drain_span.get_span_context())],
+        ) as span:
+            span.set_attribute("publication.id", publication.id)
+            span.set_attribute("publication.platform", publication.platform or "")
+            previous_status = publication.status
+            if not self._claim(db, publication):
+                return None
+            claimed_at = datetime.utcnow()
+            waiting_since = publication.next_attempt_at or publication.created_at
+            publication.status = "processing"
+            publication_events.publish(publication_event(
+                publication, previous_status,
+                queued_seconds=max((claimed_at - waiting_since).total_seconds(), 0.0) if waiting_since else 0.0,
+            ))
+
+            start = time.perf_counter()
+            result, attempt = self._publish(publication)
+            publication.attempts = (publication.attempts or 0) + 1
+            publication.next_attempt_at = None
+            if result.get("success"):
+                publication.status = "published"
+                publication.error_message = publication.error_code = publication.error_class = None
+            else:
+                self._record_failure(publication, result, attempt)
+            status = publication.status
+            span.set_attribute("publication.status", status)
+            span.set_attribute("publication.attempts", publication.attempts)
+            publication.processed_at = datetime.utcnow()
+            # Built before the commit expires the row, sent once the change is visible
+            event = publication_event(
+                publication, "processing",
+                publish_seconds=time.perf_counter() - start,
+                total_seconds=(publication.processed_at - publication.created_at).total_seconds() if publication.created_at else 0.0,
+            )
+            db.commit()
+            publication_events.publish(event)
+            return status
+
+    def _record_failure(self, publication: Publication, result: Dict[str, Any], attempt) -> None:
+        """Schedules the next attempt of a retriable failure, or dead-letters the publication."""
+        publication.error_code = result.get("error") or "UNKNOWN"
+        publication.error_class = classify_failure(result, attempt)
+        publication.error_message = str(result.get("message", "Unknown error"))
+        if publication.error_class == "retriable" and publication.attempts < settings.PUBLISH_MAX_ATTEMPTS:
+            delay = retry_delay(publication.attempts, attempt.retry_after)
+            publication.status = "retrying"
+            publication.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+            logger.warning(
+                "Publish failed, retry scheduled",
+                extra={"publication_id": publication.id, "platform": publication.platform,
+                       "error_code": publication.error_code, "attempts": publication.attempts,
+                       "retry_in_seconds": round(delay, 1)},
+            )
+        else:
+            publication.status = "failed"
+            logger.error(
+                "Publish failed, moved to dead letter",
+                extra={"publication_id": publication.id, "platform": publication.platform,
+                       "error_code": publication.error_code, "error_class": publication.error_class,
+                       "attempts": publication.attempts},
+            )
+
+    def dead_letter(self, db, user_id: Optional[int] = None, platform: Optional[str] = None,
+                    error_class: Optional[str] = None, error_code: Optional[str] = None):
+        """Query of dead-lettered publications ('failed'), optionally of one user and filtered."""
+        query = db.query(Publication).filter(Publication.status == "failed")
+        if user_id is not None:
+            query = query.filter(Publication.user_id == user_id)
+        if platform:
+            query = query.filter(Publication.platform == platform)
+        if error_class:
+            query = query.filter(Publication.error_class == error_class)
+        if error_code:
+            query = query.filter(Publication.error_code == error_code)
+        return query
+
+    def requeue(self, db, ids: Optional[list] = None, **filters) -> int:
+        """
+        Moves dead-lettered publications back to 'pending' with a fresh attempt budget, in one UPDATE.
+        Takes explicit `ids` or the same filters as dead_letter(); returns how many rows were requeued.
+        """
+        query = self.dead_letter(db, **filters)
+        if ids is not None:
+            query = query.filter(Publication.id.in_(ids))
+        requeued = query.update({
+            Publication.status: "pending",
+            Publication.attempts: 0,
+            Publication.next_attempt_at: None,
+            Publication.error_class: None,
+        }, synchronize_session=False)
+        db.commit()
+        return requeued
+
+    def _claim(self, db, publication: Publication) -> bool:
+        """Atomically moves a due row to processing so concurrent drains never publish it twice."""
+        claimed = db.query(Publication).filter(
+            Publication.id == publication.id, due_filter(datetime.utcnow())
+        ).update({Publication.status: "processing"}, synchronize_session=False)
+        db.commit()
+        return claimed == 1
+
+    def _publish(self, publication: Publication):
+        """Returns the publisher result and the PublishAttempt used to classify a failure."""
+        from app.services.publishers.base import publish_attempt
+
+        platform = publication.platform
+        label = platform if platform in self.PLATFORMS else "unsupported"
+        lane = self.lane(platform)
+        start = time.perf_counter()
+        try:
+            with QUEUE_LANE_IN_FLIGHT.labels(platform=label).track_inprogress(), \
+                    publish_attempt(lane.timeout_seconds) as attempt:
+                result = self._dispatch(publication)
+        except Exception as e:
+            result = {"error": "EXCEPTION", "message": str(e)}
+
+        PUBLISH_LATENCY.labels(platform=label).observe(time.perf_counter() - start)
+        PUBLISH_TOTAL.labels(platform=label, outcome="published" if result.get("success") else "failed").inc()
+        return result, attempt
+
+    def _dispatch(self, publication: Publication) -> Dict[str, Any]:
+        platform = publication.platform
+        if platform == "tiktok":
+            return self.publisher.publish_tiktok(publication.text, publication.video_path)
+        if platform == "facebook":
+            return self.publisher.publish_facebook(publication.text, publication.media_url)
+        if platform == "instagram":
+            return self.publisher.publish_instagram(publication.text, publication.media_url)
+        if platform == "linkedin":
+            return self.publisher.publish_linkedin(publication.text, publication.media_url)
+        if platform == "whatsapp":
+            return self.publisher.publish_whatsapp(publication.text, publication.media_url)
+        return {"error": "UNSUPPORTED_PLATFORM", "message": f"Unsupported platform: {platform}"}
+
+queue_service = QueueService()
@@ -0,0 +1,226 @@
+"""
+Tail-latency control for OpenAI calls: per-call deadline, hedged requests, circuit breaker and fallback model.
+
+    call = ResilientCall("chat", hedge=True, timeout_seconds=60)
+    response, model = call.call(lambda model, timeout: client.chat.completions.create(model=model, ..., timeout=timeout),
+                                ["gpt-4o-mini", "gpt-3.5-turbo"])
+
+- Deadline: every attempt gets the time left as its SDK timeout, and the caller stops waiting when it runs out.
+- Hedging: when the first request has not answered after the recent p95 latency, a second identical one is
+  sent and the first to finish wins. At most LLM_HEDGE_MAX_RATIO of the calls are hedged, so a slow provider
+  is not hit with twice the load.
+- Circuit breaker: LLM_BREAKER_FAILURES consecutive failures of a model open its breaker for
+  LLM_BREAKER_COOLDOWN_SECONDS; calls go to the next model meanwhile, and one trial call closes it again.
+"""
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, Optional, Sequence, Tuple, TypeVar
+from app.core import profiling
+from app.core.config import settings
+from app.core.metrics import LLM_CALLS, LLM_CIRCUIT_OPEN, LLM_FALLBACKS, LLM_HEDGES
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Latencies kept per operation for the hedge delay, and how many are needed before hedging starts
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 20
+
+class LLMUnavailableError(RuntimeError):
+    """Every model of the call has its circuit open, or none answered before the deadline."""
+
+class CircuitBreaker:
+    """closed -> open after `failure_threshold` consecutive failures -> half_open (one trial) after `cooldown_seconds`."""
+
+    def __init__(self, operation: str, model: str, failure_threshold: int, cooldown_seconds: float):
+        self.operation = operation
+        self.model = model
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown_seconds:
+                self.state = "half_open"
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != "closed":
+                logger.info("Circuit closed", extra={"operation": self.operation, "model": self.model})
+            self.state = "closed"
+            self.failures = 0
+        LLM_CIRCUIT_OPEN.labels(operation=self.operation, model=self.model).set(0)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(
+                        "Circuit opened", extra={"operation": self.operation, "model": self.model, "failures": self.failures}
+                    )
+                self.state = "open"
+                self.opened_at = time.monotonic()
+        if self.state == "open":
+            LLM_CIRCUIT_OPEN.labels(operation=self.operation, model=self.model).set(1)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def _get_executor() -> ThreadPoolExecutor:
+    # Shared by every ResilientCall; hedges and abandoned attempts finish here in the background
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.LLM_MAX_PARALLEL_CALLS, thread_name_prefix="llm")
+        return _executor
+
+class ResilientCall:
+    """One kind of OpenAI call (chat, image) with its own latency history and a circuit breaker per model."""
+
+    def __init__(self, operation: str, hedge: bool = True, timeout_seconds: float = 60):
+        self.operation = operation
+        self.hedge = hedge
+        self.timeout_seconds = timeout_seconds
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._hedge_flags: Deque[bool] = deque(maxlen=LATENCY_WINDOW)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        with self._lock:
+            if model not in self._breakers:
+                self._breakers[model] = CircuitBreaker(
+                    self.operation, model, settings.LLM_BREAKER_FAILURES, settings.LLM_BREAKER_COOLDOWN_SECONDS
+                )
+            return self._breakers[model]
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging: the LLM_HEDGE_QUANTILE of recent latencies. None means don't hedge."""
+        if not self.hedge:
+            return None
+        with self._lock:
+            if len(self._latencies) < MIN_LATENCY_SAMPLES:
+                return None
+            if self._hedge_flags and sum(self._hedge_flags) / len(self._hedge_flags) >= settings.LLM_HEDGE_MAX_RATIO:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(int(len(ordered) * settings.LLM_HEDGE_QUANTILE), len(ordered) - 1)
+        return max(ordered[index], settings.LLM_HEDGE_MIN_DELAY_SECONDS)
+
+    def call(
+        self,
+        request: Callable[[str, float], T],
+        models: Sequence[Optional[str]],
+        on_abandoned: Optional[Callable[[T, str], None]] = None,
+    ) -> Tuple[T, str]:
+        """
+        Runs `request(model, timeout)` against the first model whose circuit is closed, failing over to the
+        next ones on errors. Returns (result, model). `on_abandoned` gets the results of attempts that lost a
+        hedge race or finished after the deadline (their tokens were still spent). While another model is left
+        to try, an attempt leaves LLM_FALLBACK_RESERVE of the remaining time to it, so a hanging primary
+        cannot use up the fallback's deadline.
+        """
+        deadline = time.monotonic() + self.timeout_seconds
+        candidates = [model for model in dict.fromkeys(models) if model]
+        last_error: Optional[BaseException] = None
+
+        for position, model in enumerate(candidates):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            breaker = self.breaker(model)
+            if not breaker.allow():
+                continue
+            if position > 0:
+                LLM_FALLBACKS.labels(operation=self.operation, model=model).inc()
+                logger.warning("Falling back to another model", extra={"operation": self.operation, "model": model})
+            attempt_deadline = deadline
+            if position < len(candidates) - 1:
+                attempt_deadline = time.monotonic() + remaining * (1 - settings.LLM_FALLBACK_RESERVE)
+            try:
+                result = self._hedged(request, model, attempt_deadline, on_abandoned)
+            except Exception as e:
+                outcome = "timeout" if isinstance(e, TimeoutError) else "error"
+                LLM_CALLS.labels(operation=self.operation, model=model, outcome=outcome).inc()
+                breaker.record_failure()
+                last_error = e
+                continue
+            LLM_CALLS.labels(operation=self.operation, model=model, outcome="success").inc()
+            breaker.record_success()
+            return result, model
+
+        if last_error is not None:
+            raise last_error
+        raise LLMUnavailableError(f"No {self.operation} model available (circuits open: {', '.join(candidates)})")
+
+    def _hedged(self, request: Callable[[str, float], T], model: str, deadline: float,
+                on_abandoned: Optional[Callable[[T, str], None]]) -> T:
+        executor = _get_executor()
+        started: Dict[Future, float] = {}
+
+        def submit() -> Future:
+            # Attempts run in the caller's context, so spans and deadlines carry over to the worker thread
+            context = contextvars.copy_context()
+            future = executor.submit(context.run, profiling.propagate(request), model, max(deadline - time.monotonic(), 0.001))
+            started[future] = time.monotonic()
+            return future
+
+        first = submit()
+        pending = {first}
+        delay = self.hedge_delay()
+        hedge: Optional[Future] = None
+        if delay is not None and delay < deadline - time.monotonic():
+            done, _ = wait(pending, timeout=delay)
+            if not done:
+                hedge = submit()
+                pending.add(hedge)
+                LLM_HEDGES.labels(operation=self.operation, event="fired").inc()
+        with self._lock:
+            self._hedge_flags.append(hedge is not None)
+
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                self._abandon(pending, model, on_abandoned)
+                raise TimeoutError(f"{self.operation} call to {model} exceeded its {time.monotonic() - min(started.values()):.1f}s budget")
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                with self._lock:
+                    self._latencies.append(time.monotonic() - started[future])
+                if future is hedge:
+                    LLM_HEDGES.labels(operation=self.operation, event="won").inc()
+                self._abandon(pending, model, on_abandoned)
+                return future.result()
+        raise error
+
+    @staticmethod
+    def _abandon(futures, model: str, on_abandoned: Optional[Callable]) -> None:
+        if on_abandoned is None:
+            return
+
+        def finished(future: Future) -> None:
+            if future.exception() is None:
+                try:
+                    on_abandoned(future.result(), model)
+                except Exception:
+                    logger.exception("Error handling an abandoned call")
+
+        for future in futures:
+            future.add_done_callback(finished)
@@ -0,0 +1,95 @@
+"""
+Token counting and input budgeting for the LLM prompts.
+
+Counts use tiktoken when it is installed and its encoding files are available (the Docker image
+downloads them at build time); otherwise a character-based estimate that errs on the high side.
+tiktoken is imported on the first count, not when the API starts.
+"""
+import logging
+import math
+import re
+from functools import lru_cache
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Spanish text runs at about 3.5-4 characters per token; 3 keeps the estimate above the real count
+CHARS_PER_TOKEN = 3
+TRUNCATION_MARKER = "[…]"
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        logger.warning("tiktoken not available - token counts will be estimated from characters")
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # Encoding files are downloaded on first use; offline without a cache there is nothing to load
+        logger.warning("tiktoken encoding unavailable, estimating tokens: %s", e, extra={"model": model})
+        return None
+
+def count_tokens(text: str, model: str) -> int:
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+def _cut(text: str, max_tokens: int, model: str) -> str:
+    """First `max_tokens` tokens of a single sentence or paragraph, without breaking a word."""
+    encoding = _encoding(model)
+    if encoding is None:
+        head = text[:max_tokens * CHARS_PER_TOKEN]
+    else:
+        head = encoding.decode(encoding.encode(text)[:max_tokens])
+    return head.rsplit(" ", 1)[0] if " " in head else head
+
+def _fit_paragraph(paragraph: str, max_tokens: int, model: str) -> str:
+    """Whole sentences from the start of the paragraph; the first one is cut if even it does not fit."""
+    kept: List[str] = []
+    used = 0
+    for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+        cost = count_tokens(sentence, model) + 1
+        if used + cost > max_tokens:
+            if not kept:
+                kept.append(_cut(sentence, max_tokens, model))
+            break
+        kept.append(sentence)
+        used += cost
+    return " ".join(kept)
+
+def truncate_to_budget(text: str, max_tokens: int, model: str) -> str:
+    """
+    Shortens `text` to about `max_tokens` tokens, keeping whole paragraphs (then whole sentences) from
+    the start, where announcements put what they are about. The closing paragraph usually carries
+    date, place and contact, so it is kept too when it is short. A marker shows where text was dropped.
+    """
+    if count_tokens(text, model) <= max_tokens:
+        return text
+
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
+    budget = max_tokens - count_tokens(TRUNCATION_MARKER, model) - 2
+    tail: Optional[str] = None
+    if len(paragraphs) > 1 and count_tokens(paragraphs[-1], model) <= budget // 4:
+        tail = paragraphs.pop()
+        budget -= count_tokens(tail, model) + 2
+
+    kept: List[str] = []
+    used = 0
+    for paragraph in paragraphs:
+        cost = count_tokens(paragraph, model) + 2
+        if used + cost > budget:
+            if budget - used > 8:
+                kept.append(_fit_paragraph(paragraph, budget - used, model))
+            break
+        kept.append(paragraph)
+        used += cost
+
+    return "\n\n".join(kept + [TRUNCATION_MARKER] + ([tail] if tail else []))
@@ -0,0 +1,53 @@
+"""
+Standalone process for the background workers: publication queue drains, the OpenAI batch poller and
+running realtime bulk jobs (see app/services/background_workers.py).
+
+They run inside the API by default (WORKER_MODE=embedded). To scale publishing apart from the API, set
+WORKER_MODE=external on the API and run them as their own process:
+
+    python -m app.worker
+
+With WORKER_LEADER_ELECTION set, only the process holding the leader lock runs them, so several uvicorn
+workers or replicas never drain the queue or poll batches side by side.
+"""
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import logging
+from app.core.logging_config import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+import asyncio
+import signal
+from app.core.config import settings
+from app.services.background_workers import build_workers
+
+async def run_standalone() -> None:
+    task = asyncio.create_task(build_workers().run())
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, task.cancel)
+    try:
+        await task
+    except asyncio.CancelledError:
+        logger.info("Worker stopped")
+
+def main() -> None:
+    from app.core import metrics, tracing
+
+    tracing.setup_tracing()
+    if settings.WORKER_METRICS_PORT:
+        from prometheus_client import start_http_server
+        start_http_server(settings.WORKER_METRICS_PORT, registry=metrics.registry)
+
+    logger.info(
+        "Starting standalone worker",
+        extra={"lanes": settings.WORKER_LANES, "concurrency": settings.WORKER_CONCURRENCY, "leader_election": settings.WORKER_LEADER_ELECTION},
+    )
+    asyncio.run(run_standalone())
+
+if __name__ == "__main__":
+    main()
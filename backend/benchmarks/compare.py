@@ -0,0 +1,74 @@
+"""
+Compares two benchmark result files and flags regressions.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.10
+
+Metrics ending in _per_s are higher-is-better; _ms, _s, _mb and _bytes are lower-is-better.
+Exit code is 1 when any metric regresses by more than the threshold.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Optional
+
+LOWER_IS_BETTER = ("_ms", "_s", "_mb", "_bytes")
+HIGHER_IS_BETTER = ("_per_s",)
+
+def flatten(data: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = float(value)
+    return flat
+
+def direction(metric: str) -> Optional[int]:
+    """+1 when higher is better, -1 when lower is better, None for informational values."""
+    if metric.endswith(HIGHER_IS_BETTER):
+        return 1
+    if metric.endswith(LOWER_IS_BETTER):
+        return -1
+    return None
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float):
+    base = flatten(baseline.get("results", {}))
+    cand = flatten(candidate.get("results", {}))
+    rows = []
+    for metric in sorted(base.keys() & cand.keys()):
+        sign = direction(metric)
+        if sign is None or base[metric] == 0:
+            continue
+        change = (cand[metric] - base[metric]) / abs(base[metric])
+        regressed = (-change if sign > 0 else change) > threshold
+        rows.append((metric, base[metric], cand[metric], change, regressed))
+    return rows
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change treated as a regression")
+    parser.add_argument("--only-regressions", action="store_true")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    rows = compare(baseline, candidate, args.threshold)
+    print(f"baseline {baseline.get('meta', {}).get('commit')} -> candidate {candidate.get('meta', {}).get('commit')}")
+    for metric, before, after, change, regressed in rows:
+        if args.only_regressions and not regressed:
+            continue
+        flag = "REGRESSION" if regressed else ""
+        print(f"{metric:70s} {before:12.3f} {after:12.3f} {change:+8.1%} {flag}")
+
+    regressions = [r for r in rows if r[4]]
+    print(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import math
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List
+import uvicorn
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class ServerThread:
+    """Runs an ASGI app under uvicorn in a daemon thread, so benchmarks hit a real socket."""
+
+    def __init__(self, app, port: int):
+        self.port = port
+        self.base_url = f"http://127.0.0.1:{port}"
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def start(self, timeout: float = 15) -> "ServerThread":
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Server on port {self.port} did not start")
+            time.sleep(0.05)
+        return self
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+def percentiles(samples_s: Iterable[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds (nearest-rank percentiles)."""
+    values = sorted(v * 1000 for v in samples_s)
+    if not values:
+        return {"count": 0}
+
+    def rank(p: float) -> float:
+        return values[min(len(values) - 1, max(0, math.ceil(p / 100 * len(values)) - 1))]
+
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values), 3),
+        "p50_ms": round(rank(50), 3),
+        "p90_ms": round(rank(90), 3),
+        "p95_ms": round(rank(95), 3),
+        "p99_ms": round(rank(99), 3),
+        "max_ms": round(values[-1], 3),
+    }
+
+def rss_high_water_mb() -> float:
+    """Process peak RSS so far (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 2)
+
+@contextmanager
+def track_memory(result: Dict[str, Any], enabled: bool = True):
+    """Adds tracemalloc peak and process RSS high-water mark to `result`."""
+    if enabled:
+        tracemalloc.start()
+    try:
+        yield
+    finally:
+        if enabled:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            result["python_heap_peak_mb"] = round(peak / (1024 * 1024), 2)
+        result["rss_high_water_mb"] = rss_high_water_mb()
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(__file__), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+def environment_info() -> Dict[str, Any]:
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def parse_int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
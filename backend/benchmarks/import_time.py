@@ -0,0 +1,79 @@
+"""
+Cold-start profile: how long `import app.main` takes in a fresh interpreter, from `python -X importtime`.
+
+    python -m benchmarks.import_time --output startup.json
+    python -m benchmarks.compare startup_base.json startup.json
+
+Results use the same layout as the main suite, so benchmarks.compare works on them.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+from .harness import environment_info
+
+# Modules whose cumulative import time is reported on their own (when they are imported at all)
+WATCHED = ("moviepy", "numpy", "openai", "PIL.Image", "sqlalchemy", "fastapi", "app.api.api", "app.api.routes")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Import-time profile of the API")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list")
+    parser.add_argument("--output", default="import_time.json")
+    return parser.parse_args(argv)
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """{module: (self_us, cumulative_us)} from -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+def profile_once(module: str, backend_dir: Path, env: Dict[str, str]) -> Dict[str, Tuple[int, int]]:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=backend_dir, env=env, capture_output=True, text=True, check=True,
+    )
+    return parse_importtime(completed.stderr)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    backend_dir = Path(__file__).resolve().parents[1]
+
+    runs: List[Dict[str, Tuple[int, int]]] = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp_dir}/startup.db", "LOG_LEVEL": "WARNING"}
+        for _ in range(args.repeats):
+            runs.append(profile_once(args.module, backend_dir, env))
+
+    def median_ms(name: str) -> float:
+        return round(statistics.median(run[name][1] for run in runs) / 1000, 1)
+
+    last = runs[-1]
+    slowest = sorted(last, key=lambda name: last[name][0], reverse=True)[:args.top]
+    results = {
+        "import": {
+            "total_ms": median_ms(args.module),
+            "modules_ms": {name: median_ms(name) for name in WATCHED if all(name in run for run in runs)},
+            # Self time: where the interpreter actually spends it, not what it imports
+            "slowest_self_ms": {name: round(last[name][0] / 1000, 1) for name in slowest},
+        }
+    }
+
+    report = {"meta": {**environment_info(), "args": vars(args)}, "results": results}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(results, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+End-to-end performance benchmarks. The backend and the fake third-party APIs both run under uvicorn
+in this process, on a throwaway SQLite database.
+
+    python -m benchmarks --output bench.json
+    python -m benchmarks --scenarios pagination --pagination-rows 10000,1000000
+    python -m benchmarks.compare baseline.json bench.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from .harness import ServerThread, environment_info, free_port, parse_int_list
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Social Topicos performance benchmarks")
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the JSON results")
+    parser.add_argument("--scenarios", default="generate,publish,queue,lanes,fairness,pagination,db_concurrency,payloads,video,near_duplicates")
+    parser.add_argument("--concurrency", type=parse_int_list, default=[1, 4, 16])
+    parser.add_argument("--generate-requests", type=int, default=40)
+    parser.add_argument("--publish-requests", type=int, default=500)
+    parser.add_argument("--workers", type=parse_int_list, default=[1, 2, 4, 8])
+    parser.add_argument("--queue-items", type=int, default=400)
+    parser.add_argument("--queue-batch", type=int, default=10)
+    parser.add_argument("--lanes-items", type=int, default=200)
+    parser.add_argument("--lanes-tiktok-every", type=int, default=10, help="One TikTok upload every N publications")
+    parser.add_argument("--lanes-upload-ms", type=int, default=500, help="Injected TikTok upload latency")
+    parser.add_argument("--fairness-items", type=int, default=300, help="Backlog of the heavy user")
+    parser.add_argument("--fairness-users", type=int, default=5, help="Other users, 5 posts each")
+    parser.add_argument("--pagination-rows", type=parse_int_list, default=[10000])
+    parser.add_argument("--pagination-repeats", type=int, default=20)
+    parser.add_argument("--db-rows", type=int, default=10000, help="Publications table size for db_concurrency")
+    parser.add_argument("--db-requests", type=int, default=400, help="Page requests per mode and concurrency level")
+    parser.add_argument("--payload-rows", type=int, default=1000)
+    parser.add_argument("--payload-repeats", type=int, default=20)
+    parser.add_argument("--fast-responses", action="store_true", help="orjson + gzip/brotli (FAST_RESPONSES)")
+    parser.add_argument("--image-cache", action="store_true", help="Reuse images of repeated prompts (IMAGE_CACHE)")
+    parser.add_argument("--admission", default="",
+                        help='Admission limits, e.g. "generate=4:16:30" (ADMISSION_ROUTES; unlimited by default)')
+    parser.add_argument("--video-repeats", type=int, default=3)
+    parser.add_argument("--near-duplicate-items", type=int, default=200000)
+    parser.add_argument("--image-format", default="auto", choices=["auto", "url", "b64_json"],
+                        help="DALL-E response_format (OPENAI_IMAGE_RESPONSE_FORMAT)")
+    parser.add_argument("--fake-config", help="fake_api JSON config (latency/error injection)")
+    parser.add_argument("--trace-memory", action="store_true", help="Record tracemalloc peaks (slows the run)")
+    return parser.parse_args(argv)
+
+def configure_environment(tmp_dir: str, fake_url: str) -> None:
+    """Must run before anything under `app` is imported: settings and services read env at import time."""
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{tmp_dir}/bench.db",
+        "LOG_LEVEL": "WARNING",
+        "TRACING_EXPORTER": "none",
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"{fake_url}/openai/v1",
+        "GRAPH_API_BASE_URL": f"{fake_url}/graph",
+        "LINKEDIN_API_BASE_URL": f"{fake_url}/linkedin/v2",
+        "TIKTOK_API_BASE_URL": f"{fake_url}/tiktok/v2",
+        "WHAPI_BASE_URL": f"{fake_url}/whapi",
+        "FB_PAGE_ID": "1000",
+        "FB_PAGE_ACCESS_TOKEN": "bench",
+        "IG_BUSINESS_ACCOUNT_ID": "2000",
+        "LINKEDIN_ACCESS_TOKEN": "bench",
+        "LINKEDIN_AUTHOR_URN": "urn:li:person:bench",
+        "TIKTOK_ACCESS_TOKEN": "bench",
+        "WHAPI_TOKEN": "bench",
+        "WHAPI_RECIPIENT": "bench",
+        # Load runs would exhaust the daily token quotas; usage is still recorded
+        "LLM_DAILY_TOKEN_QUOTA": "0",
+        "LLM_ANONYMOUS_DAILY_TOKEN_QUOTA": "0",
+        # Every request comes from the same benchmark user
+        "ADMISSION_PER_USER": "0",
+    })
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    backend_dir = Path(__file__).resolve().parents[1]
+    sys.path.insert(0, str(backend_dir))
+
+    from fake_api import FakeApiConfig, create_app as create_fake_app
+
+    fake_config = FakeApiConfig.from_file(args.fake_config) if args.fake_config else FakeApiConfig(record_limit=1000)
+    fake = ServerThread(create_fake_app(fake_config), free_port()).start()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        configure_environment(tmp_dir, fake.base_url)
+        os.environ["OPENAI_IMAGE_RESPONSE_FORMAT"] = args.image_format
+        os.environ["FAST_RESPONSES"] = "true" if args.fast_responses else "false"
+        # Every /generate of the suite asks for the same image; without --image-cache each one is generated
+        os.environ["IMAGE_CACHE"] = "true" if args.image_cache else "false"
+        os.environ["ADMISSION_ROUTES"] = args.admission
+
+        from app.db.init_db import init_db
+        from app.main import app
+        from app.services.generation_pipeline import get_pipeline
+        from app.services.image_renditions import renditions
+        from .scenarios import BenchContext, run_scenario
+
+        init_db()
+        pipeline = get_pipeline()
+
+        # Keep generated images out of backend/static
+        pipeline.media_gen.media_dir = Path(tmp_dir) / "media"
+        pipeline.media_gen.video_dir = Path(tmp_dir) / "videos"
+        os.makedirs(pipeline.media_gen.media_dir, exist_ok=True)
+        os.makedirs(pipeline.media_gen.video_dir, exist_ok=True)
+        renditions.media_dir = pipeline.media_gen.media_dir
+        renditions.cache_dir = Path(tmp_dir) / "renditions"
+
+        server = ServerThread(app, free_port()).start()
+        ctx = BenchContext(server.base_url, fake.base_url, args)
+        ctx.login()
+
+        report = {"meta": {**environment_info(), "args": {k: v for k, v in vars(args).items() if k != "output"}}, "results": {}}
+        try:
+            for name in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+                print(f"Running {name}...", file=sys.stderr)
+                report["results"][name] = run_scenario(name, ctx)
+        finally:
+            ctx.client.close()
+            server.stop()
+            fake.stop()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report["results"], indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
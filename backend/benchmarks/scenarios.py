@@ -0,0 +1,494 @@
+import asyncio
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+import httpx
+from .harness import percentiles, track_memory
+
+GENERATE_PAYLOAD = {
+    "title": "Congreso internacional de investigación",
+    "body": "La universidad abre la inscripción al congreso anual de la facultad de ingeniería.",
+    "platforms": ["facebook", "instagram", "linkedin", "whatsapp"],
+}
+
+class BenchContext:
+    def __init__(self, base_url: str, fake_url: str, args):
+        self.base_url = base_url
+        self.fake_url = fake_url
+        self.args = args
+        self.client = httpx.Client(base_url=base_url, timeout=300, limits=httpx.Limits(max_connections=256))
+        self.auth_headers: Dict[str, str] = {}
+
+    def login(self) -> None:
+        credentials = {"email": "bench@universidad.edu", "password": "bench-password"}
+        self.client.post("/api/auth/register", json=credentials)
+        token = self.client.post(
+            "/api/auth/login", data={"username": credentials["email"], "password": credentials["password"]}
+        ).json()["access_token"]
+        self.auth_headers = {"Authorization": f"Bearer {token}"}
+
+def _timed_requests(send: Callable[[], httpx.Response], total: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(_):
+        nonlocal errors
+        start = time.perf_counter()
+        response = send()
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if response.status_code >= 400:
+                errors += 1
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    wall = time.perf_counter() - wall_start
+
+    summary = percentiles(latencies)
+    summary["errors"] = errors
+    summary["throughput_per_s"] = round(total / wall, 3) if wall else 0.0
+    return summary
+
+def _reset_publications() -> None:
+    from app.db.session import SessionLocal
+    from app.models.publication import Publication
+
+    db = SessionLocal()
+    try:
+        db.query(Publication).delete()
+        db.commit()
+    finally:
+        db.close()
+
+def _bulk_insert_publications(rows: int, status: str, user_id=None, chunk: int = 50000) -> None:
+    from app.db.session import engine
+    from app.models.publication import Publication
+
+    platforms = ["facebook", "linkedin", "instagram", "whatsapp"]
+    start = datetime.utcnow() - timedelta(seconds=rows)
+    with engine.begin() as conn:
+        for offset in range(0, rows, chunk):
+            batch = [
+                {
+                    "user_id": user_id,
+                    "platform": platforms[i % len(platforms)],
+                    "text": f"Publicación de prueba {i} " + "texto " * 40,
+                    "media_url": None,
+                    "status": status,
+                    "created_at": start + timedelta(seconds=i),
+                }
+                for i in range(offset, min(offset + chunk, rows))
+            ]
+            conn.execute(Publication.__table__.insert(), batch)
+
+def generate(ctx: BenchContext) -> Dict[str, Any]:
+    """/generate end-to-end latency (LLM, image, download, history save) per concurrency level."""
+    results = {}
+    for concurrency in ctx.args.concurrency:
+        results[f"c{concurrency}"] = _timed_requests(
+            lambda: ctx.client.post("/api/generate", json=GENERATE_PAYLOAD, headers=ctx.auth_headers),
+            ctx.args.generate_requests,
+            concurrency,
+        )
+    return results
+
+def publish(ctx: BenchContext) -> Dict[str, Any]:
+    """/publish enqueue latency per concurrency level (queue switched OFF so nothing drains)."""
+    ctx.client.post("/api/queue/status", json={"status": "OFF"})
+    # Same text every time: measures the near-duplicate lookup too, without being held back by it
+    payload = {"platform": "facebook", "text": "Inscripciones abiertas en la universidad", "allow_duplicate": True}
+    results = {}
+    for concurrency in ctx.args.concurrency:
+        results[f"c{concurrency}"] = _timed_requests(
+            lambda: ctx.client.post("/api/publish", json=payload, headers=ctx.auth_headers),
+            ctx.args.publish_requests,
+            concurrency,
+        )
+    _reset_publications()
+    return results
+
+def queue_drain(ctx: BenchContext) -> Dict[str, Any]:
+    """Time to drain N pending publications against the fake APIs with W concurrent workers."""
+    from app.db.session import SessionLocal
+    from app.models.publication import Publication
+    from app.services.queue_service import queue_service
+
+    ctx.client.post("/api/queue/status", json={"status": "OFF"})
+    results = {}
+    for workers in ctx.args.workers:
+        _reset_publications()
+        _bulk_insert_publications(ctx.args.queue_items, status="pending")
+
+        def worker():
+            while queue_service.process_pending_publications(limit=ctx.args.queue_batch)["processed"]:
+                pass
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        db = SessionLocal()
+        try:
+            done = db.query(Publication).filter(Publication.status.in_(["published", "failed"])).count()
+        finally:
+            db.close()
+        results[f"w{workers}"] = {
+            "items": ctx.args.queue_items,
+            "completed": done,
+            "drain_s": round(elapsed, 3),
+            "throughput_per_s": round(done / elapsed, 3) if elapsed else 0.0,
+        }
+    _reset_publications()
+    return results
+
+def pagination(ctx: BenchContext) -> Dict[str, Any]:
+    """/publications page latency at the first, middle and last page for each table size."""
+    results = {}
+    for rows in ctx.args.pagination_rows:
+        _reset_publications()
+        seed_start = time.perf_counter()
+        _bulk_insert_publications(rows, status="published")
+        seed_s = time.perf_counter() - seed_start
+
+        size_result: Dict[str, Any] = {"seed_s": round(seed_s, 3)}
+        for label, skip in (("first", 0), ("middle", rows // 2), ("last", max(rows - 100, 0))):
+            samples = []
+            payload_bytes = 0
+            for _ in range(ctx.args.pagination_repeats):
+                start = time.perf_counter()
+                response = ctx.client.get("/api/publications", params={"skip": skip, "limit": 100})
+                samples.append(time.perf_counter() - start)
+                payload_bytes = len(response.content)
+            size_result[label] = {**percentiles(samples), "payload_bytes": payload_bytes}
+        results[f"rows_{rows}"] = size_result
+    _reset_publications()
+    return results
+
+def _sync_publications_route() -> str:
+    """
+    Benchmark-only copy of /publications as it was before the async session: an async handler running the
+    sync query on the event loop. Registered once on the running app; returns its path.
+    """
+    from fastapi import Depends
+    from sqlalchemy.orm import Session
+    from app.api import deps
+    from app.api.routes import PUBLICATION_COLUMNS
+    from app.main import app
+    from app.models.publication import Publication
+
+    path = "/bench/publications-sync"
+    if not any(getattr(route, "path", None) == path for route in app.router.routes):
+        async def sync_publications(db: Session = Depends(deps.get_db), skip: int = 0, limit: int = 100):
+            rows = db.query(*PUBLICATION_COLUMNS).order_by(Publication.created_at.desc()).offset(skip).limit(limit).all()
+            return [dict(row._mapping) for row in rows]
+
+        app.add_api_route(path, sync_publications, methods=["GET"], include_in_schema=False)
+    return path
+
+def db_concurrency(ctx: BenchContext) -> Dict[str, Any]:
+    """
+    /publications pages per concurrency level, served by the sync session on the event loop (the old
+    handlers) vs the async session. A probe hits /health one request at a time meanwhile: its latency is
+    how long everything else waits behind the database.
+    """
+    sync_path = _sync_publications_route()
+    _reset_publications()
+    _bulk_insert_publications(ctx.args.db_rows, status="published")
+    params = {"skip": ctx.args.db_rows // 2, "limit": 100}
+
+    results: Dict[str, Any] = {}
+    for concurrency in ctx.args.concurrency:
+        for mode, path in (("sync", sync_path), ("async", "/api/publications")):
+            probes: List[float] = []
+            stop = threading.Event()
+
+            def probe():
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    ctx.client.get("/health")
+                    probes.append(time.perf_counter() - start)
+
+            prober = threading.Thread(target=probe)
+            prober.start()
+            try:
+                summary = _timed_requests(lambda: ctx.client.get(path, params=params), ctx.args.db_requests, concurrency)
+            finally:
+                stop.set()
+                prober.join()
+            results[f"c{concurrency}_{mode}"] = {**summary, "health": percentiles(probes)}
+    _reset_publications()
+    return results
+
+def _mean_ms(fn: Callable[[], Any], repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return round((time.perf_counter() - start) * 1000 / repeats, 4)
+
+def payloads(ctx: BenchContext) -> Dict[str, Any]:
+    """
+    Wire bytes and latency of /generate and /publications per Accept-Encoding (compression only applies
+    with --fast-responses), plus in-process JSON vs orjson render time and ORM vs column-projected loads.
+    """
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from app.api.routes import PUBLICATION_COLUMNS, PublicationResponse
+    from app.core.responses import ORJSONResponse
+    from app.db.session import SessionLocal
+    from app.models.publication import Publication
+
+    repeats = ctx.args.payload_repeats
+    _reset_publications()
+    _bulk_insert_publications(ctx.args.payload_rows, status="published")
+
+    results: Dict[str, Any] = {}
+    for encoding in ("identity", "gzip", "br"):
+        headers = {**ctx.auth_headers, "Accept-Encoding": encoding}
+        generated = ctx.client.post("/api/generate", json=GENERATE_PAYLOAD, headers=headers)
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            listed = ctx.client.get("/api/publications", params={"limit": 100}, headers={"Accept-Encoding": encoding})
+            samples.append(time.perf_counter() - start)
+        results[encoding] = {
+            "generate_bytes": generated.num_bytes_downloaded,
+            "publications_bytes": listed.num_bytes_downloaded,
+            "publications": percentiles(samples),
+        }
+
+    # Rendering of the same payloads outside the server (jsonable_encoder runs either way, so it is left out)
+    documents = {"generate": generated.json(), "publications": listed.json()}
+    for name, document in documents.items():
+        document = jsonable_encoder(document)
+        entry = {"json_render_ms": _mean_ms(lambda: JSONResponse(document), repeats * 10)}
+        if ORJSONResponse is not None:
+            entry["orjson_render_ms"] = _mean_ms(lambda: ORJSONResponse(document), repeats * 10)
+        results[f"serialize_{name}"] = entry
+
+    db = SessionLocal()
+    try:
+        def orm_page():
+            rows = db.query(Publication).order_by(Publication.created_at.desc()).limit(100).all()
+            return [PublicationResponse.model_validate(row) for row in rows]
+
+        def projected_page():
+            rows = db.query(*PUBLICATION_COLUMNS).order_by(Publication.created_at.desc()).limit(100).all()
+            return [PublicationResponse.model_validate(row) for row in rows]
+
+        results["publications_query"] = {
+            "orm_ms": _mean_ms(lambda: (orm_page(), db.expunge_all()), repeats),
+            "projected_ms": _mean_ms(projected_page, repeats),
+        }
+    finally:
+        db.close()
+
+    _reset_publications()
+    return results
+
+def lanes(ctx: BenchContext) -> Dict[str, Any]:
+    """
+    Mixed backlog (one TikTok upload every few Facebook posts) drained by one FIFO drain vs per-platform
+    lanes. Reports how long Facebook posts wait behind the uploads (time from drain start to published).
+    """
+    from app.db.session import SessionLocal, engine
+    from app.models.publication import Publication
+    from app.services.background_workers import QueueLanes
+    from app.services.queue_service import queue_service
+
+    ctx.client.post("/api/queue/status", json={"status": "OFF"})
+    original_config = httpx.get(f"{ctx.fake_url}/_fake/config").json()
+    slow_upload = {"latency": {"dist": "constant", "ms": ctx.args.lanes_upload_ms}}
+    httpx.put(f"{ctx.fake_url}/_fake/config", json={**original_config, "routes": {"tiktok.upload": slow_upload}})
+
+    async def drain_lanes():
+        queue_lanes = QueueLanes()
+        queue_lanes.dispatch((await asyncio.to_thread(queue_service.get_queue_stats))["lanes"])
+        await asyncio.gather(*queue_lanes._running.values())
+        await queue_lanes.shutdown()
+
+    results = {}
+    with tempfile.NamedTemporaryFile(suffix=".mp4") as video:
+        video.write(b"\0" * 1024)
+        video.flush()
+        try:
+            for mode in ("fifo", "lanes"):
+                _reset_publications()
+                created = datetime.utcnow() - timedelta(seconds=ctx.args.lanes_items)
+                rows = [
+                    {
+                        "platform": "tiktok" if i % ctx.args.lanes_tiktok_every == 0 else "facebook",
+                        "text": f"Publicación {i}",
+                        "video_path": video.name,
+                        "status": "pending",
+                        "created_at": created + timedelta(seconds=i),
+                    }
+                    for i in range(ctx.args.lanes_items)
+                ]
+                with engine.begin() as conn:
+                    conn.execute(Publication.__table__.insert(), rows)
+
+                started_at = datetime.utcnow()
+                start = time.perf_counter()
+                if mode == "fifo":
+                    queue_service.process_pending_publications()
+                else:
+                    asyncio.run(drain_lanes())
+                elapsed = time.perf_counter() - start
+
+                db = SessionLocal()
+                try:
+                    waits = {
+                        platform: [(row.processed_at - started_at).total_seconds() for row in db.query(Publication.processed_at).filter(
+                            Publication.platform == platform, Publication.processed_at.isnot(None)
+                        )]
+                        for platform in ("facebook", "tiktok")
+                    }
+                finally:
+                    db.close()
+                results[mode] = {
+                    "drain_s": round(elapsed, 3),
+                    "facebook_wait": percentiles(waits["facebook"]),
+                    "tiktok_wait": percentiles(waits["tiktok"]),
+                }
+        finally:
+            httpx.put(f"{ctx.fake_url}/_fake/config", json=original_config)
+            _reset_publications()
+    return results
+
+def fairness(ctx: BenchContext) -> Dict[str, Any]:
+    """
+    One user's large backlog followed by a few posts from other users, drained by one Facebook lane in
+    insertion order vs with the fair scheduler. Reports how long each group waits (drain start to published).
+    """
+    from app.core.config import settings
+    from app.db.session import SessionLocal, engine
+    from app.models.publication import Publication
+    from app.services.queue_service import queue_service
+
+    ctx.client.post("/api/queue/status", json={"status": "OFF"})
+    original = settings.QUEUE_SCHEDULING
+    heavy, light_users, per_light = ctx.args.fairness_items, ctx.args.fairness_users, 5
+    results = {}
+    try:
+        for mode in ("fifo", "fair"):
+            settings.QUEUE_SCHEDULING = mode
+            _reset_publications()
+            created = datetime.utcnow() - timedelta(seconds=heavy + light_users * per_light)
+            owners = [1] * heavy + [user for user in range(2, light_users + 2) for _ in range(per_light)]
+            rows = [
+                {"user_id": user_id, "platform": "facebook", "text": f"Publicación {i}", "status": "pending",
+                 "created_at": created + timedelta(seconds=i)}
+                for i, user_id in enumerate(owners)
+            ]
+            with engine.begin() as conn:
+                conn.execute(Publication.__table__.insert(), rows)
+
+            started_at = datetime.utcnow()
+            queue_service.process_pending_publications(platform="facebook")
+            db = SessionLocal()
+            try:
+                waits = {"heavy_user": [], "other_users": []}
+                for user_id, processed_at in db.query(Publication.user_id, Publication.processed_at).filter(
+                    Publication.processed_at.isnot(None)
+                ):
+                    group = "heavy_user" if user_id == 1 else "other_users"
+                    waits[group].append((processed_at - started_at).total_seconds())
+            finally:
+                db.close()
+            results[mode] = {group: percentiles(samples) for group, samples in waits.items()}
+    finally:
+        settings.QUEUE_SCHEDULING = original
+        _reset_publications()
+    return results
+
+def video(ctx: BenchContext) -> Dict[str, Any]:
+    """MoviePy encode time for the 6 s TikTok clip."""
+    from app.services.media_generator import MediaGenerator, load_image_clip
+    from fake_api.server import render_png
+
+    if load_image_clip() is None:
+        return {"skipped": "MoviePy not installed"}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        generator = MediaGenerator()
+        generator.video_dir = tmp
+        image_path = f"{tmp}/frame.png"
+        with open(image_path, "wb") as f:
+            f.write(render_png(1024, 1024))
+
+        samples = []
+        for _ in range(ctx.args.video_repeats):
+            start = time.perf_counter()
+            generator.create_video_from_image(image_path, duration=6)
+            samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+def near_duplicates(ctx: BenchContext) -> Dict[str, Any]:
+    """
+    In-process MinHash LSH index: insert time, memory and lookup latency over N synthetic announcements,
+    plus how many slight rewordings (3 words swapped) are found.
+    """
+    import random
+    from app.services.near_duplicates import NearDuplicateIndex
+
+    rng = random.Random(7)
+    vocabulary = [f"palabra{i}" for i in range(5000)]
+    items = ctx.args.near_duplicate_items
+    texts = [" ".join(rng.choices(vocabulary, k=60)) for _ in range(items)]
+
+    index = NearDuplicateIndex()
+    start = time.perf_counter()
+    index.add_many(enumerate(texts))
+    insert_s = time.perf_counter() - start
+
+    def reword(text: str) -> str:
+        words = text.split()
+        for position in rng.sample(range(len(words)), 3):
+            words[position] = rng.choice(vocabulary)
+        return " ".join(words)
+
+    queries = [(ref, reword(texts[ref])) for ref in rng.sample(range(items), min(1000, items))]
+    samples, found = [], 0
+    for ref, text in queries:
+        start = time.perf_counter()
+        matches = index.query(text, 0.7)
+        samples.append(time.perf_counter() - start)
+        found += any(match == ref for match, _ in matches)
+    return {
+        "items": items,
+        "insert_us_per_item": round(insert_s * 1e6 / items, 1),
+        "index_mb": round(index.nbytes / 1e6, 1),
+        "query": percentiles(samples),
+        "rewordings_found": round(found / len(queries), 3),
+    }
+
+SCENARIOS = {
+    "generate": generate,
+    "publish": publish,
+    "queue": queue_drain,
+    "lanes": lanes,
+    "fairness": fairness,
+    "pagination": pagination,
+    "db_concurrency": db_concurrency,
+    "payloads": payloads,
+    "video": video,
+    "near_duplicates": near_duplicates,
+}
+
+def run_scenario(name: str, ctx: BenchContext) -> Dict[str, Any]:
+    result: Dict[str, Any] = {}
+    with track_memory(result, enabled=ctx.args.trace_memory):
+        start = time.perf_counter()
+        result.update(SCENARIOS[name](ctx))
+        result["wall_s"] = round(time.perf_counter() - start, 3)
+    return result
@@ -0,0 +1,2 @@
+from .config import FakeApiConfig, LatencyConfig, RouteConfig
+from .server import create_app
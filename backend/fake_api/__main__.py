@@ -0,0 +1,37 @@
+"""
+Runs the stand-in for OpenAI, Graph, LinkedIn, TikTok and Whapi.
+
+    python -m fake_api --port 9000 --config fake_api.json
+
+Then point the backend at it:
+
+    OPENAI_BASE_URL=http://127.0.0.1:9000/openai/v1
+    GRAPH_API_BASE_URL=http://127.0.0.1:9000/graph
+    LINKEDIN_API_BASE_URL=http://127.0.0.1:9000/linkedin/v2
+    TIKTOK_API_BASE_URL=http://127.0.0.1:9000/tiktok/v2
+    WHAPI_BASE_URL=http://127.0.0.1:9000/whapi
+"""
+import argparse
+import uvicorn
+from .config import FakeApiConfig
+from .server import create_app
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake third-party API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--config", help="JSON file with latency/error/throttle settings")
+    parser.add_argument("--seed", type=int, help="Seed for reproducible latency and error injection")
+    parser.add_argument("--record-file", help="Append every received payload to this JSONL file")
+    args = parser.parse_args()
+
+    config = FakeApiConfig.from_file(args.config) if args.config else FakeApiConfig()
+    if args.seed is not None:
+        config.seed = args.seed
+    if args.record_file:
+        config.record_file = args.record_file
+
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import json
+import math
+import random
+from typing import Dict, Optional
+from pydantic import BaseModel
+
+class LatencyConfig(BaseModel):
+    """
+    Latency distribution for a fake endpoint.
+    dist: constant (ms), uniform (min_ms..max_ms), normal (mean_ms, stddev_ms) or lognormal (median_ms, sigma).
+    """
+    dist: str = "constant"
+    ms: float = 0
+    min_ms: float = 0
+    max_ms: float = 0
+    mean_ms: float = 0
+    stddev_ms: float = 0
+    median_ms: float = 0
+    sigma: float = 0.5
+
+    def sample(self, rng: random.Random) -> float:
+        """Returns a latency in seconds."""
+        if self.dist == "uniform":
+            value = rng.uniform(self.min_ms, self.max_ms)
+        elif self.dist == "normal":
+            value = rng.gauss(self.mean_ms, self.stddev_ms)
+        elif self.dist == "lognormal":
+            value = rng.lognormvariate(math.log(max(self.median_ms, 1e-3)), self.sigma)
+        else:
+            value = self.ms
+        return max(value, 0) / 1000
+
+class RouteConfig(BaseModel):
+    latency: LatencyConfig = LatencyConfig()
+    error_rate: float = 0.0      # fraction of calls answered with a 5xx
+    throttle_rate: float = 0.0   # fraction of calls answered with 429 + Retry-After
+    retry_after: int = 1
+
+class FakeApiConfig(BaseModel):
+    """
+    Behaviour of the stand-in server. Route names:
+    openai.chat, openai.images, openai.files, openai.batches, openai.batch_request, files, graph.photos, graph.feed, graph.media, graph.media_publish,
+    linkedin.register_upload, linkedin.upload, linkedin.ugc_posts, tiktok.init, tiktok.upload, whapi.stories
+    """
+    default: RouteConfig = RouteConfig()
+    routes: Dict[str, RouteConfig] = {}
+    seed: Optional[int] = None
+    record_limit: int = 10000
+    record_file: Optional[str] = None
+    # Seconds a batch stays in_progress before it completes; error_rate of the openai.batch_request
+    # route decides which lines land in the error file
+    batch_delay_seconds: float = 0.0
+
+    def for_route(self, name: str) -> RouteConfig:
+        return self.routes.get(name, self.default)
+
+    @classmethod
+    def from_file(cls, path: str) -> "FakeApiConfig":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(**json.load(f))
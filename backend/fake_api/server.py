@@ -0,0 +1,423 @@
+import asyncio
+import base64
+import json
+import random
+import re
+import struct
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from .config import FakeApiConfig
+
+REDACTED_HEADERS = {"authorization"}
+REDACTED_PARAMS = {"access_token", "api_key"}
+
+@lru_cache(maxsize=8)
+def render_png(width: int, height: int) -> bytes:
+    """Solid-colour RGB PNG built with zlib only, big enough for MoviePy to encode."""
+    row = b"\x00" + bytes((0, 82, 155)) * width
+    raw = row * height
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+class FakeApiState:
+    """Config, RNG and recorded payloads shared by every fake endpoint."""
+
+    def __init__(self, config: FakeApiConfig):
+        self.lock = threading.Lock()
+        # Uploaded files and batches of the OpenAI Batch API stand-in
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self.configure(config)
+
+    def configure(self, config: FakeApiConfig) -> None:
+        with self.lock:
+            self.config = config
+            self.rng = random.Random(config.seed)
+            self.recordings: deque = deque(maxlen=config.record_limit)
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        with self.lock:
+            self.recordings.append(entry)
+            record_file = self.config.record_file
+        if record_file:
+            with open(record_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+
+    def snapshot(self, route: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [r for r in self.recordings if route is None or r["route"] == route]
+
+def _error_body(provider: str, status: int, message: str) -> Dict[str, Any]:
+    """Error payloads shaped like each provider's, so publisher error handling is exercised."""
+    if provider == "graph":
+        return {"error": {"message": message, "type": "OAuthException", "code": 4 if status == 429 else 2}}
+    if provider == "tiktok":
+        code = "rate_limit_exceeded" if status == 429 else "internal_error"
+        return {"error": {"code": code, "message": message, "log_id": uuid.uuid4().hex}}
+    if provider == "openai":
+        kind = "rate_limit_error" if status == 429 else "server_error"
+        return {"error": {"message": message, "type": kind, "code": None}}
+    return {"error": {"message": message, "status": status}}
+
+async def _read_body(request: Request) -> Any:
+    raw = await request.body()
+    if not raw:
+        return None
+    content_type = request.headers.get("content-type", "")
+    if "application/json" in content_type:
+        try:
+            return json.loads(raw)
+        except ValueError:
+            pass
+    if "application/x-www-form-urlencoded" in content_type:
+        return {k: ("[REDACTED]" if k in REDACTED_PARAMS else v) for k, v in (await request.form()).items()}
+    return {"bytes": len(raw), "content_type": content_type}
+
+async def simulate(request: Request, route: str, body: Any = None) -> Optional[Response]:
+    """
+    Records the call, waits the configured latency and, if the dice say so, returns a throttle or error response.
+    Returns None when the endpoint should answer normally.
+    """
+    state: FakeApiState = request.app.state.fake
+    route_config = state.config.for_route(route)
+    with state.lock:
+        delay = route_config.latency.sample(state.rng)
+        roll = state.rng.random()
+
+    if roll < route_config.throttle_rate:
+        outcome = 429
+    elif roll < route_config.throttle_rate + route_config.error_rate:
+        outcome = 500
+    else:
+        outcome = 200
+
+    state.record({
+        "time": time.time(),
+        "route": route,
+        "method": request.method,
+        "path": request.url.path,
+        "query": {k: ("[REDACTED]" if k in REDACTED_PARAMS else v) for k, v in request.query_params.items()},
+        "headers": {k: ("[REDACTED]" if k in REDACTED_HEADERS else v) for k, v in request.headers.items()},
+        "body": body,
+        "latency_ms": round(delay * 1000, 3),
+        "status": outcome,
+    })
+
+    if delay:
+        await asyncio.sleep(delay)
+
+    provider = route.split(".")[0]
+    if outcome == 429:
+        return JSONResponse(
+            _error_body(provider, 429, "Rate limit reached (injected)"),
+            status_code=429,
+            headers={"Retry-After": str(route_config.retry_after)},
+        )
+    if outcome == 500:
+        return JSONResponse(_error_body(provider, 500, "Internal error (injected)"), status_code=500)
+    return None
+
+def _fake_social_content(user_prompt: str) -> Dict[str, Dict[str, Any]]:
+    match = re.search(r"Target Platforms:\s*(.+)", user_prompt)
+    platforms = [p.strip() for p in match.group(1).split(",")] if match else ["facebook"]
+    title_match = re.search(r"Title:\s*(.+)", user_prompt)
+    title = title_match.group(1).strip() if title_match else "Anuncio universitario"
+
+    content = {}
+    for platform in platforms:
+        entry = {
+            "text": f"{title} - publicación para {platform}",
+            "image_prompt": f"Campus universitario moderno, {title}",
+            "hashtags": ["#Universidad", "#Campus"],
+            "tone": "Profesional",
+        }
+        if platform == "tiktok":
+            entry["script"] = f"Escena 1: {title}. Escena 2: ¡Te esperamos!"
+        content[platform] = entry
+    return content
+
+def _chat_completion(body: Dict[str, Any]) -> Dict[str, Any]:
+    messages = body.get("messages", [])
+    user_prompt = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+    content = json.dumps(_fake_social_content(user_prompt), ensure_ascii=False)
+    prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-3.5-turbo"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+def _store_file(state: FakeApiState, content: bytes, filename: str, purpose: str) -> Dict[str, Any]:
+    file_obj = {
+        "id": f"file-{uuid.uuid4().hex}",
+        "object": "file",
+        "bytes": len(content),
+        "created_at": int(time.time()),
+        "filename": filename,
+        "purpose": purpose,
+        "status": "processed",
+    }
+    with state.lock:
+        state.files[file_obj["id"]] = {**file_obj, "content": content}
+    return file_obj
+
+def _complete_batch(state: FakeApiState, batch: Dict[str, Any]) -> None:
+    """Runs every line of the input file through the fake chat completion and writes output/error files."""
+    with state.lock:
+        content = state.files[batch["input_file_id"]]["content"].decode("utf-8")
+        lines = [line for line in content.splitlines() if line.strip()]
+        route_config = state.config.for_route("openai.batch_request")
+        rolls = [state.rng.random() for _ in lines]
+
+    output, errors = [], []
+    for line, roll in zip(lines, rolls):
+        request = json.loads(line)
+        entry = {"id": f"batch_req_{uuid.uuid4().hex}", "custom_id": request.get("custom_id"), "error": None}
+        if roll < route_config.error_rate:
+            entry["response"] = {
+                "status_code": 500,
+                "request_id": uuid.uuid4().hex,
+                "body": _error_body("openai", 500, "Internal error (injected)"),
+            }
+            errors.append(entry)
+        else:
+            entry["response"] = {"status_code": 200, "request_id": uuid.uuid4().hex, "body": _chat_completion(request.get("body") or {})}
+            output.append(entry)
+
+    def jsonl(entries):
+        return "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries).encode("utf-8")
+
+    batch["output_file_id"] = _store_file(state, jsonl(output), "batch_output.jsonl", "batch_output")["id"] if output else None
+    batch["error_file_id"] = _store_file(state, jsonl(errors), "batch_errors.jsonl", "batch_output")["id"] if errors else None
+    batch["status"] = "completed"
+    batch["completed_at"] = int(time.time())
+    batch["request_counts"] = {"total": len(output) + len(errors), "completed": len(output), "failed": len(errors)}
+
+def create_app(config: Optional[FakeApiConfig] = None) -> FastAPI:
+    app = FastAPI(title="Fake third-party APIs")
+    app.state.fake = FakeApiState(config or FakeApiConfig())
+
+    # --- Control endpoints ---
+
+    @app.get("/_fake/config")
+    def get_config():
+        return app.state.fake.config.model_dump()
+
+    @app.put("/_fake/config")
+    def put_config(config: FakeApiConfig):
+        app.state.fake.configure(config)
+        return config.model_dump()
+
+    @app.get("/_fake/recordings")
+    def get_recordings(route: Optional[str] = None):
+        return app.state.fake.snapshot(route)
+
+    @app.delete("/_fake/recordings")
+    def clear_recordings():
+        with app.state.fake.lock:
+            app.state.fake.recordings.clear()
+        return {"cleared": True}
+
+    # --- OpenAI ---
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await _read_body(request)
+        if (error := await simulate(request, "openai.chat", body)) is not None:
+            return error
+        return _chat_completion(body or {})
+
+    @app.post("/openai/v1/images/generations")
+    async def images_generations(request: Request):
+        body = await _read_body(request) or {}
+        if (error := await simulate(request, "openai.images", body)) is not None:
+            return error
+        size = body.get("size", "512x512")
+        width, height = (int(v) for v in size.split("x"))
+        if body.get("response_format") == "b64_json":
+            data = [{"b64_json": base64.b64encode(render_png(width, height)).decode()}]
+        else:
+            data = [{"url": str(request.url_for("fake_file", size=size))}]
+        return {"created": int(time.time()), "data": data * int(body.get("n", 1))}
+
+    # --- OpenAI Batch API ---
+
+    @app.post("/openai/v1/files")
+    async def openai_upload_file(request: Request):
+        form = await request.form()
+        upload = form["file"]
+        content = await upload.read()
+        purpose = form.get("purpose", "batch")
+        if (error := await simulate(request, "openai.files", {"purpose": purpose, "bytes": len(content)})) is not None:
+            return error
+        return _store_file(app.state.fake, content, upload.filename or "upload.jsonl", purpose)
+
+    @app.get("/openai/v1/files/{file_id}/content")
+    async def openai_file_content(file_id: str, request: Request):
+        if (error := await simulate(request, "openai.files")) is not None:
+            return error
+        stored = app.state.fake.files.get(file_id)
+        if stored is None:
+            return JSONResponse(_error_body("openai", 404, f"No such File object: {file_id}"), status_code=404)
+        return Response(content=stored["content"], media_type="application/octet-stream")
+
+    @app.post("/openai/v1/batches")
+    async def openai_create_batch(request: Request):
+        body = await _read_body(request) or {}
+        if (error := await simulate(request, "openai.batches", body)) is not None:
+            return error
+        stored = app.state.fake.files.get(body.get("input_file_id"))
+        if stored is None:
+            return JSONResponse(_error_body("openai", 400, "input_file_id not found"), status_code=400)
+        total = sum(1 for line in stored["content"].splitlines() if line.strip())
+        batch = {
+            "id": f"batch_{uuid.uuid4().hex}",
+            "object": "batch",
+            "endpoint": body.get("endpoint"),
+            "input_file_id": body["input_file_id"],
+            "completion_window": body.get("completion_window", "24h"),
+            "status": "in_progress",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+            "completed_at": None,
+            "request_counts": {"total": total, "completed": 0, "failed": 0},
+            "metadata": body.get("metadata"),
+        }
+        with app.state.fake.lock:
+            app.state.fake.batches[batch["id"]] = batch
+        return batch
+
+    @app.get("/openai/v1/batches/{batch_id}")
+    async def openai_retrieve_batch(batch_id: str, request: Request):
+        if (error := await simulate(request, "openai.batches")) is not None:
+            return error
+        state = app.state.fake
+        batch = state.batches.get(batch_id)
+        if batch is None:
+            return JSONResponse(_error_body("openai", 404, f"No such Batch object: {batch_id}"), status_code=404)
+        if batch["status"] == "in_progress" and time.time() - batch["created_at"] >= state.config.batch_delay_seconds:
+            _complete_batch(state, batch)
+        return batch
+
+    @app.get("/files/{size}.png", name="fake_file")
+    async def fake_file(size: str, request: Request):
+        if (error := await simulate(request, "files")) is not None:
+            return error
+        width, height = (int(v) for v in size.split("x"))
+        return Response(render_png(width, height), media_type="image/png")
+
+    @app.head("/files/{size}.png")
+    async def fake_file_head(size: str):
+        return Response(headers={"Content-Type": "image/png"})
+
+    # --- Facebook / Instagram Graph API ---
+
+    @app.post("/graph/{version}/{node_id}/photos")
+    async def graph_photos(node_id: str, request: Request):
+        if (error := await simulate(request, "graph.photos", await _read_body(request))) is not None:
+            return error
+        return {"id": uuid.uuid4().hex[:15], "post_id": f"{node_id}_{uuid.uuid4().hex[:15]}"}
+
+    @app.post("/graph/{version}/{node_id}/feed")
+    async def graph_feed(node_id: str, request: Request):
+        if (error := await simulate(request, "graph.feed", await _read_body(request))) is not None:
+            return error
+        return {"id": f"{node_id}_{uuid.uuid4().hex[:15]}"}
+
+    @app.post("/graph/{version}/{node_id}/media")
+    async def graph_media(node_id: str, request: Request):
+        if (error := await simulate(request, "graph.media", await _read_body(request))) is not None:
+            return error
+        return {"id": uuid.uuid4().hex[:17]}
+
+    @app.post("/graph/{version}/{node_id}/media_publish")
+    async def graph_media_publish(node_id: str, request: Request):
+        if (error := await simulate(request, "graph.media_publish", await _read_body(request))) is not None:
+            return error
+        return {"id": uuid.uuid4().hex[:17]}
+
+    # --- LinkedIn ---
+
+    @app.post("/linkedin/v2/assets")
+    async def linkedin_register_upload(request: Request):
+        if (error := await simulate(request, "linkedin.register_upload", await _read_body(request))) is not None:
+            return error
+        asset_id = uuid.uuid4().hex
+        return {
+            "value": {
+                "uploadMechanism": {
+                    "com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest": {
+                        "uploadUrl": str(request.url_for("linkedin_upload", asset_id=asset_id)),
+                        "headers": {},
+                    }
+                },
+                "asset": f"urn:li:digitalmediaAsset:{asset_id}",
+            }
+        }
+
+    @app.put("/linkedin/upload/{asset_id}", name="linkedin_upload")
+    async def linkedin_upload(asset_id: str, request: Request):
+        if (error := await simulate(request, "linkedin.upload", await _read_body(request))) is not None:
+            return error
+        return Response(status_code=201)
+
+    @app.post("/linkedin/v2/ugcPosts")
+    async def linkedin_ugc_posts(request: Request):
+        if (error := await simulate(request, "linkedin.ugc_posts", await _read_body(request))) is not None:
+            return error
+        return JSONResponse({"id": f"urn:li:share:{uuid.uuid4().int % 10**19}"}, status_code=201)
+
+    # --- TikTok ---
+
+    @app.post("/tiktok/v2/post/publish/video/init/")
+    async def tiktok_init(request: Request):
+        if (error := await simulate(request, "tiktok.init", await _read_body(request))) is not None:
+            return error
+        publish_id = f"v_pub_file~v2-1.{uuid.uuid4().int % 10**18}"
+        return {
+            "data": {
+                "publish_id": publish_id,
+                "upload_url": str(request.url_for("tiktok_upload", publish_id=publish_id)),
+            },
+            "error": {"code": "ok", "message": "", "log_id": uuid.uuid4().hex},
+        }
+
+    @app.put("/tiktok/upload/{publish_id}", name="tiktok_upload")
+    async def tiktok_upload(publish_id: str, request: Request):
+        if (error := await simulate(request, "tiktok.upload", await _read_body(request))) is not None:
+            return error
+        return Response(status_code=201)
+
+    # --- Whapi.cloud ---
+
+    @app.post("/whapi/stories/send/media")
+    async def whapi_stories(request: Request):
+        if (error := await simulate(request, "whapi.stories", await _read_body(request))) is not None:
+            return error
+        return {"sent": True, "message": {"id": uuid.uuid4().hex, "status": "pending"}}
+
+    return app
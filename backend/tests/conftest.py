@@ -0,0 +1,15 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app import models  # noqa: F401 - registers every table on Base.metadata
+from app.db.base import Base
+
+
+@pytest.fixture
+def session_factory():
+    """sessionmaker for a fresh in-memory SQLite database with every table, usable from worker threads."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
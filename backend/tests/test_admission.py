@@ -0,0 +1,191 @@
+import asyncio
+import threading
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from app.api import deps
+from app.core.admission import AdmissionController, AdmissionRejected, parse_admission
+from app.main import app as application
+from app.services.generation_pipeline import get_pipeline
+
+
+class TestAdmissionController:
+
+    def test_parse_admission(self):
+        assert parse_admission("Generate=4:16:30, publish=2") == {
+            "generate": {"concurrency": 4, "queue": 16, "max_wait": 30.0},
+            "publish": {"concurrency": 2},
+        }
+        assert parse_admission("") == {}
+
+    def test_queue_hands_slots_over_in_order_and_sheds_when_full(self):
+        controller = AdmissionController("test", concurrency=1, queue=2, max_wait=5)
+        order = []
+
+        async def request(name, release):
+            async with controller.slot(name):
+                order.append(name)
+                await release.wait()
+
+        async def run():
+            releases = [asyncio.Event() for _ in range(3)]
+            tasks = [asyncio.create_task(request(f"u{i}", releases[i])) for i in range(3)]
+            await asyncio.sleep(0)
+            # One running, two queued: the fourth is turned away at once
+            with pytest.raises(AdmissionRejected) as rejected:
+                await request("u3", asyncio.Event())
+            state = (controller.in_flight, len(controller._waiters))
+            for release in releases:
+                release.set()
+                await asyncio.sleep(0.01)
+            await asyncio.gather(*tasks)
+            return rejected.value, state
+
+        rejected, state = asyncio.run(run())
+
+        assert state == (1, 2)
+        assert (rejected.status_code, rejected.reason, rejected.retry_after) == (503, "queue_full", 1)
+        assert order == ["u0", "u1", "u2"]
+        assert controller.in_flight == 0 and not controller._users
+
+    def test_deadline_aware_rejection_and_wait_timeout(self):
+        controller = AdmissionController("test", concurrency=1, queue=10, max_wait=0.05)
+
+        async def run():
+            release = asyncio.Event()
+
+            async def hold():
+                async with controller.slot():
+                    await release.wait()
+
+            holder = asyncio.create_task(hold())
+            await asyncio.sleep(0)
+            # Nothing known about service time yet: the request waits, then times out
+            with pytest.raises(AdmissionRejected) as timed_out:
+                async with controller.slot():
+                    pass
+            # Recent requests took 2 s: a 0.05 s wait budget cannot be met, rejected without queueing
+            controller.service_seconds = 2
+            with pytest.raises(AdmissionRejected) as deadline:
+                async with controller.slot():
+                    pass
+            release.set()
+            await holder
+            return timed_out.value, deadline.value
+
+        timed_out, deadline = asyncio.run(run())
+
+        assert timed_out.reason == "timeout"
+        assert (deadline.reason, deadline.retry_after) == ("deadline", 2)
+        assert controller.in_flight == 0 and not controller._waiters
+
+    def test_per_user_cap_and_cancelled_waiter(self):
+        controller = AdmissionController("test", concurrency=1, queue=10, max_wait=5, per_user=1)
+
+        async def run():
+            release = asyncio.Event()
+
+            async def hold(user):
+                async with controller.slot(user):
+                    await release.wait()
+
+            holder = asyncio.create_task(hold("user:1"))
+            await asyncio.sleep(0)
+            with pytest.raises(AdmissionRejected) as capped:
+                await hold("user:1")
+            # A queued client that disconnects leaves the queue
+            waiter = asyncio.create_task(hold("user:2"))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+            queued_after_cancel = len(controller._waiters)
+            release.set()
+            await holder
+            return capped.value, queued_after_cancel
+
+        capped, queued_after_cancel = asyncio.run(run())
+
+        assert capped.status_code == 429
+        assert queued_after_cancel == 0
+        assert controller.in_flight == 0 and not controller._users
+
+
+class TestGenerateAdmission:
+
+    def setup_method(self):
+        self.controller = AdmissionController("generate", concurrency=1, queue=0, max_wait=5, per_user=2)
+        self.patch = patch("app.api.deps.admission_controller", return_value=self.controller)
+        self.patch.start()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.pipeline = MagicMock()
+
+        def generate(*args, **kwargs):
+            self.started.set()
+            self.release.wait(5)
+            return {"facebook": {"text": "ok"}}
+
+        self.pipeline.generate.side_effect = generate
+        application.dependency_overrides[get_pipeline] = lambda: self.pipeline
+        application.dependency_overrides[deps.get_current_user_optional] = lambda: SimpleNamespace(id=1)
+        self.client = TestClient(application)
+
+    def teardown_method(self):
+        self.patch.stop()
+        application.dependency_overrides.clear()
+
+    def test_generate_is_shed_with_retry_after_while_at_capacity(self):
+        payload = {"title": "Congreso", "body": "Anuncio", "platforms": ["facebook"]}
+        first = {}
+        thread = threading.Thread(target=lambda: first.update(response=self.client.post("/api/generate", json=payload)))
+        thread.start()
+        assert self.started.wait(5)
+
+        shed = self.client.post("/api/generate", json=payload)
+        self.release.set()
+        thread.join(5)
+        after = self.client.post("/api/generate", json=payload)
+
+        assert shed.status_code == 503
+        assert int(shed.headers["Retry-After"]) >= 1
+        assert first["response"].status_code == 200
+        assert after.status_code == 200
+        assert self.controller.in_flight == 0
+
+    def test_idempotent_retry_waits_for_the_original_without_taking_a_slot(self, session_factory):
+        def override_get_db():
+            db = session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        application.dependency_overrides[deps.get_db] = override_get_db
+        payload = {"title": "Congreso", "body": "Anuncio", "platforms": ["facebook"]}
+        headers = {"Idempotency-Key": "retry-1"}
+        responses = {}
+        first = threading.Thread(target=lambda: responses.update(first=self.client.post("/api/generate", json=payload, headers=headers)))
+        first.start()
+        assert self.started.wait(5)
+
+        # With one slot and no queue, a retry that took a slot up front would be shed with 503
+        retry = threading.Thread(target=lambda: responses.update(retry=self.client.post("/api/generate", json=payload, headers=headers)))
+        retry.start()
+        retry.join(0.5)
+        waiting = (self.controller.in_flight, len(self.controller._waiters))
+        self.release.set()
+        first.join(5)
+        retry.join(5)
+
+        assert waiting == (1, 0)
+        assert responses["first"].status_code == 200
+        assert responses["retry"].status_code == 200
+        assert responses["retry"].headers["Idempotent-Replayed"] == "true"
+        assert responses["retry"].json() == responses["first"].json()
+        assert self.pipeline.generate.call_count == 1
+        assert self.controller.in_flight == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
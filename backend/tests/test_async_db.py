@@ -0,0 +1,96 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from app.api import deps
+from app.db.base import Base
+from app.db.session import async_database_url
+from app.main import app as application
+from app.models.publication import Publication
+
+
+class TestAsyncDatabaseUrl:
+
+    def test_async_driver_per_backend(self):
+        assert async_database_url("sqlite:///./social_topicos.db") == "sqlite+aiosqlite:///./social_topicos.db"
+        assert async_database_url("postgresql://app:s3cret@db:5432/topicos") == "postgresql+asyncpg://app:s3cret@db:5432/topicos"
+        assert async_database_url("postgresql+psycopg2://app@db/topicos") == "postgresql+asyncpg://app@db/topicos"
+        with pytest.raises(ValueError):
+            async_database_url("mysql://app@db/topicos")
+
+
+class TestAsyncHandlers:
+
+    def setup_method(self):
+        self.engine = engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+
+        async def create_tables():
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+
+        asyncio.run(create_tables())
+        self.SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+        async def override_get_async_db():
+            async with self.SessionLocal() as db:
+                yield db
+
+        application.dependency_overrides[deps.get_async_db] = override_get_async_db
+        self.client = TestClient(application)
+
+    def teardown_method(self):
+        application.dependency_overrides.clear()
+        # aiosqlite's connection thread would keep the test run from exiting
+        asyncio.run(self.engine.dispose())
+
+    def login(self, email):
+        credentials = {"email": email, "password": "clave-segura"}
+        assert self.client.post("/api/auth/register", json=credentials).status_code == 200
+        token = self.client.post("/api/auth/login", data={"username": email, "password": "clave-segura"}).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+    def test_auth_and_chat_history(self):
+        owner = self.login("docente@universidad.edu")
+        other = self.login("alumno@universidad.edu")
+
+        duplicate = self.client.post("/api/auth/register", json={"email": "docente@universidad.edu", "password": "x"})
+        wrong = self.client.post("/api/auth/login", data={"username": "docente@universidad.edu", "password": "x"})
+        chat = self.client.post("/api/chats/", json={"title": "Congreso"}, headers=owner).json()
+        message = self.client.post(f"/api/chats/{chat['id']}/messages", json={"content": "Hola"}, headers=owner)
+
+        assert duplicate.status_code == 400
+        assert wrong.status_code == 401
+        assert message.status_code == 200
+        assert [c["title"] for c in self.client.get("/api/chats/", headers=owner).json()] == ["Congreso"]
+        assert [m["content"] for m in self.client.get(f"/api/chats/{chat['id']}/messages", headers=owner).json()] == ["Hola"]
+        assert self.client.get(f"/api/chats/{chat['id']}/messages", headers=other).status_code == 404
+
+    def test_publications_and_draft_queue(self):
+        headers = self.login("docente@universidad.edu")
+
+        async def add_publications():
+            async with self.SessionLocal() as db:
+                db.add_all([
+                    Publication(user_id=1, platform="facebook", text="Borrador", status="draft"),
+                    Publication(user_id=2, platform="linkedin", text="Ajena", status="published"),
+                ])
+                await db.commit()
+
+        asyncio.run(add_publications())
+
+        mine = self.client.get("/api/publications/me", headers=headers).json()
+        queued = self.client.post("/api/publications/1/queue", headers=headers)
+        again = self.client.post("/api/publications/1/queue", headers=headers)
+
+        assert [p["text"] for p in mine] == ["Borrador"]
+        assert len(self.client.get("/api/publications").json()) == 2
+        assert queued.status_code == 200 and queued.json()["status"] == "pending"
+        assert again.status_code == 409
+        assert self.client.get("/api/publications/2").json()["platform"] == "linkedin"
+        assert self.client.get("/api/publications/99").status_code == 404
+        assert self.client.post("/api/publications/2/queue", headers=headers).status_code == 404
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
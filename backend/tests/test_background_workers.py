@@ -0,0 +1,132 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock, patch
+from app.services.background_workers import BackgroundWorkers
+from app.services.leader_election import LeaderElection, resolve_backend
+
+
+class TestLeaderElection:
+
+    def setup_method(self):
+        self.election = LeaderElection(backend="none")
+
+    def test_resolve_backend(self):
+        with patch("app.services.leader_election.settings") as settings:
+            settings.DATABASE_URL = "postgresql://db/app"
+            assert resolve_backend("auto") == "postgres"
+
+            settings.DATABASE_URL = "sqlite:///./dev.db"
+            settings.REDIS_HOST = "redis"
+            assert resolve_backend("auto") == "redis"
+
+            settings.REDIS_HOST = None
+            assert resolve_backend("auto") == "none"
+
+        with pytest.raises(ValueError):
+            resolve_backend("zookeeper")
+
+    def test_redis_lock_is_taken_renewed_and_lost(self):
+        self.election.backend = "redis"
+        self.election._redis = MagicMock()
+        self.election._redis.set.return_value = True
+
+        assert self.election.acquire()
+        self.election._redis.set.assert_called_once_with(
+            "leader:background-workers", self.election._token, nx=True, px=30000
+        )
+
+        # Renewal succeeds while the key still holds our token
+        self.election._redis.eval.return_value = 1
+        assert self.election.acquire()
+        assert self.election._redis.set.call_count == 1
+
+        # Key expired and another process took it
+        self.election._redis.eval.return_value = 0
+        self.election._redis.set.return_value = None
+        assert not self.election.acquire()
+        assert not self.election.is_leader
+
+    def test_backend_errors_mean_not_leader(self):
+        self.election.backend = "redis"
+        self.election._redis = MagicMock()
+        self.election._redis.set.side_effect = ConnectionError("redis down")
+
+        assert not self.election.acquire()
+
+    def test_postgres_lock_connection_is_dropped_after_an_error(self):
+        self.election.backend = "postgres"
+        engine = MagicMock()
+        first, second = MagicMock(), MagicMock()
+        first.execute.side_effect = ConnectionError("server closed the connection")
+        second.execute.return_value.scalar.return_value = True
+        engine.connect.side_effect = [first, second]
+
+        with patch("app.services.leader_election.create_engine", return_value=engine) as create:
+            assert not self.election.acquire()
+            assert self.election.acquire()
+
+        # Unpooled, and the failed connection is invalidated instead of going back to a pool holding the lock
+        assert create.call_args.kwargs["poolclass"].__name__ == "NullPool"
+        first.invalidate.assert_called_once()
+        assert self.election._connection is second
+
+
+class TestBackgroundWorkers:
+
+    def test_queue_status_is_only_initialized_once(self, session_factory):
+        from app.services.queue_service import QueueService
+
+        service = QueueService()
+        service._redis = None
+        with patch("app.services.queue_service.SessionLocal", session_factory):
+            assert service.initialize_status("ON") == "ON"
+            service.set_status("OFF")
+            # A new leader (or a restart of the workers) keeps the operator's OFF
+            assert service.initialize_status("ON") == "OFF"
+
+        service._redis = MagicMock()
+        service._redis.get.return_value = "OFF"
+        assert service.initialize_status("ON") == "OFF"
+        service._redis.set.assert_called_once_with("queue:status", "ON", nx=True)
+
+    def test_queue_status_is_shared_without_redis(self, session_factory):
+        from app.services.queue_service import QueueService
+
+        api, worker = QueueService(), QueueService()
+        api._redis = worker._redis = None
+        with patch("app.services.queue_service.SessionLocal", session_factory):
+            assert worker.initialize_status("ON") == "ON"
+            # The operator switches the queue off through the API process; the worker sees it on its next tick
+            api.set_status("OFF")
+            assert worker.get_status() == "OFF"
+            assert QueueService().initialize_status("ON") == "OFF"
+
+    def test_workers_follow_leadership(self):
+        election = MagicMock(backend="redis", ttl_seconds=3)
+        election.acquire.side_effect = [True, True, False, True]
+        workers = BackgroundWorkers(election)
+        calls = []
+
+        async def start():
+            calls.append("start")
+            workers._tasks = [MagicMock()]
+
+        async def stop():
+            if workers._tasks:
+                calls.append("stop")
+            workers._tasks = []
+
+        async def run():
+            with patch.object(workers, "_start", start), patch.object(workers, "_stop", stop), \
+                    patch("app.services.background_workers.asyncio.sleep", side_effect=[None, None, None, asyncio.CancelledError]):
+                with pytest.raises(asyncio.CancelledError):
+                    await workers.run()
+
+        asyncio.run(run())
+
+        assert calls == ["start", "stop", "start", "stop"]
+        election.release.assert_called_once()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,44 @@
+import pytest
+from benchmarks.compare import compare, direction
+from benchmarks.harness import percentiles
+from benchmarks.import_time import parse_importtime
+
+
+class TestBenchmarks:
+
+    def test_percentiles_nearest_rank(self):
+        summary = percentiles([i / 1000 for i in range(1, 101)])
+
+        assert summary["count"] == 100
+        assert summary["p50_ms"] == 50
+        assert summary["p99_ms"] == 99
+        assert summary["max_ms"] == 100
+
+    def test_metric_direction(self):
+        assert direction("generate.c1.p95_ms") == -1
+        assert direction("queue.w4.throughput_per_s") == 1
+        assert direction("queue.w4.items") is None
+
+    def test_compare_flags_regressions(self):
+        baseline = {"results": {"generate": {"c1": {"p95_ms": 100.0, "throughput_per_s": 10.0}}}}
+        candidate = {"results": {"generate": {"c1": {"p95_ms": 130.0, "throughput_per_s": 10.5}}}}
+
+        rows = {metric: regressed for metric, _, _, _, regressed in compare(baseline, candidate, 0.1)}
+
+        assert rows["generate.c1.p95_ms"] is True
+        assert rows["generate.c1.throughput_per_s"] is False
+
+    def test_parse_importtime(self):
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   zipimport\n"
+            "import time:      2500 |     704200 | app.main\n"
+        )
+
+        modules = parse_importtime(stderr)
+
+        assert modules == {"zipimport": (120, 120), "app.main": (2500, 704200)}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,154 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from app.api.endpoints import bulk
+from app.core.config import settings
+from app.models.bulk_job import BulkJob, BulkJobItem
+from app.services.bulk_generation import BulkGenerationService, parse_csv_items
+
+
+class TestBulkGeneration:
+
+    def setup_method(self):
+        self.service = BulkGenerationService()
+
+    def test_parse_csv_items(self):
+        content = "﻿title,body\nCongreso,Inscripciones abiertas\n,\nSeminario,Clase magistral\n".encode("utf-8")
+
+        items = parse_csv_items(content)
+
+        assert items == [
+            {"title": "Congreso", "body": "Inscripciones abiertas"},
+            {"title": "Seminario", "body": "Clase magistral"},
+        ]
+
+    def test_parse_csv_items_requires_columns(self):
+        with pytest.raises(ValueError, match="title"):
+            parse_csv_items(b"titulo,cuerpo\nA,B\n")
+
+    def test_create_job_clamps_concurrency(self):
+        db = MagicMock()
+        items = [{"title": "Congreso", "body": "Universidad"}] * 3
+
+        job = self.service.create_job(db, 1, items, ["facebook"], concurrency=1000)
+
+        assert job.concurrency == settings.BULK_MAX_CONCURRENCY
+        assert job.total == 3
+        db.commit.assert_called_once()
+
+    def test_create_job_rejects_empty_and_oversized(self):
+        with pytest.raises(ValueError):
+            self.service.create_job(MagicMock(), 1, [], ["facebook"], 2)
+
+        too_many = [{"title": "t", "body": "b"}] * (settings.BULK_MAX_ITEMS + 1)
+        with pytest.raises(ValueError, match="limit"):
+            self.service.create_job(MagicMock(), 1, too_many, ["facebook"], 2)
+
+    def test_create_job_batch_mode_limits(self):
+        items = [{"title": "t", "body": "b"}] * (settings.BULK_MAX_ITEMS + 1)
+
+        job = self.service.create_job(MagicMock(), 1, items, ["facebook"], 2, mode="batch")
+
+        assert job.mode == "batch"
+        with pytest.raises(ValueError, match="mode"):
+            self.service.create_job(MagicMock(), 1, items, ["facebook"], 2, mode="later")
+
+
+class TestBulkJobOwnership:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, session_factory):
+        self.SessionLocal = session_factory
+        self.service = BulkGenerationService()
+        self.service._pipeline = MagicMock()
+        self.service._pipeline.generate.return_value = {"facebook": {"text": "ok"}}
+        self.service._pipeline.save_history.return_value = SimpleNamespace(id=7)
+        with patch("app.services.bulk_generation.SessionLocal", session_factory):
+            yield
+
+    def _job(self, items=2, **fields):
+        db = self.SessionLocal()
+        # One item at a time: the in-memory database is a single connection shared by the worker threads
+        job = self.service.create_job(db, 1, [{"title": f"t{i}", "body": "b"} for i in range(items)], ["facebook"], 1)
+        for name, value in fields.items():
+            setattr(job, name, value)
+        db.commit()
+        job_id = job.id
+        db.close()
+        return job_id
+
+    def _statuses(self, job_id):
+        db = self.SessionLocal()
+        try:
+            job = db.get(BulkJob, job_id)
+            items = db.query(BulkJobItem).filter(BulkJobItem.job_id == job_id).order_by(BulkJobItem.position)
+            return job.status, job.owner, [item.status for item in items]
+        finally:
+            db.close()
+
+    def test_item_is_generated_once(self):
+        job_id = self._job(items=1)
+        item_id = self.service._pending_item_ids(job_id)[0]
+
+        first = self.service._process_item(job_id, item_id, ["facebook"], 1)
+        second = self.service._process_item(job_id, item_id, ["facebook"], 1)
+
+        assert first["item"]["status"] == "done"
+        assert second is None
+        assert self.service._pipeline.generate.call_count == 1
+
+    def test_job_of_a_live_owner_is_not_resumed(self):
+        job_id = self._job(owner="other-process", heartbeat_at=datetime.utcnow(), status="running")
+        db = self.SessionLocal()
+        db.query(BulkJobItem).filter(BulkJobItem.position == 0).update({BulkJobItem.status: "running"})
+        db.commit()
+        db.close()
+
+        assert self.service._orphaned_jobs() == []
+        assert self.service._claim_job(job_id) is None
+        assert self._statuses(job_id) == ("running", "other-process", ["running", "pending"])
+
+        # Once the owner stops renewing its heartbeat, its interrupted item is run again
+        stale = datetime.utcnow() - timedelta(seconds=settings.BULK_JOB_OWNER_TTL_SECONDS + 1)
+        db = self.SessionLocal()
+        db.query(BulkJob).update({BulkJob.heartbeat_at: stale})
+        db.commit()
+        db.close()
+
+        assert self.service._orphaned_jobs() == [job_id]
+        asyncio.run(self.service.run_job(job_id))
+
+        assert self._statuses(job_id) == ("completed", None, ["done", "done"])
+        assert self.service._pipeline.generate.call_count == 2
+
+    def test_external_mode_leaves_new_jobs_to_the_worker(self):
+        job_id = self._job()
+        api = MagicMock()
+
+        async def create():
+            db = self.SessionLocal()
+            try:
+                with patch.object(bulk, "settings", SimpleNamespace(WORKER_MODE="external")), \
+                        patch.object(bulk, "bulk_service", api):
+                    await bulk._start(db, db.get(BulkJob, job_id))
+            finally:
+                db.close()
+
+        async def worker_pass():
+            started = await self.service.resume_incomplete_jobs()
+            await asyncio.gather(*list(self.service._tasks.values()))
+            return started
+
+        asyncio.run(create())
+        assert self._statuses(job_id) == ("pending", None, ["pending", "pending"])
+        assert asyncio.run(worker_pass()) == [job_id]
+
+        api.start.assert_not_called()
+        assert self._statuses(job_id) == ("completed", None, ["done", "done"])
+        assert asyncio.run(worker_pass()) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,56 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from app.core.compression import CompressionMiddleware, choose_encoding
+from app.core.responses import default_response_class
+
+
+class TestCompression:
+
+    def setup_method(self):
+        app = FastAPI(default_response_class=default_response_class(True))
+        app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+        @app.get("/big")
+        def big():
+            return {"items": [{"text": "Inscripciones abiertas en la universidad"}] * 50}
+
+        @app.get("/small")
+        def small():
+            return {"ok": True}
+
+        @app.get("/events")
+        def events():
+            return StreamingResponse(iter(["data: x\n\n"] * 100), media_type="text/event-stream")
+
+        self.client = TestClient(app)
+
+    def test_choose_encoding(self):
+        assert choose_encoding("gzip, deflate, br") == "br"
+        assert choose_encoding("gzip, br;q=0") == "gzip"
+        assert choose_encoding("identity") is None
+
+    def test_large_json_is_gzipped(self):
+        response = self.client.get("/big", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert int(response.headers["content-length"]) == response.num_bytes_downloaded
+        assert response.num_bytes_downloaded < len(response.content) / 5
+        assert response.json()["items"][0]["text"].startswith("Inscripciones")
+
+    def test_small_and_streamed_events_are_untouched(self):
+        small = self.client.get("/small", headers={"Accept-Encoding": "gzip, br"})
+        events = self.client.get("/events", headers={"Accept-Encoding": "gzip, br"})
+
+        assert "content-encoding" not in small.headers
+        assert "content-encoding" not in events.headers
+
+    def test_default_response_class(self):
+        assert default_response_class(False) is JSONResponse
+        assert default_response_class(True) is ORJSONResponse
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,142 @@
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from app.models.publication import Publication
+from app.services.fair_queue import FairScheduler, backlog_bucket, parse_weights
+from app.services.queue_service import QueueService
+
+
+def tunables(**overrides):
+    values = dict(QUEUE_SCHEDULING="fair", QUEUE_USER_WEIGHTS="", QUEUE_MAX_IN_FLIGHT_PER_USER=0)
+    values.update(overrides)
+    return patch("app.services.fair_queue.settings", SimpleNamespace(**values))
+
+
+class TestFairScheduler:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, session_factory):
+        self.SessionLocal = session_factory
+        self.scheduler = FairScheduler()
+        self.created = datetime.utcnow() - timedelta(hours=1)
+        self.rows = 0
+
+    def add(self, user_id, count=1, priority="normal", platform="facebook"):
+        db = self.SessionLocal()
+        for _ in range(count):
+            self.rows += 1
+            db.add(Publication(
+                user_id=user_id, platform=platform, text="Hola", status="pending", priority=priority,
+                created_at=self.created + timedelta(seconds=self.rows),
+            ))
+        db.commit()
+        db.close()
+
+    def refresh(self, **overrides):
+        db = self.SessionLocal()
+        try:
+            with tunables(**overrides):
+                return self.scheduler.refresh(db, "facebook")
+        finally:
+            db.close()
+
+    def dispatch(self, count=None):
+        """User of each publication handed out, marking each one done right away."""
+        db = self.SessionLocal()
+        users = []
+        try:
+            while count is None or len(users) < count:
+                ticket = self.scheduler.next("facebook")
+                if ticket is None:
+                    break
+                users.append(db.get(Publication, ticket.publication_id).user_id)
+                self.scheduler.done(ticket)
+        finally:
+            db.close()
+        return users
+
+    def test_parsing_and_backlog_buckets(self):
+        assert parse_weights("7=3, 12=0.5,") == {7: 3.0, 12: 0.5}
+        assert [backlog_bucket(n) for n in (1, 5, 50, 300)] == ["1", "2-10", "11-100", "100+"]
+
+    def test_light_user_is_not_stuck_behind_a_heavy_backlog(self):
+        self.add(1, 300)
+        self.add(2, 3)
+        self.add(3, 3)
+
+        assert self.refresh() == 306
+        order = self.dispatch()
+
+        # Every user gets a turn per round; the heavy backlog is served once the others are done
+        assert order[:9] == [1, 2, 3] * 3
+        assert order[9:] == [1] * 297
+
+        self.add(1, 300)
+        self.add(2, 3)
+        self.refresh(QUEUE_SCHEDULING="fifo")
+        assert self.dispatch()[:300] == [1] * 300
+
+    def test_weights_priorities_and_late_arrivals(self):
+        self.add(1, 40)
+        self.add(2, 40)
+        self.refresh(QUEUE_USER_WEIGHTS="1=3")
+        assert self.dispatch(20).count(1) == 15
+
+        # A user who shows up now starts at the current virtual time, not behind the backlog
+        self.add(3, 2)
+        self.add(4, 1, priority="urgent")
+        self.refresh(QUEUE_USER_WEIGHTS="1=3")
+        order = self.dispatch(6)
+        assert order[0] == 4
+        assert order.index(3) <= 4
+
+    def test_in_flight_cap_per_user(self):
+        self.add(1, 3)
+        self.add(2, 1)
+        self.refresh(QUEUE_MAX_IN_FLIGHT_PER_USER=1)
+
+        first, second = self.scheduler.next("facebook"), self.scheduler.next("facebook")
+        # User 1 has one publication in flight and user 2 none left: nothing else can go out yet
+        assert (first.flow[1], second.flow[1]) == (1, 2)
+        assert self.scheduler.next("facebook") is None
+        assert {(row["user_id"], row["pending"], row["in_flight"]) for row in self.scheduler.snapshot("facebook")} == {
+            (1, 2, 1), (2, 0, 1),
+        }
+
+        self.scheduler.done(first)
+        assert self.scheduler.next("facebook").flow[1] == 1
+
+
+class TestFairDrain:
+
+    def test_drain_alternates_users_and_skips_rows_claimed_elsewhere(self, session_factory):
+        SessionLocal = session_factory
+        service = QueueService()
+        service._publisher = MagicMock()
+        service._publisher.publish_facebook.return_value = {"success": True}
+
+        db = SessionLocal()
+        db.add_all([Publication(user_id=1, platform="facebook", text=f"Aviso {i}", status="pending") for i in range(4)])
+        db.add(Publication(user_id=2, platform="facebook", text="Urgente", status="pending", priority="urgent"))
+        db.add(Publication(user_id=3, platform="facebook", text="Otro", status="pending"))
+        db.commit()
+        db.close()
+
+        with patch("app.services.queue_service.SessionLocal", SessionLocal), tunables():
+            db = SessionLocal()
+            service.scheduler.refresh(db, "facebook")
+            # Published by another worker after this one queued it
+            db.query(Publication).filter(Publication.id == 2).update({Publication.status: "published"})
+            db.commit()
+            db.close()
+            result = service.process_pending_publications(platform="facebook")
+
+        texts = [call.args[0] for call in service._publisher.publish_facebook.call_args_list]
+        assert result == {"processed": 5, "published": 5, "retrying": 0, "failed": 0}
+        assert texts == ["Urgente", "Aviso 0", "Otro", "Aviso 2", "Aviso 3"]
+        assert service.scheduler.snapshot("facebook") == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
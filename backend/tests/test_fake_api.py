@@ -0,0 +1,118 @@
+import os
+import random
+import pytest
+import requests
+from unittest.mock import MagicMock
+from fastapi.testclient import TestClient
+from openai import OpenAI
+from app.services.content_generator import ContentGenerator
+from app.services.media_generator import MediaGenerator
+from fake_api import FakeApiConfig, LatencyConfig, RouteConfig, create_app
+from fake_api.server import render_png
+
+
+class TestFakeApi:
+
+    def setup_method(self):
+        self.app = create_app(FakeApiConfig(seed=1))
+        self.client = TestClient(self.app)
+
+    def test_content_generator_against_fake_openai(self):
+        generator = ContentGenerator()
+        generator.client = OpenAI(
+            api_key="test", base_url="http://testserver/openai/v1", http_client=self.client
+        )
+
+        result = generator.generate_social_content(
+            "Congreso de investigación", "La universidad abre inscripciones", ["facebook", "tiktok"]
+        )
+
+        assert set(result) == {"facebook", "tiktok"}
+        assert "script" in result["tiktok"]
+        assert len(self.client.get("/_fake/recordings", params={"route": "openai.chat"}).json()) == 1
+
+    def test_batch_api_round_trip(self):
+        self.app.state.fake.configure(FakeApiConfig(seed=1, routes={"openai.batch_request": RouteConfig(error_rate=0.5)}))
+        generator = ContentGenerator()
+        generator.client = OpenAI(
+            api_key="test", base_url="http://testserver/openai/v1", http_client=self.client
+        )
+        requests = [
+            generator.batch_request(f"item-{i}", f"Congreso {i}", "Universidad", ["facebook"]) for i in range(6)
+        ]
+
+        batch = generator.submit_batch(requests)
+        batch = generator.retrieve_batch(batch.id)
+        results = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                results.update(generator.batch_results(file_id))
+
+        assert batch.status == "completed"
+        assert set(results) == {f"item-{i}" for i in range(6)}
+        ok = [r for r in results.values() if "facebook" in r]
+        assert ok and all(r["facebook"]["text"].startswith("Congreso") for r in ok)
+        assert batch.request_counts.failed == sum(1 for r in results.values() if r.get("error") == "GENERATION_FAILED")
+
+    def test_media_generator_writes_same_png_in_both_formats(self, tmp_path, monkeypatch):
+        def fake_get(url, **kwargs):
+            # requests-style streamed response backed by the TestClient
+            response = MagicMock()
+            response.__enter__.return_value.iter_content.return_value = [self.client.get(url).content]
+            return response
+
+        monkeypatch.setattr(requests, "get", fake_get)
+        generator = MediaGenerator()
+        generator.client = OpenAI(
+            api_key="test", base_url="http://testserver/openai/v1", http_client=self.client
+        )
+        generator.media_dir = tmp_path
+
+        generator.image_response_format = "url"
+        url_path, remote_url = generator.generate_image("campus", size="256x256")
+        generator.image_response_format = "b64_json"
+        b64_path, public_url = generator.generate_image("campus", size="256x256")
+
+        assert remote_url.startswith("http://testserver/files/")
+        assert public_url.endswith(f"/static/media/{os.path.basename(b64_path)}")
+        assert open(url_path, "rb").read() == open(b64_path, "rb").read() == render_png(256, 256)
+
+    def test_image_generation_returns_fetchable_png(self):
+        response = self.client.post("/openai/v1/images/generations", json={"prompt": "campus", "size": "256x256"})
+        url = response.json()["data"][0]["url"]
+
+        image = self.client.get(url)
+
+        assert image.headers["content-type"] == "image/png"
+        assert image.content.startswith(b"\x89PNG")
+
+    def test_throttle_injection_returns_retry_after(self):
+        config = FakeApiConfig(routes={"graph.feed": RouteConfig(throttle_rate=1.0, retry_after=3)})
+        self.client.put("/_fake/config", json=config.model_dump())
+
+        response = self.client.post("/graph/v18.0/123/feed", params={"message": "hola", "access_token": "secret"})
+
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "3"
+        assert "message" in response.json()["error"]
+        recorded = self.client.get("/_fake/recordings").json()[-1]
+        assert recorded["query"]["access_token"] == "[REDACTED]"
+
+    def test_error_injection_tiktok_shape(self):
+        config = FakeApiConfig(routes={"tiktok.init": RouteConfig(error_rate=1.0)})
+        self.client.put("/_fake/config", json=config.model_dump())
+
+        response = self.client.post("/tiktok/v2/post/publish/video/init/", json={})
+
+        assert response.status_code == 500
+        assert response.json()["error"]["code"] != "ok"
+
+    def test_latency_distributions(self):
+        rng = random.Random(0)
+        assert LatencyConfig(dist="constant", ms=250).sample(rng) == 0.25
+        assert 0.1 <= LatencyConfig(dist="uniform", min_ms=100, max_ms=200).sample(rng) <= 0.2
+        assert LatencyConfig(dist="lognormal", median_ms=100, sigma=0.5).sample(rng) > 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
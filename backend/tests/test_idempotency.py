@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import pytest
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from app.models.idempotency import IdempotencyKey
+from app.services.idempotency import IdempotencyService
+
+
+class TestIdempotency:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, session_factory):
+        self.db = session_factory()
+        self.service = IdempotencyService()
+        self.payload = {"title": "Congreso", "body": "Universidad", "platforms": ["facebook"]}
+        yield
+        self.db.close()
+
+    def claim(self, key="key-1", payload=None, user_id=1):
+        return asyncio.run(self.service.claim(self.db, "generate", user_id, key, payload or self.payload))
+
+    def test_without_key_is_not_tracked(self):
+        claim = self.claim(key=None)
+
+        assert claim.record_id is None and not claim.is_replay
+        assert self.db.query(IdempotencyKey).count() == 0
+
+    def test_retry_replays_stored_response(self):
+        first = self.claim()
+        self.service.complete(self.db, first, {"facebook": {"text": "Hola"}})
+
+        retry = self.claim()
+
+        assert retry.is_replay
+        assert retry.replay_status == 200
+        assert retry.replay_body == {"facebook": {"text": "Hola"}}
+
+    def test_key_is_scoped_per_user(self):
+        self.service.complete(self.db, self.claim(user_id=1), {"ok": 1})
+
+        other = self.claim(user_id=2)
+
+        assert not other.is_replay and other.record_id is not None
+
+    def test_same_key_with_different_payload_is_rejected(self):
+        self.claim()
+
+        with pytest.raises(HTTPException) as exc:
+            self.claim(payload={"title": "Otro", "body": "Texto", "platforms": []})
+
+        assert exc.value.status_code == 422
+
+    def test_in_progress_key_returns_409_after_wait(self, monkeypatch):
+        monkeypatch.setattr("app.services.idempotency.settings.IDEMPOTENCY_WAIT_SECONDS", 0)
+        self.claim()
+
+        with pytest.raises(HTTPException) as exc:
+            self.claim()
+
+        assert exc.value.status_code == 409
+        assert "Retry-After" in exc.value.headers
+
+    def test_released_and_stale_keys_can_run_again(self):
+        first = self.claim()
+        self.service.release(self.db, first)
+        assert not self.claim().is_replay
+
+        record = self.db.query(IdempotencyKey).one()
+        record.locked_until = datetime.utcnow() - timedelta(seconds=1)
+        self.db.commit()
+
+        takeover = self.claim()
+
+        assert takeover.record_id == record.id and not takeover.is_replay
+
+    def test_expired_keys_are_purged_on_a_schedule(self):
+        self.service.complete(self.db, self.claim(key="old"), {"ok": 1})
+        self.db.query(IdempotencyKey).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+        self.db.commit()
+
+        self.claim(key="new")
+        assert self.db.query(IdempotencyKey).filter_by(key="old").count() == 1
+
+        self.service._next_purge = 0.0
+        self.claim(key="newer")
+        assert self.db.query(IdempotencyKey).filter_by(key="old").count() == 0
+
+    @pytest.mark.filterwarnings("error::sqlalchemy.exc.SAWarning")
+    def test_expired_completed_key_runs_again(self):
+        self.service.complete(self.db, self.claim(), {"ok": 1})
+        self.db.query(IdempotencyKey).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+        self.db.commit()
+
+        again = self.claim()
+
+        assert not again.is_replay and again.record_id is not None
+
+    def test_cancelled_request_releases_its_key(self):
+        first = self.claim()
+
+        threads = []
+        release = self.service.release
+        self.service.release = lambda *args: threads.append(threading.get_ident()) or release(*args)
+
+        async def cancelled_request():
+            async with self.service.releasing(self.db, first):
+                raise asyncio.CancelledError()
+
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(cancelled_request())
+
+        assert self.db.query(IdempotencyKey).count() == 0
+        # Released from a worker thread, not on the event loop
+        assert threads and threading.get_ident() not in threads
+        assert not self.claim().is_replay
+
+    def test_claim_queries_run_off_the_event_loop(self):
+        threads = []
+        try_claim = self.service._try_claim
+
+        def record_thread(*args):
+            threads.append(threading.get_ident())
+            return try_claim(*args)
+
+        self.service._try_claim = record_thread
+        self.claim()
+
+        assert threads and threading.get_ident() not in threads
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
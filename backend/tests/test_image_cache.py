@@ -0,0 +1,152 @@
+import base64
+import os
+import shutil
+import tempfile
+import pytest
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from app.models.image_cache import ImageCacheEntry
+from app.models.publication import Publication
+from app.services.image_cache import ImageCache, normalize_prompt, prompt_tokens, token_set_similarity
+from app.services.media_generator import MediaGenerator
+
+PROMPT = "Students walking across the university campus at sunset, watercolor style"
+
+
+def tunables(**overrides):
+    values = dict(IMAGE_CACHE_MAX_MB=500, IMAGE_CACHE_FUZZY=False, IMAGE_CACHE_FUZZY_THRESHOLD=0.85)
+    values.update(overrides)
+    return patch("app.services.image_cache.settings", SimpleNamespace(**values))
+
+
+class TestImageCache:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, session_factory):
+        self.SessionLocal = session_factory
+        self.session_patch = patch("app.services.image_cache.SessionLocal", self.SessionLocal)
+        self.session_patch.start()
+
+        self.cache = ImageCache()
+        self.generator = MediaGenerator(self.cache)
+        self.generator.media_dir = self.cache.media_dir = Path(tempfile.mkdtemp())
+        self.generator.client = MagicMock()
+        self.images = 0
+
+        def generate(**kwargs):
+            self.images += 1
+            image = base64.b64encode(f"png-{self.images}".encode()).decode()
+            return SimpleNamespace(data=[SimpleNamespace(b64_json=image, url=f"https://openai.example/{self.images}.png")])
+
+        self.generator.client.images.generate.side_effect = generate
+
+    def teardown_method(self):
+        self.session_patch.stop()
+        shutil.rmtree(self.generator.media_dir, ignore_errors=True)
+
+    def test_normalization_and_similarity(self):
+        assert normalize_prompt("  Café, CAMPUS!\n(at night) ") == "cafe campus at night"
+        assert prompt_tokens("the campus at night") == {"campus", "night"}
+        assert token_set_similarity(prompt_tokens("students on campus"), prompt_tokens("campus students")) == 1.0
+        assert token_set_similarity(frozenset(), frozenset({"campus"})) == 0.0
+
+    def test_exact_hit_skips_generation_and_opt_out_bypasses(self, monkeypatch):
+        monkeypatch.setenv("PUBLIC_URL", "https://uni.example")
+        self.generator.image_response_format = "b64_json"
+
+        with tunables():
+            first = self.generator.generate_image(PROMPT, size="512x512")
+            # Same prompt up to case and punctuation
+            again = self.generator.generate_image("students walking across the University campus at sunset; watercolor style!", size="512x512")
+            other_size = self.generator.generate_image(PROMPT, size="1024x1024")
+            fresh = self.generator.generate_image(PROMPT, size="512x512", use_cache=False)
+
+        assert again == first
+        assert first[1] == f"https://uni.example/static/media/{os.path.basename(first[0])}"
+        assert other_size[0] != first[0]
+        assert fresh[0] != first[0]
+        assert self.images == 3
+        db = self.SessionLocal()
+        assert db.query(ImageCacheEntry).count() == 2
+        db.close()
+
+    def test_fuzzy_tier_is_opt_in(self, monkeypatch):
+        monkeypatch.setenv("PUBLIC_URL", "https://uni.example")
+        self.generator.image_response_format = "b64_json"
+        reordered = "Watercolor style: university campus at sunset with students walking across"
+
+        with tunables():
+            first = self.generator.generate_image(PROMPT)
+            # Exact tier only: a reordered prompt is a new image
+            second = self.generator.generate_image(reordered)
+        with tunables(IMAGE_CACHE_FUZZY=True):
+            reused = self.generator.generate_image("Watercolor: students walking across a university campus, sunset")
+            unrelated = self.generator.generate_image("Robotics laboratory with engineers testing a drone")
+
+        assert second[0] != first[0]
+        assert reused[0] in (first[0], second[0])
+        assert unrelated[0] not in (first[0], second[0])
+        assert self.images == 3
+
+    def test_expired_remote_url_is_a_miss_without_public_url(self, monkeypatch):
+        monkeypatch.delenv("PUBLIC_URL", raising=False)
+        self.generator.image_response_format = "url"
+        self.generator._download = lambda url, write: write(url.encode())
+
+        with tunables():
+            first = self.generator.generate_image(PROMPT)
+            cached = self.generator.generate_image(PROMPT)
+            db = self.SessionLocal()
+            db.query(ImageCacheEntry).update({ImageCacheEntry.remote_expires_at: datetime.utcnow() - timedelta(minutes=1)})
+            db.commit()
+            db.close()
+            refreshed = self.generator.generate_image(PROMPT)
+            after_refresh = self.generator.generate_image(PROMPT)
+
+        assert cached == first == (first[0], "https://openai.example/1.png")
+        assert refreshed[1] == after_refresh[1] == "https://openai.example/2.png"
+        assert self.images == 2
+
+    def test_lru_eviction_and_missing_files(self, monkeypatch):
+        monkeypatch.setenv("PUBLIC_URL", "https://uni.example")
+        self.generator.image_response_format = "b64_json"
+
+        with tunables(IMAGE_CACHE_MAX_MB=0):
+            self.generator.generate_image(PROMPT)
+        db = self.SessionLocal()
+        assert db.query(ImageCacheEntry).count() == 0
+        db.close()
+
+        with tunables():
+            path, _ = self.generator.generate_image(PROMPT)
+            os.unlink(path)
+            regenerated, _ = self.generator.generate_image(PROMPT)
+
+        assert os.path.exists(regenerated)
+        assert self.images == 3
+
+    def test_eviction_deletes_files_nothing_else_uses(self, monkeypatch):
+        monkeypatch.setenv("PUBLIC_URL", "https://uni.example")
+        self.generator.image_response_format = "b64_json"
+
+        with tunables():
+            unused, _ = self.generator.generate_image(PROMPT)
+            published, published_url = self.generator.generate_image("Graduation ceremony in the main hall")
+        db = self.SessionLocal()
+        db.add(Publication(platform="facebook", text="Graduación", media_url=published_url))
+        db.commit()
+        db.close()
+
+        with tunables(IMAGE_CACHE_MAX_MB=0):
+            newest, _ = self.generator.generate_image("Library at night")
+
+        assert not os.path.exists(unused)
+        assert os.path.exists(published)
+        # The image being returned survives even though its own entry was over the cap
+        assert os.path.exists(newest)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
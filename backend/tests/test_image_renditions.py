@@ -0,0 +1,52 @@
+import os
+import tempfile
+import pytest
+from pathlib import Path
+from PIL import Image
+from fake_api.server import render_png
+from app.services.image_renditions import ImageRenditionService
+
+
+class TestImageRenditions:
+
+    def setup_method(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.service = ImageRenditionService(self.tmp / "media", self.tmp / "renditions")
+        os.makedirs(self.tmp / "media", exist_ok=True)
+        self.source = self.tmp / "media" / "master.png"
+        self.source.write_bytes(render_png(512, 512))
+
+    def test_platform_rendition_keeps_aspect_without_upscaling(self):
+        path = self.service.get(self.source, "whatsapp_story")
+
+        with Image.open(path) as image:
+            assert image.format == "JPEG"
+            assert image.height == 512
+            assert abs(image.width / image.height - 1080 / 1920) < 0.01
+
+    def test_renditions_are_cached_by_content_hash(self):
+        first = self.service.get(self.source, "thumb")
+        mtime = first.stat().st_mtime_ns
+
+        copy = self.tmp / "media" / "copy.png"
+        copy.write_bytes(self.source.read_bytes())
+        second = self.service.get(copy, "thumb")
+
+        assert first == second
+        assert second.stat().st_mtime_ns == mtime
+        assert first.suffix == ".webp"
+        assert first.parent.name == self.service.content_hash(self.source)
+
+    def test_source_path_rejects_traversal(self):
+        assert self.service.source_path("master.png") == self.source
+        assert self.service.source_path("../media/master.png") is None
+        assert self.service.source_path("missing.png") is None
+
+    def test_rendition_url(self):
+        url = self.service.url("https://example.org/", str(self.source), "instagram")
+
+        assert url == "https://example.org/api/media/renditions/master.png/instagram.jpg"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
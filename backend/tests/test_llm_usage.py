@@ -0,0 +1,190 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from app.api import deps
+from app.main import app as application
+from app.models.llm_usage import LLMUsage
+from app.services.content_generator import ContentGenerator
+from app.services.generation_pipeline import GenerationPipeline, get_pipeline
+from app.services.llm_usage import QuotaExceededError, UsageService
+from app.services.token_budget import TRUNCATION_MARKER, count_tokens, truncate_to_budget
+
+LONG_BODY = (
+    "La universidad celebra su congreso anual de investigación.\n\n"
+    + "Habrá conferencias, talleres y mesas redondas con docentes invitados. " * 60
+    + "\n\nInscripciones hasta el 5 de mayo en la facultad."
+)
+
+
+def completion(content='{"facebook": {"text": "Hola"}}', prompt_tokens=900, completion_tokens=100):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, total_tokens=prompt_tokens + completion_tokens),
+    )
+
+
+class TestTokenBudget:
+
+    def setup_method(self):
+        # Character estimate, so the test does not depend on tiktoken's encoding files
+        self.encoding = patch("app.services.token_budget._encoding", return_value=None)
+        self.encoding.start()
+
+    def teardown_method(self):
+        self.encoding.stop()
+
+    def test_truncation_keeps_opening_and_closing_paragraphs(self):
+        result = truncate_to_budget(LONG_BODY, 200, "gpt-3.5-turbo")
+
+        assert count_tokens(result, "gpt-3.5-turbo") <= 200
+        assert result.startswith("La universidad celebra su congreso anual")
+        assert TRUNCATION_MARKER in result
+        assert result.endswith("Inscripciones hasta el 5 de mayo en la facultad.")
+        # Cut at a sentence boundary
+        assert result.split(TRUNCATION_MARKER)[0].strip().endswith(".")
+        assert truncate_to_budget("Corto.", 200, "gpt-3.5-turbo") == "Corto."
+
+    def test_oversized_body_is_budgeted_before_the_call(self):
+        generator = ContentGenerator()
+        generator.client = MagicMock()
+        generator.client.chat.completions.create.return_value = completion()
+        on_usage = MagicMock()
+
+        with patch("app.services.content_generator.settings") as settings:
+            settings.LLM_MAX_BODY_TOKENS = 200
+            settings.LLM_BODY_OVERFLOW = "truncate"
+            generator.generate_social_content("Congreso", LONG_BODY, ["facebook"], on_usage=on_usage)
+
+        prompt = generator.client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+        assert TRUNCATION_MARKER in prompt
+        assert len(prompt) < len(LONG_BODY) / 2
+        on_usage.assert_called_once()
+        assert on_usage.call_args.args[1].total_tokens == 1000
+
+    def test_summarize_mode_condenses_the_body(self):
+        generator = ContentGenerator()
+        generator.client = MagicMock()
+        generator.client.chat.completions.create.side_effect = [
+            completion("Congreso de investigación, inscripciones hasta el 5 de mayo.", 400, 30),
+            completion(),
+        ]
+        on_usage = MagicMock()
+
+        with patch("app.services.content_generator.settings") as settings:
+            settings.LLM_MAX_BODY_TOKENS = 200
+            settings.LLM_BODY_OVERFLOW = "summarize"
+            generator.generate_social_content("Congreso", LONG_BODY, ["facebook"], on_usage=on_usage)
+
+        summary_call, content_call = generator.client.chat.completions.create.call_args_list
+        assert summary_call.kwargs["max_tokens"] == 200
+        assert "inscripciones hasta el 5 de mayo" in content_call.kwargs["messages"][1]["content"]
+        assert on_usage.call_count == 2
+
+
+class TestUsageAccounting:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, session_factory):
+        self.SessionLocal = session_factory
+        self.session_patch = patch("app.services.llm_usage.SessionLocal", self.SessionLocal)
+        self.session_patch.start()
+        self.service = UsageService()
+        yield
+        self.session_patch.stop()
+        application.dependency_overrides.clear()
+
+    def test_usage_is_aggregated_per_user_day_and_model(self):
+        usage = SimpleNamespace(prompt_tokens=900, completion_tokens=100, total_tokens=1000)
+        self.service.record(1, "gpt-4o-mini", usage)
+        self.service.record(1, "gpt-4o-mini", usage)
+        self.service.record(None, "gpt-4o-mini", usage)
+
+        db = self.SessionLocal()
+        try:
+            assert db.query(LLMUsage).count() == 2
+            assert self.service.used_today(db, 1) == 2000
+            assert self.service.used_today(db, None) == 1000
+            report = self.service.report(db, db.query(LLMUsage.day).first()[0], by_user=True)
+        finally:
+            db.close()
+
+        assert [row["user_id"] for row in report["rows"]] == [1, None]
+        assert report["totals"]["requests"] == 3
+
+    def test_quota_is_checked_before_the_llm_call(self):
+        self.service.record(1, "gpt-4o-mini", SimpleNamespace(prompt_tokens=4500, completion_tokens=0, total_tokens=4500))
+        content_gen = MagicMock()
+        content_gen.estimate_tokens.return_value = 800
+        pipeline = GenerationPipeline(content_gen, MagicMock(), self.service)
+
+        with patch("app.services.llm_usage.settings") as settings:
+            settings.LLM_DAILY_TOKEN_QUOTA = 5000
+            with pytest.raises(QuotaExceededError) as exc:
+                pipeline.generate("Congreso", "Universidad", ["facebook"], user_id=1)
+
+            # Unlimited when the quota is 0
+            settings.LLM_DAILY_TOKEN_QUOTA = 0
+            content_gen.generate_social_content.return_value = {}
+            pipeline.generate("Congreso", "Universidad", ["facebook"], user_id=1)
+
+        assert exc.value.quota == 5000 and exc.value.retry_after > 0
+        content_gen.generate_social_content.assert_called_once()
+
+    def test_generate_answers_429_and_usage_report(self):
+        self.service.record(1, "gpt-4o-mini", SimpleNamespace(prompt_tokens=4900, completion_tokens=0, total_tokens=4900))
+        content_gen = MagicMock()
+        content_gen.estimate_tokens.return_value = 800
+
+        def override_get_db():
+            db = self.SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        application.dependency_overrides[deps.get_db] = override_get_db
+        application.dependency_overrides[deps.get_current_user] = lambda: SimpleNamespace(id=1)
+        application.dependency_overrides[deps.get_current_user_optional] = lambda: SimpleNamespace(id=1)
+        application.dependency_overrides[get_pipeline] = lambda: GenerationPipeline(content_gen, MagicMock(), self.service)
+        client = TestClient(application)
+
+        with patch("app.services.llm_usage.settings") as settings:
+            settings.LLM_DAILY_TOKEN_QUOTA = 5000
+            response = client.post("/api/generate", json={"title": "Congreso", "body": "Universidad"})
+            usage = client.get("/api/usage/me").json()
+
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) > 0
+        content_gen.generate_social_content.assert_not_called()
+        assert usage["quota"] == {**usage["quota"], "daily_tokens": 5000, "used_today": 4900, "remaining_today": 100}
+        assert usage["totals"]["total_tokens"] == 4900
+
+    def test_usage_report_is_admin_only(self):
+        self.service.record(2, "gpt-4o-mini", SimpleNamespace(prompt_tokens=900, completion_tokens=100, total_tokens=1000))
+
+        def override_get_db():
+            db = self.SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        application.dependency_overrides[deps.get_db] = override_get_db
+        client = TestClient(application)
+
+        anonymous = client.get("/api/usage/report")
+        application.dependency_overrides[deps.get_current_user] = lambda: SimpleNamespace(id=1, email="alumno@universidad.edu")
+        with patch("app.api.deps.settings", SimpleNamespace(ADMIN_EMAILS="Admin@universidad.edu")):
+            student = client.get("/api/usage/report")
+            application.dependency_overrides[deps.get_current_user] = lambda: SimpleNamespace(id=3, email="admin@universidad.edu")
+            admin = client.get("/api/usage/report")
+
+        assert anonymous.status_code == 401
+        assert student.status_code == 403
+        assert admin.status_code == 200
+        assert admin.json()["totals"]["total_tokens"] == 1000
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
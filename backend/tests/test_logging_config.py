@@ -0,0 +1,75 @@
+import io
+import json
+import logging
+import pytest
+from app.core import logging_config
+from app.core.logging_config import DebugSamplingFilter, JsonFormatter, parse_levels, redact
+
+
+class TestLoggingConfig:
+
+    def test_redact_bearer_and_query_tokens(self):
+        text = "Authorization: Bearer abc.def-123 url=https://graph.facebook.com/x?access_token=EAAB123&x=1"
+        result = redact(text)
+
+        assert "abc.def-123" not in result
+        assert "EAAB123" not in result
+        assert "[REDACTED]" in result
+
+    def test_json_formatter_includes_extra_fields(self):
+        record = logging.LogRecord("app.test", logging.INFO, __file__, 1, "Queue drained", None, None)
+        record.processed = 3
+
+        entry = json.loads(JsonFormatter().format(record))
+
+        assert entry["message"] == "Queue drained"
+        assert entry["level"] == "INFO"
+        assert entry["processed"] == 3
+
+    def test_debug_sampling_keeps_higher_levels(self):
+        sampler = DebugSamplingFilter(rate=0)
+        debug = logging.LogRecord("app", logging.DEBUG, __file__, 1, "tick", None, None)
+        info = logging.LogRecord("app", logging.INFO, __file__, 1, "done", None, None)
+
+        assert sampler.filter(debug) is False
+        assert sampler.filter(info) is True
+
+    def test_parse_levels(self):
+        levels = parse_levels("app.services.publishers=debug, uvicorn.access=WARNING,")
+        assert levels == {"app.services.publishers": "DEBUG", "uvicorn.access": "WARNING"}
+
+    def test_setup_logging_writes_json_through_queue(self):
+        stream = io.StringIO()
+        logging_config.setup_logging(level="INFO", fmt="json", module_levels="", stream=stream)
+        try:
+            logging.getLogger("app.test").info("token=%s", "super-secret")
+        finally:
+            logging_config.shutdown_logging()
+
+        entry = json.loads(stream.getvalue().strip().splitlines()[-1])
+        assert entry["logger"] == "app.test"
+        assert "super-secret" not in entry["message"]
+
+    def test_uvicorn_access_log_is_redacted(self):
+        stream = io.StringIO()
+        access_logger = logging.getLogger("uvicorn.access")
+        handler = logging.StreamHandler(stream)
+        access_logger.addHandler(handler)
+        logging_config.setup_logging(level="INFO", fmt="text", module_levels="", stream=io.StringIO())
+        try:
+            # Same shape as uvicorn's access record: its formatter unpacks the five arguments
+            access_logger.info(
+                '%s - "%s %s HTTP/%s" %d',
+                "127.0.0.1:50000", "GET", "/api/publications/events?access_token=eyJhbGciOi.payload.sig", "1.1", 200,
+            )
+        finally:
+            access_logger.removeHandler(handler)
+            logging_config.shutdown_logging()
+
+        line = stream.getvalue()
+        assert "eyJhbGciOi" not in line
+        assert '"GET /api/publications/events?access_token=[REDACTED] HTTP/1.1" 200' in line
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -1,3 +1,4 @@
+import hashlib
 import pytest
 from unittest.mock import Mock, patch, MagicMock, mock_open
 import tempfile
@@ -21,9 +22,9 @@ class TestMediaGenerator:
         mock_client.images.generate.return_value = mock_response
         
         mock_http_response = MagicMock()
-        mock_http_response.content = b"fake_image_data"
+        mock_http_response.iter_content.return_value = [b"fake_image_data"]
         mock_http_response.raise_for_status = MagicMock()
-        mock_requests.return_value = mock_http_response
+        mock_requests.return_value.__enter__.return_value = mock_http_response
         
         generator = MediaGenerator()
         generator.client = mock_client
@@ -33,11 +34,18 @@ class TestMediaGenerator:
             mock_path = "/tmp/test_image.png"
             mock_mkstemp.return_value = (mock_fd, mock_path)
             
-            with patch('os.fdopen', mock_open()) as mock_file:
+            with patch('os.fdopen', mock_open()) as mock_file, patch('os.replace') as mock_replace, \
+                    patch('app.services.media_generator.record_remote_copy') as mock_record:
                 path, url = generator.generate_image("Test prompt")
                 
-                assert path == mock_path
+                # Saved under its content hash
+                expected_path = os.path.join("/tmp", hashlib.sha256(b"fake_image_data").hexdigest()[:32] + ".png")
+                assert path == expected_path
+                mock_replace.assert_called_once_with(mock_path, expected_path)
+                mock_file().write.assert_called_once_with(b"fake_image_data")
                 assert url == "https://example.com/image.png"
+                # The expiring OpenAI URL is linked to the local file for the publishers
+                mock_record.assert_called_once_with("/tmp", url, os.path.basename(expected_path))
                 mock_client.images.generate.assert_called_once()
     
     def test_get_public_url_image(self):
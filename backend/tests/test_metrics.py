@@ -0,0 +1,45 @@
+import pytest
+from unittest.mock import MagicMock
+from app.core import metrics
+
+
+class TestMetrics:
+
+    def _sample(self, name, labels):
+        return metrics.registry.get_sample_value(name, labels) or 0.0
+
+    def test_time_stage_records_observation(self):
+        before = self._sample("generate_stage_duration_seconds_count", {"stage": "llm"})
+
+        with metrics.time_stage("llm"):
+            pass
+
+        after = self._sample("generate_stage_duration_seconds_count", {"stage": "llm"})
+        assert after == before + 1
+
+    def test_record_token_usage(self):
+        labels = {"model": "test-model", "kind": "prompt"}
+        before = self._sample("openai_tokens_total", labels)
+
+        usage = MagicMock()
+        usage.prompt_tokens = 120
+        usage.completion_tokens = 80
+        metrics.record_token_usage("test-model", usage)
+
+        assert self._sample("openai_tokens_total", labels) == before + 120
+        assert self._sample("openai_tokens_total", {"model": "test-model", "kind": "completion"}) >= 80
+
+    def test_record_token_usage_ignores_missing_usage(self):
+        metrics.record_token_usage("test-model", None)
+        metrics.record_token_usage("test-model", MagicMock())  # non-int fields are skipped
+
+    def test_render_latest_prometheus_format(self):
+        body, content_type = metrics.render_latest()
+
+        assert content_type.startswith("text/plain")
+        assert b"generate_stage_duration_seconds" in body
+        assert b"queue_pending_publications" in body
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
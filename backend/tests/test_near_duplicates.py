@@ -0,0 +1,176 @@
+import json
+import random
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from app.api import deps
+from app.main import app as application
+from app.models.chat import ChatMessage, ChatSession
+from app.models.publication import Publication
+from app.services.generation_pipeline import get_pipeline
+from app.services.near_duplicates import UNSORTED_TAIL, NearDuplicateIndex, NearDuplicateService, normalize, shingles
+
+ANNOUNCEMENT = (
+    "La Facultad de Ingeniería invita a estudiantes y docentes al congreso anual de investigación, "
+    "que se realizará el 5 de mayo en el auditorio central con conferencias y talleres abiertos."
+)
+REWORDED = (
+    "La Facultad de Ingeniería invita a los estudiantes y docentes al congreso anual de investigación, "
+    "que se realizará el 5 de mayo en el auditorio principal con conferencias y talleres abiertos!"
+)
+
+
+class TestNearDuplicateIndex:
+
+    def test_normalize_ignores_case_accents_urls_and_punctuation(self):
+        assert normalize("¡Inscripción ABIERTA! Más info: https://uni.edu/x") == ["inscripcion", "abierta", "mas", "info"]
+        assert shingles("Congreso de investigación") == ["congreso de", "de investigacion"]
+        assert NearDuplicateIndex().signature("¡¿...?!") is None
+
+    def test_finds_rewordings_in_sorted_and_unsorted_rows(self):
+        rng = random.Random(3)
+        vocabulary = [f"w{i}" for i in range(2000)]
+        index = NearDuplicateIndex()
+        index.add_many((ref, " ".join(rng.choices(vocabulary, k=40))) for ref in range(UNSORTED_TAIL * 2))
+        index.add(10_000, ANNOUNCEMENT)  # stays in the unsorted tail
+
+        assert index.query(REWORDED, 0.7)[0][0] == 10_000
+        assert index.query("Convocatoria de becas deportivas para el segundo semestre", 0.7) == []
+
+        index.add_many([(20_000, REWORDED)])  # also appended to the tail
+        matches = index.query(ANNOUNCEMENT, 0.7)
+        assert {ref for ref, _ in matches} == {10_000, 20_000}
+        assert matches[0] == (10_000, 1.0)
+        assert 0.7 <= matches[1][1] < 1.0
+
+    def test_new_rows_do_not_resort_the_index(self):
+        rng = random.Random(5)
+        vocabulary = [f"w{i}" for i in range(2000)]
+        index = NearDuplicateIndex()
+        index.add_many((ref, " ".join(rng.choices(vocabulary, k=40))) for ref in range(UNSORTED_TAIL * 2))
+        assert index._sorted == index.size  # the bulk load is sorted once
+
+        with patch.object(index, "_reindex", wraps=index._reindex) as reindex:
+            index.add_many([(10_000, ANNOUNCEMENT)])
+            index.add(10_001, "Feria de empleo en el campus central el próximo martes")
+            assert reindex.call_count == 0
+            assert index.query(REWORDED, 0.7)[0][0] == 10_000
+
+            index.add_many((20_000 + ref, " ".join(rng.choices(vocabulary, k=40))) for ref in range(UNSORTED_TAIL))
+            assert reindex.call_count == 1  # the tail passed UNSORTED_TAIL
+
+        assert index._sorted == index.size
+        assert index.query(REWORDED, 0.7)[0][0] == 10_000
+
+
+class TestNearDuplicateEndpoints:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, session_factory):
+        self.SessionLocal = session_factory
+        self.service = NearDuplicateService()
+
+        def override_get_db():
+            db = self.SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        application.dependency_overrides[deps.get_db] = override_get_db
+        application.dependency_overrides[deps.get_current_user] = lambda: SimpleNamespace(id=1)
+        application.dependency_overrides[deps.get_current_user_optional] = lambda: SimpleNamespace(id=1)
+        self.patch = patch("app.services.near_duplicates.get_near_duplicates", return_value=self.service)
+        self.patch.start()
+        self.client = TestClient(application)
+
+    def teardown_method(self):
+        self.patch.stop()
+        application.dependency_overrides.clear()
+
+    def add_generation(self, user_id, title, body, results):
+        db = self.SessionLocal()
+        chat = ChatSession(user_id=user_id, title=title)
+        db.add(chat)
+        db.flush()
+        db.add(ChatMessage(session_id=chat.id, role="user", content=json.dumps({"title": title, "body": body})))
+        db.add(ChatMessage(session_id=chat.id, role="assistant", content=json.dumps(results)))
+        db.commit()
+        session_id = chat.id
+        db.close()
+        return session_id
+
+    def test_publish_holds_back_near_duplicates(self):
+        db = self.SessionLocal()
+        db.add_all([
+            Publication(user_id=1, platform="facebook", text=ANNOUNCEMENT, status="published"),
+            Publication(user_id=1, platform="linkedin", text="Otro anuncio " + ANNOUNCEMENT, status="failed"),
+            Publication(user_id=1, platform="whatsapp", text=ANNOUNCEMENT, status="published", created_at=datetime.utcnow() - timedelta(days=90)),
+            Publication(user_id=2, platform="instagram", text=ANNOUNCEMENT, status="published"),
+        ])
+        db.commit()
+        db.close()
+
+        held = self.client.post("/api/publish", json={"platform": "facebook", "text": REWORDED})
+        # Same text on another network, a dead-lettered post, an old one and another user's post do not count
+        other = [
+            self.client.post("/api/publish", json={"platform": platform, "text": REWORDED})
+            for platform in ("instagram", "linkedin", "whatsapp")
+        ]
+        allowed = self.client.post("/api/publish", json={"platform": "facebook", "text": REWORDED, "allow_duplicate": True})
+
+        assert held.status_code == 409
+        assert held.json()["detail"]["duplicates"][0]["publication_id"] == 1
+        assert held.json()["detail"]["duplicates"][0]["similarity"] >= 0.7
+        assert [response.status_code for response in other] == [200, 200, 200]
+        assert allowed.status_code == 200
+
+    def test_warm_loads_both_indexes(self):
+        self.add_generation(1, "Congreso de investigación", ANNOUNCEMENT, {"facebook": {"text": "Post"}})
+        db = self.SessionLocal()
+        db.add(Publication(user_id=1, platform="facebook", text=ANNOUNCEMENT, status="published"))
+        db.commit()
+        db.close()
+
+        with patch("app.services.near_duplicates.SessionLocal", self.SessionLocal):
+            self.service.warm()
+
+        assert (self.service._generations.size, self.service._publications["facebook"].size) == (1, 1)
+        db = self.SessionLocal()
+        try:
+            assert self.service.similar_publications(db, 1, "facebook", REWORDED)[0]["publication_id"] == 1
+        finally:
+            db.close()
+
+    def test_generate_offers_and_reuses_previous_result(self):
+        previous = {
+            "facebook": {"text": "Post anterior", "media_url": "http://x/img.png"},
+            "tiktok": {"error": "GENERATION_FAILED"},
+        }
+        session_id = self.add_generation(1, "Congreso de investigación", ANNOUNCEMENT, previous)
+        self.add_generation(2, "Congreso de investigación", ANNOUNCEMENT, previous)
+        pipeline = MagicMock()
+        pipeline.generate.return_value = {"tiktok": {"script": "nuevo"}}
+        application.dependency_overrides[get_pipeline] = lambda: pipeline
+
+        similar = self.client.post("/api/generate/similar", json={"title": "Congreso de investigación", "body": REWORDED}).json()
+        reused = self.client.post("/api/generate", json={
+            "title": "Congreso de investigación", "body": REWORDED, "platforms": ["facebook"], "reuse": True,
+        })
+        # A previous result that failed for a requested platform is not reused
+        generated = self.client.post("/api/generate", json={
+            "title": "Congreso de investigación", "body": REWORDED, "platforms": ["tiktok"], "reuse": True,
+        })
+
+        # Only the user's own history is offered
+        assert [match["session_id"] for match in similar] == [session_id]
+        assert reused.json() == {"facebook": previous["facebook"]}
+        assert reused.headers["Reused-From-Session"] == str(session_id)
+        assert generated.json() == {"tiktok": {"script": "nuevo"}}
+        pipeline.generate.assert_called_once()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,116 @@
+import shutil
+import tempfile
+import threading
+import time
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from app.api import deps
+from app.core.profiling import StackSampler
+from app.main import app as application
+from app.services.generation_pipeline import get_pipeline
+
+TOKEN = "s3cret-profiling"
+
+
+def busy_generate(*args, **kwargs):
+    deadline = time.perf_counter() + 0.15
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+    return {"facebook": {"text": "ok"}}
+
+
+class TestStackSampler:
+
+    def test_folded_stacks_of_the_included_threads_only(self):
+        stop = threading.Event()
+
+        def spin():
+            while not stop.is_set():
+                sum(range(1000))
+
+        worker = threading.Thread(target=spin, name="worker")
+        worker.start()
+        sampler = StackSampler(lambda ident: ident == worker.ident, interval=0.002).start()
+        time.sleep(0.1)
+        sampler.stop()
+        stop.set()
+        worker.join()
+
+        lines = sampler.folded().splitlines()
+        assert sampler.samples > 5
+        assert all(line.startswith("[worker];") for line in lines)
+        stack, count = lines[0].rsplit(" ", 1)
+        assert "spin (tests/test_profiling.py:" in stack
+        assert int(count) > 0
+
+
+class TestProfilingEndpoints:
+
+    def setup_method(self):
+        self.dir = tempfile.mkdtemp()
+        values = dict(
+            PROFILING_TOKEN=TOKEN, PROFILING_DIR=self.dir, PROFILING_INTERVAL_MS=2,
+            PROFILING_MAX_SECONDS=1, PROFILING_MAX_ARTIFACTS=50,
+        )
+        self.settings = SimpleNamespace(**values)
+        self.patches = [
+            patch("app.core.profiling.settings", self.settings),
+            patch("app.api.endpoints.profiling.settings", self.settings),
+        ]
+        for p in self.patches:
+            p.start()
+        pipeline = MagicMock()
+        pipeline.generate.side_effect = busy_generate
+        application.dependency_overrides[get_pipeline] = lambda: pipeline
+        application.dependency_overrides[deps.get_current_user_optional] = lambda: None
+        self.client = TestClient(application)
+
+    def teardown_method(self):
+        for p in self.patches:
+            p.stop()
+        application.dependency_overrides.clear()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_request_profile_follows_the_pipeline_thread(self):
+        payload = {"title": "Congreso", "body": "Anuncio", "platforms": ["facebook"]}
+
+        plain = self.client.post("/api/generate", json=payload)
+        rejected = self.client.post("/api/generate", json=payload, headers={"X-Profile": "wrong"})
+        profiled = self.client.post("/api/generate", json=payload, headers={"X-Profile": TOKEN})
+
+        assert "X-Profile-Artifact" not in plain.headers
+        assert rejected.status_code == 403
+        assert profiled.status_code == 200
+        name = profiled.headers["X-Profile-Artifact"]
+        artifact = self.client.get(f"/api/profiling/artifacts/{name}", headers={"X-Profile": TOKEN})
+        assert artifact.status_code == 200
+        assert "busy_generate (tests/test_profiling.py:" in artifact.text
+        assert [a["name"] for a in self.client.get("/api/profiling/artifacts", headers={"X-Profile": TOKEN}).json()["artifacts"]] == [name]
+
+    def test_process_sampling_and_admin_access(self):
+        started = self.client.post("/api/profiling/sample?seconds=30", headers={"X-Profile": TOKEN})
+        again = self.client.post("/api/profiling/sample", headers={"X-Profile": TOKEN})
+        no_token = self.client.get("/api/profiling/artifacts")
+        traversal = self.client.get("/api/profiling/artifacts/..%2Fsecrets.folded", headers={"X-Profile": TOKEN})
+
+        assert started.json()["seconds"] == 1  # capped at PROFILING_MAX_SECONDS
+        assert again.status_code == 409
+        assert no_token.status_code == 403
+        assert traversal.status_code == 404
+
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            listing = self.client.get("/api/profiling/artifacts", headers={"X-Profile": TOKEN}).json()
+            if not listing["running"]:
+                break
+            time.sleep(0.1)
+        assert [a["name"] for a in listing["artifacts"]] == [started.json()["artifact"]]
+
+        self.settings.PROFILING_TOKEN = None
+        assert self.client.get("/api/profiling/artifacts", headers={"X-Profile": TOKEN}).status_code == 404
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
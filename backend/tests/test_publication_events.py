@@ -0,0 +1,128 @@
+import asyncio
+import json
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+from sqlalchemy.pool import NullPool
+from app.api.routes import stream_publication_events
+from app.models.publication import Publication
+from app.services.publication_events import CHANNEL, PublicationEvents, resolve_backend
+from app.services.queue_service import QueueService
+
+
+class TestPublicationEvents:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, session_factory):
+        self.SessionLocal = session_factory
+        self.events = PublicationEvents(backend="memory")
+
+    def test_resolve_backend(self):
+        with patch("app.services.publication_events.settings") as settings:
+            settings.REDIS_HOST = "redis"
+            assert resolve_backend("auto") == "redis"
+
+            settings.REDIS_HOST = None
+            settings.DATABASE_URL = "postgresql://db/app"
+            assert resolve_backend("auto") == "postgres"
+
+            settings.DATABASE_URL = "sqlite:///./dev.db"
+            assert resolve_backend("auto") == "memory"
+
+        with pytest.raises(ValueError):
+            resolve_backend("kafka")
+
+    def test_events_reach_only_their_user_from_any_thread(self):
+        async def run():
+            mine = self.events.subscribe(1)
+            other = self.events.subscribe(2)
+            # The queue worker publishes from a lane thread
+            thread = threading.Thread(target=self.events.publish, args=({"user_id": 1, "publication_id": 7, "status": "published"},))
+            thread.start()
+            thread.join()
+            event = await asyncio.wait_for(mine.get(), timeout=1)
+            self.events.unsubscribe(1, mine)
+            self.events.unsubscribe(2, other)
+            return event, other.empty()
+
+        event, other_empty = asyncio.run(run())
+
+        assert event["publication_id"] == 7
+        assert other_empty
+        assert self.events._subscribers == {}
+
+    def test_redis_backend_broadcasts(self):
+        events = PublicationEvents(backend="redis")
+        events._redis = MagicMock()
+
+        events.publish({"user_id": 1, "publication_id": 7, "status": "failed"})
+
+        channel, payload = events._redis.publish.call_args.args
+        assert channel == CHANNEL
+        assert json.loads(payload)["status"] == "failed"
+
+    def test_postgres_listener_uses_an_unpooled_connection(self):
+        events = PublicationEvents(backend="postgres")
+        engine = MagicMock()
+        connection = engine.raw_connection.return_value
+
+        with patch("app.services.publication_events.create_engine", return_value=engine) as create, \
+                patch("app.services.publication_events.select.select", side_effect=OSError("connection lost")):
+            with pytest.raises(OSError):
+                events._listen_postgres()
+
+        assert create.call_args.kwargs["poolclass"] is NullPool
+        connection.driver_connection.cursor.return_value.execute.assert_called_once_with(f"LISTEN {CHANNEL}")
+        # Closed for good (NullPool), never back in the shared pool with autocommit and LISTEN still on
+        connection.close.assert_called_once()
+
+    def test_queue_worker_pushes_transitions_with_timings(self):
+        db = self.SessionLocal()
+        db.add(Publication(user_id=1, platform="facebook", text="Hola", status="pending"))
+        db.commit()
+        db.close()
+
+        service = QueueService()
+        service._publisher = MagicMock()
+        service._publisher.publish_facebook.return_value = {"success": True}
+        with patch("app.services.queue_service.SessionLocal", self.SessionLocal), \
+                patch("app.services.queue_service.publication_events") as events:
+            service.process_pending_publications()
+
+        processing, published = [call.args[0] for call in events.publish.call_args_list]
+        assert (processing["previous_status"], processing["status"]) == ("pending", "processing")
+        assert processing["queued_seconds"] >= 0
+        assert (published["previous_status"], published["status"], published["attempts"]) == ("processing", "published", 1)
+        assert published["publish_seconds"] >= 0
+
+    def test_stream_sends_snapshot_then_live_events(self):
+        db = self.SessionLocal()
+        db.add_all([
+            Publication(user_id=1, platform="facebook", text="a", status="pending"),
+            Publication(user_id=1, platform="linkedin", text="b", status="published"),
+        ])
+        db.commit()
+        db.close()
+
+        async def run():
+            with patch("app.services.publication_events.SessionLocal", self.SessionLocal), \
+                    patch("app.api.routes.publication_events", self.events):
+                response = await stream_publication_events(current_user=MagicMock(id=1))
+                stream = response.body_iterator
+                snapshot = await stream.__anext__()
+                self.events.publish({"user_id": 1, "publication_id": 1, "status": "processing"})
+                live = await stream.__anext__()
+                await stream.aclose()
+            return response, snapshot, live
+
+        response, snapshot, live = asyncio.run(run())
+
+        assert response.media_type == "text/event-stream"
+        assert snapshot.startswith("event: publication\n")
+        assert json.loads(snapshot.split("data: ")[1])["status"] == "pending"
+        assert json.loads(live.split("data: ")[1])["status"] == "processing"
+        assert self.events._subscribers == {}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,124 @@
+import asyncio
+import time
+import pytest
+import requests
+from unittest.mock import MagicMock, patch
+from app.models.publication import Publication
+from app.services.background_workers import QueueLanes
+from app.services.publishers.facebook import FacebookPublisher
+from app.services.publishers.base import publish_attempt, publish_deadline
+from app.services.queue_service import QueueService, parse_lanes
+
+
+class TestQueueLanes:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, session_factory):
+        self.SessionLocal = session_factory
+        self.service = QueueService()
+        self.service._publisher = MagicMock()
+        self.service._publisher.publish_facebook.return_value = {"success": True}
+        self.service._publisher.publish_tiktok.return_value = {"success": True}
+
+    def add(self, platform, count=1):
+        db = self.SessionLocal()
+        db.add_all([Publication(platform=platform, text="Hola", status="pending") for _ in range(count)])
+        db.commit()
+        db.close()
+
+    def test_parse_lanes_and_defaults(self):
+        assert parse_lanes("tiktok=1:600, linkedin=2,") == {
+            "tiktok": {"concurrency": 1, "timeout_seconds": 600.0},
+            "linkedin": {"concurrency": 2},
+        }
+
+        with patch("app.services.queue_service.settings") as settings:
+            settings.WORKER_LANES = "tiktok=1:600"
+            settings.WORKER_CONCURRENCY = 3
+            settings.WORKER_LANE_TIMEOUT_SECONDS = 45
+            assert self.service.lane("tiktok").timeout_seconds == 600
+            assert self.service.lane("facebook").concurrency == 3
+            assert self.service.lane("facebook").timeout_seconds == 45
+
+    def test_stats_and_drain_are_per_lane(self):
+        self.add("facebook", 2)
+        self.add("tiktok", 3)
+
+        with patch("app.services.queue_service.SessionLocal", self.SessionLocal):
+            stats = self.service.get_queue_stats()
+            result = self.service.process_pending_publications(platform="facebook")
+            after = self.service.get_queue_stats()
+
+        assert stats["pending"] == 5
+        assert stats["lanes"]["tiktok"]["pending"] == 3
+        assert stats["lanes"]["linkedin"] == {"pending": 0, "oldest_pending_age_seconds": 0.0}
+        assert result == {"processed": 2, "published": 2, "retrying": 0, "failed": 0}
+        assert after["lanes"]["facebook"]["pending"] == 0
+        assert after["lanes"]["tiktok"]["pending"] == 3
+        self.service._publisher.publish_tiktok.assert_not_called()
+
+    def test_slow_lane_does_not_block_fast_lane(self):
+        finished = {}
+
+        def drain(limit=None, platform=None):
+            time.sleep(0.5 if platform == "tiktok" else 0.01)
+            finished[platform] = time.perf_counter()
+            return {"processed": 1, "published": 1, "failed": 0}
+
+        async def run():
+            lanes = QueueLanes()
+            with patch("app.services.queue_service.queue_service.process_pending_publications", side_effect=drain):
+                started = lanes.dispatch({"tiktok": {"pending": 1}, "facebook": {"pending": 1}, "linkedin": {"pending": 0}})
+                # A lane still draining is not started again by the next tick
+                again = lanes.dispatch({"tiktok": {"pending": 1}})
+                await asyncio.sleep(0.2)
+                fast_done = "facebook" in finished and "tiktok" not in finished
+                await asyncio.sleep(0.5)
+                await lanes.shutdown()
+            return started, again, fast_done
+
+        started, again, fast_done = asyncio.run(run())
+
+        assert started == ["tiktok", "facebook"]
+        assert again == []
+        assert fast_done
+        assert finished["facebook"] < finished["tiktok"]
+
+    def test_publish_deadline_caps_request_timeout(self):
+        publisher = FacebookPublisher()
+
+        with patch("app.services.publishers.base.requests.request") as request:
+            request.return_value.status_code = 200
+            with publish_deadline(5):
+                publisher._request("POST", "https://graph.example/feed", timeout=30)
+            assert 0 < request.call_args.kwargs["timeout"] <= 5
+
+            with publish_deadline(0.001):
+                time.sleep(0.01)
+                with pytest.raises(requests.Timeout):
+                    publisher._request("POST", "https://graph.example/feed")
+
+    def test_publish_deadline_stops_a_slow_upload(self):
+        publisher = FacebookPublisher()
+        sent = []
+
+        def slow_upload(method, url, data=None, **kwargs):
+            # A server that keeps reading: every send is within the socket timeout, the transfer is not
+            for chunk in data:
+                sent.append(len(chunk))
+                time.sleep(0.02)
+
+        with patch("app.services.publishers.base.requests.request", side_effect=slow_upload):
+            with publish_attempt(0.1) as attempt:
+                started = time.perf_counter()
+                with pytest.raises(requests.Timeout):
+                    publisher._request("PUT", "https://upload.example/video", data=b"x" * (64 * 1024 * 100))
+                elapsed = time.perf_counter() - started
+
+        assert elapsed < 0.3
+        assert 0 < len(sent) < 100
+        assert attempt.network_error
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,236 @@
+import tempfile
+import pytest
+import requests
+from pathlib import Path
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from app.api import deps
+from app.main import app as application
+from app.models.publication import Publication
+from app.services.publishers.base import PublishAttempt
+from app.core.static_media import record_remote_copy
+from app.services.publishers.facebook import FacebookPublisher
+from app.services.publishers.linkedin import LinkedInPublisher
+from app.services.queue_service import QueueService, classify_failure, retry_delay
+
+
+class TestQueueRetries:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, session_factory):
+        self.SessionLocal = session_factory
+        self.service = QueueService()
+        self.service._publisher = MagicMock()
+
+    def add(self, platform="facebook", **fields):
+        db = self.SessionLocal()
+        publication = Publication(platform=platform, text="Hola", status=fields.pop("status", "pending"), **fields)
+        db.add(publication)
+        db.commit()
+        publication_id = publication.id
+        db.close()
+        return publication_id
+
+    def get(self, publication_id):
+        db = self.SessionLocal()
+        try:
+            return db.get(Publication, publication_id)
+        finally:
+            db.close()
+
+    def drain(self):
+        with patch("app.services.queue_service.SessionLocal", self.SessionLocal):
+            return self.service.process_pending_publications()
+
+    def test_classify_failure(self):
+        assert classify_failure({"error": "CONFIG_ERROR"}, PublishAttempt(network_error=True)) == "permanent"
+        assert classify_failure({"error": "EXCEPTION"}, PublishAttempt(network_error=True)) == "retriable"
+        assert classify_failure({"error": "API_ERROR"}, PublishAttempt(status_code=503)) == "retriable"
+        assert classify_failure({"error": "API_ERROR"}, PublishAttempt(status_code=429)) == "retriable"
+        assert classify_failure({"error": "UPLOAD_ERROR", "status_code": 502}, PublishAttempt()) == "retriable"
+        assert classify_failure({"error": "API_ERROR"}, PublishAttempt(status_code=400)) == "permanent"
+        # An exception after a successful response is a bug, not an outage
+        assert classify_failure({"error": "EXCEPTION"}, PublishAttempt(status_code=200)) == "permanent"
+
+    def test_retry_delay_backs_off_with_jitter(self):
+        with patch("app.services.queue_service.settings") as settings:
+            settings.PUBLISH_RETRY_BASE_SECONDS = 10
+            settings.PUBLISH_RETRY_MAX_SECONDS = 60
+            assert 5 <= retry_delay(1) <= 10
+            assert 20 <= retry_delay(3) <= 40
+            assert 30 <= retry_delay(10) <= 60
+            assert retry_delay(1, retry_after=45) == 45
+            assert retry_delay(1, retry_after=600) == 60
+
+    def test_request_records_attempt(self):
+        from app.services.publishers.base import publish_attempt
+
+        publisher = FacebookPublisher()
+        with patch("app.services.publishers.base.requests.request") as request:
+            request.return_value.status_code = 429
+            request.return_value.headers = {"Retry-After": "120"}
+            with publish_attempt(30) as attempt:
+                publisher._request("POST", "https://graph.example/feed")
+            assert (attempt.status_code, attempt.retry_after, attempt.network_error) == (429, 120.0, False)
+
+            request.side_effect = requests.ConnectionError("refused")
+            with publish_attempt(30) as attempt:
+                with pytest.raises(requests.ConnectionError):
+                    publisher._request("POST", "https://graph.example/feed")
+            assert attempt.network_error
+
+            # A swallowed network error followed by a definitive rejection is not retried
+            rejected = MagicMock(status_code=400, headers={})
+            request.side_effect = [requests.ConnectionError("refused"), rejected]
+            with publish_attempt(30) as attempt:
+                with pytest.raises(requests.ConnectionError):
+                    publisher._request("HEAD", "https://cdn.example/image.png")
+                publisher._request("POST", "https://graph.example/feed")
+            assert (attempt.status_code, attempt.network_error) == (400, False)
+            assert classify_failure({"error": "API_ERROR"}, attempt) == "permanent"
+
+    def test_transient_failure_is_retried_until_dead_letter(self):
+        publication_id = self.add()
+
+        publisher = FacebookPublisher()
+
+        def outage(text, media_url):
+            try:
+                publisher._request("POST", "https://graph.example/feed")
+            except requests.ConnectionError as e:
+                return {"error": "EXCEPTION", "message": str(e)}
+
+        self.service._publisher.publish_facebook.side_effect = outage
+        with patch("app.services.publishers.base.requests.request", side_effect=requests.ConnectionError("platform down")), \
+                patch("app.services.queue_service.settings") as settings:
+            settings.PUBLISH_MAX_ATTEMPTS = 2
+            settings.PUBLISH_RETRY_BASE_SECONDS = 30
+            settings.PUBLISH_RETRY_MAX_SECONDS = 60
+            settings.WORKER_LANES = ""
+            settings.WORKER_CONCURRENCY = 1
+            settings.WORKER_LANE_TIMEOUT_SECONDS = 5
+
+            assert self.drain() == {"processed": 1, "published": 0, "retrying": 1, "failed": 0}
+            publication = self.get(publication_id)
+            assert publication.status == "retrying"
+            assert publication.attempts == 1
+            assert publication.error_class == "retriable"
+            assert publication.next_attempt_at > datetime.utcnow() + timedelta(seconds=10)
+
+            # Not due yet: the next drain leaves it alone and the stats don't count it as pending
+            assert self.drain()["processed"] == 0
+            with patch("app.services.queue_service.SessionLocal", self.SessionLocal):
+                stats = self.service.get_queue_stats()
+            assert (stats["pending"], stats["retrying"], stats["dead_letter"]) == (0, 1, 0)
+
+            db = self.SessionLocal()
+            db.query(Publication).update({Publication.next_attempt_at: datetime.utcnow() - timedelta(seconds=1)})
+            db.commit()
+            db.close()
+
+            assert self.drain() == {"processed": 1, "published": 0, "retrying": 0, "failed": 1}
+            publication = self.get(publication_id)
+            assert (publication.status, publication.attempts, publication.next_attempt_at) == ("failed", 2, None)
+
+    def test_permanent_failure_goes_straight_to_dead_letter(self):
+        publication_id = self.add()
+        self.service._publisher.publish_facebook.return_value = {"error": "CONFIG_ERROR", "message": "No token"}
+
+        assert self.drain()["failed"] == 1
+        publication = self.get(publication_id)
+        assert (publication.status, publication.error_code, publication.error_class) == ("failed", "CONFIG_ERROR", "permanent")
+        assert publication.attempts == 1
+
+
+class TestExpiredMedia:
+
+    BLOB = "https://oaidalleapiprodscus.blob.core.windows.net/private/org-Ab12/user-Cd34/img-Ef56Gh78.png"
+
+    def test_expired_openai_url_uploads_the_local_copy(self):
+        media_dir = tempfile.mkdtemp()
+        (Path(media_dir) / "3f2a9c.png").write_bytes(b"png bytes")
+        record_remote_copy(media_dir, f"{self.BLOB}?st=2026-10-19T14%3A00%3A00Z&se=2026-10-19T16%3A00%3A00Z&sig=first", "3f2a9c.png")
+
+        publisher = LinkedInPublisher()
+        publisher.access_token, publisher.author_urn = "token", "urn:li:person:1"
+        publisher.media_dir = media_dir
+        responses = {
+            "POST": MagicMock(status_code=200, json=lambda: {"value": {
+                "uploadMechanism": {"com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest": {"uploadUrl": "https://upload.example/1"}},
+                "asset": "urn:li:digitalmediaAsset:1",
+            }}),
+            "PUT": MagicMock(status_code=201),
+        }
+        with patch("app.services.publishers.base.requests.request", side_effect=lambda method, url, **kw: responses[method]) as request:
+            # Same image, signed again: the query string differs from the one recorded
+            result = publisher.publish("Hola", f"{self.BLOB}?st=2026-10-19T18%3A00%3A00Z&sig=later")
+
+        assert result["success"]
+        assert all(call.args[1].startswith("https://oaidalleapiprodscus") is False for call in request.call_args_list)
+        put = next(call for call in request.call_args_list if call.args[0] == "PUT")
+        assert put.kwargs["data"] == b"png bytes"
+        assert publisher._get_local_path_from_url("https://oaidalleapiprodscus.blob.core.windows.net/private/img-other.png?sig=x") is None
+
+
+class TestDeadLetterEndpoints:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, session_factory):
+        self.SessionLocal = session_factory
+
+        db = self.SessionLocal()
+        db.add_all([
+            Publication(user_id=1, platform="facebook", text="a", status="failed", attempts=5, error_code="API_ERROR", error_class="retriable"),
+            Publication(user_id=1, platform="facebook", text="b", status="failed", attempts=1, error_code="CONFIG_ERROR", error_class="permanent"),
+            Publication(user_id=1, platform="linkedin", text="c", status="failed", attempts=5, error_code="EXCEPTION", error_class="retriable"),
+            Publication(user_id=1, platform="linkedin", text="d", status="published", attempts=1),
+            Publication(user_id=2, platform="facebook", text="e", status="failed", attempts=5, error_code="API_ERROR", error_class="retriable"),
+        ])
+        db.commit()
+        db.close()
+
+        def override_get_db():
+            db = self.SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        application.dependency_overrides[deps.get_db] = override_get_db
+        application.dependency_overrides[deps.get_current_user] = lambda: SimpleNamespace(id=1)
+        self.client = TestClient(application)
+
+    def teardown_method(self):
+        application.dependency_overrides.clear()
+
+    def test_list_and_bulk_requeue(self):
+        response = self.client.get("/api/queue/dead-letter", params={"error_class": "retriable"})
+        assert response.status_code == 200
+        assert sorted(entry["id"] for entry in response.json()) == [1, 3]
+        assert response.json()[0]["attempts"] == 5
+
+        response = self.client.post("/api/queue/dead-letter/requeue", json={"error_class": "retriable"})
+        assert response.json() == {"requeued": 2}
+
+        db = self.SessionLocal()
+        statuses = {p.id: (p.status, p.attempts) for p in db.query(Publication).all()}
+        db.close()
+        # Another user's dead letter is neither listed nor requeued
+        assert statuses == {1: ("pending", 0), 2: ("failed", 1), 3: ("pending", 0), 4: ("published", 1), 5: ("failed", 5)}
+
+        assert self.client.post("/api/queue/dead-letter/requeue", json={}).status_code == 400
+        response = self.client.post("/api/queue/dead-letter/requeue", json={"ids": [2, 5]})
+        assert response.json() == {"requeued": 1}
+        assert self.client.get("/api/queue/dead-letter").json() == []
+
+    def test_requires_authentication(self):
+        application.dependency_overrides.pop(deps.get_current_user)
+
+        assert self.client.get("/api/queue/dead-letter").status_code == 401
+        assert self.client.post("/api/queue/dead-letter/requeue", json={"ids": [1]}).status_code == 401
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,148 @@
+import time
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from app.core.metrics import LLM_HEDGES
+from app.services.content_generator import ContentGenerator
+from app.services.resilient_llm import MIN_LATENCY_SAMPLES, LLMUnavailableError, ResilientCall
+
+
+def tunables(**overrides):
+    values = dict(
+        LLM_HEDGE_QUANTILE=0.95, LLM_HEDGE_MIN_DELAY_SECONDS=0.05, LLM_HEDGE_MAX_RATIO=0.5,
+        LLM_BREAKER_FAILURES=2, LLM_BREAKER_COOLDOWN_SECONDS=60, LLM_MAX_PARALLEL_CALLS=8, LLM_FALLBACK_RESERVE=0.3,
+    )
+    values.update(overrides)
+    return patch("app.services.resilient_llm.settings", SimpleNamespace(**values))
+
+
+class TestResilientCall:
+
+    def setup_method(self):
+        self.call = ResilientCall("test", hedge=True, timeout_seconds=2)
+
+    def warm_up(self, latency=0.05):
+        self.call._latencies.extend([latency] * MIN_LATENCY_SAMPLES)
+
+    def test_hedge_fires_after_p95_and_first_answer_wins(self):
+        self.warm_up()
+        calls = []
+        abandoned = []
+
+        def request(model, timeout):
+            calls.append(timeout)
+            if len(calls) == 1:
+                time.sleep(0.5)
+                return "slow"
+            return "fast"
+
+        fired = LLM_HEDGES.labels(operation="test", event="fired")._value.get()
+        won = LLM_HEDGES.labels(operation="test", event="won")._value.get()
+        with tunables():
+            started = time.perf_counter()
+            result, model = self.call.call(request, ["primary"], on_abandoned=lambda r, m: abandoned.append((r, m)))
+            elapsed = time.perf_counter() - started
+            time.sleep(0.6)
+
+        assert (result, model) == ("fast", "primary")
+        assert elapsed < 0.4
+        # Every attempt gets the time left before the deadline as its own timeout
+        assert len(calls) == 2 and all(0 < timeout <= 2 for timeout in calls)
+        assert LLM_HEDGES.labels(operation="test", event="fired")._value.get() == fired + 1
+        assert LLM_HEDGES.labels(operation="test", event="won")._value.get() == won + 1
+        # The loser still ran (and was paid for)
+        assert abandoned == [("slow", "primary")]
+
+    def test_no_hedge_without_history_or_over_budget(self):
+        with tunables():
+            assert self.call.hedge_delay() is None
+            self.warm_up()
+            assert self.call.hedge_delay() == 0.05
+            self.call._hedge_flags.extend([True] * 10)
+            assert self.call.hedge_delay() is None
+
+        self.call.hedge = False
+        with tunables(LLM_HEDGE_MAX_RATIO=1.0):
+            assert self.call.hedge_delay() is None
+
+    def test_deadline_bounds_a_stuck_call(self):
+        self.call.timeout_seconds = 0.1
+
+        with tunables():
+            started = time.perf_counter()
+            with pytest.raises(TimeoutError):
+                self.call.call(lambda model, timeout: time.sleep(1), ["primary"])
+            assert time.perf_counter() - started < 0.5
+
+    def test_hanging_primary_leaves_time_for_the_fallback(self):
+        self.call.timeout_seconds = 0.5
+        timeouts = {}
+
+        def request(model, timeout):
+            timeouts[model] = timeout
+            if model == "primary":
+                time.sleep(1)
+                return "late"
+            return f"answer from {model}"
+
+        with tunables():
+            started = time.perf_counter()
+            result = self.call.call(request, ["primary", "fallback"])
+            elapsed = time.perf_counter() - started
+
+        assert result == ("answer from fallback", "fallback")
+        assert elapsed < 0.5
+        assert timeouts["primary"] == pytest.approx(0.35, abs=0.05)
+        assert 0.1 < timeouts["fallback"] <= 0.16
+
+    def test_circuit_opens_and_fails_over_to_fallback(self):
+        def request(model, timeout):
+            if model == "primary":
+                raise RuntimeError("upstream 500")
+            return f"answer from {model}"
+
+        with tunables():
+            # Errors fail over on the same call
+            assert self.call.call(request, ["primary", "fallback"]) == ("answer from fallback", "fallback")
+            assert self.call.call(request, ["primary", "fallback"])[1] == "fallback"
+            assert self.call.breaker("primary").state == "open"
+
+            # Open circuit: the primary is not even tried
+            primary = MagicMock(side_effect=request)
+            assert self.call.call(primary, ["primary", "fallback"])[1] == "fallback"
+            assert [c.args[0] for c in primary.call_args_list] == ["fallback"]
+            with pytest.raises(LLMUnavailableError):
+                self.call.call(request, ["primary"])
+
+            # After the cooldown one trial call closes it again
+            self.call.breaker("primary").opened_at -= 61
+            assert self.call.call(lambda model, timeout: "ok", ["primary", "fallback"]) == ("ok", "primary")
+            assert self.call.breaker("primary").state == "closed"
+
+    def test_content_generator_uses_fallback_model(self):
+        generator = ContentGenerator()
+        generator.client = MagicMock()
+        generator.model = "gpt-primary"
+        generator.fallback_model = "gpt-fallback"
+        usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15)
+        response = MagicMock(usage=usage)
+        response.choices[0].message.content = '{"facebook": {"text": "Hola"}}'
+
+        def create(model, **kwargs):
+            if model == "gpt-primary":
+                raise RuntimeError("timeout")
+            return response
+
+        generator.client.chat.completions.create.side_effect = create
+        on_usage = MagicMock()
+        result = generator.generate_social_content(
+            "Convocatoria de becas", "La universidad abre la convocatoria para estudiantes.", ["facebook"], on_usage=on_usage
+        )
+
+        assert result == {"facebook": {"text": "Hola"}}
+        assert "timeout" in generator.client.chat.completions.create.call_args.kwargs
+        on_usage.assert_called_once_with("gpt-fallback", usage)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
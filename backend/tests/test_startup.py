@@ -0,0 +1,72 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from pathlib import Path
+from sqlalchemy import create_engine, inspect
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+class TestStartup:
+
+    def setup_method(self):
+        self.env = {**os.environ, "LOG_LEVEL": "WARNING"}
+
+    def run_python(self, code: str, db_path: Path) -> str:
+        env = {**self.env, "DATABASE_URL": f"sqlite:///{db_path}"}
+        completed = subprocess.run(
+            [sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+        )
+        return completed.stdout.strip().splitlines()[-1]
+
+    def test_importing_api_defers_heavy_modules_and_schema(self, tmp_path):
+        db_path = tmp_path / "startup.db"
+        code = (
+            "import json, sys; import app.main; "
+            "print(json.dumps([m for m in ('moviepy', 'openai', 'PIL.Image') if m in sys.modules]))"
+        )
+
+        loaded = json.loads(self.run_python(code, db_path))
+
+        assert loaded == []
+        assert not db_path.exists() or inspect(create_engine(f"sqlite:///{db_path}")).get_table_names() == []
+
+    def test_init_db_creates_tables(self, tmp_path):
+        db_path = tmp_path / "startup.db"
+
+        self.run_python("from app.db.init_db import init_db; init_db(); print('ok')", db_path)
+
+        tables = inspect(create_engine(f"sqlite:///{db_path}")).get_table_names()
+        assert {"users", "publications", "bulk_jobs", "idempotency_keys"} <= set(tables)
+
+    def test_init_db_upgrades_an_existing_publications_table(self, tmp_path):
+        db_path = tmp_path / "startup.db"
+        old = create_engine(f"sqlite:///{db_path}")
+        with old.begin() as conn:
+            # publications as it was before retries, tracing and priorities
+            conn.exec_driver_sql(
+                "CREATE TABLE publications (id INTEGER PRIMARY KEY, user_id INTEGER, platform VARCHAR, text TEXT, "
+                "media_url VARCHAR, video_path VARCHAR, status VARCHAR, error_message TEXT, created_at DATETIME, "
+                "processed_at DATETIME)"
+            )
+            conn.exec_driver_sql("INSERT INTO publications (platform, text, status) VALUES ('facebook', 'Hola', 'pending')")
+        old.dispose()
+
+        code = (
+            "from app.db.init_db import init_db; init_db(); init_db(); "
+            "from app.db.session import SessionLocal; from app.models.publication import Publication; "
+            "p = SessionLocal().query(Publication).one(); print(p.priority, p.attempts, p.trace_id)"
+        )
+
+        assert self.run_python(code, db_path) == "normal 0 None"
+        upgraded = inspect(create_engine(f"sqlite:///{db_path}"))
+        assert {"priority", "attempts", "next_attempt_at", "error_code", "error_class", "trace_id", "traceparent"} <= {
+            column["name"] for column in upgraded.get_columns("publications")
+        }
+        assert "ix_publications_status_next_attempt_at" in {index["name"] for index in upgraded.get_indexes("publications")}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
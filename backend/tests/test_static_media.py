@@ -0,0 +1,56 @@
+import os
+import tempfile
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.static_media import IMMUTABLE, REVALIDATE, MediaStaticFiles, content_digest
+
+DIGEST = "0123456789abcdef0123456789abcdef"
+
+
+class TestStaticMedia:
+
+    def setup_method(self):
+        self.directory = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.directory, "videos"))
+        with open(os.path.join(self.directory, "videos", f"{DIGEST}.mp4"), "wb") as f:
+            f.write(bytes(range(256)) * 4)
+        with open(os.path.join(self.directory, "tmpab12cd.png"), "wb") as f:
+            f.write(b"legacy")
+
+        app = FastAPI()
+        app.mount("/static", MediaStaticFiles(directory=self.directory, accel_redirect_prefix="/internal-static/"))
+        self.client = TestClient(app)
+
+    def test_content_digest(self):
+        assert content_digest(f"media/{DIGEST}.png") == DIGEST
+        assert content_digest(f"renditions/{DIGEST}/thumb.webp") == DIGEST
+        assert content_digest("media/tmpab12cd.png") is None
+
+    def test_hashed_file_is_immutable_with_strong_etag(self):
+        response = self.client.get(f"/static/videos/{DIGEST}.mp4")
+
+        assert response.headers["cache-control"] == IMMUTABLE
+        assert response.headers["etag"] == f'"{DIGEST}"'
+        revalidated = self.client.get(f"/static/videos/{DIGEST}.mp4", headers={"If-None-Match": f'"{DIGEST}"'})
+        assert revalidated.status_code == 304
+        assert self.client.get("/static/tmpab12cd.png").headers["cache-control"] == REVALIDATE
+
+    def test_range_request(self):
+        response = self.client.get(f"/static/videos/{DIGEST}.mp4", headers={"Range": "bytes=256-511"})
+
+        assert response.status_code == 206
+        assert response.headers["content-range"] == "bytes 256-511/1024"
+        assert response.content == bytes(range(256))
+
+    def test_accel_redirect_only_behind_proxy(self):
+        proxied = self.client.get(f"/static/videos/{DIGEST}.mp4", headers={"X-Sendfile-Type": "X-Accel-Redirect"})
+
+        assert proxied.headers["x-accel-redirect"] == f"/internal-static/videos/{DIGEST}.mp4"
+        assert proxied.headers["content-type"] == "video/mp4"
+        assert proxied.content == b""
+        assert len(self.client.get(f"/static/videos/{DIGEST}.mp4").content) == 1024
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,57 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from app.core import tracing
+from app.services.content_generator import ContentGenerator
+from app.services.publishers import FacebookPublisher
+
+
+@pytest.fixture(scope="module")
+def exporter():
+    return tracing.setup_tracing("memory")
+
+
+class TestTracing:
+
+    @pytest.fixture(autouse=True)
+    def clear_spans(self, exporter):
+        exporter.clear()
+        self.exporter = exporter
+
+    def test_generate_social_content_creates_span(self):
+        generator = ContentGenerator()
+        generator.generate_social_content("Pizza", "Oferta", ["facebook"])
+
+        names = [span.name for span in self.exporter.get_finished_spans()]
+        assert "ContentGenerator.generate_social_content" in names
+
+    @patch('app.services.publishers.base.requests.request')
+    def test_publisher_http_call_is_traced_without_query_string(self, mock_request):
+        mock_response = MagicMock(status_code=200)
+        mock_response.json.return_value = {"id": "123"}
+        mock_request.return_value = mock_response
+
+        publisher = FacebookPublisher()
+        publisher.facebook_page_id = "page"
+        publisher.facebook_access_token = "secret-token"
+        publisher.publish("Hola universidad")
+
+        span = self.exporter.get_finished_spans()[-1]
+        assert span.name == "facebook POST"
+        assert span.attributes["http.response.status_code"] == 200
+        assert "secret-token" not in span.attributes["url.full"]
+
+    def test_traceparent_round_trip(self):
+        with tracing.tracer.start_as_current_span("enqueue"):
+            trace_id = tracing.current_trace_id()
+            traceparent = tracing.current_traceparent()
+
+        with tracing.tracer.start_as_current_span("process", context=tracing.extract_context(traceparent)):
+            assert tracing.current_trace_id() == trace_id
+
+    def test_no_active_span_has_no_trace_id(self):
+        assert tracing.current_trace_id() is None
+        assert tracing.extract_context(None) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -1,9 +1,9 @@
-import { Component, ChangeDetectorRef, OnInit } from '@angular/core';
+import { Component, ChangeDetectorRef, OnDestroy, OnInit } from '@angular/core';
 import { CommonModule } from '@angular/common';
 import { FormsModule } from '@angular/forms';
 import { ApiService } from '../../services/api.service';
 import { Router, RouterModule } from '@angular/router';
-import { Observable } from 'rxjs';
+import { Observable, Subscription } from 'rxjs';
 import { finalize } from 'rxjs/operators';
 
 @Component({
@@ -13,7 +13,7 @@ import { finalize } from 'rxjs/operators';
     templateUrl: './content-generator.component.html',
     styleUrls: ['./content-generator.component.css']
 })
-export class ContentGeneratorComponent {
+export class ContentGeneratorComponent implements OnInit, OnDestroy {
     title: string = '';
     body: string = '';
     platforms: string[] = ['facebook', 'instagram', 'whatsapp', 'linkedin', 'tiktok'];
@@ -43,9 +43,14 @@ export class ContentGeneratorComponent {
     ngOnInit() {
         if (this.apiService.isLoggedIn()) {
             this.loadChats();
+            this.publicationEvents = this.apiService.publicationEvents().subscribe(event => this.onPublicationEvent(event));
         }
     }
 
+    ngOnDestroy() {
+        this.publicationEvents?.unsubscribe();
+    }
+
     isLoggedIn(): boolean {
         return this.apiService.isLoggedIn();
     }
@@ -101,6 +106,10 @@ export class ContentGeneratorComponent {
 
     // Track publishing states: { messageIndex: { platform: 'publishing' | 'published' } }
     publishingStates: { [key: string]: { [platform: string]: string } } = {};
+    publishKeys: { [key: string]: string } = {};
+    // Queued publications waiting for their outcome: { publicationId: { msgKey, platform } }
+    publicationTargets: { [publicationId: number]: { msgKey: string, platform: string } } = {};
+    private publicationEvents?: Subscription;
 
     newChat() {
         this.chatHistory = [];
@@ -121,6 +130,51 @@ export class ContentGeneratorComponent {
             return;
         }
 
+        if (!this.apiService.isLoggedIn()) {
+            this.runGeneration(selected);
+            return;
+        }
+
+        // Offer the result of a near-identical announcement instead of paying for a new generation
+        this.apiService.similarGenerations({ title: this.title, body: this.body }).subscribe({
+            next: (matches: any[]) => {
+                const match = matches[0];
+                if (match && confirm(`Ya generaste contenido para un anuncio casi idéntico ("${match.title}", ${Math.round(match.similarity * 100)}% similar). ¿Reutilizarlo en lugar de generar de nuevo?`)) {
+                    this.reuseGeneration(match.session_id, selected);
+                } else {
+                    this.runGeneration(selected);
+                }
+            },
+            // The check is only a hint: generate anyway
+            error: () => this.runGeneration(selected)
+        });
+    }
+
+    reuseGeneration(sessionId: number, selected: string[]) {
+        this.apiService.getMessages(sessionId).subscribe({
+            next: (msgs: any[]) => {
+                const answer = [...msgs].reverse().find(m => m.role === 'assistant');
+                const content = answer ? JSON.parse(answer.content) : {};
+                if (!selected.every(p => content[p] && !content[p].error)) {
+                    // The old result lacks some of the platforms asked for now
+                    this.runGeneration(selected);
+                    return;
+                }
+                this.chatHistory.push({ type: 'user', title: this.title, body: this.body, timestamp: new Date() });
+                this.chatHistory.push({
+                    type: 'ai',
+                    content: Object.fromEntries(selected.map(p => [p, content[p]])),
+                    timestamp: new Date()
+                });
+                this.title = '';
+                this.body = '';
+                this.cdr.detectChanges();
+            },
+            error: () => this.runGeneration(selected)
+        });
+    }
+
+    runGeneration(selected: string[]) {
         this.isLoading = true;
         this.error = '';
 
@@ -210,12 +264,23 @@ export class ContentGeneratorComponent {
             payload.media_url = mediaUrl;
         }
 
-        this.apiService.publishContent(payload).subscribe({
+        // Reused when the user retries after an error, so a publish that did reach the server is not queued twice
+        const keyId = `${msgKey}_${platform}`;
+        this.publishKeys[keyId] = this.publishKeys[keyId] || crypto.randomUUID();
+
+        this.sendPublication(payload, keyId, msgKey, platform);
+    }
+
+    sendPublication(payload: any, keyId: string, msgKey: string, platform: string) {
+        this.apiService.publishContent(payload, this.publishKeys[keyId]).subscribe({
             next: (res: any) => {
                 if (res.error) {
                     alert(`Error: ${res.message}`);
                     // Reset state on error
                     delete this.publishingStates[msgKey][platform];
+                } else if (this.publicationEvents && res.publication_id) {
+                    // Queued: stays 'publishing' until the worker pushes the outcome
+                    this.publicationTargets[res.publication_id] = { msgKey, platform };
                 } else {
                     // Set to published state
                     this.publishingStates[msgKey][platform] = 'published';
@@ -223,8 +288,18 @@ export class ContentGeneratorComponent {
                 }
             },
             error: (err) => {
-                console.error(err);
-                alert('Error al publicar en el servidor.');
+                const duplicates = err.status === 409 ? err.error?.detail?.duplicates : null;
+                if (duplicates?.length) {
+                    // A near-identical post already went out on this platform: ask before sending it again
+                    const similarity = Math.round(duplicates[0].similarity * 100);
+                    if (confirm(`Ya se publicó un texto casi idéntico en ${platform} (${similarity}% similar). ¿Publicar de todos modos?`)) {
+                        this.sendPublication({ ...payload, allow_duplicate: true }, keyId, msgKey, platform);
+                        return;
+                    }
+                } else {
+                    console.error(err);
+                    alert('Error al publicar en el servidor.');
+                }
                 // Reset state on error
                 delete this.publishingStates[msgKey][platform];
                 this.cdr.detectChanges();
@@ -232,6 +307,22 @@ export class ContentGeneratorComponent {
         });
     }
 
+    onPublicationEvent(event: any) {
+        const target = this.publicationTargets[event.publication_id];
+        if (!target) return;
+
+        if (event.status === 'published') {
+            this.publishingStates[target.msgKey][target.platform] = 'published';
+            delete this.publicationTargets[event.publication_id];
+        } else if (event.status === 'failed') {
+            delete this.publishingStates[target.msgKey][target.platform];
+            delete this.publicationTargets[event.publication_id];
+            alert(`Error al publicar en ${target.platform}: ${event.error_message || 'error desconocido'}`);
+        }
+        // processing / retrying: still 'publishing'
+        this.cdr.detectChanges();
+    }
+
     getPublishButtonState(messageIndex: number, platform: string): string {
         const msgKey = `msg_${messageIndex}`;
         return this.publishingStates[msgKey]?.[platform] || '';
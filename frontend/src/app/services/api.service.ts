@@ -1,6 +1,6 @@
 import { Injectable } from '@angular/core';
 import { HttpClient } from '@angular/common/http';
-import { Observable } from 'rxjs';
+import { Observable, retry, throwError, timer } from 'rxjs';
 
 @Injectable({
   providedIn: 'root'
@@ -72,13 +72,29 @@ export class ApiService {
     return this.http.post(`${this.apiUrl}/chats/${chatId}/messages`, { content }, this.getHeaders());
   }
 
+  // Same key on every retry, so the backend replays the first result instead of running twice
+  private postIdempotent(url: string, data: any, idempotencyKey: string = crypto.randomUUID()): Observable<any> {
+    return this.http.post(url, data, { headers: { 'Idempotency-Key': idempotencyKey } }).pipe(
+      retry({
+        count: 3,
+        // Only network failures (status 0) are retried; HTTP errors are real answers
+        delay: (err, attempt) => err.status === 0 ? timer(1000 * attempt) : throwError(() => err)
+      })
+    );
+  }
+
   // Content Generation
-  generateContent(data: any): Observable<any> {
-    return this.http.post(`${this.apiUrl}/generate`, data);
+  generateContent(data: any, idempotencyKey?: string): Observable<any> {
+    return this.postIdempotent(`${this.apiUrl}/generate`, data, idempotencyKey);
+  }
+
+  // Previous generations of the user from a near-identical announcement, most similar first
+  similarGenerations(data: { title: string, body: string }): Observable<any> {
+    return this.http.post(`${this.apiUrl}/generate/similar`, data, this.getHeaders());
   }
 
-  publishContent(data: any): Observable<any> {
-    return this.http.post(`${this.apiUrl}/publish`, data);
+  publishContent(data: any, idempotencyKey?: string): Observable<any> {
+    return this.postIdempotent(`${this.apiUrl}/publish`, data, idempotencyKey);
   }
 
   // Publications History
@@ -93,4 +109,15 @@ export class ApiService {
   getPublication(id: number): Observable<any> {
     return this.http.get(`${this.apiUrl}/publications/${id}`);
   }
+
+  // Status changes of the user's publications, pushed by the queue worker (Server-Sent Events).
+  // EventSource cannot send headers, so the token goes in the query; it reconnects by itself.
+  publicationEvents(): Observable<any> {
+    return new Observable(subscriber => {
+      const token = encodeURIComponent(this.getToken() || '');
+      const source = new EventSource(`${this.apiUrl}/publications/events?access_token=${token}`);
+      source.addEventListener('publication', (event: MessageEvent) => subscriber.next(JSON.parse(event.data)));
+      return () => source.close();
+    });
+  }
 }